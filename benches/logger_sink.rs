@@ -0,0 +1,51 @@
+use criterion::{criterion_group, criterion_main, Criterion, Throughput};
+use didius::logger::message::Message;
+use didius::logger::sink::{BinarySink, JsonLinesSink, LogSink};
+use serde_json::json;
+use std::fs;
+
+// A batch of 10-level book snapshots, the bulk of what MARKET_DATA logging writes
+fn batch(n: usize) -> Vec<Message> {
+    (0..n).map(|i| {
+        let bp: Vec<String> = (0..10).map(|l| (142_500 - l * 100).to_string()).collect();
+        let bv: Vec<i64> = (0..10).map(|l| 1_000 + (i as i64 + l) % 97).collect();
+        let ap: Vec<String> = (0..10).map(|l| (142_600 + l * 100).to_string()).collect();
+        Message::new("MARKET_DATA".to_string(), json!({
+            "type": "OrderBookSnapshot", "symbol": "005930", "update_id": i,
+            "data": {"bp": bp, "bv": bv, "ap": ap, "av": bv}
+        }))
+    }).collect()
+}
+
+fn bench_sinks(c: &mut Criterion) {
+    let messages = batch(1_000);
+    let dir = std::env::temp_dir().join("didius_logger_bench");
+    fs::create_dir_all(&dir).unwrap();
+    let path = |name: &str| dir.join(name).to_string_lossy().to_string();
+
+    let mut group = c.benchmark_group("log_sink");
+    group.throughput(Throughput::Elements(messages.len() as u64));
+
+    group.bench_function("json_lines", |b| {
+        let p = path("bench.jsonl");
+        let mut sink = JsonLinesSink::new(&p);
+        b.iter(|| sink.write_batch(&messages).unwrap());
+        sink.close().unwrap();
+        let _ = fs::remove_file(&p);
+    });
+
+    for (name, compress) in [("binary", false), ("binary_zstd", true)] {
+        group.bench_function(name, |b| {
+            let p = path(name);
+            // Rotate every 64 MB so the bench does not fill the disk
+            let mut sink = BinarySink::new(&p, compress, Some(64 << 20), None).unwrap();
+            b.iter(|| sink.write_batch(&messages).unwrap());
+            sink.close().unwrap();
+        });
+    }
+    group.finish();
+    let _ = fs::remove_dir_all(&dir);
+}
+
+criterion_group!(benches, bench_sinks);
+criterion_main!(benches);
@@ -0,0 +1,62 @@
+use criterion::{black_box, criterion_group, criterion_main, BatchSize, Criterion};
+use didius::oms::order_book::{OrderBook, OrderBookDelta};
+use rust_decimal::Decimal;
+
+// 10-level KRX stock book around 142,600 KRW with a 100 KRW tick,
+// the same shape as the H0UNASP0 frames in examples/websocket_stock.txt.
+fn levels(shift: i64) -> (Vec<(Decimal, i64)>, Vec<(Decimal, i64)>) {
+    let asks = (0..10).map(|i| (Decimal::new(142_600 + (i + shift) * 100, 0), 1_000 + i * 37)).collect();
+    let bids = (0..10).map(|i| (Decimal::new(142_500 - (i - shift) * 100, 0), 2_000 + i * 53)).collect();
+    (bids, asks)
+}
+
+fn deltas(n: usize) -> Vec<OrderBookDelta> {
+    (0..n as i64).map(|i| OrderBookDelta {
+        symbol: "005930".to_string(),
+        bids: vec![(Decimal::new(142_500 - (i % 10) * 100, 0), 100 + i % 7)],
+        asks: vec![(Decimal::new(142_600 + (i % 10) * 100, 0), if i % 5 == 0 { 0 } else { 200 + i % 11 })],
+        update_id: i,
+        timestamp: i as f64,
+    }).collect()
+}
+
+fn bench_rebuild(c: &mut Criterion) {
+    let mut group = c.benchmark_group("rebuild");
+    let snapshots: Vec<_> = (0..16).map(levels).collect();
+
+    group.bench_function("btree", |b| {
+        let mut book = OrderBook::new("005930".to_string());
+        let mut i = 0;
+        b.iter_batched(
+            || { i += 1; snapshots[i % snapshots.len()].clone() },
+            |(bids, asks)| {
+                book.rebuild(bids, asks, 0, 0.0);
+                black_box(book.get_best_bid());
+            },
+            BatchSize::SmallInput,
+        );
+    });
+    group.finish();
+}
+
+fn bench_apply_delta(c: &mut Criterion) {
+    let mut group = c.benchmark_group("apply_delta");
+    let (bids, asks) = levels(0);
+    let updates = deltas(1024);
+
+    group.bench_function("btree", |b| {
+        let mut book = OrderBook::new("005930".to_string());
+        book.rebuild(bids.clone(), asks.clone(), 0, 0.0);
+        b.iter(|| {
+            for d in &updates {
+                book.apply_delta(d);
+            }
+            black_box((book.get_best_bid(), book.get_best_ask()));
+            book.timestamp = 0.0;
+        });
+    });
+    group.finish();
+}
+
+criterion_group!(benches, bench_rebuild, bench_apply_delta);
+criterion_main!(benches);
@@ -0,0 +1,101 @@
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion, Throughput};
+use didius::adapter::hantoo_ws::{WsDecoder, WsEvent};
+use didius::adapter::mock::MockAdapter;
+use didius::adapter::replay::{RecordReader, RecordWriter};
+use didius::adapter::IncomingMessage;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{ExecutionStrategy, Order, OrderSide, OrderType};
+use std::collections::HashMap;
+use std::sync::{Arc, Mutex};
+use std::time::Duration;
+
+const SYMBOLS: usize = 50;
+const MESSAGES: usize = 20_000;
+
+// A recorded KRX session when DIDIUS_REPLAY_FILE is set; otherwise one is built
+// from the H0UNASP0 frames in examples/, spread over SYMBOLS names with the
+// residual quantities varied so consecutive snapshots differ.
+fn recording() -> String {
+    if let Ok(path) = std::env::var("DIDIUS_REPLAY_FILE") {
+        return path;
+    }
+    let path = std::env::temp_dir().join("didius_bench_replay.rec").to_string_lossy().to_string();
+    let text = std::fs::read_to_string(concat!(env!("CARGO_MANIFEST_DIR"), "/examples/websocket_stock.txt")).expect("recorded frames");
+    let frames: Vec<&str> = text.lines().filter(|l| !l.is_empty()).collect();
+
+    let mut decoder = WsDecoder::new();
+    let mut writer = RecordWriter::create(&path, Duration::from_secs(1)).unwrap();
+    for i in 0..MESSAGES {
+        let mut book = match decoder.parse(frames[i % frames.len()]) {
+            Some(WsEvent::Book(b)) => b,
+            _ => continue,
+        };
+        book.symbol = format!("{:06}", i % SYMBOLS);
+        book.update_id = i as i64;
+        if let Some(level) = book.asks.first_mut() {
+            level.1 += (i % 7) as i64;
+        }
+        writer.write(i as i64 * 1_000, &IncomingMessage::OrderBookSnapshot(book)).unwrap();
+    }
+    writer.finish().unwrap();
+    path
+}
+
+fn engine_with_stops(n_stops: usize) -> OMSEngine {
+    let config = LoggerConfig { destination: LogDestinationInfo::Console, ..Default::default() };
+    let engine = OMSEngine::new(Arc::new(MockAdapter::new()), Arc::new(Mutex::new(Logger::new(config))));
+    for i in 0..n_stops {
+        // Triggers far below the book, so the stops stay armed
+        let mut params = HashMap::new();
+        params.insert("trigger_price".to_string(), "1".to_string());
+        params.insert("trigger_side".to_string(), "SELL".to_string());
+        let order = Order::new(
+            format!("{:06}", i % SYMBOLS),
+            OrderSide::SELL,
+            OrderType::LIMIT,
+            1,
+            Some("150000".to_string()),
+            Some(ExecutionStrategy::STOP),
+            Some(params),
+            None,
+            "KRX".to_string(),
+        );
+        engine.send_order_internal(order).unwrap();
+    }
+    engine
+}
+
+fn bench_replay(c: &mut Criterion) {
+    let path = recording();
+    let messages: Vec<IncomingMessage> = RecordReader::open(&path).unwrap().map(|r| r.unwrap().1).collect();
+
+    let mut group = c.benchmark_group("replay");
+    group.throughput(Throughput::Elements(messages.len() as u64));
+    group.sample_size(10);
+
+    group.bench_function("read_recording", |b| {
+        b.iter(|| {
+            for r in RecordReader::open(&path).unwrap() {
+                black_box(r.unwrap());
+            }
+        })
+    });
+
+    // Books and strategy dispatch, as the gateway listener drives them
+    for &stops in &[0usize, 1_000, 10_000] {
+        group.bench_with_input(BenchmarkId::new("engine", stops), &stops, |b, &stops| {
+            let engine = engine_with_stops(stops);
+            b.iter(|| {
+                for msg in &messages {
+                    engine.on_order_book_information(msg.clone()).unwrap();
+                }
+            })
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, bench_replay);
+criterion_main!(benches);
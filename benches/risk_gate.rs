@@ -0,0 +1,77 @@
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion};
+use didius::adapter::mock::MockAdapter;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::risk::{RiskGate, RiskLimits};
+use rust_decimal::Decimal;
+use std::sync::{Arc, Mutex};
+
+fn limits() -> RiskLimits {
+    // Every check enabled, loose enough that nothing is rejected
+    RiskLimits {
+        max_order_qty: Some(1_000_000),
+        max_order_notional: Some(Decimal::new(1_000_000_000_000, 0)),
+        max_symbol_notional: Some(Decimal::new(1_000_000_000_000, 0)),
+        max_gross_notional: Some(Decimal::new(1_000_000_000_000, 0)),
+        max_open_orders: Some(1_000_000),
+        max_orders_per_sec: Some(u32::MAX),
+        price_band: Some(Decimal::new(5, 2)),
+        max_position: Some(1_000_000_000),
+    }
+}
+
+fn order(id: String, symbol: String) -> Order {
+    let mut o = Order::new(symbol, OrderSide::BUY, OrderType::LIMIT, 1, Some("70000".to_string()), None, None, None, "KRX".to_string());
+    o.order_id = Some(id);
+    o
+}
+
+// check + release of one order, with `open` other orders already reserved
+fn bench_gate(c: &mut Criterion) {
+    let mut group = c.benchmark_group("risk_gate_check");
+    for open in [10usize, 1_000, 100_000] {
+        let mut gate = RiskGate::new(limits());
+        for s in 0..200 {
+            gate.on_bbo(&format!("{:06}", s), Some(Decimal::new(69900, 0)), Some(Decimal::new(70100, 0)));
+        }
+        for i in 0..open {
+            gate.check(&order(format!("open-{}", i), format!("{:06}", i % 200))).unwrap();
+        }
+        let probe = order("probe".to_string(), "000007".to_string());
+        group.bench_with_input(BenchmarkId::from_parameter(open), &open, |b, _| {
+            b.iter(|| {
+                gate.check(black_box(&probe)).unwrap();
+                gate.on_status("probe", &OrderState::CANCELED);
+            })
+        });
+    }
+    group.finish();
+}
+
+// Whole send_order_internal path against a no-op adapter, with and without limits
+fn bench_send_order(c: &mut Criterion) {
+    let mut group = c.benchmark_group("send_order_internal");
+    for (name, limits) in [("no_limits", RiskLimits::default()), ("all_limits", limits())] {
+        let config = LoggerConfig {
+            destination: LogDestinationInfo::Console,
+            ..Default::default()
+        };
+        let engine = OMSEngine::new(Arc::new(MockAdapter::new()), Arc::new(Mutex::new(Logger::new(config))));
+        engine.set_risk_limits(limits);
+        let mut i = 0u64;
+        group.bench_function(name, |b| {
+            b.iter(|| {
+                i += 1;
+                let id = engine.send_order_internal(order(format!("o-{}", i), "005930".to_string())).unwrap();
+                // Keep the open-order count flat across iterations
+                engine.on_order_status_update(&id, OrderState::CANCELED, None);
+            })
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, bench_gate, bench_send_order);
+criterion_main!(benches);
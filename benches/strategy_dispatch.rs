@@ -0,0 +1,75 @@
+use criterion::{black_box, criterion_group, criterion_main, BenchmarkId, Criterion};
+use didius::oms::order::OrderSide;
+use didius::oms::order_book::OrderBook;
+use didius::strategy::base::Strategy;
+use didius::strategy::registry::StrategyRegistry;
+use didius::strategy::stop::StopStrategy;
+use rust_decimal::Decimal;
+
+// Resting stop orders per symbol. Total strategies grow by adding symbols,
+// which is how the book grows in practice (more names, not more stops per name).
+const STOPS_PER_SYMBOL: usize = 4;
+
+fn build_registry(n_strategies: usize) -> StrategyRegistry {
+    let mut registry = StrategyRegistry::new();
+    for i in 0..n_strategies {
+        let symbol = format!("{:06}", i / STOPS_PER_SYMBOL);
+        // Trigger far away from the book so strategies never fire
+        registry.add(Box::new(StopStrategy::new(
+            format!("order-{}", i),
+            symbol,
+            OrderSide::BUY,
+            1,
+            OrderSide::BUY,
+            Decimal::new(1_000_000, 0),
+            0.0,
+            None,
+        )));
+    }
+    registry
+}
+
+fn make_book(symbol: &str) -> OrderBook {
+    let mut book = OrderBook::new(symbol.to_string());
+    book.rebuild(
+        vec![(Decimal::new(70000, 0), 10), (Decimal::new(69900, 0), 10)],
+        vec![(Decimal::new(70100, 0), 10), (Decimal::new(70200, 0), 10)],
+        1,
+        1.0,
+    );
+    book
+}
+
+fn bench_book_update(c: &mut Criterion) {
+    let mut group = c.benchmark_group("book_update_dispatch");
+    for &n in &[16usize, 256, 4096, 65536] {
+        let mut registry = build_registry(n);
+        let book = make_book("000000");
+
+        group.bench_with_input(BenchmarkId::new("indexed", n), &n, |b, _| {
+            b.iter(|| black_box(registry.dispatch_symbol("000000", |s| s.on_order_book_update(&book))))
+        });
+
+        // Baseline: the previous behaviour of notifying every active strategy
+        group.bench_with_input(BenchmarkId::new("scan_all", n), &n, |b, _| {
+            b.iter(|| black_box(registry.dispatch_all(|s| s.on_order_book_update(&book))))
+        });
+    }
+    group.finish();
+}
+
+fn bench_order_update(c: &mut Criterion) {
+    let mut group = c.benchmark_group("order_update_dispatch");
+    for &n in &[16usize, 256, 4096, 65536] {
+        let mut registry = build_registry(n);
+        let target = format!("order-{}", n / 2);
+
+        group.bench_with_input(BenchmarkId::new("indexed", n), &n, |b, _| {
+            b.iter(|| black_box(registry.dispatch_order(&target, |s| s.on_trade_update(0.0))))
+        });
+    }
+    group.finish();
+}
+
+criterion_group!(benches, bench_book_update, bench_order_update);
+criterion_main!(benches);
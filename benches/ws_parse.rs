@@ -0,0 +1,103 @@
+use criterion::{black_box, criterion_group, criterion_main, Criterion, Throughput};
+use didius::adapter::hantoo_ws::WsDecoder;
+use didius::oms::order_book::OrderBookSnapshot;
+use rust_decimal::Decimal;
+use std::alloc::{GlobalAlloc, Layout, System};
+use std::str::FromStr;
+use std::sync::atomic::{AtomicUsize, Ordering};
+
+// Counts heap allocations so the report can show allocations per frame.
+struct CountingAlloc;
+
+static ALLOCS: AtomicUsize = AtomicUsize::new(0);
+
+unsafe impl GlobalAlloc for CountingAlloc {
+    unsafe fn alloc(&self, layout: Layout) -> *mut u8 {
+        ALLOCS.fetch_add(1, Ordering::Relaxed);
+        System.alloc(layout)
+    }
+    unsafe fn dealloc(&self, ptr: *mut u8, layout: Layout) {
+        System.dealloc(ptr, layout)
+    }
+    unsafe fn realloc(&self, ptr: *mut u8, layout: Layout, new_size: usize) -> *mut u8 {
+        ALLOCS.fetch_add(1, Ordering::Relaxed);
+        System.realloc(ptr, layout, new_size)
+    }
+}
+
+#[global_allocator]
+static GLOBAL: CountingAlloc = CountingAlloc;
+
+fn frames() -> Vec<String> {
+    let path = concat!(env!("CARGO_MANIFEST_DIR"), "/examples/websocket_stock.txt");
+    std::fs::read_to_string(path).expect("recorded frames")
+        .lines()
+        .filter(|l| !l.is_empty())
+        .map(|l| l.to_string())
+        .collect()
+}
+
+// The previous H0UNASP0 path: collect/join/collect, Decimal::from_str and two clock reads.
+fn parse_legacy(text: &str) -> Option<OrderBookSnapshot> {
+    let parts: Vec<&str> = text.split('|').collect();
+    if parts.len() < 4 { return None; }
+    let data_part = parts[3..].join("|");
+    let fields: Vec<&str> = data_part.split('^').collect();
+    if fields.len() <= 42 { return None; }
+    let mut asks = Vec::new();
+    let mut bids = Vec::new();
+    for i in 0..10 {
+        let ap = Decimal::from_str(fields[3 + i]).unwrap_or_default();
+        let bp = Decimal::from_str(fields[13 + i]).unwrap_or_default();
+        let aq: i64 = fields[23 + i].parse().unwrap_or(0);
+        let bq: i64 = fields[33 + i].parse().unwrap_or(0);
+        if ap > Decimal::ZERO { asks.push((ap, aq)); }
+        if bp > Decimal::ZERO { bids.push((bp, bq)); }
+    }
+    Some(OrderBookSnapshot {
+        symbol: fields[0].to_string(),
+        bids: bids.clone(),
+        asks: asks.clone(),
+        update_id: chrono::Local::now().timestamp_millis(),
+        timestamp: chrono::Local::now().timestamp_millis() as f64 / 1000.0,
+    })
+}
+
+fn allocs_per_frame<F: FnMut(&str)>(frames: &[String], mut f: F) -> f64 {
+    let before = ALLOCS.load(Ordering::Relaxed);
+    for text in frames {
+        f(text);
+    }
+    (ALLOCS.load(Ordering::Relaxed) - before) as f64 / frames.len() as f64
+}
+
+fn bench_ws_parse(c: &mut Criterion) {
+    let frames = frames();
+    let mut decoder = WsDecoder::new();
+
+    // Result allocations (symbol + level vectors) are included in both counts
+    let legacy = allocs_per_frame(&frames, |t| { black_box(parse_legacy(t)); });
+    let table = allocs_per_frame(&frames, |t| { black_box(decoder.parse(t)); });
+    println!("allocations per H0UNASP0 frame: legacy {:.1}, field table {:.1}", legacy, table);
+
+    let mut group = c.benchmark_group("ws_parse_h0unasp0");
+    group.throughput(Throughput::Elements(frames.len() as u64));
+    group.bench_function("legacy", |b| {
+        b.iter(|| {
+            for t in &frames {
+                black_box(parse_legacy(t));
+            }
+        })
+    });
+    group.bench_function("field_table", |b| {
+        b.iter(|| {
+            for t in &frames {
+                black_box(decoder.parse(t));
+            }
+        })
+    });
+    group.finish();
+}
+
+criterion_group!(benches, bench_ws_parse);
+criterion_main!(benches);
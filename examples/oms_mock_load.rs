@@ -0,0 +1,49 @@
+use didius::adapter::matching::RandomWalkBook;
+use didius::adapter::mock::{MockAdapter, MockConfig};
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::loadgen::{run_load, LoadConfig};
+use rust_decimal::Decimal;
+use std::sync::{Arc, Mutex};
+use std::time::Duration;
+
+// Usage: cargo run --release --example oms_mock_load -- [orders/sec] [seconds] [venue latency ms]
+fn main() -> anyhow::Result<()> {
+    let args: Vec<String> = std::env::args().collect();
+    let rate: u64 = args.get(1).and_then(|s| s.parse().ok()).unwrap_or(1_000);
+    let seconds: f64 = args.get(2).and_then(|s| s.parse().ok()).unwrap_or(10.0);
+    let latency_ms: f64 = args.get(3).and_then(|s| s.parse().ok()).unwrap_or(1.0);
+
+    let symbols: Vec<String> = ["005930", "000660", "035420", "005380"].iter().map(|s| s.to_string()).collect();
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig {
+        latency: Duration::from_secs_f64(latency_ms / 1000.0),
+        book_interval: Duration::from_millis(50),
+    }));
+    for (i, symbol) in symbols.iter().enumerate() {
+        // Deep enough that market orders of 1 never run the book dry between refreshes
+        adapter.add_book_generator(Box::new(RandomWalkBook::new(symbol, Decimal::new(70_000, 0), Decimal::new(100, 0), 10, 10_000, i as u64 + 1)));
+    }
+
+    let logger_config = LoggerConfig {
+        destination: LogDestinationInfo::LocalFile { path: "logs/mock_load.log".to_string() },
+        flush_interval_seconds: 1,
+        batch_size: 1024 * 8,
+    };
+    let logger = Arc::new(Mutex::new(Logger::new(logger_config)));
+    logger.lock().unwrap().start();
+    let engine = OMSEngine::new(adapter.clone(), logger.clone());
+
+    println!("Sending {} orders/sec for {}s, venue latency {}ms...", rate, seconds, latency_ms);
+    let report = run_load(&engine, adapter.as_ref(), &LoadConfig {
+        orders_per_sec: rate,
+        duration: Duration::from_secs_f64(seconds),
+        symbols,
+        ..Default::default()
+    })?;
+    println!("{}", serde_json::to_string_pretty(&report)?);
+    println!("Account: {:?}", engine.get_account().positions);
+
+    logger.lock().unwrap().stop();
+    Ok(())
+}
@@ -13,23 +13,19 @@ use std::io::Write;
 use std::path::PathBuf;
 use std::sync::{Arc, Mutex};
 use std::sync::atomic::{AtomicBool, Ordering};
-use std::thread;
 use std::sync::mpsc;
-use std::collections::HashMap;
-use tungstenite::{connect, Message};
 use url::Url;
 use crate::adapter::IncomingMessage;
 use rust_decimal::Decimal;
 use std::str::FromStr;
-use crate::oms::order_book::{OrderBookSnapshot};
-
-use aes::Aes256;
-use cbc::Decryptor;
-use block_padding::Pkcs7;
-use base64::{Engine as _, engine::general_purpose::STANDARD as BASE64};
-use cbc::cipher::{BlockDecryptMut, KeyIvInit};
-
-type Aes256CbcDec = Decryptor<Aes256>;
+use crate::adapter::hantoo_ws::{WsDecoder, WsEvent};
+use crate::adapter::order_index::{NoticeRoute, OrderNoIndex};
+use crate::adapter::rest::{LatencyStats, RestConfig, RestPipeline, RestRequest};
+use crate::adapter::ws_session::{WsHandler, WsSession};
+use crate::message::ConnectionStatus;
+use std::sync::RwLock;
+use std::time::Instant;
+use crate::metrics::{self, Stage};
 
 #[derive(Debug, Deserialize, Clone)]
 pub struct HantooConfig {
@@ -44,8 +40,15 @@ pub struct HantooConfig {
     pub my_prod_future: Option<String>,
     pub my_htsid: Option<String>,
     pub ops: Option<String>, // WebSocket URL
+    // Order entry pipeline: concurrent REST requests and client-side requests/sec.
+    // Defaults follow KIS limits (20/s real, 2/s virtual).
+    pub rest_max_in_flight: Option<usize>,
+    pub rest_rate_limit: Option<f64>,
 }
 
+const TR_ID_WS_TRADE: &str = "H0SCCNT0"; // Realtime Stock Conclusion (KOSPI)
+const TR_ID_WS_ASK: &str = "H0UNASP0"; // Asking Price (Total - 10 levels)
+
 #[derive(Debug, Serialize, Deserialize)]
 struct TokenData {
     token: String,
@@ -55,26 +58,25 @@ struct TokenData {
 
 pub struct HantooAdapter {
     config: HantooConfig,
-    token: Mutex<Option<String>>,
-    token_exp: Mutex<Option<DateTime<Local>>>,
+    // (token, expiry) behind one lock; read on every REST call
+    token: RwLock<Option<(String, DateTime<Local>)>>,
     client: Client,
+    // Orders, cancels, modifies and book snapshots
+    rest: RestPipeline,
     auth_dir: PathBuf,
     // WebSocket state
     approval_key: Mutex<Option<String>>,
-    ws_thread: Mutex<Option<thread::JoinHandle<()>>>,
-    // Map ClientOrderID -> (OrgNo, OrderNo)
+    // One WS session for market data and notices; reconnects on its own
+    session: Mutex<Option<WsSession>>,
+    // Map ClientOrderID -> (OrgNo, OrderNo), indexed by OrderNo for notices
     // Changed to Arc<Mutex> to share with WS thread
-    order_map: Arc<Mutex<HashMap<String, HantooOrderInfo>>>,
+    order_map: Arc<Mutex<OrderNoIndex<HantooOrderInfo>>>,
     // Channel to Engine
     sender: Mutex<Option<mpsc::Sender<IncomingMessage>>>,
     // Subscribed Symbols
     subscribed_symbols: Mutex<Vec<String>>,
     // Debug flag for WS logging
     debug_ws: Arc<AtomicBool>,
-    
-    // Encryption
-    ws_aes_iv: Arc<Mutex<Option<Vec<u8>>>>,
-    ws_aes_key: Arc<Mutex<Option<Vec<u8>>>>,
 }
 
 #[derive(Debug, Clone)]
@@ -84,6 +86,43 @@ struct HantooOrderInfo {
     exchange: String
 }
 
+struct HantooWsHandler {
+    // AES keys arrive on the session and are only used by its thread
+    decoder: WsDecoder,
+    sender: Option<mpsc::Sender<IncomingMessage>>,
+    order_map: Arc<Mutex<OrderNoIndex<HantooOrderInfo>>>,
+    debug_ws: Arc<AtomicBool>,
+}
+
+impl WsHandler for HantooWsHandler {
+    fn on_text(&mut self, text: &str) {
+        let received = Instant::now();
+        if self.debug_ws.load(Ordering::Relaxed) {
+            println!("[{}] WS_RECV: {}", chrono::Local::now().format("%Y-%m-%d %H:%M:%S%.3f"), text);
+        }
+        if text.starts_with('{') {
+            // Subscription response carries the IV/Key for encrypted notices
+            self.decoder.update_keys(text);
+            return;
+        }
+        if text.starts_with('0') || text.starts_with('1') { // Data
+            if let Some(s) = &self.sender {
+                if let Some(msg) = HantooAdapter::parse_ws_message(&mut self.decoder, text, &self.order_map) {
+                    metrics::global().record_since(Stage::Parse, received);
+                    let _ = s.send(msg);
+                }
+            }
+        }
+    }
+
+    fn on_status(&mut self, status: ConnectionStatus) {
+        info!("Hantoo WS {:?}", status);
+        if let Some(s) = &self.sender {
+            let _ = s.send(IncomingMessage::ConnectionStatus(status));
+        }
+    }
+}
+
 impl HantooAdapter {
     pub fn new(config_path: &str) -> Result<Self> {
         let config_str = fs::read_to_string(config_path)
@@ -91,22 +130,27 @@ impl HantooAdapter {
         let config: HantooConfig = serde_yaml::from_str(&config_str)
             .map_err(|e| anyhow!("Failed to parse hantoo config: {}", e))?;
 
+        let is_virtual = config.prod.contains("openapivts");
+        let rest = RestPipeline::new(RestConfig {
+            max_in_flight: config.rest_max_in_flight.unwrap_or(4),
+            rate_per_sec: config.rest_rate_limit.unwrap_or(if is_virtual { 2.0 } else { 20.0 }),
+            ..Default::default()
+        })?;
+
         let adapter = HantooAdapter {
             config,
-            token: Mutex::new(None),
-            token_exp: Mutex::new(None),
+            token: RwLock::new(None),
             client: Client::new(),
+            rest,
             auth_dir: PathBuf::from("auth"),
             approval_key: Mutex::new(None),
 
-            ws_thread: Mutex::new(None), 
-            order_map: Arc::new(Mutex::new(HashMap::new())),
+            session: Mutex::new(None),
+            order_map: Arc::new(Mutex::new(OrderNoIndex::new())),
             sender: Mutex::new(None),
             subscribed_symbols: Mutex::new(Vec::new()),
             debug_ws: Arc::new(AtomicBool::new(false)),
             
-            ws_aes_iv: Arc::new(Mutex::new(None)),
-            ws_aes_key: Arc::new(Mutex::new(None)),
         };
 
         Ok(adapter)
@@ -120,39 +164,69 @@ impl HantooAdapter {
         &self.client
     }
 
+    pub(crate) fn rest(&self) -> &RestPipeline {
+        &self.rest
+    }
+
+    /// End-to-end latency (submit -> response) of REST order entry calls.
+    pub fn rest_latency(&self) -> LatencyStats {
+        self.rest.latency_stats()
+    }
+
+    // Standard KIS headers on a pipeline request
+    pub(crate) fn api_request(&self, request: RestRequest, tr_id: &str) -> Result<RestRequest> {
+        let token = self.get_token()?;
+        Ok(request
+            .header("content-type", "application/json")
+            .header("authorization", format!("Bearer {}", token))
+            .header("appkey", self.config.my_app.as_str())
+            .header("appsecret", self.config.my_sec.as_str())
+            .header("tr_id", tr_id)
+            .header("custtype", "P"))
+    }
+
     pub(crate) fn set_monitor_internal(&self, sender: mpsc::Sender<IncomingMessage>) {
         let mut guard = self.sender.lock().unwrap();
         *guard = Some(sender);
     }
     
+    /// Add symbols to the market stream. Before `connect` they are only recorded;
+    /// afterwards they are subscribed on the live session.
     pub fn subscribe_market(&self, symbols: &[String]) -> Result<()> {
         let mut guard = self.subscribed_symbols.lock().unwrap();
+        let session = self.session.lock().unwrap();
         for s in symbols {
             if !guard.contains(s) {
                 guard.push(s.to_string());
             }
+            if let Some(session) = session.as_ref() {
+                Self::subscribe_symbol(session, s);
+            }
+        }
+        Ok(())
+    }
+
+    pub fn unsubscribe_market(&self, symbols: &[String]) -> Result<()> {
+        let mut guard = self.subscribed_symbols.lock().unwrap();
+        let session = self.session.lock().unwrap();
+        for s in symbols {
+            guard.retain(|x| x != s);
+            if let Some(session) = session.as_ref() {
+                session.unsubscribe(TR_ID_WS_TRADE, s);
+                session.unsubscribe(TR_ID_WS_ASK, s);
+            }
         }
         Ok(())
     }
-    
-    // pub fn add_subscription(&self, _symbol: String) {
-    //     // Placeholder driven by start_ws_thread using subscribed_symbols
-    // }
     
     pub(crate) fn get_token(&self) -> Result<String> {
-        {
-            let token_guard = self.token.lock().unwrap();
-            let exp_guard = self.token_exp.lock().unwrap();
-            if let (Some(token), Some(exp)) = (token_guard.as_ref(), exp_guard.as_ref()) {
-                 if *exp > Local::now() {
-                     return Ok(token.clone());
-                 }
+        if let Some((token, exp)) = self.token.read().unwrap().as_ref() {
+            if *exp > Local::now() {
+                return Ok(token.clone());
             }
         }
 
         if let Ok(cached_token) = self.read_token_from_file() {
-             let mut token_guard = self.token.lock().unwrap();
-             *token_guard = Some(cached_token.clone());
              return Ok(cached_token);
         }
 
@@ -174,8 +248,7 @@ impl HantooAdapter {
             .unwrap();
 
         if expiry > Local::now() {
-            let mut exp_guard = self.token_exp.lock().unwrap();
-            *exp_guard = Some(expiry);
+            *self.token.write().unwrap() = Some((data.token.clone(), expiry));
             return Ok(data.token);
         }
 
@@ -214,16 +287,11 @@ impl HantooAdapter {
         self.save_token_to_file(&access_token, &expired_str)?;
         
         // Update memory
-        let mut token_guard = self.token.lock().unwrap();
-        *token_guard = Some(access_token.clone());
-        
         let expiry = chrono::NaiveDateTime::parse_from_str(&expired_str, "%Y-%m-%d %H:%M:%S")
             .map_err(|e| anyhow!("Failed to parse new token date: {}", e))?
             .and_local_timezone(Local)
             .unwrap();
-            
-        let mut exp_guard = self.token_exp.lock().unwrap();
-        *exp_guard = Some(expiry);
+        *self.token.write().unwrap() = Some((access_token.clone(), expiry));
 
         Ok(access_token)
     }
@@ -282,302 +350,103 @@ impl HantooAdapter {
         self.debug_ws.store(enabled, Ordering::Relaxed);
     }
 
-    fn start_ws_thread(&self) -> Result<()> {
+    /// Open the market stream subscribed to `symbols`. The caller holds both
+    /// `subscribed_symbols` and `session`; see `connect` for the lock order.
+    fn start_session(&self, symbols: &[String]) -> Result<WsSession> {
         let ws_url_str = self.config.ops.clone().ok_or(anyhow!("No WebSocket URL (ops) in config"))?;
+        let url = Url::parse(&format!("{}/tryitout/H0STCNT0", ws_url_str))?; // Typical suffix
         let approval_key = self.get_ws_approval_key()?;
-        let my_htsid = self.config.my_htsid.clone().unwrap_or_default();
-        
-        // Sender clone
-        let sender = self.sender.lock().unwrap().clone();
-        
-        // Get symbols to subscribe
-        let symbols: Vec<String> = self.subscribed_symbols.lock().unwrap().clone();
-        let debug_ws = self.debug_ws.clone();
-        let order_map_clone = self.order_map.clone();
-        
-        let aes_iv = self.ws_aes_iv.clone();
-        let aes_key = self.ws_aes_key.clone();
-        
-        let handle = thread::spawn(move || {
-            let full_url = format!("{}/tryitout/H0STCNT0", ws_url_str); // Typical suffix
-            let url = Url::parse(&full_url).expect("Invalid WS URL");
-
-            info!("Connecting to WebSocket: {}", url);
-            match connect(url) {
-                Ok((mut socket, response)) => {
-                    info!("WebSocket Connected. Response: {:?}", response);
-
-                    // Subscribe to Execution (Private)
-                    if !my_htsid.is_empty() {
-                         let tr_id = if ws_url_str.contains("openapivts") { "H0STCNI9" } else { "H0STCNI0" };
-                         let sub_body = serde_json::json!({
-                            "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
-                            "body": {"input": {"tr_id": tr_id, "tr_key": my_htsid}}
-                         });
-                         let _ = socket.send(Message::Text(sub_body.to_string()));
-                    }
-                    
-                    // Subscribe to Market Data for all symbols
-                    for target_symbol in symbols {
-                        // Trade
-                        {
-                            let sub_body = serde_json::json!({
-                                "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
-                                "body": {"input": {"tr_id": "H0SCCNT0", "tr_key": target_symbol}} // H0SCCNT0 is "Realtime Stock Conclusion" (KOSPI)
-                            }); 
-                            let _ = socket.send(Message::Text(sub_body.to_string()));
-                        }
-                        
-                        // Asking Price (Total - 10 levels) H0UNASP0
-                        {
-                            let sub_body = serde_json::json!({
-                                "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
-                                "body": {"input": {"tr_id": "H0UNASP0", "tr_key": target_symbol}} 
-                            });
-                            let _ = socket.send(Message::Text(sub_body.to_string()));
-                        }
-                        
-                        info!("Subscribed to {} Trade/Ask(Total)", target_symbol);
-                    }
-
-                    // Loop
-                    loop {
-                        match socket.read() {
-                            Ok(msg) => {
-                                match msg {
-                                    Message::Text(text) => {
-                                        if debug_ws.load(Ordering::Relaxed) {
-                                            println!("[{}] WS_RECV: {}", chrono::Local::now().format("%Y-%m-%d %H:%M:%S%.3f"), text);
-                                        }
-                                        if text.contains("PINGPONG") {
-                                            let _ = socket.send(Message::Text(text)); 
-                                            continue;
-                                        }
-                                        
-                                        // Check for Subscription Response with IV/Key
-                                        if text.contains("SUBSCRIBE SUCCESS") && text.contains("iv") {
-                                            if let Ok(val) = serde_json::from_str::<Value>(&text) {
-                                                if let Some(output) = val.get("body").and_then(|b| b.get("output")) {
-                                                    let iv_str = output["iv"].as_str().unwrap_or("");
-                                                    let key_str = output["key"].as_str().unwrap_or("");
-                                                    if !iv_str.is_empty() && !key_str.is_empty() {
-                                                        info!("Received Encryption Keys: IV={}, Key={}", iv_str, key_str);
-                                                        *aes_iv.lock().unwrap() = Some(iv_str.as_bytes().to_vec());
-                                                        *aes_key.lock().unwrap() = Some(key_str.as_bytes().to_vec());
-                                                    }
-                                                }
-                                            }
-                                        }
-                                        
-                                        if let Some(first) = text.chars().next() {
-                                            if first == '0' || first == '1' { // Data
-                                                if let Some(s) = &sender {
-                                                    // Pass keys to parse
-                                                    let iv = aes_iv.lock().unwrap().clone();
-                                                    let key = aes_key.lock().unwrap().clone();
-                                                    
-                                                    if let Some(msg) = Self::parse_ws_message(&text, &order_map_clone, iv, key) {
-                                                        let _ = s.send(msg);
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    },
-                                    Message::Close(_) => break,
-                                    _ => {}
-                                }
-                            },
-                            Err(e) => {
-                                error!("WS Error: {}", e);
-                                break;
-                            }
-                        }
-                    }
-                },
-                Err(e) => error!("Connection failed: {}", e),
-            }
-        });
-        
-        let mut thread_guard = self.ws_thread.lock().unwrap();
-        *thread_guard = Some(handle);
-        
-        Ok(())
-    }
-    
-    fn parse_ws_message(text: &str, order_map: &Mutex<HashMap<String, HantooOrderInfo>>, iv_opt: Option<Vec<u8>>, key_opt: Option<Vec<u8>>) -> Option<IncomingMessage> {
-        let parts: Vec<&str> = text.split('|').collect();
-        if parts.len() < 4 { return None; }
-        
-        let tr_id = parts[1];
-        let symbol = parts[2];
-        let data_part = parts[3..].join("|"); 
-        
-        // Decryption Logic for H0STCNI0/9
-        let final_data = if tr_id == "H0STCNI0" || tr_id == "H0STCNI9" {
-             // Check if it looks encrypted (Base64 is alphanumeric + +/=)
-             // And if we have keys
-             if let (Some(iv), Some(key)) = (iv_opt, key_opt) {
-                 // Try to decode base64
-                 if let Ok(mut ciphertext) = BASE64.decode(&data_part) {
-                     // Decrypt
-                     let decryptor = Aes256CbcDec::new_from_slices(&key, &iv).ok()?;
-                     // We need a buffer copy because decrypt works in place usually or writes to out
-                     // Using decrypt_padded_mut
-                     if let Ok(plaintext_slice) = decryptor.decrypt_padded_mut::<Pkcs7>(&mut ciphertext) {
-                         if let Ok(s) = String::from_utf8(plaintext_slice.to_vec()) {
-                              // success
-                              s
-                         } else {
-                             data_part
-                         }
-                     } else {
-                         data_part 
-                     }
-                 } else {
-                     data_part
-                 }
-             } else {
-                 data_part
-             }
-        } else {
-            data_part
+
+        let handler = HantooWsHandler {
+            decoder: WsDecoder::new(),
+            sender: self.sender.lock().unwrap().clone(),
+            order_map: self.order_map.clone(),
+            debug_ws: self.debug_ws.clone(),
         };
+        let session = WsSession::start(url, approval_key, handler)?;
 
-        if tr_id == "H0STCNI0" || tr_id == "H0STCNI9" {
-            // Decrypted successfully
+        // Subscribe to Execution (Private)
+        let my_htsid = self.config.my_htsid.clone().unwrap_or_default();
+        if !my_htsid.is_empty() {
+            let tr_id = if ws_url_str.contains("openapivts") { "H0STCNI9" } else { "H0STCNI0" };
+            session.subscribe(tr_id, &my_htsid);
         }
+        for symbol in symbols {
+            Self::subscribe_symbol(&session, symbol);
+        }
+        Ok(session)
+    }
 
-        let fields: Vec<&str> = final_data.split('^').collect();
-        
-        match tr_id {
-            "H0STCNT0" | "H0SCCNT0" => { // Trade
-                if fields.len() > 2 {
-                    let price = Decimal::from_str(fields[1]).unwrap_or_default();
-                    let qty = if fields.len() > 12 { fields[12].parse().unwrap_or(0) } else { 0 };
-                   
-                    return Some(IncomingMessage::MarketTrade {
-                        symbol: symbol.to_string(),
-                        price,
-                        quantity: qty,
-                        timestamp: Local::now().timestamp_millis() as f64 / 1000.0,
-                    });
-                }
-            },
-            "H0STASP0" => { // Asking Price
-                if fields.len() > 5 {
-                     let mut asks = Vec::new();
-                     let mut bids = Vec::new();
-                     
-                     let a1 = Decimal::from_str(fields[3]).unwrap_or_default();
-                     let b1 = Decimal::from_str(fields[4]).unwrap_or_default();
-                     let aq1 = fields[5].parse().unwrap_or(0);
-                     let bq1 = fields[6].parse().unwrap_or(0);
-                     
-                     asks.push((a1, aq1));
-                     bids.push((b1, bq1));
-                     
-                     let delta = OrderBookSnapshot {
-                         symbol: symbol.to_string(),
-                         bids,
-                         asks,
-                         update_id: Local::now().timestamp_millis(),
-                         timestamp: Local::now().timestamp_millis() as f64 / 1000.0,
-                     };
-                     return Some(IncomingMessage::OrderBookSnapshot(delta));
-                }
-            },
-            "H0STCNI0" | "H0STCNI9" => { // Execution Notice
-                 // fields parsing based on ccnl_notice.py
-                 // 0: CUST_ID, 1: ACNT_NO, 2: ODER_NO, 3: ODER_QTY, ... 
-                 // 9: CNTG_QTY, 10: CNTG_UNPR, ...
-                 // 12: RFUS_YN, 13: CNTG_YN (1: Accept, 2: Execute)
-                 
-                 if fields.len() > 14 {
-                     let order_no = fields[2];
-                     let cntg_yn = fields[13]; // 1 or 2
-                     
-                     // Find Client Order ID
-                     let map = order_map.lock().unwrap();
-                     if let Some((client_id, info)) = map.iter().find(|(_, info)| info.order_no == order_no) {
-                          info!("Hantoo Parse: Found Order Map for OrderNo: {} -> ClientID: {}", order_no, client_id);
-                          info!("Hantoo Parse: fields[9](qty)={}, fields[10](price)={}, cntg_yn={}, rfus_yn={}", fields[9], fields[10], cntg_yn, fields[12]);
-
-                          if cntg_yn == "2" { // Execution
-                               let fill_qty = fields[9].parse::<i64>().unwrap_or(0);
-                               let fill_price = Decimal::from_str(fields[10]).unwrap_or_default();
-                               
-                               info!("Hantoo Parse: Execution for {}, qty={}, price={}", client_id, fill_qty, fill_price);
-                               return Some(IncomingMessage::Execution {
-                                   order_id: client_id.clone(),
-                                   fill_qty,
-                                   fill_price,
-                               });
-                          } else if cntg_yn == "1" { // Accepted / Modify / Cancel
-                               let rfus_yn = fields[12];
-                               
-                               let state = if rfus_yn == "Y" { 
-                                   OrderState::REJECTED 
-                               } else { 
-                                   // Simply NEW for now, could be CANCELED if msg implies. 
-                                   // But H0STCNI0 is complex. 
-                                   // For MVP, if it is not refused, we assume NEW or PENDING->NEW.
-                                   OrderState::NEW 
-                               };
-                               
-                               info!("Hantoo Parse: Update for {}, state={:?}", client_id, state);
-                               return Some(IncomingMessage::OrderStatus {
-                                   order_id: client_id.clone(),
-                                   state,
-                                   filled_qty: 0,
-                                   filled_price: None,
-                                   msg: None,
-                                   updated_at: Local::now().timestamp_millis() as f64 / 1000.0,
-                               });
-                          }
-                     } else {
-                         // Unknown order (maybe manual order not in OMS). Log/Ignore?
-                         // Print map keys for debugging
-                         let keys: Vec<_> = map.values().map(|v| v.order_no.clone()).collect();
-                         warn!("Received notice for unknown order_no: {}. Known OrderNos: {:?}", order_no, keys);
-                     }
-                 } else {
-                     warn!("H0STCNI0 received but insufficient fields: len={}", fields.len());
-                 }
-             },
-            "H0UNASP0" => { // Asking Price (Total - 10 levels)
-                if fields.len() > 42 {
-                    let symbol = fields[0]; 
-                    
-                    let mut asks = Vec::new();
-                    let mut bids = Vec::new();
-
-                    for i in 0..10 {
-                         let ask_p_idx = 3 + i;
-                         let bid_p_idx = 13 + i;
-                         let ask_q_idx = 23 + i;
-                         let bid_q_idx = 33 + i;
-
-                         let ap = Decimal::from_str(fields[ask_p_idx]).unwrap_or_default();
-                         let bp = Decimal::from_str(fields[bid_p_idx]).unwrap_or_default();
-                         let aq: i64 = fields[ask_q_idx].parse().unwrap_or(0);
-                         let bq: i64 = fields[bid_q_idx].parse().unwrap_or(0);
-
-                         if ap > Decimal::ZERO { asks.push((ap, aq)); }
-                         if bp > Decimal::ZERO { bids.push((bp, bq)); }
-                    }
-
-                 return Some(IncomingMessage::OrderBookSnapshot(crate::oms::order_book::OrderBookSnapshot {
-                     symbol: symbol.to_string(),
-                     bids: bids.clone(),
-                     asks: asks.clone(),
-                     update_id: Local::now().timestamp_millis(),
-                     timestamp: Local::now().timestamp_millis() as f64 / 1000.0,
-                 }));
+    fn subscribe_symbol(session: &WsSession, symbol: &str) {
+        session.subscribe(TR_ID_WS_TRADE, symbol);
+        session.subscribe(TR_ID_WS_ASK, symbol);
+    }
+
+    fn parse_ws_message(decoder: &mut WsDecoder, text: &str, order_map: &Mutex<OrderNoIndex<HantooOrderInfo>>) -> Option<IncomingMessage> {
+        match decoder.parse(text)? {
+            WsEvent::Book(snapshot) => Some(IncomingMessage::OrderBookSnapshot(snapshot)),
+            WsEvent::Trade(t) => Some(IncomingMessage::MarketTrade {
+                symbol: t.symbol,
+                price: t.price,
+                quantity: t.quantity,
+                timestamp: t.timestamp,
+            }),
+            WsEvent::Notice(n) => {
+                // Execution Notice (H0STCNI0/9), CNTG_YN 1: Accept, 2: Execute
+                let mut map = order_map.lock().unwrap();
+                match map.route(n.order_no) {
+                    Some(NoticeRoute::Cancel(client_id)) => {
+                        // Answer to our cancel, under the cancel's own order number
+                        if n.cntg_yn != "1" {
+                            return None;
+                        }
+                        info!("Hantoo Parse: Cancel {} for {}, rfus_yn={}", n.order_no, client_id, n.rfus_yn);
+                        map.cancel_notice(&client_id, n.rfus_yn == "Y", n.timestamp)
+                    },
+                    Some(NoticeRoute::Order(client_id)) => {
+                        info!("Hantoo Parse: Found Order Map for OrderNo: {} -> ClientID: {}", n.order_no, client_id);
+                        info!("Hantoo Parse: qty={}, price={}, cntg_yn={}, rfus_yn={}", n.fill_qty, n.fill_price, n.cntg_yn, n.rfus_yn);
+
+                        if n.cntg_yn == "2" { // Execution
+                            info!("Hantoo Parse: Execution for {}, qty={}, price={}", client_id, n.fill_qty, n.fill_price);
+                            map.fill(&client_id, n.fill_qty);
+                            Some(IncomingMessage::Execution {
+                                order_id: client_id,
+                                fill_qty: n.fill_qty,
+                                fill_price: n.fill_price,
+                            })
+                        } else if n.cntg_yn == "1" { // Accepted / Modify
+                            let state = if n.rfus_yn == "Y" {
+                                map.remove(&client_id);
+                                OrderState::REJECTED
+                            } else {
+                                // Simply NEW for now.
+                                // But H0STCNI0 is complex.
+                                // For MVP, if it is not refused, we assume NEW or PENDING->NEW.
+                                OrderState::NEW
+                            };
+
+                            info!("Hantoo Parse: Update for {}, state={:?}", client_id, state);
+                            Some(IncomingMessage::OrderStatus {
+                                order_id: client_id,
+                                state,
+                                filled_qty: 0,
+                                filled_price: None,
+                                msg: None,
+                                updated_at: n.timestamp,
+                            })
+                        } else {
+                            None
+                        }
+                    },
+                    None => {
+                        // Unknown order (maybe manual order not in OMS).
+                        warn!("Received notice for unknown order_no: {} ({} orders tracked)", n.order_no, map.len());
+                        None
+                    },
                 }
-            },
-            _ => {}
+            }
         }
-        None
     }
 }
 
@@ -588,9 +457,18 @@ impl Adapter for HantooAdapter {
     fn connect(&self) -> Result<()> {
         let _ = self.get_token()?;
         info!("HantooAdapter connected (token verified)");
+        // Open the keep-alive pool now so the first order does not pay for TCP/TLS setup
+        self.rest.warm(&self.config.prod, self.config.rest_max_in_flight.unwrap_or(4));
         
-        if let Err(e) = self.start_ws_thread() {
-            warn!("Failed to start WebSocket: {}", e);
+        // Lock order: subscribed_symbols, then session (as in subscribe_market),
+        // and held together so a concurrent subscribe is neither lost nor doubled
+        let symbols = self.subscribed_symbols.lock().unwrap();
+        let mut session = self.session.lock().unwrap();
+        if session.is_none() {
+            match self.start_session(&symbols) {
+                Ok(s) => *session = Some(s),
+                Err(e) => warn!("Failed to start WebSocket: {}", e),
+            }
         }
 
         Ok(())
@@ -600,13 +478,19 @@ impl Adapter for HantooAdapter {
         self.subscribe_market(symbols)
     }
 
+    fn unsubscribe(&self, symbols: &[String]) -> Result<()> {
+        self.unsubscribe_market(symbols)
+    }
+
     fn disconnect(&self) -> Result<()> {
+        if let Some(session) = self.session.lock().unwrap().take() {
+            session.stop();
+        }
         info!("HantooAdapter disconnected");
         Ok(())
     }
 
     fn place_order(&self, order: &Order) -> Result<bool> {
-        let token = self.get_token()?;
         let url = format!("{}/uapi/domestic-stock/v1/trading/order-cash", self.config.prod);
         
         let is_virtual = self.config.prod.contains("openapivts");
@@ -638,19 +522,10 @@ impl Adapter for HantooAdapter {
             "CNDT_PRIC": ""
         });
 
-        let resp = self.client.post(&url)
-            .header("content-type", "application/json")
-            .header("authorization", format!("Bearer {}", token))
-            .header("appkey", &self.config.my_app)
-            .header("appsecret", &self.config.my_sec)
-            .header("tr_id", tr_id)
-            .header("custtype", "P")
-            .json(&body)
-            .send()?;
+        let resp = self.rest.execute(self.api_request(RestRequest::post(url, body), tr_id)?)?;
             
-        if resp.status().is_success() {
-             let text = resp.text().unwrap_or_default();
-             let data: Value = serde_json::from_str(&text).map_err(|e| anyhow!("Failed to parse response: {}", e))?;
+        if resp.is_success() {
+             let data: Value = resp.json()?;
 
              if data["rt_cd"].as_str().unwrap_or("") != "0" {
                  let msg = data["msg1"].as_str().unwrap_or("Unknown error");
@@ -667,23 +542,20 @@ impl Adapter for HantooAdapter {
                      info!("Order Placed: OrgNo={}, OrderNo={}, Exhange={}", org_no, order_no, exchange);
                      
                      if let Some(client_id) = &order.order_id {
-                          let info = HantooOrderInfo { org_no, order_no, exchange };
                           let mut map = self.order_map.lock().unwrap();
-                          map.insert(client_id.clone(), info);
+                          map.insert(client_id.clone(), &order_no, order.quantity, HantooOrderInfo { org_no, order_no: order_no.clone(), exchange });
                      }
                  }
              }
 
              Ok(true)
         } else {
-             let text = resp.text().unwrap_or_default();
-             error!("Order placement failed: {}", text);
+             error!("Order placement failed: {}", resp.body);
              Ok(false)
         }
     }
 
     fn cancel_order(&self, order_id: &str) -> Result<bool> {
-        let token = self.get_token()?;
         let url = format!("{}/uapi/domestic-stock/v1/trading/order-rvsecncl", self.config.prod);
         
         let (org_no, order_no, exchange) = {
@@ -715,21 +587,16 @@ impl Adapter for HantooAdapter {
             "EXCG_ID_DVSN_CD": exchange
         });
 
-        let resp = self.client.post(&url)
-            .header("content-type", "application/json")
-            .header("authorization", format!("Bearer {}", token))
-            .header("appkey", &self.config.my_app)
-            .header("appsecret", &self.config.my_sec)
-            .header("tr_id", tr_id)
-            .header("custtype", "P")
-            .json(&body)
-            .send()?;
+        let resp = self.rest.execute(self.api_request(RestRequest::post(url, body), tr_id)?)?;
 
-        if resp.status().is_success() {
-             let text = resp.text().unwrap_or_default();
-             let data: Value = serde_json::from_str(&text)?;
+        if resp.is_success() {
+             let data: Value = resp.json()?;
              if data["rt_cd"].as_str().unwrap_or("") == "0" {
                  info!("Order Cancelled: {}", order_id);
+                 // The cancel gets its own order number; its accept or refusal notice uses it
+                 if let Some(cancel_no) = data.get("output").and_then(|o| o["ODNO"].as_str()).filter(|s| !s.is_empty()) {
+                     self.order_map.lock().unwrap().add_cancel_no(order_id, cancel_no);
+                 }
                  Ok(true)
              } else {
                  let msg = data["msg1"].as_str().unwrap_or("Unknown error");
@@ -737,14 +604,12 @@ impl Adapter for HantooAdapter {
                  Err(anyhow!("Cancel failed: {}", msg))
              }
         } else {
-             let text = resp.text().unwrap_or_default();
-             error!("Cancel Request failed: {}", text);
+             error!("Cancel Request failed: {}", resp.body);
              Ok(false)
         }
     }
 
     fn get_order_book_snapshot(&self, symbol: &str) -> Result<OrderBook> {
-        let token = self.get_token()?;
         let url = format!("{}/uapi/domestic-stock/v1/quotations/inquire-asking-price-exp-ccn", self.config.prod);
         
         let tr_id = "FHKST01010200";
@@ -754,17 +619,10 @@ impl Adapter for HantooAdapter {
             ("FID_INPUT_ISCD", symbol)
         ];
 
-        let resp = self.client.get(&url)
-            .header("content-type", "application/json")
-            .header("authorization", format!("Bearer {}", token))
-            .header("appkey", &self.config.my_app)
-            .header("appsecret", &self.config.my_sec)
-            .header("tr_id", tr_id)
-            .query(&params)
-            .send()?;
+        let resp = self.rest.execute(self.api_request(RestRequest::get(url).query(&params), tr_id)?)?;
 
-        if !resp.status().is_success() {
-             return Err(anyhow!("Snapshot failed: {}", resp.status()));
+        if !resp.is_success() {
+             return Err(anyhow!("Snapshot failed: {}", resp.status));
         }
 
         let data: Value = resp.json()?;
@@ -886,7 +744,6 @@ impl Adapter for HantooAdapter {
     }
 
     fn modify_order(&self, order_id: &str, price: Option<Decimal>, qty: Option<i64>) -> Result<bool> {
-        let token = self.get_token()?;
         let url = format!("{}/uapi/domestic-stock/v1/trading/order-rvsecncl", self.config.prod);
 
         let (org_no, order_no, exchange) = {
@@ -925,19 +782,10 @@ impl Adapter for HantooAdapter {
             "CNDT_PRIC": ""
         });
 
-        let resp = self.client.post(&url)
-            .header("content-type", "application/json")
-            .header("authorization", format!("Bearer {}", token))
-            .header("appkey", &self.config.my_app)
-            .header("appsecret", &self.config.my_sec)
-            .header("tr_id", tr_id)
-            .header("custtype", "P")
-            .json(&body)
-            .send()?;
+        let resp = self.rest.execute(self.api_request(RestRequest::post(url, body), tr_id)?)?;
 
-        if resp.status().is_success() {
-             let text = resp.text().unwrap_or_default();
-             let data: Value = serde_json::from_str(&text)?;
+        if resp.is_success() {
+             let data: Value = resp.json()?;
              if data["rt_cd"].as_str().unwrap_or("") == "0" {
                  info!("Order Modified: {}", order_id);
                  
@@ -950,6 +798,11 @@ impl Adapter for HantooAdapter {
                              info.order_no = new_order_no.to_string();
                              info.org_no = new_org_no.to_string();
                          }
+                         map.add_order_no(order_id, new_order_no);
+                         // 0 means the whole open quantity, which is unchanged
+                         if let Some(qty) = qty.filter(|q| *q > 0) {
+                             map.set_open_qty(order_id, qty);
+                         }
                      }
                  }
                  
@@ -960,8 +813,7 @@ impl Adapter for HantooAdapter {
                  Ok(false)
              }
         } else {
-             let text = resp.text().unwrap_or_default();
-             error!("Modify Request failed: {}", text);
+             error!("Modify Request failed: {}", resp.body);
              Ok(false)
         }
     }
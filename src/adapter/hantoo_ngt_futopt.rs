@@ -6,19 +6,22 @@ use anyhow::{anyhow, Result};
 use log::{error, info};
 // use serde::{Deserialize, Serialize};
 use serde_json::Value;
-use std::collections::HashMap;
 use std::sync::{Arc, Mutex};
 use crate::adapter::hantoo::HantooAdapter;
-use tungstenite::{connect, Message};
 use url::Url;
-use std::thread;
 use std::sync::mpsc;
 use std::sync::atomic::{AtomicBool, Ordering};
-use crate::adapter::{IncomingMessage, Trade};
+use crate::adapter::IncomingMessage;
+use crate::adapter::hantoo_ws::{WsDecoder, WsEvent};
+use crate::adapter::order_index::{NoticeRoute, OrderNoIndex};
+use crate::adapter::ws_session::{WsHandler, WsSession};
+use crate::message::ConnectionStatus;
 // use crate::oms::order_book::{OrderBookDelta, PriceLevel};
 use rust_decimal::Decimal;
 use std::str::FromStr;
 use chrono::Local;
+use std::time::Instant;
+use crate::metrics::{self, Stage};
 
 // Constants for Night Future
 const NIGHT_ORDER_TR_ID: &str = "STTN1101U"; // Night Future Order (Real)
@@ -33,32 +36,58 @@ const URL_LIST_OPTION: &str = "/uapi/domestic-futureoption/v1/quotations/display
 const TR_ID_LIST_FUTURE: &str = "FHPIF05030200";
 const TR_ID_LIST_OPTION: &str = "FHPIO056104C0";
 
+const TR_ID_WS_TRADE: &str = "H0MFCNT0"; // Realtime Night Future Conclusion
+const TR_ID_WS_ASK: &str = "H0MFASP0"; // Realtime Night Future Asking Price
+const TR_ID_WS_NOTICE: &str = "H0MFCNI0"; // Night Future Execution Notice
+
 #[derive(Debug, Clone)]
 struct NightOrderInfo {
     org_no: String,
     order_no: String,
 }
 
-#[derive(Debug)]
-enum NightIncomingEvent {
-    Trade(Trade),
-    Snapshot(crate::oms::order_book::OrderBookSnapshot),
-    Notice(NightNotice),
+struct NightWsHandler {
+    // H0MFCNI0 notices are encrypted with keys from the subscribe response
+    decoder: WsDecoder,
+    sender: Option<mpsc::Sender<IncomingMessage>>,
+    order_map: Arc<Mutex<OrderNoIndex<NightOrderInfo>>>,
+    debug_ws: Arc<AtomicBool>,
 }
 
-#[derive(Debug)]
-struct NightNotice {
-    order_no: String,
-    cntg_yn: String,
-    fill_qty: String,
-    fill_price: String,
-    rfus_yn: String,
+impl WsHandler for NightWsHandler {
+    fn on_text(&mut self, text: &str) {
+        let received = Instant::now();
+        if self.debug_ws.load(Ordering::Relaxed) {
+            println!("[{}] WS_RECV: {}", chrono::Local::now().format("%Y-%m-%d %H:%M:%S%.3f"), text);
+        }
+        if text.starts_with('{') {
+            self.decoder.update_keys(text);
+            return;
+        }
+        if text.starts_with('0') || text.starts_with('1') {
+            if let Some(s) = &self.sender {
+                if let Some(event) = self.decoder.parse(text) {
+                    if let Some(m) = HantooNightAdapter::process_event(event, &self.order_map) {
+                        metrics::global().record_since(Stage::Parse, received);
+                        let _ = s.send(m);
+                    }
+                }
+            }
+        }
+    }
+
+    fn on_status(&mut self, status: ConnectionStatus) {
+        info!("Night WS {:?}", status);
+        if let Some(s) = &self.sender {
+            let _ = s.send(IncomingMessage::ConnectionStatus(status));
+        }
+    }
 }
 
 pub struct HantooNightAdapter {
     inner: HantooAdapter,
-    order_map: Arc<Mutex<HashMap<String, NightOrderInfo>>>,
-    ws_thread: Mutex<Option<thread::JoinHandle<()>>>,
+    order_map: Arc<Mutex<OrderNoIndex<NightOrderInfo>>>,
+    session: Mutex<Option<WsSession>>,
     sender: Mutex<Option<mpsc::Sender<IncomingMessage>>>,
     debug_ws: Arc<AtomicBool>,
 }
@@ -71,8 +100,8 @@ impl HantooNightAdapter {
         println!("HantooNightAdapter initialized with Account: {}, Prod: {}", acct, prod);
         Ok(HantooNightAdapter {
             inner,
-            order_map: Arc::new(Mutex::new(HashMap::new())),
-            ws_thread: Mutex::new(None),
+            order_map: Arc::new(Mutex::new(OrderNoIndex::new())),
+            session: Mutex::new(None),
             sender: Mutex::new(None),
             debug_ws: Arc::new(AtomicBool::new(false)),
         })
@@ -87,247 +116,107 @@ impl HantooNightAdapter {
         *guard = Some(sender);
     }
 
+    /// Add `symbol` to the shared WS session (trades + asking price).
+    /// The first call opens the session and subscribes execution notices once.
     pub fn subscribe(&self, symbol: &str) -> Result<()> {
-        let symbol = symbol.to_string();
-        self.start_ws_thread(symbol)?;
+        let mut guard = self.session.lock().unwrap();
+        if guard.as_ref().map_or(true, |s| !s.is_running()) {
+            *guard = Some(self.start_session()?);
+        }
+        let session = guard.as_ref().unwrap();
+        session.subscribe(TR_ID_WS_TRADE, symbol);
+        session.subscribe(TR_ID_WS_ASK, symbol);
+        Ok(())
+    }
+
+    /// Drop `symbol` from the session. Execution notices stay subscribed.
+    pub fn unsubscribe(&self, symbol: &str) -> Result<()> {
+        if let Some(session) = self.session.lock().unwrap().as_ref() {
+            session.unsubscribe(TR_ID_WS_TRADE, symbol);
+            session.unsubscribe(TR_ID_WS_ASK, symbol);
+        }
         Ok(())
     }
 
-    fn start_ws_thread(&self, symbol: String) -> Result<()> {
+    pub fn subscriptions(&self) -> Vec<(String, String)> {
+        self.session.lock().unwrap().as_ref().map(|s| s.subscriptions()).unwrap_or_default()
+    }
+
+    fn start_session(&self) -> Result<WsSession> {
         let config = self.inner.config().clone();
         let ws_url_str = config.ops.clone().ok_or(anyhow!("No WebSocket URL (ops) in config"))?;
+        let url = Url::parse(&format!("{}/tryitout/H0STCNT0", ws_url_str))?;
         let approval_key = self.inner.get_ws_approval_key()?;
-        
-        let sender = self.sender.lock().unwrap().clone();
-        let debug_ws = self.debug_ws.clone();
-        let order_map_clone = self.order_map.clone();
-
-        let handle = thread::spawn(move || {
-            let full_url = format!("{}/tryitout/H0STCNT0", ws_url_str); 
-            let url = Url::parse(&full_url).expect("Invalid WS URL");
-
-            info!("NightAdapter connecting to WebSocket: {}", url);
-            match connect(url) {
-                Ok((mut socket, _)) => {
-                    info!("Night WS Connected.");
-
-                    // Subscribe to Night Future Trade (H0MFCNT0)
-                    // Note: TR_ID in body should be H0MFCNT0 for Night Future Trade?
-                    // The example uses `H0MFCNT0` (Realtime Night Future Conclusion)
-                    let tr_id = "H0MFCNT0";
-                    let sub_body = serde_json::json!({
-                        "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
-                        "body": {"input": {"tr_id": tr_id, "tr_key": symbol}} 
-                    });
-                    
-                    if let Err(e) = socket.send(Message::Text(sub_body.to_string())) {
-                        error!("Failed to subscribe to trade: {}", e);
-                        return;
-                    }
-                    info!("Subscribed to Night Future Trade {} (H0MFCNT0)", symbol);
-
-                    // Subscribe to Night Future Asking Price (H0MFASP0)
-                    let tr_id_ask = "H0MFASP0";
-                    let sub_body_ask = serde_json::json!({
-                        "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
-                        "body": {"input": {"tr_id": tr_id_ask, "tr_key": symbol}} 
-                    });
-                    
-                    if let Err(e) = socket.send(Message::Text(sub_body_ask.to_string())) {
-                        error!("Failed to subscribe to ask: {}", e);
-                        // Continue even if ask fails
-                    } else {
-                        info!("Subscribed to Night Future Ask {} (H0MFASP0)", symbol);
-                    }
-
-                    // Subscribe to Private Execution Notices (H0MFCNI0)
-                    let my_htsid = config.my_htsid.clone().unwrap_or_default();
-                    if !my_htsid.is_empty() {
-                         let tr_id_notice = "H0MFCNI0";
-                         let sub_body_notice = serde_json::json!({
-                            "header": {"approval_key": approval_key, "custtype": "P", "tr_type": "1", "content-type": "utf-8"},
-                            "body": {"input": {"tr_id": tr_id_notice, "tr_key": my_htsid}}
-                         });
-                         if let Err(e) = socket.send(Message::Text(sub_body_notice.to_string())) {
-                             error!("Failed to subscribe to notice: {}", e);
-                         } else {
-                             info!("Subscribed to Night Future Notice (H0MFCNI0) for {}", my_htsid);
-                         }
-                    }
-
-                    loop {
-                        match socket.read() {
-                            Ok(msg) => {
-                                match msg {
-                                    Message::Text(text) => {
-                                        if debug_ws.load(Ordering::Relaxed) {
-                                            println!("[{}] WS_RECV: {}", chrono::Local::now().format("%Y-%m-%d %H:%M:%S%.3f"), text);
-                                        }
-                                        if text.contains("PINGPONG") {
-                                            let _ = socket.send(Message::Text(text)); 
-                                            continue;
-                                        }
-                                        
-                                        if let Some(first) = text.chars().next() {
-                                            if first == '0' || first == '1' {
-                                                if let Some(s) = &sender {
-                                                    if let Some(event) = Self::parse_ws_message(&text) {
-                                                        if let Some(m) = Self::process_event(event, &order_map_clone) {
-                                                            let _ = s.send(m);
-                                                        }
-                                                    }
-                                                }
-                                            }
-                                        }
-                                    },
-                                    Message::Close(_) => break,
-                                    _ => {}
-                                }
-                            },
-                            Err(e) => {
-                                error!("WS Error: {}", e);
-                                break;
-                            }
-                        }
-                    }
-                },
-                Err(e) => error!("Connection failed: {}", e),
-            }
-        });
 
-        let mut thread_guard = self.ws_thread.lock().unwrap();
-        *thread_guard = Some(handle);
-        
-        Ok(())
-    }
+        let handler = NightWsHandler {
+            decoder: WsDecoder::new(),
+            sender: self.sender.lock().unwrap().clone(),
+            order_map: self.order_map.clone(),
+            debug_ws: self.debug_ws.clone(),
+        };
+        let session = WsSession::start(url, approval_key, handler)?;
 
-    fn parse_ws_message(text: &str) -> Option<NightIncomingEvent> {
-        // 0|TR_ID|KEY|Data...
-        let parts: Vec<&str> = text.split('|').collect();
-        if parts.len() < 4 { return None; }
-        
-        let tr_id = parts[1];
-        // let symbol = parts[2]; // Unused locally if we parse fields
-        let data_part = parts[3..].join("|");
-        // Assuming ^ separator as per Stock examples, but need to verify for Night Future.
-        // Usually KIS uses ^.
-        let fields: Vec<&str> = data_part.split('^').collect();
-        
-        match tr_id {
-            "H0MFCNT0" => { // Night Future Trade
-                if fields.len() > 9 {
-                    // Correct symbol is fields[0] (e.g., A05602)
-                    let symbol = fields[0]; 
-                    
-                    let price_str = fields[5];
-                    let qty_str = fields[9];
-                    
-                    let price = Decimal::from_str(price_str).unwrap_or_default();
-                    let qty = qty_str.parse().unwrap_or(0);
-                    
-                    return Some(NightIncomingEvent::Trade(Trade {
-                        symbol: symbol.to_string(),
-                        price,
-                        quantity: qty,
-                        timestamp: Local::now().timestamp_millis() as f64 / 1000.0,
-                    }));
-                }
-            },
-            "H0MFASP0" => { // Night Future Asking Price
-                if fields.len() > 31 {
-                    let symbol = fields[0];
-                    let mut asks = Vec::new();
-                    let mut bids = Vec::new();
-                    
-                    // 5 Levels
-                    for i in 0..5 {
-                        let price_idx = 2 + i;
-                        let qty_idx = 22 + i;
-                        let price = Decimal::from_str(fields[price_idx]).unwrap_or_default();
-                        let qty: i64 = fields[qty_idx].parse().unwrap_or(0);
-                        if price > Decimal::ZERO { asks.push((price, qty)); }
-                        
-                        let price_idx_b = 7 + i;
-                        let qty_idx_b = 27 + i;
-                        let price_b = Decimal::from_str(fields[price_idx_b]).unwrap_or_default();
-                        let qty_b: i64 = fields[qty_idx_b].parse().unwrap_or(0);
-                        if price_b > Decimal::ZERO { bids.push((price_b, qty_b)); }
-                    }
-                    
-                    return Some(NightIncomingEvent::Snapshot(crate::oms::order_book::OrderBookSnapshot {
-                         symbol: symbol.to_string(),
-                         bids: bids.clone(),
-                         asks: asks.clone(),
-                         update_id: Local::now().timestamp_millis(),
-                         timestamp: Local::now().timestamp_millis() as f64 / 1000.0,
-                    }));
-                }
-            },
-            "H0MFCNI0" => { // Night Future Execution/Order Notice
-                if fields.len() > 13 {
-                    let order_no = fields[2].to_string();
-                    let cntg_yn = fields[13].to_string();
-                    let fill_qty = fields[9].to_string();
-                    let fill_price = fields[10].to_string();
-                    let rfus_yn = if fields.len() > 11 { fields[11].to_string() } else { "".to_string() };
-                    
-                    return Some(NightIncomingEvent::Notice(NightNotice {
-                        order_no,
-                        cntg_yn,
-                        fill_qty,
-                        fill_price,
-                        rfus_yn,
-                    }));
-                }
-            },
-            _ => {
-                // info!("Unknown TR_ID: {}", tr_id);
-            }
+        // Private Execution Notices (H0MFCNI0), once per session
+        let my_htsid = config.my_htsid.clone().unwrap_or_default();
+        if !my_htsid.is_empty() {
+            session.subscribe(TR_ID_WS_NOTICE, &my_htsid);
         }
-        None
+        Ok(session)
     }
 
-    fn process_event(event: NightIncomingEvent, order_map: &Mutex<HashMap<String, NightOrderInfo>>) -> Option<IncomingMessage> {
+    fn process_event(event: WsEvent<'_>, order_map: &Mutex<OrderNoIndex<NightOrderInfo>>) -> Option<IncomingMessage> {
         match event {
-            NightIncomingEvent::Trade(t) => Some(IncomingMessage::MarketTrade {
+            WsEvent::Trade(t) => Some(IncomingMessage::MarketTrade {
                 symbol: t.symbol,
                 price: t.price,
                 quantity: t.quantity,
                 timestamp: t.timestamp,
             }),
-            NightIncomingEvent::Snapshot(s) => Some(IncomingMessage::OrderBookSnapshot(s)),
-            NightIncomingEvent::Notice(n) => {
-                let map = order_map.lock().unwrap();
-                if let Some((client_id, _)) = map.iter().find(|(_, info)| info.order_no == n.order_no) {
-                    if n.cntg_yn == "2" { // Execution
-                        let fill_qty = n.fill_qty.parse::<i64>().unwrap_or(0);
-                        let fill_price = Decimal::from_str(&n.fill_price).unwrap_or_default();
-                        
-                        info!("Night Execution: {} qty={} price={}", client_id, fill_qty, fill_price);
-                        return Some(IncomingMessage::Execution {
-                            order_id: client_id.clone(),
-                            fill_qty,
-                            fill_price,
-                        });
-                    } else { // Accept/Modify/Cancel/Reject
-                         // Use n.rfus_yn if needed
-                         let _ = n.rfus_yn; 
-                         
-                         let state = OrderState::NEW; // Default to NEW/OPEN
-                         
-                         return Some(IncomingMessage::OrderStatus {
-                             order_id: client_id.clone(),
-                             state,
-                             filled_qty: 0,
-                             filled_price: None,
-                             msg: None,
-                             updated_at: Local::now().timestamp_millis() as f64 / 1000.0,
-                         });
-                    }
-                } else {
-                     // println!("Unknown OrderNo in Notice: {}", n.order_no);
+            WsEvent::Book(s) => Some(IncomingMessage::OrderBookSnapshot(s)),
+            WsEvent::Notice(n) => {
+                let mut map = order_map.lock().unwrap();
+                match map.route(n.order_no) {
+                    Some(NoticeRoute::Cancel(client_id)) => {
+                        // Answer to our cancel, under the cancel's own order number
+                        if n.cntg_yn == "2" {
+                            return None;
+                        }
+                        info!("Night Cancel {} for {}, rfus_yn={}", n.order_no, client_id, n.rfus_yn);
+                        map.cancel_notice(&client_id, n.rfus_yn == "Y", n.timestamp)
+                    },
+                    Some(NoticeRoute::Order(client_id)) => {
+                        if n.cntg_yn == "2" { // Execution
+                            let fill_qty = n.fill_qty;
+                            let fill_price = n.fill_price;
+                            
+                            info!("Night Execution: {} qty={} price={}", client_id, fill_qty, fill_price);
+                            map.fill(&client_id, fill_qty);
+                            Some(IncomingMessage::Execution {
+                                order_id: client_id,
+                                fill_qty,
+                                fill_price,
+                            })
+                        } else { // Accept/Modify/Reject
+                             // Use n.rfus_yn if needed
+                             let _ = n.rfus_yn; 
+                             
+                             let state = OrderState::NEW; // Default to NEW/OPEN
+                             
+                             Some(IncomingMessage::OrderStatus {
+                                 order_id: client_id,
+                                 state,
+                                 filled_qty: 0,
+                                 filled_price: None,
+                                 msg: None,
+                                 updated_at: n.timestamp,
+                             })
+                        }
+                    },
+                    None => {
+                         // println!("Unknown OrderNo in Notice: {}", n.order_no);
+                         None
+                    },
                 }
-                None
             }
         }
     }
@@ -426,7 +315,7 @@ impl Adapter for HantooNightAdapter {
         // Reuse inner logic to verify token
         let _ = self.inner.get_token()?;
         info!("HantooNightAdapter connected (Token valid)");
-        // No WS for Night for now
+        // The WS session is opened by the first subscribe
         Ok(())
     }
 
@@ -437,7 +326,17 @@ impl Adapter for HantooNightAdapter {
         Ok(())
     }
 
+    fn unsubscribe(&self, symbols: &[String]) -> Result<()> {
+        for s in symbols {
+            self.unsubscribe(s)?;
+        }
+        Ok(())
+    }
+
     fn disconnect(&self) -> Result<()> {
+        if let Some(session) = self.session.lock().unwrap().take() {
+            session.stop();
+        }
         info!("HantooNightAdapter disconnected");
         Ok(())
     }
@@ -513,7 +412,7 @@ impl Adapter for HantooNightAdapter {
                      
                      if let Some(client_id) = &order.order_id {
                          let mut map = self.order_map.lock().unwrap();
-                         map.insert(client_id.clone(), NightOrderInfo { org_no, order_no });
+                         map.insert(client_id.clone(), &order_no, order.quantity, NightOrderInfo { org_no, order_no: order_no.clone() });
                      }
                  }
                  Ok(true)
@@ -570,6 +469,13 @@ impl Adapter for HantooNightAdapter {
             
         if resp.status().is_success() {
              info!("Night Cancel Success for {}", order_id);
+             // The cancel gets its own order number; its accept or refusal notice uses it
+             let text = resp.text().unwrap_or_default();
+             if let Ok(data) = serde_json::from_str::<Value>(&text) {
+                 if let Some(cancel_no) = data.get("output").and_then(|o| o["ODNO"].as_str()).filter(|s| !s.is_empty()) {
+                     self.order_map.lock().unwrap().add_cancel_no(order_id, cancel_no);
+                 }
+             }
              Ok(true)
         } else {
              let t = resp.text().unwrap_or_default();
@@ -802,6 +708,11 @@ impl Adapter for HantooNightAdapter {
                                  info.org_no = new_org_no.to_string();
                              }
                          }
+                         map.add_order_no(order_id, new_order_no);
+                         // 0 means the whole open quantity, which is unchanged
+                         if let Some(qty) = qty.filter(|q| *q > 0) {
+                             map.set_open_qty(order_id, qty);
+                         }
                      }
                  }
              }
@@ -0,0 +1,336 @@
+//! Hantoo (KIS) WebSocket frame parsing shared by `HantooAdapter` and `HantooNightAdapter`.
+//!
+//! Data frames look like `0|TR_ID|COUNT|f0^f1^...` (`1|...` when the payload is AES
+//! encrypted). Frames are split into borrowed `&str` fields on the stack and read
+//! through fixed field-index tables per `tr_id`, so the only allocations per frame
+//! are the ones in the resulting message (symbol, level vectors).
+
+use crate::adapter::Trade;
+use crate::oms::order_book::OrderBookSnapshot;
+use aes::Aes256;
+use base64::{Engine as _, engine::general_purpose::STANDARD as BASE64};
+use block_padding::Pkcs7;
+use cbc::Decryptor;
+use cbc::cipher::{BlockDecryptMut, InnerIvInit, KeyInit};
+use log::{info, warn};
+use rust_decimal::Decimal;
+use serde_json::Value;
+use std::str::FromStr;
+use std::time::{SystemTime, UNIX_EPOCH};
+
+type Aes256CbcDec = Decryptor<Aes256>;
+
+/// Most fields any table reads. H0UNASP0 carries ~65, we only need the first 43.
+pub const MAX_FIELDS: usize = 64;
+
+/// Level layout of an asking-price (book) message.
+#[derive(Debug)]
+pub struct BookLayout {
+    pub levels: usize,
+    pub ask_price: usize,
+    pub bid_price: usize,
+    pub ask_qty: usize,
+    pub bid_qty: usize,
+    pub min_fields: usize,
+}
+
+#[derive(Debug)]
+pub struct TradeLayout {
+    pub price: usize,
+    pub qty: usize,
+    pub min_fields: usize,
+}
+
+#[derive(Debug)]
+pub struct NoticeLayout {
+    pub order_no: usize,
+    pub fill_qty: usize,
+    pub fill_price: usize,
+    pub rfus_yn: usize,
+    pub cntg_yn: usize,
+    pub min_fields: usize,
+}
+
+// KRX stock 10-level book: 0 symbol, 1 time, 2 hour code, 3..13 ask px, 13..23 bid px,
+// 23..33 ask qty, 33..43 bid qty. H0STASP0 (KRX only) has the same layout as H0UNASP0.
+pub const KRX_BOOK: BookLayout = BookLayout { levels: 10, ask_price: 3, bid_price: 13, ask_qty: 23, bid_qty: 33, min_fields: 43 };
+// Night futures 5-level book
+pub const NIGHT_FUTURE_BOOK: BookLayout = BookLayout { levels: 5, ask_price: 2, bid_price: 7, ask_qty: 22, bid_qty: 27, min_fields: 32 };
+// KRX stock trade: 0 symbol, 1 time, 2 price, ..., 12 trade volume
+pub const KRX_TRADE: TradeLayout = TradeLayout { price: 2, qty: 12, min_fields: 3 };
+// Night futures trade: 0 symbol, 5 price, 9 last trade qty
+pub const NIGHT_FUTURE_TRADE: TradeLayout = TradeLayout { price: 5, qty: 9, min_fields: 10 };
+// Execution notices: 2 order no, 9 fill qty, 10 fill price, 13 CNTG_YN (1 accept, 2 fill)
+pub const KRX_NOTICE: NoticeLayout = NoticeLayout { order_no: 2, fill_qty: 9, fill_price: 10, rfus_yn: 12, cntg_yn: 13, min_fields: 15 };
+pub const NIGHT_FUTURE_NOTICE: NoticeLayout = NoticeLayout { order_no: 2, fill_qty: 9, fill_price: 10, rfus_yn: 11, cntg_yn: 13, min_fields: 14 };
+
+#[derive(Debug)]
+pub enum Layout {
+    Book(&'static BookLayout),
+    Trade(&'static TradeLayout),
+    Notice(&'static NoticeLayout),
+}
+
+pub fn layout(tr_id: &str) -> Option<Layout> {
+    match tr_id {
+        "H0UNASP0" | "H0STASP0" => Some(Layout::Book(&KRX_BOOK)),
+        "H0MFASP0" => Some(Layout::Book(&NIGHT_FUTURE_BOOK)),
+        "H0STCNT0" | "H0SCCNT0" => Some(Layout::Trade(&KRX_TRADE)),
+        "H0MFCNT0" => Some(Layout::Trade(&NIGHT_FUTURE_TRADE)),
+        "H0STCNI0" | "H0STCNI9" => Some(Layout::Notice(&KRX_NOTICE)),
+        "H0MFCNI0" => Some(Layout::Notice(&NIGHT_FUTURE_NOTICE)),
+        _ => None,
+    }
+}
+
+/// `^`-separated fields borrowed from the payload, kept in a fixed array.
+pub struct Fields<'a> {
+    items: [&'a str; MAX_FIELDS],
+    len: usize,
+}
+
+impl<'a> Fields<'a> {
+    /// Split at most `limit` fields (the rest of the payload is not scanned).
+    pub fn split(payload: &'a str, limit: usize) -> Self {
+        let mut items = [""; MAX_FIELDS];
+        let mut len = 0;
+        for f in payload.split('^').take(limit.min(MAX_FIELDS)) {
+            items[len] = f;
+            len += 1;
+        }
+        Fields { items, len }
+    }
+
+    pub fn len(&self) -> usize {
+        self.len
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len == 0
+    }
+
+    /// Field `i`, or "" if the frame was shorter.
+    pub fn get(&self, i: usize) -> &'a str {
+        if i < self.len { self.items[i] } else { "" }
+    }
+}
+
+/// Decimal from a plain `[-]digits[.digits]` field without going through `Decimal::from_str`.
+/// Anything else (exponents, > 18 chars) falls back to `from_str`; unparsable input is 0.
+pub fn parse_decimal(s: &str) -> Decimal {
+    let b = s.as_bytes();
+    let (neg, digits) = match b.first() {
+        Some(b'-') => (true, &b[1..]),
+        Some(b'+') => (false, &b[1..]),
+        _ => (false, b),
+    };
+    if digits.is_empty() || digits.len() > 18 {
+        return Decimal::from_str(s).unwrap_or_default();
+    }
+    let mut mantissa: i64 = 0;
+    let mut scale = 0u32;
+    let mut seen_dot = false;
+    for &c in digits {
+        match c {
+            b'0'..=b'9' => {
+                mantissa = mantissa * 10 + (c - b'0') as i64;
+                if seen_dot {
+                    scale += 1;
+                }
+            },
+            b'.' if !seen_dot => seen_dot = true,
+            _ => return Decimal::from_str(s).unwrap_or_default(),
+        }
+    }
+    Decimal::new(if neg { -mantissa } else { mantissa }, scale)
+}
+
+pub fn parse_qty(s: &str) -> i64 {
+    s.parse().unwrap_or(0)
+}
+
+// Microseconds, so the engine can measure channel latency from the message timestamp
+fn now_micros() -> i64 {
+    SystemTime::now().duration_since(UNIX_EPOCH).map(|d| d.as_micros() as i64).unwrap_or(0)
+}
+
+/// Execution / order notice. Borrowed fields stay in the frame (or the decrypt buffer).
+#[derive(Debug)]
+pub struct Notice<'a> {
+    pub order_no: &'a str,
+    pub cntg_yn: &'a str,
+    pub rfus_yn: &'a str,
+    pub fill_qty: i64,
+    pub fill_price: Decimal,
+    pub timestamp: f64,
+}
+
+#[derive(Debug)]
+pub enum WsEvent<'a> {
+    Book(OrderBookSnapshot),
+    Trade(Trade),
+    Notice(Notice<'a>),
+}
+
+pub fn parse_book(fields: &Fields<'_>, l: &BookLayout, now_us: i64) -> Option<OrderBookSnapshot> {
+    if fields.len() < l.min_fields {
+        return None;
+    }
+    let mut asks = Vec::with_capacity(l.levels);
+    let mut bids = Vec::with_capacity(l.levels);
+    for i in 0..l.levels {
+        let ap = parse_decimal(fields.get(l.ask_price + i));
+        let bp = parse_decimal(fields.get(l.bid_price + i));
+        if ap > Decimal::ZERO { asks.push((ap, parse_qty(fields.get(l.ask_qty + i)))); }
+        if bp > Decimal::ZERO { bids.push((bp, parse_qty(fields.get(l.bid_qty + i)))); }
+    }
+    Some(OrderBookSnapshot {
+        symbol: fields.get(0).to_string(),
+        bids,
+        asks,
+        update_id: now_us / 1000,
+        timestamp: now_us as f64 / 1e6,
+    })
+}
+
+pub fn parse_trade(fields: &Fields<'_>, l: &TradeLayout, now_us: i64) -> Option<Trade> {
+    if fields.len() < l.min_fields {
+        return None;
+    }
+    Some(Trade {
+        symbol: fields.get(0).to_string(),
+        price: parse_decimal(fields.get(l.price)),
+        quantity: parse_qty(fields.get(l.qty)),
+        timestamp: now_us as f64 / 1e6,
+    })
+}
+
+pub fn parse_notice<'a>(fields: &Fields<'a>, l: &NoticeLayout, now_us: i64) -> Option<Notice<'a>> {
+    if fields.len() < l.min_fields {
+        warn!("Notice received but insufficient fields: len={}", fields.len());
+        return None;
+    }
+    Some(Notice {
+        order_no: fields.get(l.order_no),
+        cntg_yn: fields.get(l.cntg_yn),
+        rfus_yn: fields.get(l.rfus_yn),
+        fill_qty: parse_qty(fields.get(l.fill_qty)),
+        fill_price: parse_decimal(fields.get(l.fill_price)),
+        timestamp: now_us as f64 / 1e6,
+    })
+}
+
+/// A data frame split into its header and (decrypted) payload.
+#[derive(Debug)]
+pub struct WsFrame<'a> {
+    pub tr_id: &'a str,
+    pub payload: &'a str,
+}
+
+/// Per-connection frame decoder. Owned by the WS thread, so the AES state needs no lock.
+///
+/// The AES key schedule is expanded once when the subscribe response delivers the
+/// key, and the base64/plaintext buffer is reused across frames.
+#[derive(Default)]
+pub struct WsDecoder {
+    cipher: Option<(Aes256, [u8; 16])>,
+    buf: Vec<u8>,
+    plain_len: usize,
+}
+
+impl WsDecoder {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub fn has_keys(&self) -> bool {
+        self.cipher.is_some()
+    }
+
+    pub fn set_keys(&mut self, key: &[u8], iv: &[u8]) -> bool {
+        let aes = match Aes256::new_from_slice(key) {
+            Ok(a) => a,
+            Err(_) => return false,
+        };
+        let iv: [u8; 16] = match iv.try_into() {
+            Ok(v) => v,
+            Err(_) => return false,
+        };
+        self.cipher = Some((aes, iv));
+        true
+    }
+
+    /// Pick up the AES key/iv from a `SUBSCRIBE SUCCESS` response. Returns true if keys were set.
+    pub fn update_keys(&mut self, text: &str) -> bool {
+        if !(text.contains("SUBSCRIBE SUCCESS") && text.contains("iv")) {
+            return false;
+        }
+        let val: Value = match serde_json::from_str(text) {
+            Ok(v) => v,
+            Err(_) => return false,
+        };
+        let output = match val.get("body").and_then(|b| b.get("output")) {
+            Some(o) => o,
+            None => return false,
+        };
+        let iv_str = output["iv"].as_str().unwrap_or("");
+        let key_str = output["key"].as_str().unwrap_or("");
+        if iv_str.is_empty() || key_str.is_empty() {
+            return false;
+        }
+        info!("Received Encryption Keys: IV={}, Key={}", iv_str, key_str);
+        self.set_keys(key_str.as_bytes(), iv_str.as_bytes())
+    }
+
+    // Base64-decode and decrypt into `buf`. False leaves the payload as is.
+    fn decrypt_into_buf(&mut self, payload: &str) -> bool {
+        let (aes, iv) = match &self.cipher {
+            Some(c) => c,
+            None => return false,
+        };
+        self.buf.clear();
+        if BASE64.decode_vec(payload, &mut self.buf).is_err() {
+            return false;
+        }
+        let decryptor = match Aes256CbcDec::inner_iv_slice_init(aes.clone(), iv) {
+            Ok(d) => d,
+            Err(_) => return false,
+        };
+        match decryptor.decrypt_padded_mut::<Pkcs7>(&mut self.buf) {
+            Ok(plain) => {
+                self.plain_len = plain.len();
+                true
+            },
+            Err(_) => false,
+        }
+    }
+
+    /// Split `0|TR_ID|COUNT|payload`, decrypting the payload of `1|...` frames.
+    pub fn decode<'a>(&'a mut self, text: &'a str) -> Option<WsFrame<'a>> {
+        let mut parts = text.splitn(4, '|');
+        let flag = parts.next()?;
+        let tr_id = parts.next()?;
+        let _count = parts.next()?;
+        let raw = parts.next()?;
+
+        let decrypted = flag == "1" && self.decrypt_into_buf(raw);
+        let this: &'a WsDecoder = self;
+        let payload = if decrypted {
+            std::str::from_utf8(&this.buf[..this.plain_len]).unwrap_or(raw)
+        } else {
+            raw
+        };
+        Some(WsFrame { tr_id, payload })
+    }
+
+    /// Decode and parse a data frame. Unknown `tr_id`s and short frames give None.
+    pub fn parse<'a>(&'a mut self, text: &'a str) -> Option<WsEvent<'a>> {
+        let frame = self.decode(text)?;
+        let now_us = now_micros();
+        match layout(frame.tr_id)? {
+            Layout::Book(l) => parse_book(&Fields::split(frame.payload, l.min_fields), l, now_us).map(WsEvent::Book),
+            Layout::Trade(l) => parse_trade(&Fields::split(frame.payload, l.min_fields.max(l.qty + 1)), l, now_us).map(WsEvent::Trade),
+            Layout::Notice(l) => parse_notice(&Fields::split(frame.payload, l.min_fields), l, now_us).map(WsEvent::Notice),
+        }
+    }
+}
@@ -0,0 +1,298 @@
+use crate::oms::order::OrderSide;
+use crate::oms::order_book::OrderBookSnapshot;
+use rust_decimal::Decimal;
+use std::collections::{BTreeMap, HashMap, VecDeque};
+
+/// One queue entry at a price level.
+/// `order_id` is `None` for synthetic liquidity (other participants).
+#[derive(Debug, Clone)]
+pub struct Resting {
+    pub order_id: Option<String>,
+    pub qty: i64,
+}
+
+/// A match involving one of our orders.
+#[derive(Debug, Clone, PartialEq)]
+pub struct Fill {
+    pub order_id: String,
+    pub price: Decimal,
+    pub qty: i64,
+}
+
+type Levels = BTreeMap<Decimal, VecDeque<Resting>>;
+
+/// Price-time priority book for one symbol.
+///
+/// Our orders and synthetic liquidity share the same FIFO queues. Incoming
+/// orders trade at the resting level's price; `replace_liquidity` swaps the
+/// synthetic part for a new snapshot and executes our resting orders it crosses.
+pub struct MatchingBook {
+    pub symbol: String,
+    bids: Levels,
+    asks: Levels,
+    // order_id -> (side, price), to find resting orders on cancel
+    own: HashMap<String, (OrderSide, Decimal)>,
+}
+
+impl MatchingBook {
+    pub fn new(symbol: &str) -> Self {
+        MatchingBook {
+            symbol: symbol.to_string(),
+            bids: BTreeMap::new(),
+            asks: BTreeMap::new(),
+            own: HashMap::new(),
+        }
+    }
+
+    /// Match an order and rest what is left if it has a limit price.
+    /// Returns the fills (ours on both sides) and the quantity left unfilled.
+    pub fn submit(&mut self, order_id: &str, side: OrderSide, price: Option<Decimal>, qty: i64) -> (Vec<Fill>, i64) {
+        let mut fills = Vec::new();
+        let mut remaining = qty;
+        let opposite = match side {
+            OrderSide::BUY => &mut self.asks,
+            OrderSide::SELL => &mut self.bids,
+        };
+
+        while remaining > 0 {
+            let best = match side {
+                OrderSide::BUY => opposite.first_entry(),
+                OrderSide::SELL => opposite.last_entry(),
+            };
+            let Some(mut entry) = best else { break };
+            let level_price = *entry.key();
+            let crosses = match (side.clone(), price) {
+                (_, None) => true,
+                (OrderSide::BUY, Some(limit)) => level_price <= limit,
+                (OrderSide::SELL, Some(limit)) => level_price >= limit,
+            };
+            if !crosses {
+                break;
+            }
+
+            let queue = entry.get_mut();
+            while remaining > 0 {
+                let Some(front) = queue.front_mut() else { break };
+                let traded = front.qty.min(remaining);
+                front.qty -= traded;
+                remaining -= traded;
+                fills.push(Fill { order_id: order_id.to_string(), price: level_price, qty: traded });
+                if let Some(id) = &front.order_id {
+                    fills.push(Fill { order_id: id.clone(), price: level_price, qty: traded });
+                }
+                if front.qty == 0 {
+                    if let Some(done) = queue.pop_front().and_then(|r| r.order_id) {
+                        self.own.remove(&done);
+                    }
+                }
+            }
+            if queue.is_empty() {
+                entry.remove();
+            }
+        }
+
+        if remaining > 0 {
+            if let Some(limit) = price {
+                self.side_mut(&side).entry(limit).or_default().push_back(Resting { order_id: Some(order_id.to_string()), qty: remaining });
+                self.own.insert(order_id.to_string(), (side, limit));
+            }
+        }
+        (fills, remaining)
+    }
+
+    /// Remove a resting order; returns its open quantity.
+    pub fn cancel(&mut self, order_id: &str) -> Option<i64> {
+        let (side, price) = self.own.remove(order_id)?;
+        let levels = self.side_mut(&side);
+        let queue = levels.get_mut(&price)?;
+        let pos = queue.iter().position(|r| r.order_id.as_deref() == Some(order_id))?;
+        let removed = queue.remove(pos)?;
+        if queue.is_empty() {
+            levels.remove(&price);
+        }
+        Some(removed.qty)
+    }
+
+    pub fn side_and_price(&self, order_id: &str) -> Option<(OrderSide, Decimal)> {
+        self.own.get(order_id).cloned()
+    }
+
+    pub fn resting_qty(&self, order_id: &str) -> Option<i64> {
+        let (side, price) = self.own.get(order_id)?;
+        let levels = match side {
+            OrderSide::BUY => &self.bids,
+            OrderSide::SELL => &self.asks,
+        };
+        levels.get(price)?.iter().find(|r| r.order_id.as_deref() == Some(order_id)).map(|r| r.qty)
+    }
+
+    /// Replace all synthetic liquidity with `snapshot`'s levels (queued behind our
+    /// orders at the same price), then execute our resting orders it crosses at
+    /// their own price.
+    pub fn replace_liquidity(&mut self, snapshot: &OrderBookSnapshot) -> Vec<Fill> {
+        for levels in [&mut self.bids, &mut self.asks] {
+            levels.retain(|_, q| {
+                q.retain(|r| r.order_id.is_some());
+                !q.is_empty()
+            });
+        }
+        for (levels, new) in [(&mut self.bids, &snapshot.bids), (&mut self.asks, &snapshot.asks)] {
+            for (price, qty) in new {
+                if *qty > 0 {
+                    levels.entry(*price).or_default().push_back(Resting { order_id: None, qty: *qty });
+                }
+            }
+        }
+        self.uncross()
+    }
+
+    fn uncross(&mut self) -> Vec<Fill> {
+        let mut fills = Vec::new();
+        loop {
+            let (Some(mut bid), Some(mut ask)) = (self.bids.last_entry(), self.asks.first_entry()) else { break };
+            if bid.key() < ask.key() {
+                break;
+            }
+            let (bid_price, ask_price) = (*bid.key(), *ask.key());
+            let (b, a) = (bid.get_mut().front_mut().unwrap(), ask.get_mut().front_mut().unwrap());
+            // Ours was resting first, so it sets the price
+            let price = match (&b.order_id, &a.order_id) {
+                (Some(_), None) => bid_price,
+                (None, Some(_)) => ask_price,
+                (Some(_), Some(_)) => ask_price,
+                // A crossed snapshot; nothing of ours to execute
+                (None, None) => break,
+            };
+            let traded = b.qty.min(a.qty);
+            b.qty -= traded;
+            a.qty -= traded;
+            for r in [&*b, &*a] {
+                if let Some(id) = &r.order_id {
+                    fills.push(Fill { order_id: id.clone(), price, qty: traded });
+                }
+            }
+            for entry in [&mut bid, &mut ask] {
+                if entry.get().front().map_or(false, |r| r.qty == 0) {
+                    if let Some(done) = entry.get_mut().pop_front().and_then(|r| r.order_id) {
+                        self.own.remove(&done);
+                    }
+                }
+            }
+            if bid.get().is_empty() {
+                bid.remove();
+            }
+            if ask.get().is_empty() {
+                ask.remove();
+            }
+        }
+        fills
+    }
+
+    fn side_mut(&mut self, side: &OrderSide) -> &mut Levels {
+        match side {
+            OrderSide::BUY => &mut self.bids,
+            OrderSide::SELL => &mut self.asks,
+        }
+    }
+
+    /// Aggregated levels (ours included), best first.
+    pub fn depth(&self, levels: usize) -> (Vec<(Decimal, i64)>, Vec<(Decimal, i64)>) {
+        let total = |q: &VecDeque<Resting>| q.iter().map(|r| r.qty).sum::<i64>();
+        (
+            self.bids.iter().rev().take(levels).map(|(p, q)| (*p, total(q))).collect(),
+            self.asks.iter().take(levels).map(|(p, q)| (*p, total(q))).collect(),
+        )
+    }
+}
+
+/// Source of synthetic books for `MockAdapter`.
+pub trait BookGenerator: Send {
+    fn symbol(&self) -> &str;
+    fn next_book(&mut self) -> OrderBookSnapshot;
+}
+
+fn now_epoch() -> f64 {
+    chrono::Local::now().timestamp_micros() as f64 / 1_000_000.0
+}
+
+/// The same book every time.
+pub struct StaticBook {
+    snapshot: OrderBookSnapshot,
+}
+
+impl StaticBook {
+    pub fn new(symbol: &str, bids: Vec<(Decimal, i64)>, asks: Vec<(Decimal, i64)>) -> Self {
+        StaticBook {
+            snapshot: OrderBookSnapshot { symbol: symbol.to_string(), bids, asks, update_id: 0, timestamp: 0.0 },
+        }
+    }
+}
+
+impl BookGenerator for StaticBook {
+    fn symbol(&self) -> &str {
+        &self.snapshot.symbol
+    }
+
+    fn next_book(&mut self) -> OrderBookSnapshot {
+        self.snapshot.update_id += 1;
+        self.snapshot.timestamp = now_epoch();
+        self.snapshot.clone()
+    }
+}
+
+/// One-tick-wide book whose best bid moves -1/0/+1 tick per step,
+/// with random quantities. Deterministic for a given seed.
+pub struct RandomWalkBook {
+    symbol: String,
+    bid: Decimal,
+    tick: Decimal,
+    levels: usize,
+    max_qty: i64,
+    state: u64,
+    update_id: i64,
+}
+
+impl RandomWalkBook {
+    pub fn new(symbol: &str, start_bid: Decimal, tick: Decimal, levels: usize, max_qty: i64, seed: u64) -> Self {
+        RandomWalkBook {
+            symbol: symbol.to_string(),
+            bid: start_bid,
+            tick,
+            levels: levels.max(1),
+            max_qty: max_qty.max(1),
+            state: seed | 1,
+            update_id: 0,
+        }
+    }
+
+    // xorshift64*; a load generator does not need a real RNG dependency
+    fn next_u64(&mut self) -> u64 {
+        self.state ^= self.state >> 12;
+        self.state ^= self.state << 25;
+        self.state ^= self.state >> 27;
+        self.state.wrapping_mul(0x2545_F491_4F6C_DD1D)
+    }
+
+    fn qty(&mut self) -> i64 {
+        1 + (self.next_u64() % self.max_qty as u64) as i64
+    }
+}
+
+impl BookGenerator for RandomWalkBook {
+    fn symbol(&self) -> &str {
+        &self.symbol
+    }
+
+    fn next_book(&mut self) -> OrderBookSnapshot {
+        let step = (self.next_u64() % 3) as i64 - 1;
+        let next = self.bid + self.tick * Decimal::from(step);
+        if next > self.tick * Decimal::from(self.levels as i64) {
+            self.bid = next;
+        }
+        let (bid, ask, tick) = (self.bid, self.bid + self.tick, self.tick);
+        let bids = (0..self.levels).map(|i| (bid - tick * Decimal::from(i as i64), self.qty())).collect();
+        let asks = (0..self.levels).map(|i| (ask + tick * Decimal::from(i as i64), self.qty())).collect();
+        self.update_id += 1;
+        OrderBookSnapshot { symbol: self.symbol.clone(), bids, asks, update_id: self.update_id, timestamp: now_epoch() }
+    }
+}
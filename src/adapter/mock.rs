@@ -1,34 +1,284 @@
-use crate::oms::order::Order;
+use crate::oms::order::{Order, OrderState, OrderType};
 use crate::oms::order_book::OrderBook;
 use crate::oms::account::{AccountState};
+use crate::adapter::matching::{BookGenerator, Fill, MatchingBook};
 use crate::adapter::Adapter;
 use anyhow::Result;
-use std::sync::Mutex;
+use std::collections::{HashMap, VecDeque};
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::mpsc::Sender;
+use std::sync::{Arc, Condvar, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
 use rust_decimal::Decimal;
-// use std::collections::HashMap;
 use crate::adapter::IncomingMessage;
 
+#[derive(Debug, Clone)]
+pub struct MockConfig {
+    /// Delay between a request and the venue acting on it (ack, fills, cancel).
+    pub latency: Duration,
+    /// How often generated books are refreshed and published.
+    pub book_interval: Duration,
+}
+
+impl Default for MockConfig {
+    fn default() -> Self {
+        MockConfig {
+            latency: Duration::ZERO,
+            book_interval: Duration::from_millis(100),
+        }
+    }
+}
+
+enum Request {
+    Place(Order),
+    Cancel(String),
+    Modify(String, Option<Decimal>, Option<i64>),
+}
+
+struct Venue {
+    config: MockConfig,
+    books: Mutex<HashMap<String, MatchingBook>>,
+    generators: Mutex<Vec<Box<dyn BookGenerator>>>,
+    // (due, request), in due order since the latency is constant
+    requests: Mutex<VecDeque<(Instant, Request)>>,
+    wakeup: Condvar,
+    sender: Mutex<Option<Sender<IncomingMessage>>>,
+    // order_id -> symbol, for cancel/modify
+    symbols: Mutex<HashMap<String, String>>,
+    running: AtomicBool,
+}
+
+fn now_epoch() -> f64 {
+    chrono::Local::now().timestamp_micros() as f64 / 1_000_000.0
+}
+
+impl Venue {
+    fn emit(&self, msg: IncomingMessage) {
+        if let Some(s) = self.sender.lock().unwrap().as_ref() {
+            let _ = s.send(msg);
+        }
+    }
+
+    fn status(&self, order_id: &str, state: OrderState, msg: Option<String>) {
+        self.emit(IncomingMessage::OrderStatus {
+            order_id: order_id.to_string(),
+            state,
+            filled_qty: 0,
+            filled_price: None,
+            msg,
+            updated_at: now_epoch(),
+        });
+    }
+
+    fn emit_fills(&self, fills: Vec<Fill>) {
+        for f in fills {
+            self.emit(IncomingMessage::Execution { order_id: f.order_id, fill_qty: f.qty, fill_price: f.price });
+        }
+    }
+
+    fn handle(&self, request: Request) {
+        match request {
+            Request::Place(order) => {
+                let order_id = order.order_id.clone().unwrap_or_default();
+                let price = match order.order_type {
+                    OrderType::MARKET => None,
+                    OrderType::LIMIT => order.price,
+                };
+                if order.quantity <= 0 || (order.order_type == OrderType::LIMIT && price.is_none()) {
+                    self.status(&order_id, OrderState::REJECTED, Some("Invalid quantity or price".into()));
+                    return;
+                }
+                self.status(&order_id, OrderState::NEW, None);
+                self.symbols.lock().unwrap().insert(order_id.clone(), order.symbol.clone());
+                let (fills, remaining) = self
+                    .with_book_of(&order_id, |book| book.submit(&order_id, order.side.clone(), price, order.quantity))
+                    .unwrap_or_default();
+                self.finish_match(&order_id, fills, remaining, price.is_none());
+            },
+            Request::Cancel(order_id) => {
+                match self.with_book_of(&order_id, |book| book.cancel(&order_id)).flatten() {
+                    Some(_) => {
+                        self.symbols.lock().unwrap().remove(&order_id);
+                        self.status(&order_id, OrderState::CANCELED, None);
+                    },
+                    None => self.emit(IncomingMessage::Error { code: 1, message: format!("Cancel rejected: {} is not open", order_id) }),
+                }
+            },
+            Request::Modify(order_id, price, qty) => {
+                // Cancel-replace: the order goes to the back of the queue at its new
+                // price; no price means convert to market, as the engine does
+                let replaced = self.with_book_of(&order_id, |book| {
+                    let (side, _) = book.side_and_price(&order_id)?;
+                    let open = book.cancel(&order_id)?;
+                    Some(book.submit(&order_id, side, price, qty.unwrap_or(open)))
+                }).flatten();
+                match replaced {
+                    Some((fills, remaining)) => self.finish_match(&order_id, fills, remaining, price.is_none()),
+                    None => self.emit(IncomingMessage::Error { code: 2, message: format!("Modify rejected: {} is not open", order_id) }),
+                }
+            },
+        }
+    }
+
+    // Report fills, and drop the id once the order is no longer resting
+    fn finish_match(&self, order_id: &str, fills: Vec<Fill>, remaining: i64, market: bool) {
+        if remaining == 0 || market {
+            self.symbols.lock().unwrap().remove(order_id);
+        }
+        self.forget_filled(&fills);
+        self.emit_fills(fills);
+        if remaining > 0 && market {
+            // Market orders do not rest
+            self.status(order_id, OrderState::CANCELED, Some("No liquidity for remainder".into()));
+        }
+    }
+
+    fn forget_filled(&self, fills: &[Fill]) {
+        let mut symbols = self.symbols.lock().unwrap();
+        let books = self.books.lock().unwrap();
+        for f in fills {
+            let resting = symbols.get(&f.order_id).and_then(|s| books.get(s)).and_then(|b| b.resting_qty(&f.order_id));
+            if resting.is_none() {
+                symbols.remove(&f.order_id);
+            }
+        }
+    }
+
+    fn with_book_of<T>(&self, order_id: &str, f: impl FnOnce(&mut MatchingBook) -> T) -> Option<T> {
+        let symbol = self.symbols.lock().unwrap().get(order_id).cloned()?;
+        let mut books = self.books.lock().unwrap();
+        let book = books.entry(symbol.clone()).or_insert_with(|| MatchingBook::new(&symbol));
+        Some(f(book))
+    }
+
+    fn tick_books(&self) {
+        let mut generators = self.generators.lock().unwrap();
+        for generator in generators.iter_mut() {
+            let mut snapshot = generator.next_book();
+            let fills = {
+                let mut books = self.books.lock().unwrap();
+                let book = books.entry(snapshot.symbol.clone()).or_insert_with(|| MatchingBook::new(&snapshot.symbol));
+                let fills = book.replace_liquidity(&snapshot);
+                // Publish what the venue shows, our resting orders included
+                let levels = snapshot.bids.len().max(snapshot.asks.len());
+                (snapshot.bids, snapshot.asks) = book.depth(levels);
+                fills
+            };
+            self.forget_filled(&fills);
+            self.emit_fills(fills);
+            self.emit(IncomingMessage::OrderBookSnapshot(snapshot));
+        }
+    }
+
+    fn run(&self) {
+        let mut next_tick = Instant::now();
+        let mut queue = self.requests.lock().unwrap();
+        while self.running.load(Ordering::SeqCst) {
+            let now = Instant::now();
+            if now >= next_tick {
+                drop(queue);
+                self.tick_books();
+                next_tick = now + self.config.book_interval;
+                queue = self.requests.lock().unwrap();
+                continue;
+            }
+            match queue.front().map(|(due, _)| *due) {
+                Some(due) if due <= now => {
+                    let (_, request) = queue.pop_front().unwrap();
+                    drop(queue);
+                    self.handle(request);
+                    queue = self.requests.lock().unwrap();
+                },
+                due => {
+                    let until = due.map_or(next_tick, |d| d.min(next_tick));
+                    queue = self.wakeup.wait_timeout(queue, until - now).unwrap().0;
+                },
+            }
+        }
+    }
+}
+
+/// In-process venue.
+///
+/// Without a monitor it only answers `true` to everything, as before. Once
+/// `set_monitor` is called, orders go through a price-time priority
+/// `MatchingBook` per symbol after `MockConfig::latency`, and the results come
+/// back through the monitor like a real venue: `OrderStatus` NEW / CANCELED /
+/// REJECTED and one `Execution` per match. Books from `add_book_generator` are
+/// refreshed every `book_interval`, published as `OrderBookSnapshot`s, and
+/// provide the liquidity our orders trade against.
 pub struct MockAdapter {
     account_state: Mutex<AccountState>,
+    venue: Arc<Venue>,
+    thread: Mutex<Option<thread::JoinHandle<()>>>,
 }
 
 impl MockAdapter {
     pub fn new() -> Self {
+        Self::with_config(MockConfig::default())
+    }
+
+    pub fn with_config(config: MockConfig) -> Self {
         MockAdapter {
             account_state: Mutex::new(AccountState::new()),
+            venue: Arc::new(Venue {
+                config,
+                books: Mutex::new(HashMap::new()),
+                generators: Mutex::new(Vec::new()),
+                requests: Mutex::new(VecDeque::new()),
+                wakeup: Condvar::new(),
+                sender: Mutex::new(None),
+                symbols: Mutex::new(HashMap::new()),
+                running: AtomicBool::new(false),
+            }),
+            thread: Mutex::new(None),
         }
     }
-    
+
     pub fn with_account_state(state: AccountState) -> Self {
-        MockAdapter {
-            account_state: Mutex::new(state),
-        }
+        let adapter = Self::new();
+        adapter.set_account_state(state);
+        adapter
     }
-    
+
     pub fn set_account_state(&self, state: AccountState) {
         let mut guard = self.account_state.lock().unwrap();
         *guard = state;
     }
+
+    pub fn add_book_generator(&self, generator: Box<dyn BookGenerator>) {
+        self.venue.generators.lock().unwrap().push(generator);
+    }
+
+    /// Open quantity of a resting order at the venue.
+    pub fn resting_qty(&self, order_id: &str) -> Option<i64> {
+        self.venue.with_book_of(order_id, |book| book.resting_qty(order_id)).flatten()
+    }
+
+    fn simulating(&self) -> bool {
+        self.venue.running.load(Ordering::SeqCst)
+    }
+
+    fn submit(&self, request: Request) {
+        let due = Instant::now() + self.venue.config.latency;
+        self.venue.requests.lock().unwrap().push_back((due, request));
+        self.venue.wakeup.notify_one();
+    }
+
+    fn stop_venue(&self) {
+        self.venue.running.store(false, Ordering::SeqCst);
+        self.venue.wakeup.notify_one();
+        if let Some(handle) = self.thread.lock().unwrap().take() {
+            let _ = handle.join();
+        }
+    }
+}
+
+impl Drop for MockAdapter {
+    fn drop(&mut self) {
+        self.stop_venue();
+    }
 }
 
 impl Adapter for MockAdapter {
@@ -37,19 +287,31 @@ impl Adapter for MockAdapter {
     }
 
     fn disconnect(&self) -> Result<()> {
+        self.stop_venue();
         Ok(())
     }
 
-    fn place_order(&self, _order: &Order) -> Result<bool> {
+    fn place_order(&self, order: &Order) -> Result<bool> {
+        if self.simulating() {
+            self.submit(Request::Place(order.clone()));
+        }
         Ok(true)
     }
 
-    fn cancel_order(&self, _order_id: &str) -> Result<bool> {
+    fn cancel_order(&self, order_id: &str) -> Result<bool> {
+        if self.simulating() {
+            self.submit(Request::Cancel(order_id.to_string()));
+        }
         Ok(true)
     }
 
     fn get_order_book_snapshot(&self, symbol: &str) -> Result<OrderBook> {
-        Ok(OrderBook::new(symbol.to_string()))
+        let mut book = OrderBook::new(symbol.to_string());
+        if let Some(m) = self.venue.books.lock().unwrap().get(symbol) {
+            let (bids, asks) = m.depth(usize::MAX);
+            book.rebuild(bids, asks, 0, now_epoch());
+        }
+        Ok(book)
     }
 
     fn get_account_snapshot(&self, _account_id: &str) -> Result<AccountState> {
@@ -57,7 +319,10 @@ impl Adapter for MockAdapter {
         Ok(self.account_state.lock().unwrap().clone())
     }
 
-    fn modify_order(&self, _order_id: &str, _price: Option<Decimal>, _qty: Option<i64>) -> Result<bool> {
+    fn modify_order(&self, order_id: &str, price: Option<Decimal>, qty: Option<i64>) -> Result<bool> {
+        if self.simulating() {
+            self.submit(Request::Modify(order_id.to_string(), price, qty));
+        }
         Ok(true) //TODO: what if the user want to modify whole remaining orders? Does the API support partial modify?
     }
 
@@ -65,7 +330,13 @@ impl Adapter for MockAdapter {
         Ok(())
     }
 
-    fn set_monitor(&self, _sender: std::sync::mpsc::Sender<IncomingMessage>) {
-        // Mock adapter currently ignores the monitor, or we could store it to send mock messages later
+    fn set_monitor(&self, sender: Sender<IncomingMessage>) {
+        *self.venue.sender.lock().unwrap() = Some(sender);
+        let mut thread_guard = self.thread.lock().unwrap();
+        if thread_guard.is_none() {
+            self.venue.running.store(true, Ordering::SeqCst);
+            let venue = self.venue.clone();
+            *thread_guard = Some(thread::spawn(move || venue.run()));
+        }
     }
 }
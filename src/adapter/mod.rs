@@ -26,10 +26,20 @@ pub trait Adapter: Send + Sync {
     fn get_account_snapshot(&self, account_id: &str) -> Result<AccountState>;
     fn modify_order(&self, order_id: &str, price: Option<Decimal>, qty: Option<i64>) -> Result<bool>;
     fn subscribe(&self, symbols: &[String]) -> Result<()>;
+    fn unsubscribe(&self, _symbols: &[String]) -> Result<()> {
+        Ok(())
+    }
     fn set_monitor(&self, sender: std::sync::mpsc::Sender<IncomingMessage>);
 }
 
 pub mod mock;
+pub mod matching;
 pub mod hantoo;
 pub mod hantoo_ngt_futopt;
+pub mod hantoo_ws;
+pub mod order_index;
+pub mod replay;
+pub mod rest;
+pub mod router;
+pub mod ws_session;
 pub mod interface;
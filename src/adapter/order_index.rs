@@ -0,0 +1,164 @@
+use crate::adapter::IncomingMessage;
+use crate::oms::order::OrderState;
+use std::collections::HashMap;
+
+struct Tracked<I> {
+    info: I,
+    // Every exchange order number seen for this order (original, modify)
+    order_nos: Vec<String>,
+    // Numbers of our cancel requests; their notices answer the cancel, not the order
+    cancel_nos: Vec<String>,
+    open_qty: i64,
+    filled_qty: i64,
+}
+
+/// Which order an exchange notice is about, and in what role.
+#[derive(Debug, Clone, PartialEq, Eq)]
+pub enum NoticeRoute {
+    /// Fill, accept or refusal of the order itself (original or modify number).
+    Order(String),
+    /// Accept or refusal of our cancel request, under the cancel's own number.
+    Cancel(String),
+}
+
+/// Client order id -> broker order info, with a reverse index from exchange order
+/// number (ODNO) to client order id.
+///
+/// Execution notices only carry the exchange order number, so routing a fill is a
+/// single hash lookup instead of a scan over every working order. A modify gets a
+/// new order number from the exchange; the old ones are kept as aliases so notices
+/// that arrive late for the original number still find the order. A cancel also
+/// gets its own number, kept apart so its notice is read as the cancel's answer.
+/// Orders are forgotten once filled, canceled or rejected.
+pub struct OrderNoIndex<I> {
+    orders: HashMap<String, Tracked<I>>,
+    by_order_no: HashMap<String, String>,
+    by_cancel_no: HashMap<String, String>,
+}
+
+impl<I> Default for OrderNoIndex<I> {
+    fn default() -> Self {
+        OrderNoIndex {
+            orders: HashMap::new(),
+            by_order_no: HashMap::new(),
+            by_cancel_no: HashMap::new(),
+        }
+    }
+}
+
+impl<I> OrderNoIndex<I> {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Track a newly placed order of `quantity`. Replaces any previous entry for `client_id`.
+    pub fn insert(&mut self, client_id: String, order_no: &str, quantity: i64, info: I) {
+        self.remove(&client_id);
+        self.by_order_no.insert(order_no.to_string(), client_id.clone());
+        let tracked = Tracked { info, order_nos: vec![order_no.to_string()], cancel_nos: Vec::new(), open_qty: quantity, filled_qty: 0 };
+        self.orders.insert(client_id, tracked);
+    }
+
+    /// Route `order_no` to `client_id` as well (new number after a modify).
+    pub fn add_order_no(&mut self, client_id: &str, order_no: &str) {
+        if let Some(t) = self.orders.get_mut(client_id) {
+            if !t.order_nos.iter().any(|o| o == order_no) {
+                t.order_nos.push(order_no.to_string());
+            }
+            self.by_order_no.insert(order_no.to_string(), client_id.to_string());
+        }
+    }
+
+    /// Number the exchange gave our cancel of `client_id`.
+    pub fn add_cancel_no(&mut self, client_id: &str, cancel_no: &str) {
+        if let Some(t) = self.orders.get_mut(client_id) {
+            if !t.cancel_nos.iter().any(|o| o == cancel_no) {
+                t.cancel_nos.push(cancel_no.to_string());
+            }
+            self.by_cancel_no.insert(cancel_no.to_string(), client_id.to_string());
+        }
+    }
+
+    /// Open quantity after a modify.
+    pub fn set_open_qty(&mut self, client_id: &str, qty: i64) {
+        if let Some(t) = self.orders.get_mut(client_id) {
+            t.open_qty = qty;
+        }
+    }
+
+    /// Count a fill; the order is forgotten once nothing is left open.
+    pub fn fill(&mut self, client_id: &str, qty: i64) {
+        let Some(t) = self.orders.get_mut(client_id) else { return };
+        t.open_qty -= qty;
+        t.filled_qty += qty;
+        if t.open_qty <= 0 {
+            self.remove(client_id);
+        }
+    }
+
+    /// The venue's answer to our cancel of `client_id`. An accepted cancel closes
+    /// the order, which is forgotten; a refused one leaves it working, so it is
+    /// reported in its working state rather than as REJECTED.
+    pub fn cancel_notice(&mut self, client_id: &str, refused: bool, updated_at: f64) -> Option<IncomingMessage> {
+        let (state, msg) = if refused {
+            let t = self.orders.get(client_id)?;
+            let working = if t.filled_qty > 0 { OrderState::PARTIALLY_FILLED } else { OrderState::NEW };
+            (working, Some("Cancel rejected".to_string()))
+        } else {
+            self.remove(client_id)?;
+            (OrderState::CANCELED, None)
+        };
+        Some(IncomingMessage::OrderStatus {
+            order_id: client_id.to_string(),
+            state,
+            filled_qty: 0,
+            filled_price: None,
+            msg,
+            updated_at,
+        })
+    }
+
+    pub fn get(&self, client_id: &str) -> Option<&I> {
+        self.orders.get(client_id).map(|t| &t.info)
+    }
+
+    pub fn get_mut(&mut self, client_id: &str) -> Option<&mut I> {
+        self.orders.get_mut(client_id).map(|t| &mut t.info)
+    }
+
+    /// Client order id for an exchange order number (not a cancel number).
+    pub fn client_id(&self, order_no: &str) -> Option<&str> {
+        self.by_order_no.get(order_no).map(|s| s.as_str())
+    }
+
+    /// Which order, and in what role, a notice for `order_no` is about.
+    pub fn route(&self, order_no: &str) -> Option<NoticeRoute> {
+        if let Some(c) = self.by_cancel_no.get(order_no) {
+            return Some(NoticeRoute::Cancel(c.clone()));
+        }
+        self.client_id(order_no).map(|c| NoticeRoute::Order(c.to_string()))
+    }
+
+    pub fn remove(&mut self, client_id: &str) -> Option<I> {
+        let t = self.orders.remove(client_id)?;
+        for o in &t.order_nos {
+            if self.by_order_no.get(o).map(|c| c.as_str()) == Some(client_id) {
+                self.by_order_no.remove(o);
+            }
+        }
+        for o in &t.cancel_nos {
+            if self.by_cancel_no.get(o).map(|c| c.as_str()) == Some(client_id) {
+                self.by_cancel_no.remove(o);
+            }
+        }
+        Some(t.info)
+    }
+
+    pub fn len(&self) -> usize {
+        self.orders.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.orders.is_empty()
+    }
+}
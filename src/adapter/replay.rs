@@ -0,0 +1,526 @@
+use crate::adapter::mock::MockAdapter;
+use crate::adapter::{Adapter, IncomingMessage};
+use crate::oms::account::AccountState;
+use crate::oms::order::Order;
+use crate::oms::order_book::OrderBook;
+use anyhow::{anyhow, Result};
+use log::{error, info};
+use rust_decimal::Decimal;
+use serde::{Deserialize, Serialize};
+use std::collections::{BTreeMap, HashSet};
+use std::fs::{self, File};
+use std::io::{self, BufReader, BufWriter, Read, Seek, SeekFrom, Write};
+use std::path::Path;
+use std::sync::atomic::{AtomicBool, AtomicU64, Ordering};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+const MAGIC: &[u8; 8] = b"DDREC001";
+const INDEX_SUFFIX: &str = ".idx";
+// Longest uninterrupted sleep while pacing, i.e. how late `disconnect` can be
+const PACE_SLICE: Duration = Duration::from_millis(50);
+
+pub fn now_micros() -> i64 {
+    chrono::Local::now().timestamp_micros()
+}
+
+/// Symbol a message is about, if any.
+pub fn message_symbol(msg: &IncomingMessage) -> Option<&str> {
+    match msg {
+        IncomingMessage::OrderBookSnapshot(s) => Some(&s.symbol),
+        IncomingMessage::OrderBookUpdate { symbol, .. } => Some(symbol),
+        IncomingMessage::MarketTrade { symbol, .. } => Some(symbol),
+        _ => None,
+    }
+}
+
+/// Sparse seek index of a recording, stored next to it as `<path>.idx`.
+///
+/// Every `interval_us`, the offset of the first record (overall, and per symbol)
+/// is noted, so a replay can start near any time without scanning the file.
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct RecordingIndex {
+    pub count: u64,
+    pub first_ts: i64,
+    pub last_ts: i64,
+    pub interval_us: i64,
+    /// (timestamp_us, byte offset), ascending
+    pub time: Vec<(i64, u64)>,
+    pub symbols: BTreeMap<String, Vec<(i64, u64)>>,
+}
+
+impl RecordingIndex {
+    fn mark(marks: &mut Vec<(i64, u64)>, interval_us: i64, ts: i64, offset: u64) {
+        if marks.last().map_or(true, |(last, _)| ts - *last >= interval_us) {
+            marks.push((ts, offset));
+        }
+    }
+
+    fn note(&mut self, ts: i64, offset: u64, symbol: Option<&str>) {
+        if self.count == 0 {
+            self.first_ts = ts;
+        }
+        self.count += 1;
+        self.last_ts = ts;
+        Self::mark(&mut self.time, self.interval_us, ts, offset);
+        if let Some(s) = symbol {
+            let marks = match self.symbols.get_mut(s) {
+                Some(m) => m,
+                None => self.symbols.entry(s.to_string()).or_default(),
+            };
+            Self::mark(marks, self.interval_us, ts, offset);
+        }
+    }
+
+    // Offset of the last mark at or before `from`, i.e. no record at >= `from` comes before it
+    fn floor(marks: &[(i64, u64)], from: i64) -> Option<u64> {
+        if marks.is_empty() {
+            return None;
+        }
+        let i = marks.partition_point(|(ts, _)| *ts <= from);
+        Some(marks[i.saturating_sub(1)].1)
+    }
+
+    /// Where to start reading to see every record at or after `from_us`
+    /// (for `symbols`, or all records when `None`).
+    pub fn seek_offset(&self, from_us: i64, symbols: Option<&HashSet<String>>) -> u64 {
+        let first = MAGIC.len() as u64;
+        match symbols {
+            None => Self::floor(&self.time, from_us).unwrap_or(first),
+            Some(set) => set
+                .iter()
+                .filter_map(|s| self.symbols.get(s).and_then(|m| Self::floor(m, from_us)))
+                .min()
+                .unwrap_or(first),
+        }
+    }
+
+    /// Read `<path>.idx`, or rebuild it by scanning the recording.
+    pub fn load(path: &str) -> Result<Self> {
+        let idx_path = format!("{}{}", path, INDEX_SUFFIX);
+        if let Ok(bytes) = fs::read(&idx_path) {
+            if let Ok(index) = rmp_serde::from_slice(&bytes) {
+                return Ok(index);
+            }
+        }
+        let mut index = RecordingIndex { interval_us: 1_000_000, ..Default::default() };
+        let mut reader = RecordReader::open(path)?;
+        loop {
+            let offset = reader.offset;
+            match reader.next_record()? {
+                Some((ts, msg)) => index.note(ts, offset, message_symbol(&msg)),
+                None => break,
+            }
+        }
+        Ok(index)
+    }
+}
+
+/// Appends `[u32 LE len][i64 LE ts_us][MessagePack IncomingMessage]` records after
+/// an 8-byte header, and writes the `.idx` sidecar on `finish`.
+pub struct RecordWriter {
+    path: String,
+    file: BufWriter<File>,
+    offset: u64,
+    index: RecordingIndex,
+    buf: Vec<u8>,
+}
+
+impl RecordWriter {
+    pub fn create(path: &str, index_interval: Duration) -> Result<Self> {
+        if let Some(dir) = Path::new(path).parent() {
+            if !dir.as_os_str().is_empty() {
+                fs::create_dir_all(dir)?;
+            }
+        }
+        let mut file = BufWriter::with_capacity(256 * 1024, File::create(path)?);
+        file.write_all(MAGIC)?;
+        Ok(RecordWriter {
+            path: path.to_string(),
+            file,
+            offset: MAGIC.len() as u64,
+            index: RecordingIndex {
+                interval_us: (index_interval.as_micros() as i64).max(1),
+                ..Default::default()
+            },
+            buf: Vec::with_capacity(1024),
+        })
+    }
+
+    pub fn write(&mut self, ts_us: i64, msg: &IncomingMessage) -> Result<()> {
+        self.buf.clear();
+        rmp_serde::encode::write(&mut self.buf, msg)?;
+        self.index.note(ts_us, self.offset, message_symbol(msg));
+        self.file.write_all(&(self.buf.len() as u32).to_le_bytes())?;
+        self.file.write_all(&ts_us.to_le_bytes())?;
+        self.file.write_all(&self.buf)?;
+        self.offset += 12 + self.buf.len() as u64;
+        Ok(())
+    }
+
+    pub fn flush(&mut self) -> Result<()> {
+        self.file.flush()?;
+        Ok(())
+    }
+
+    /// Flush the data and write the index.
+    pub fn finish(mut self) -> Result<RecordingIndex> {
+        self.file.flush()?;
+        fs::write(format!("{}{}", self.path, INDEX_SUFFIX), rmp_serde::to_vec(&self.index)?)?;
+        Ok(self.index)
+    }
+}
+
+/// Sequential reader over a recording.
+pub struct RecordReader {
+    file: BufReader<File>,
+    offset: u64,
+    buf: Vec<u8>,
+}
+
+impl RecordReader {
+    pub fn open(path: &str) -> Result<Self> {
+        let mut file = BufReader::with_capacity(256 * 1024, File::open(path)?);
+        let mut magic = [0u8; 8];
+        file.read_exact(&mut magic)?;
+        if &magic != MAGIC {
+            return Err(anyhow!("{} is not a didius recording", path));
+        }
+        Ok(RecordReader { file, offset: MAGIC.len() as u64, buf: Vec::new() })
+    }
+
+    pub fn seek(&mut self, offset: u64) -> Result<()> {
+        self.file.seek(SeekFrom::Start(offset))?;
+        self.offset = offset;
+        Ok(())
+    }
+
+    /// Next `(timestamp_us, message)`. A truncated tail (recorder killed mid-write) ends the stream.
+    pub fn next_record(&mut self) -> Result<Option<(i64, IncomingMessage)>> {
+        let mut head = [0u8; 12];
+        match self.file.read_exact(&mut head) {
+            Ok(()) => {},
+            Err(e) if e.kind() == io::ErrorKind::UnexpectedEof => return Ok(None),
+            Err(e) => return Err(e.into()),
+        }
+        let len = u32::from_le_bytes(head[..4].try_into().unwrap()) as usize;
+        let ts = i64::from_le_bytes(head[4..].try_into().unwrap());
+        self.buf.resize(len, 0);
+        match self.file.read_exact(&mut self.buf) {
+            Ok(()) => {},
+            Err(e) if e.kind() == io::ErrorKind::UnexpectedEof => return Ok(None),
+            Err(e) => return Err(e.into()),
+        }
+        self.offset += 12 + len as u64;
+        let msg = rmp_serde::from_slice(&self.buf).map_err(|e| anyhow!("Corrupt record at {}: {}", self.offset, e))?;
+        Ok(Some((ts, msg)))
+    }
+}
+
+impl Iterator for RecordReader {
+    type Item = Result<(i64, IncomingMessage)>;
+
+    fn next(&mut self) -> Option<Self::Item> {
+        self.next_record().transpose()
+    }
+}
+
+/// Wraps a live adapter and records every message its monitor sender delivers,
+/// passing them on unchanged. Call `finish` (or `disconnect`) to write the index.
+pub struct RecordingAdapter {
+    inner: Arc<dyn Adapter>,
+    writer: Arc<Mutex<Option<RecordWriter>>>,
+}
+
+impl RecordingAdapter {
+    pub fn new(inner: Arc<dyn Adapter>, path: &str) -> Result<Self> {
+        Ok(RecordingAdapter {
+            inner,
+            writer: Arc::new(Mutex::new(Some(RecordWriter::create(path, Duration::from_secs(1))?))),
+        })
+    }
+
+    pub fn finish(&self) -> Result<Option<RecordingIndex>> {
+        match self.writer.lock().unwrap().take() {
+            Some(w) => Ok(Some(w.finish()?)),
+            None => Ok(None),
+        }
+    }
+}
+
+impl Adapter for RecordingAdapter {
+    fn connect(&self) -> Result<()> {
+        self.inner.connect()
+    }
+
+    fn disconnect(&self) -> Result<()> {
+        let result = self.inner.disconnect();
+        self.finish()?;
+        result
+    }
+
+    fn place_order(&self, order: &Order) -> Result<bool> {
+        self.inner.place_order(order)
+    }
+
+    fn cancel_order(&self, order_id: &str) -> Result<bool> {
+        self.inner.cancel_order(order_id)
+    }
+
+    fn get_order_book_snapshot(&self, symbol: &str) -> Result<OrderBook> {
+        self.inner.get_order_book_snapshot(symbol)
+    }
+
+    fn get_account_snapshot(&self, account_id: &str) -> Result<AccountState> {
+        self.inner.get_account_snapshot(account_id)
+    }
+
+    fn modify_order(&self, order_id: &str, price: Option<Decimal>, qty: Option<i64>) -> Result<bool> {
+        self.inner.modify_order(order_id, price, qty)
+    }
+
+    fn subscribe(&self, symbols: &[String]) -> Result<()> {
+        self.inner.subscribe(symbols)
+    }
+
+    fn unsubscribe(&self, symbols: &[String]) -> Result<()> {
+        self.inner.unsubscribe(symbols)
+    }
+
+    fn set_monitor(&self, sender: mpsc::Sender<IncomingMessage>) {
+        // Tee: the inner adapter sends to us, we record and forward
+        let (tx, rx) = mpsc::channel::<IncomingMessage>();
+        let writer = self.writer.clone();
+        thread::spawn(move || {
+            for msg in rx {
+                if let Some(w) = writer.lock().unwrap().as_mut() {
+                    if let Err(e) = w.write(now_micros(), &msg) {
+                        error!("Failed to record message: {}", e);
+                    }
+                }
+                if sender.send(msg).is_err() {
+                    break;
+                }
+            }
+            if let Some(w) = writer.lock().unwrap().as_mut() {
+                let _ = w.flush();
+            }
+        });
+        self.inner.set_monitor(tx);
+    }
+}
+
+#[derive(Debug, Clone, Copy, PartialEq)]
+pub enum ReplaySpeed {
+    /// Keep the recorded gaps between messages.
+    Recorded,
+    /// Recorded gaps divided by this factor (2.0 = twice as fast).
+    Scaled(f64),
+    AsFastAsPossible,
+}
+
+#[derive(Debug, Clone)]
+pub struct ReplayConfig {
+    pub speed: ReplaySpeed,
+    /// Inclusive time range in recording microseconds.
+    pub from_us: Option<i64>,
+    pub to_us: Option<i64>,
+}
+
+impl Default for ReplayConfig {
+    fn default() -> Self {
+        ReplayConfig { speed: ReplaySpeed::AsFastAsPossible, from_us: None, to_us: None }
+    }
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct ReplayStats {
+    pub messages: u64,
+    pub elapsed: Duration,
+}
+
+impl ReplayStats {
+    pub fn messages_per_sec(&self) -> f64 {
+        let secs = self.elapsed.as_secs_f64();
+        if secs > 0.0 { self.messages as f64 / secs } else { 0.0 }
+    }
+}
+
+/// Adapter that plays a recording into the monitor sender on `connect`.
+///
+/// Order entry is answered by an inner `MockAdapter`. `subscribe` before `connect`
+/// limits the replay to those symbols (all symbols otherwise); the per-symbol
+/// index is used to skip straight to `from_us`. The sender is dropped when the
+/// replay ends, so a gateway listener fed only by this adapter exits afterwards.
+pub struct ReplayAdapter {
+    path: String,
+    config: ReplayConfig,
+    orders: MockAdapter,
+    symbols: Mutex<HashSet<String>>,
+    sender: Mutex<Option<mpsc::Sender<IncomingMessage>>>,
+    thread: Mutex<Option<thread::JoinHandle<Result<ReplayStats>>>>,
+    sent: Arc<AtomicU64>,
+    stop: Arc<AtomicBool>,
+}
+
+impl ReplayAdapter {
+    pub fn new(path: &str, config: ReplayConfig) -> Result<Self> {
+        // Fail early on a missing or foreign file
+        RecordReader::open(path)?;
+        Ok(ReplayAdapter {
+            path: path.to_string(),
+            config,
+            orders: MockAdapter::new(),
+            symbols: Mutex::new(HashSet::new()),
+            sender: Mutex::new(None),
+            thread: Mutex::new(None),
+            sent: Arc::new(AtomicU64::new(0)),
+            stop: Arc::new(AtomicBool::new(false)),
+        })
+    }
+
+    /// Messages delivered so far.
+    pub fn sent(&self) -> u64 {
+        self.sent.load(Ordering::Relaxed)
+    }
+
+    /// Block until the replay has finished.
+    pub fn wait(&self) -> Result<ReplayStats> {
+        let handle = self.thread.lock().unwrap().take().ok_or_else(|| anyhow!("Replay not started"))?;
+        handle.join().map_err(|_| anyhow!("Replay thread panicked"))?
+    }
+
+    fn run(
+        path: String,
+        config: ReplayConfig,
+        symbols: Option<HashSet<String>>,
+        sender: mpsc::Sender<IncomingMessage>,
+        sent: Arc<AtomicU64>,
+        stop: Arc<AtomicBool>,
+    ) -> Result<ReplayStats> {
+        let mut reader = RecordReader::open(&path)?;
+        if let Some(from) = config.from_us {
+            let index = RecordingIndex::load(&path)?;
+            reader.seek(index.seek_offset(from, symbols.as_ref()))?;
+        }
+
+        let started = Instant::now();
+        let mut first_ts = None;
+        let mut messages = 0u64;
+        while let Some((ts, msg)) = reader.next_record()? {
+            if stop.load(Ordering::Relaxed) {
+                break;
+            }
+            if config.from_us.map_or(false, |from| ts < from) {
+                continue;
+            }
+            if config.to_us.map_or(false, |to| ts > to) {
+                break;
+            }
+            if let (Some(set), Some(s)) = (&symbols, message_symbol(&msg)) {
+                if !set.contains(s) {
+                    continue;
+                }
+            }
+
+            let scale = match config.speed {
+                ReplaySpeed::Recorded => Some(1.0),
+                ReplaySpeed::Scaled(f) if f > 0.0 => Some(f),
+                _ => None,
+            };
+            if let Some(scale) = scale {
+                let base = *first_ts.get_or_insert(ts);
+                let due = started + Duration::from_secs_f64((ts - base).max(0) as f64 / 1e6 / scale);
+                if !Self::sleep_until(due, &stop) {
+                    break;
+                }
+            }
+
+            if sender.send(msg).is_err() {
+                break;
+            }
+            messages += 1;
+            sent.fetch_add(1, Ordering::Relaxed);
+        }
+        let stats = ReplayStats { messages, elapsed: started.elapsed() };
+        info!("Replay of {} done: {} messages in {:?} ({:.0} msg/s)", path, stats.messages, stats.elapsed, stats.messages_per_sec());
+        Ok(stats)
+    }
+
+    // Sleeps in slices so `disconnect` is not held up by a recorded gap (lunch
+    // break, overnight). False if stopped first.
+    fn sleep_until(due: Instant, stop: &AtomicBool) -> bool {
+        loop {
+            if stop.load(Ordering::Relaxed) {
+                return false;
+            }
+            let now = Instant::now();
+            if now >= due {
+                return true;
+            }
+            thread::sleep((due - now).min(PACE_SLICE));
+        }
+    }
+}
+
+impl Adapter for ReplayAdapter {
+    fn connect(&self) -> Result<()> {
+        let mut thread_guard = self.thread.lock().unwrap();
+        if thread_guard.is_some() {
+            return Ok(());
+        }
+        let sender = self.sender.lock().unwrap().take().ok_or_else(|| anyhow!("ReplayAdapter: set_monitor before connect"))?;
+        let symbols = self.symbols.lock().unwrap().clone();
+        let symbols = if symbols.is_empty() { None } else { Some(symbols) };
+        let (path, config, sent, stop) = (self.path.clone(), self.config.clone(), self.sent.clone(), self.stop.clone());
+        stop.store(false, Ordering::Relaxed);
+        *thread_guard = Some(thread::spawn(move || Self::run(path, config, symbols, sender, sent, stop)));
+        Ok(())
+    }
+
+    fn disconnect(&self) -> Result<()> {
+        self.stop.store(true, Ordering::Relaxed);
+        if self.thread.lock().unwrap().is_some() {
+            self.wait()?;
+        }
+        Ok(())
+    }
+
+    fn place_order(&self, order: &Order) -> Result<bool> {
+        self.orders.place_order(order)
+    }
+
+    fn cancel_order(&self, order_id: &str) -> Result<bool> {
+        self.orders.cancel_order(order_id)
+    }
+
+    fn get_order_book_snapshot(&self, symbol: &str) -> Result<OrderBook> {
+        self.orders.get_order_book_snapshot(symbol)
+    }
+
+    fn get_account_snapshot(&self, account_id: &str) -> Result<AccountState> {
+        self.orders.get_account_snapshot(account_id)
+    }
+
+    fn modify_order(&self, order_id: &str, price: Option<Decimal>, qty: Option<i64>) -> Result<bool> {
+        self.orders.modify_order(order_id, price, qty)
+    }
+
+    fn subscribe(&self, symbols: &[String]) -> Result<()> {
+        self.symbols.lock().unwrap().extend(symbols.iter().cloned());
+        Ok(())
+    }
+
+    fn unsubscribe(&self, symbols: &[String]) -> Result<()> {
+        let mut set = self.symbols.lock().unwrap();
+        for s in symbols {
+            set.remove(s);
+        }
+        Ok(())
+    }
+
+    fn set_monitor(&self, sender: mpsc::Sender<IncomingMessage>) {
+        *self.sender.lock().unwrap() = Some(sender);
+    }
+}
@@ -0,0 +1,326 @@
+use anyhow::{anyhow, Result};
+use reqwest::blocking::Client;
+use reqwest::Method;
+use serde_json::Value;
+use std::collections::VecDeque;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::mpsc;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+#[derive(Debug, Clone)]
+pub struct RestConfig {
+    /// Worker threads, i.e. requests on the wire at once.
+    pub max_in_flight: usize,
+    /// Client-side requests per second. <= 0 disables the limiter.
+    pub rate_per_sec: f64,
+    /// Requests that may go out back to back before the rate applies.
+    pub burst: usize,
+    pub timeout: Duration,
+}
+
+impl Default for RestConfig {
+    fn default() -> Self {
+        RestConfig {
+            max_in_flight: 4,
+            rate_per_sec: 0.0,
+            burst: 1,
+            timeout: Duration::from_secs(10),
+        }
+    }
+}
+
+/// Token bucket shared by all workers.
+pub struct TokenBucket {
+    state: Mutex<(f64, Instant)>,
+    rate: f64,
+    capacity: f64,
+}
+
+impl TokenBucket {
+    pub fn new(rate_per_sec: f64, burst: usize) -> Self {
+        let capacity = burst.max(1) as f64;
+        TokenBucket {
+            state: Mutex::new((capacity, Instant::now())),
+            rate: rate_per_sec,
+            capacity,
+        }
+    }
+
+    /// Take one token, sleeping until one is available.
+    pub fn acquire(&self) {
+        if self.rate <= 0.0 {
+            return;
+        }
+        loop {
+            let wait = {
+                let mut state = self.state.lock().unwrap();
+                let now = Instant::now();
+                let refill = now.duration_since(state.1).as_secs_f64() * self.rate;
+                state.0 = (state.0 + refill).min(self.capacity);
+                state.1 = now;
+                if state.0 >= 1.0 {
+                    state.0 -= 1.0;
+                    return;
+                }
+                (1.0 - state.0) / self.rate
+            };
+            thread::sleep(Duration::from_secs_f64(wait));
+        }
+    }
+}
+
+#[derive(Debug, Clone)]
+pub struct RestRequest {
+    pub method: Method,
+    pub url: String,
+    pub headers: Vec<(&'static str, String)>,
+    pub query: Vec<(String, String)>,
+    pub body: Option<Value>,
+}
+
+impl RestRequest {
+    pub fn get(url: String) -> Self {
+        RestRequest { method: Method::GET, url, headers: Vec::new(), query: Vec::new(), body: None }
+    }
+
+    pub fn head(url: String) -> Self {
+        RestRequest { method: Method::HEAD, url, headers: Vec::new(), query: Vec::new(), body: None }
+    }
+
+    pub fn post(url: String, body: Value) -> Self {
+        RestRequest { method: Method::POST, url, headers: Vec::new(), query: Vec::new(), body: Some(body) }
+    }
+
+    pub fn header(mut self, name: &'static str, value: impl Into<String>) -> Self {
+        self.headers.push((name, value.into()));
+        self
+    }
+
+    pub fn query(mut self, params: &[(&str, &str)]) -> Self {
+        self.query.extend(params.iter().map(|(k, v)| (k.to_string(), v.to_string())));
+        self
+    }
+}
+
+#[derive(Debug, Clone)]
+pub struct RestResponse {
+    pub status: u16,
+    pub body: String,
+    /// Submit -> response, including queueing and rate limiting.
+    pub latency: Duration,
+    /// On the wire only.
+    pub service_time: Duration,
+}
+
+impl RestResponse {
+    pub fn is_success(&self) -> bool {
+        (200..300).contains(&self.status)
+    }
+
+    pub fn json(&self) -> Result<Value> {
+        serde_json::from_str(&self.body).map_err(|e| anyhow!("Failed to parse response: {}", e))
+    }
+}
+
+/// Pending response of a submitted request.
+pub struct RestTicket {
+    rx: mpsc::Receiver<Result<RestResponse>>,
+}
+
+impl RestTicket {
+    pub fn wait(self) -> Result<RestResponse> {
+        self.rx.recv().map_err(|_| anyhow!("REST pipeline shut down"))?
+    }
+}
+
+#[derive(Debug, Clone, Default)]
+pub struct LatencyStats {
+    pub count: u64,
+    pub mean_us: f64,
+    pub p50_us: u64,
+    pub p99_us: u64,
+    pub max_us: u64,
+}
+
+// Keeps the last SAMPLES latencies for percentiles, plus running totals
+#[derive(Default)]
+struct LatencyRecorder {
+    samples: VecDeque<u64>,
+    count: u64,
+    total_us: u64,
+    max_us: u64,
+}
+
+const SAMPLES: usize = 1024;
+
+impl LatencyRecorder {
+    fn record(&mut self, d: Duration) {
+        let us = d.as_micros() as u64;
+        if self.samples.len() == SAMPLES {
+            self.samples.pop_front();
+        }
+        self.samples.push_back(us);
+        self.count += 1;
+        self.total_us += us;
+        self.max_us = self.max_us.max(us);
+    }
+
+    fn stats(&self) -> LatencyStats {
+        let mut sorted: Vec<u64> = self.samples.iter().copied().collect();
+        sorted.sort_unstable();
+        let pct = |p: f64| -> u64 {
+            if sorted.is_empty() { return 0; }
+            sorted[((sorted.len() - 1) as f64 * p).round() as usize]
+        };
+        LatencyStats {
+            count: self.count,
+            mean_us: if self.count > 0 { self.total_us as f64 / self.count as f64 } else { 0.0 },
+            p50_us: pct(0.50),
+            p99_us: pct(0.99),
+            max_us: self.max_us,
+        }
+    }
+}
+
+struct Job {
+    request: RestRequest,
+    queued_at: Instant,
+    // Warm-up requests stay out of the latency stats
+    record: bool,
+    reply: mpsc::Sender<Result<RestResponse>>,
+}
+
+/// Order-entry request pipeline.
+///
+/// `submit` queues a request and returns immediately; a fixed set of workers
+/// (`max_in_flight`) sends them over one keep-alive connection pool, each request
+/// first taking a token from the shared bucket so bursts stay under the venue's
+/// TPS limit. `execute` is submit + wait for callers that need the answer inline.
+pub struct RestPipeline {
+    jobs: Mutex<Option<mpsc::Sender<Job>>>,
+    latency: Arc<Mutex<LatencyRecorder>>,
+    in_flight: Arc<AtomicUsize>,
+}
+
+impl RestPipeline {
+    pub fn new(config: RestConfig) -> Result<Self> {
+        let workers = config.max_in_flight.max(1);
+        let client = Client::builder()
+            .pool_max_idle_per_host(workers)
+            .pool_idle_timeout(Duration::from_secs(90))
+            .tcp_keepalive(Duration::from_secs(30))
+            .tcp_nodelay(true)
+            .timeout(config.timeout)
+            .build()
+            .map_err(|e| anyhow!("Failed to build HTTP client: {}", e))?;
+
+        let (tx, rx) = mpsc::channel::<Job>();
+        let rx = Arc::new(Mutex::new(rx));
+        let bucket = Arc::new(TokenBucket::new(config.rate_per_sec, config.burst));
+        let latency = Arc::new(Mutex::new(LatencyRecorder::default()));
+        let in_flight = Arc::new(AtomicUsize::new(0));
+
+        for i in 0..workers {
+            let rx = rx.clone();
+            let client = client.clone();
+            let bucket = bucket.clone();
+            let latency = latency.clone();
+            let in_flight = in_flight.clone();
+            thread::Builder::new()
+                .name(format!("rest-worker-{}", i))
+                .spawn(move || loop {
+                    // Only one worker waits on the queue at a time; the lock is released before sending
+                    let job = match rx.lock().unwrap().recv() {
+                        Ok(job) => job,
+                        Err(_) => break, // pipeline dropped
+                    };
+                    bucket.acquire();
+                    in_flight.fetch_add(1, Ordering::Relaxed);
+                    let started = Instant::now();
+                    let result = Self::send(&client, job.request).map(|(status, body)| RestResponse {
+                        status,
+                        body,
+                        latency: job.queued_at.elapsed(),
+                        service_time: started.elapsed(),
+                    });
+                    in_flight.fetch_sub(1, Ordering::Relaxed);
+                    if let (true, Ok(r)) = (job.record, &result) {
+                        latency.lock().unwrap().record(r.latency);
+                    }
+                    let _ = job.reply.send(result);
+                })
+                .map_err(|e| anyhow!("Failed to spawn REST worker: {}", e))?;
+        }
+
+        Ok(RestPipeline {
+            jobs: Mutex::new(Some(tx)),
+            latency,
+            in_flight,
+        })
+    }
+
+    fn send(client: &Client, request: RestRequest) -> Result<(u16, String)> {
+        let mut builder = client.request(request.method, &request.url);
+        for (name, value) in &request.headers {
+            builder = builder.header(*name, value.as_str());
+        }
+        if !request.query.is_empty() {
+            builder = builder.query(&request.query);
+        }
+        if let Some(body) = &request.body {
+            builder = builder.json(body);
+        }
+        let resp = builder.send()?;
+        let status = resp.status().as_u16();
+        let body = resp.text().unwrap_or_default();
+        Ok((status, body))
+    }
+
+    pub fn submit(&self, request: RestRequest) -> Result<RestTicket> {
+        self.enqueue(request, true)
+    }
+
+    fn enqueue(&self, request: RestRequest, record: bool) -> Result<RestTicket> {
+        let (reply, rx) = mpsc::channel();
+        let jobs = self.jobs.lock().unwrap();
+        let tx = jobs.as_ref().ok_or_else(|| anyhow!("REST pipeline shut down"))?;
+        tx.send(Job { request, queued_at: Instant::now(), record, reply })
+            .map_err(|_| anyhow!("REST pipeline shut down"))?;
+        Ok(RestTicket { rx })
+    }
+
+    pub fn execute(&self, request: RestRequest) -> Result<RestResponse> {
+        self.submit(request)?.wait()
+    }
+
+    /// Open pooled connections to `url` ahead of the first order with `n` HEAD
+    /// requests through the workers. They take rate-limiter tokens like any other
+    /// request but are not counted in `latency_stats`; any HTTP status counts as warmed.
+    pub fn warm(&self, url: &str, n: usize) {
+        let tickets: Vec<_> = (0..n).filter_map(|_| self.enqueue(RestRequest::head(url.to_string()), false).ok()).collect();
+        for ticket in tickets {
+            let _ = ticket.wait();
+        }
+    }
+
+    pub fn in_flight(&self) -> usize {
+        self.in_flight.load(Ordering::Relaxed)
+    }
+
+    pub fn latency_stats(&self) -> LatencyStats {
+        self.latency.lock().unwrap().stats()
+    }
+
+    /// Stop accepting requests; workers exit once the queue is drained.
+    pub fn shutdown(&self) {
+        self.jobs.lock().unwrap().take();
+    }
+}
+
+impl Drop for RestPipeline {
+    fn drop(&mut self) {
+        self.shutdown();
+    }
+}
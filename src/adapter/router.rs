@@ -0,0 +1,256 @@
+use crate::adapter::{Adapter, IncomingMessage};
+use crate::oms::account::AccountState;
+use crate::oms::consolidated::{ConsolidatedStore, VenueBbo};
+use crate::oms::order::Order;
+use crate::oms::order_book::OrderBook;
+use anyhow::{anyhow, Result};
+use rust_decimal::Decimal;
+use std::collections::HashMap;
+use std::sync::mpsc::{self, Sender};
+use std::sync::{Arc, Mutex};
+use std::thread;
+
+/// Exchange value that lets the router pick the venue (`Order::new`'s default).
+pub const SMART_ROUTE: &str = "SOR";
+
+/// Adapter over several venues (e.g. KRX / NXT, or day / night sessions).
+///
+/// Orders go to the venue named by `Order.exchange`; `"SOR"` goes to the venue
+/// quoting the best opposite price, or the default venue when there is no
+/// quote. Cancels and modifies follow the venue the order was placed on; an
+/// order is forgotten once its venue reports it terminal or fully filled.
+///
+/// Market data from every venue is merged into one consolidated book per
+/// symbol. The monitor receives the merged changes as `OrderBookUpdate`s, so
+/// the engine's book for a symbol is the sum over venues; per-venue books and
+/// the cross-venue BBO are available from `books()`.
+pub struct VenueRouter {
+    // Few venues, kept in registration order
+    venues: Vec<(String, Arc<dyn Adapter>)>,
+    default_venue: String,
+    order_venues: Arc<Mutex<HashMap<String, RoutedOrder>>>,
+    books: Arc<ConsolidatedStore>,
+}
+
+// Where a working order went, and how much of it can still fill there
+#[derive(Debug, Clone)]
+struct RoutedOrder {
+    venue: String,
+    open_qty: i64,
+}
+
+impl VenueRouter {
+    /// `venues` must not be empty; the first one is the default.
+    pub fn new(venues: Vec<(String, Arc<dyn Adapter>)>) -> Result<Self> {
+        let default_venue = venues.first().map(|(v, _)| v.clone()).ok_or_else(|| anyhow!("VenueRouter needs at least one venue"))?;
+        Ok(VenueRouter {
+            venues,
+            default_venue,
+            order_venues: Arc::new(Mutex::new(HashMap::new())),
+            books: Arc::new(ConsolidatedStore::new()),
+        })
+    }
+
+    pub fn with_default(mut self, venue: &str) -> Result<Self> {
+        self.default_venue = self.find(venue).map(|(v, _)| v.clone()).ok_or_else(|| anyhow!("Unknown venue: {}", venue))?;
+        Ok(self)
+    }
+
+    pub fn venues(&self) -> Vec<String> {
+        self.venues.iter().map(|(v, _)| v.clone()).collect()
+    }
+
+    pub fn adapter(&self, venue: &str) -> Option<Arc<dyn Adapter>> {
+        self.find(venue).map(|(_, a)| a.clone())
+    }
+
+    pub fn books(&self) -> Arc<ConsolidatedStore> {
+        self.books.clone()
+    }
+
+    pub fn bbo(&self, symbol: &str) -> Option<VenueBbo> {
+        self.books.bbo(symbol)
+    }
+
+    /// Venue an order would be sent to.
+    pub fn route(&self, order: &Order) -> Result<String> {
+        if order.exchange.is_empty() || order.exchange.eq_ignore_ascii_case(SMART_ROUTE) {
+            let best = self.books.get(&order.symbol).and_then(|b| b.lock().unwrap().best_venue(&order.side).map(|v| v.to_string()));
+            return Ok(best.unwrap_or_else(|| self.default_venue.clone()));
+        }
+        self.find(&order.exchange).map(|(v, _)| v.clone()).ok_or_else(|| anyhow!("No adapter for venue: {}", order.exchange))
+    }
+
+    fn find(&self, venue: &str) -> Option<&(String, Arc<dyn Adapter>)> {
+        self.venues.iter().find(|(v, _)| v.eq_ignore_ascii_case(venue))
+    }
+
+    fn default_adapter(&self) -> &Arc<dyn Adapter> {
+        &self.find(&self.default_venue).expect("default venue is registered").1
+    }
+
+    fn adapter_for_order(&self, order_id: &str) -> Result<Arc<dyn Adapter>> {
+        let venue = self.order_venues.lock().unwrap().get(order_id).map(|r| r.venue.clone());
+        match venue {
+            Some(v) => self.adapter(&v).ok_or_else(|| anyhow!("Unknown venue: {}", v)),
+            None => Err(anyhow!("Order {} is not working through this router", order_id)),
+        }
+    }
+
+    /// Orders the router still tracks a venue for.
+    pub fn routed_count(&self) -> usize {
+        self.order_venues.lock().unwrap().len()
+    }
+
+    // Drop orders that can no longer be cancelled or modified
+    fn track(order_venues: &Mutex<HashMap<String, RoutedOrder>>, msg: &IncomingMessage) {
+        match msg {
+            IncomingMessage::OrderStatus { order_id, state, .. } if state.is_terminal() => {
+                order_venues.lock().unwrap().remove(order_id);
+            },
+            IncomingMessage::Execution { order_id, fill_qty, .. } => {
+                let mut order_venues = order_venues.lock().unwrap();
+                if let Some(r) = order_venues.get_mut(order_id) {
+                    r.open_qty -= fill_qty;
+                    if r.open_qty <= 0 {
+                        order_venues.remove(order_id);
+                    }
+                }
+            },
+            _ => {},
+        }
+    }
+
+    // Venue messages pass through, except books, which become merged deltas
+    fn forward(
+        venue: String,
+        rx: mpsc::Receiver<IncomingMessage>,
+        tx: Sender<IncomingMessage>,
+        books: Arc<ConsolidatedStore>,
+        order_venues: Arc<Mutex<HashMap<String, RoutedOrder>>>,
+    ) {
+        for msg in rx {
+            Self::track(&order_venues, &msg);
+            let out = match msg {
+                IncomingMessage::OrderBookSnapshot(s) => {
+                    let delta = books.entry(&s.symbol).lock().unwrap().apply_snapshot(&venue, &s);
+                    if delta.bids.is_empty() && delta.asks.is_empty() {
+                        continue;
+                    }
+                    IncomingMessage::OrderBookUpdate { symbol: s.symbol, delta }
+                },
+                IncomingMessage::OrderBookUpdate { symbol, delta } => {
+                    let merged = books.entry(&symbol).lock().unwrap().apply_delta(&venue, &delta);
+                    if merged.bids.is_empty() && merged.asks.is_empty() {
+                        continue;
+                    }
+                    IncomingMessage::OrderBookUpdate { symbol, delta: merged }
+                },
+                other => other,
+            };
+            if tx.send(out).is_err() {
+                break;
+            }
+        }
+    }
+}
+
+impl Adapter for VenueRouter {
+    fn connect(&self) -> Result<()> {
+        self.venues.iter().try_for_each(|(_, a)| a.connect())
+    }
+
+    fn disconnect(&self) -> Result<()> {
+        // Every venue is disconnected even if one fails
+        let mut first_err = None;
+        for (venue, a) in &self.venues {
+            if let Err(e) = a.disconnect() {
+                first_err.get_or_insert(anyhow!("{}: {}", venue, e));
+            }
+        }
+        first_err.map_or(Ok(()), Err)
+    }
+
+    fn place_order(&self, order: &Order) -> Result<bool> {
+        let venue = self.route(order)?;
+        let adapter = self.adapter(&venue).ok_or_else(|| anyhow!("Unknown venue: {}", venue))?;
+        // Tracked before the venue sees the order, so its first reports find it
+        if let Some(id) = &order.order_id {
+            let routed = RoutedOrder { venue: venue.clone(), open_qty: order.quantity - order.filled_quantity };
+            self.order_venues.lock().unwrap().insert(id.clone(), routed);
+        }
+        let placed = if order.exchange.eq_ignore_ascii_case(&venue) {
+            adapter.place_order(order)
+        } else {
+            // Smart-routed: tell the venue adapter where it is going
+            let mut routed = order.clone();
+            routed.exchange = venue;
+            adapter.place_order(&routed)
+        };
+        if !matches!(placed, Ok(true)) {
+            if let Some(id) = &order.order_id {
+                self.order_venues.lock().unwrap().remove(id);
+            }
+        }
+        placed
+    }
+
+    fn cancel_order(&self, order_id: &str) -> Result<bool> {
+        self.adapter_for_order(order_id)?.cancel_order(order_id)
+    }
+
+    fn modify_order(&self, order_id: &str, price: Option<Decimal>, qty: Option<i64>) -> Result<bool> {
+        let modified = self.adapter_for_order(order_id)?.modify_order(order_id, price, qty)?;
+        // `qty` is the new open quantity
+        if let (true, Some(qty)) = (modified, qty) {
+            if let Some(r) = self.order_venues.lock().unwrap().get_mut(order_id) {
+                r.open_qty = qty;
+            }
+        }
+        Ok(modified)
+    }
+
+    /// Snapshot from every venue, folded into the consolidated book, which is returned.
+    fn get_order_book_snapshot(&self, symbol: &str) -> Result<OrderBook> {
+        let handle = self.books.entry(symbol);
+        for (venue, a) in &self.venues {
+            let book = match a.get_order_book_snapshot(symbol) {
+                Ok(book) => book,
+                // A venue that does not list the symbol contributes nothing
+                Err(_) => continue,
+            };
+            let snapshot = crate::oms::order_book::OrderBookSnapshot {
+                symbol: symbol.to_string(),
+                bids: book.bids.into_iter().collect(),
+                asks: book.asks.into_iter().collect(),
+                update_id: book.last_update_id,
+                timestamp: book.timestamp,
+            };
+            handle.lock().unwrap().apply_snapshot(venue, &snapshot);
+        }
+        let merged = handle.lock().unwrap().merged().clone();
+        Ok(merged)
+    }
+
+    /// Account of the default venue (venues share the brokerage account).
+    fn get_account_snapshot(&self, account_id: &str) -> Result<AccountState> {
+        self.default_adapter().get_account_snapshot(account_id)
+    }
+
+    fn subscribe(&self, symbols: &[String]) -> Result<()> {
+        self.venues.iter().try_for_each(|(_, a)| a.subscribe(symbols))
+    }
+
+    fn unsubscribe(&self, symbols: &[String]) -> Result<()> {
+        self.venues.iter().try_for_each(|(_, a)| a.unsubscribe(symbols))
+    }
+
+    fn set_monitor(&self, sender: Sender<IncomingMessage>) {
+        for (venue, a) in &self.venues {
+            let (tx, rx) = mpsc::channel();
+            a.set_monitor(tx);
+            let (venue, sender, books, order_venues) = (venue.clone(), sender.clone(), self.books.clone(), self.order_venues.clone());
+            thread::spawn(move || Self::forward(venue, rx, sender, books, order_venues));
+        }
+    }
+}
@@ -0,0 +1,234 @@
+use crate::message::ConnectionStatus;
+use anyhow::{anyhow, Result};
+use log::{error, info, warn};
+use std::collections::BTreeSet;
+use std::io::ErrorKind;
+use std::net::TcpStream;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+use tungstenite::stream::MaybeTlsStream;
+use tungstenite::{connect, Message, WebSocket};
+use url::Url;
+
+// How long a read may block before pending subscription changes are sent
+const POLL_INTERVAL: Duration = Duration::from_millis(20);
+
+type Socket = WebSocket<MaybeTlsStream<TcpStream>>;
+
+/// Receives frames from a `WsSession` on the session thread.
+pub trait WsHandler: Send + 'static {
+    /// Every text frame except PINGPONG, which the session answers itself.
+    fn on_text(&mut self, text: &str);
+    /// Connecting -> Connected, then Reconnecting -> Connected after every drop,
+    /// and Disconnected once the session is stopped.
+    fn on_status(&mut self, _status: ConnectionStatus) {}
+}
+
+/// Delay between reconnect attempts: doubles from `initial` up to `max`,
+/// and resets once a connection is up.
+#[derive(Debug, Clone)]
+pub struct Backoff {
+    pub initial: Duration,
+    pub max: Duration,
+}
+
+impl Default for Backoff {
+    fn default() -> Self {
+        Backoff {
+            initial: Duration::from_millis(500),
+            max: Duration::from_secs(30),
+        }
+    }
+}
+
+#[derive(Default)]
+struct Shared {
+    // (tr_id, tr_key) the caller wants subscribed
+    desired: Mutex<BTreeSet<(String, String)>>,
+    dirty: AtomicBool,
+    running: AtomicBool,
+}
+
+/// One KIS WebSocket connection carrying every subscription.
+///
+/// `subscribe` / `unsubscribe` only update the desired set; the session thread
+/// diffs it against what was sent on the socket and sends the missing
+/// `tr_type` 1 / 2 frames, so adding a symbol never opens a new connection and
+/// a subscription is never sent twice.
+///
+/// A dropped connection is retried with `Backoff`; on reconnect the whole
+/// desired set is subscribed again.
+pub struct WsSession {
+    shared: Arc<Shared>,
+    thread: Mutex<Option<thread::JoinHandle<()>>>,
+}
+
+impl WsSession {
+    pub fn start<H: WsHandler>(url: Url, approval_key: String, handler: H) -> Result<Self> {
+        Self::start_with_backoff(url, approval_key, handler, Backoff::default())
+    }
+
+    pub fn start_with_backoff<H: WsHandler>(url: Url, approval_key: String, handler: H, backoff: Backoff) -> Result<Self> {
+        let shared = Arc::new(Shared::default());
+        shared.running.store(true, Ordering::SeqCst);
+
+        let thread_shared = shared.clone();
+        let handle = thread::Builder::new()
+            .name("kis-ws".to_string())
+            .spawn(move || run(url, approval_key, handler, backoff, thread_shared))
+            .map_err(|e| anyhow!("Failed to spawn WS thread: {}", e))?;
+
+        Ok(WsSession {
+            shared,
+            thread: Mutex::new(Some(handle)),
+        })
+    }
+
+    /// Returns false if already subscribed.
+    pub fn subscribe(&self, tr_id: &str, tr_key: &str) -> bool {
+        let added = self.shared.desired.lock().unwrap().insert((tr_id.to_string(), tr_key.to_string()));
+        if added {
+            self.shared.dirty.store(true, Ordering::Release);
+        }
+        added
+    }
+
+    /// Returns false if not subscribed.
+    pub fn unsubscribe(&self, tr_id: &str, tr_key: &str) -> bool {
+        let removed = self.shared.desired.lock().unwrap().remove(&(tr_id.to_string(), tr_key.to_string()));
+        if removed {
+            self.shared.dirty.store(true, Ordering::Release);
+        }
+        removed
+    }
+
+    pub fn subscriptions(&self) -> Vec<(String, String)> {
+        self.shared.desired.lock().unwrap().iter().cloned().collect()
+    }
+
+    pub fn is_running(&self) -> bool {
+        self.shared.running.load(Ordering::SeqCst)
+    }
+
+    /// Close the socket and wait for the session thread.
+    pub fn stop(&self) {
+        self.shared.running.store(false, Ordering::SeqCst);
+        if let Some(handle) = self.thread.lock().unwrap().take() {
+            let _ = handle.join();
+        }
+    }
+}
+
+impl Drop for WsSession {
+    fn drop(&mut self) {
+        self.stop();
+    }
+}
+
+pub fn subscribe_frame(approval_key: &str, tr_id: &str, tr_key: &str, subscribe: bool) -> String {
+    serde_json::json!({
+        "header": {"approval_key": approval_key, "custtype": "P", "tr_type": if subscribe { "1" } else { "2" }, "content-type": "utf-8"},
+        "body": {"input": {"tr_id": tr_id, "tr_key": tr_key}}
+    }).to_string()
+}
+
+fn set_read_timeout(socket: &mut Socket, timeout: Duration) {
+    let _ = match socket.get_mut() {
+        MaybeTlsStream::Plain(s) => s.set_read_timeout(Some(timeout)),
+        MaybeTlsStream::Rustls(s) => s.sock.set_read_timeout(Some(timeout)),
+        _ => Ok(()),
+    };
+}
+
+// Send subscribe/unsubscribe frames for the difference between desired and active
+fn sync_subscriptions(socket: &mut Socket, approval_key: &str, shared: &Shared, active: &mut BTreeSet<(String, String)>) -> Result<()> {
+    let desired = shared.desired.lock().unwrap().clone();
+    for (tr_id, tr_key) in active.difference(&desired) {
+        socket.send(Message::Text(subscribe_frame(approval_key, tr_id, tr_key, false)))?;
+        info!("WS unsubscribed {} {}", tr_id, tr_key);
+    }
+    for (tr_id, tr_key) in desired.difference(active) {
+        socket.send(Message::Text(subscribe_frame(approval_key, tr_id, tr_key, true)))?;
+        info!("WS subscribed {} {}", tr_id, tr_key);
+    }
+    *active = desired;
+    Ok(())
+}
+
+// Sleep for `d`, waking early if the session is stopped
+fn sleep_while_running(shared: &Shared, d: Duration) {
+    let deadline = Instant::now() + d;
+    while shared.running.load(Ordering::SeqCst) {
+        let now = Instant::now();
+        if now >= deadline {
+            break;
+        }
+        thread::sleep((deadline - now).min(POLL_INTERVAL));
+    }
+}
+
+fn run<H: WsHandler>(url: Url, approval_key: String, mut handler: H, backoff: Backoff, shared: Arc<Shared>) {
+    let mut delay = backoff.initial;
+    handler.on_status(ConnectionStatus::Connecting);
+
+    while shared.running.load(Ordering::SeqCst) {
+        info!("Connecting to WebSocket: {}", url);
+        let mut socket = match connect(url.clone()) {
+            Ok((socket, _)) => socket,
+            Err(e) => {
+                warn!("WS connection failed: {}, retrying in {:?}", e, delay);
+                sleep_while_running(&shared, delay);
+                delay = (delay * 2).min(backoff.max);
+                continue;
+            }
+        };
+        set_read_timeout(&mut socket, POLL_INTERVAL);
+        info!("WebSocket Connected.");
+        delay = backoff.initial;
+        handler.on_status(ConnectionStatus::Connected);
+
+        // Fresh connection: everything desired gets subscribed again
+        let mut active = BTreeSet::new();
+        shared.dirty.store(true, Ordering::Release);
+
+        while shared.running.load(Ordering::SeqCst) {
+            if shared.dirty.swap(false, Ordering::AcqRel) {
+                if let Err(e) = sync_subscriptions(&mut socket, &approval_key, &shared, &mut active) {
+                    error!("WS subscribe failed: {}", e);
+                    break;
+                }
+            }
+
+            match socket.read() {
+                Ok(Message::Text(text)) => {
+                    if text.starts_with('{') && text.contains("PINGPONG") {
+                        let _ = socket.send(Message::Text(text));
+                        continue;
+                    }
+                    handler.on_text(&text);
+                },
+                Ok(Message::Close(_)) => {
+                    warn!("WS closed by server");
+                    break;
+                },
+                Ok(_) => {},
+                Err(tungstenite::Error::Io(e)) if matches!(e.kind(), ErrorKind::WouldBlock | ErrorKind::TimedOut) => {},
+                Err(e) => {
+                    error!("WS Error: {}", e);
+                    break;
+                }
+            }
+        }
+
+        let _ = socket.close(None);
+        if shared.running.load(Ordering::SeqCst) {
+            handler.on_status(ConnectionStatus::Reconnecting);
+            sleep_while_running(&shared, delay);
+            delay = (delay * 2).min(backoff.max);
+        }
+    }
+
+    handler.on_status(ConnectionStatus::Disconnected);
+}
@@ -1,27 +1,328 @@
 use pyo3::prelude::*;
-use crate::state::State;
+use pyo3::types::{PyBool, PyBytes, PyDict};
+use crate::state::StateStore;
+use crate::oms::engine::OMSEngine;
+use crate::metrics;
+use crate::oms::columnar::{self, BookArrays, TickStore};
+use crate::adapter::replay::message_symbol;
 use crate::adapter::{Adapter, IncomingMessage};
 use crate::message::Message;
 use crate::logger::Logger;
+use crate::logger::queue::{OverflowPolicy, QueueConfig};
 use crate::logger::config::{LoggerConfig, LogDestinationInfo};
-use std::sync::{Arc, Mutex};
+use std::sync::{Arc, Mutex, Condvar};
 use std::sync::mpsc;
-use std::time::Duration;
-use crate::oms::order::Order;
+use std::sync::atomic::{AtomicBool, Ordering};
+use std::collections::{HashMap, VecDeque};
+use std::io::{Read, Write};
+use std::os::unix::io::AsRawFd;
+use std::os::unix::net::UnixStream;
+use std::thread;
+use std::time::{Duration, Instant};
+use crate::oms::order::{Order, OrderState};
+use uuid::Uuid;
+use crate::utils::{batch_to_py, concurrent_map};
+
+/// Hand-off queue between the adapter monitor channel and Python.
+///
+/// A pump thread moves messages off the mpsc receiver into `queue`. The first push
+/// into an empty (not yet drained) queue writes one byte to a socketpair, so an asyncio
+/// loop watching `wakeup_fd` wakes once and drains every queued message in one call.
+/// Arming (push) and re-arming (drain) both happen under the queue lock, so the fd
+/// is readable whenever messages are waiting.
+pub struct MessageQueue {
+    queue: Mutex<VecDeque<IncomingMessage>>,
+    ready: Condvar,
+    closed: AtomicBool,
+    wake_pending: AtomicBool,
+    wake_tx: UnixStream,
+    wake_rx: UnixStream,
+}
+
+impl MessageQueue {
+    pub fn new() -> std::io::Result<Self> {
+        let (wake_tx, wake_rx) = UnixStream::pair()?;
+        wake_tx.set_nonblocking(true)?;
+        wake_rx.set_nonblocking(true)?;
+        Ok(MessageQueue {
+            queue: Mutex::new(VecDeque::new()),
+            ready: Condvar::new(),
+            closed: AtomicBool::new(false),
+            wake_pending: AtomicBool::new(false),
+            wake_tx,
+            wake_rx,
+        })
+    }
+
+    pub fn push(&self, msg: IncomingMessage) {
+        let mut q = self.queue.lock().unwrap();
+        q.push_back(msg);
+        self.wake();
+        drop(q);
+        self.ready.notify_one();
+    }
+
+    pub fn close(&self) {
+        let q = self.queue.lock().unwrap();
+        self.closed.store(true, Ordering::Release);
+        self.wake();
+        drop(q);
+        self.ready.notify_all();
+    }
+
+    /// Readable while messages are waiting; `drain` re-arms it.
+    pub fn wakeup_fd(&self) -> i32 {
+        self.wake_rx.as_raw_fd()
+    }
+
+    // Caller holds the queue lock
+    fn wake(&self) {
+        // Only one byte per drain cycle. If the socket buffer is full the reader is
+        // already readable, so WouldBlock can be ignored.
+        if !self.wake_pending.swap(true, Ordering::AcqRel) {
+            let _ = (&self.wake_tx).write(&[1u8]);
+        }
+    }
+
+    // Caller holds the queue lock. The socket is emptied before the flag is
+    // cleared, so the byte for the next push is never read here.
+    fn clear_wakeup(&self) {
+        let mut buf = [0u8; 64];
+        while let Ok(n) = (&self.wake_rx).read(&mut buf) {
+            if n == 0 { break; }
+        }
+        self.wake_pending.store(false, Ordering::Release);
+    }
+
+    /// Pop up to `max_n` messages, waiting at most `timeout` for the first one.
+    /// Returns `None` once the channel is disconnected and the queue is empty.
+    pub fn pop_batch(&self, max_n: usize, timeout: Duration) -> Option<Vec<IncomingMessage>> {
+        let deadline = Instant::now() + timeout;
+        let mut q = self.queue.lock().unwrap();
+        while q.is_empty() {
+            if self.closed.load(Ordering::Acquire) {
+                return None;
+            }
+            let now = Instant::now();
+            if now >= deadline {
+                return Some(Vec::new());
+            }
+            q = self.ready.wait_timeout(q, deadline - now).unwrap().0;
+        }
+        let n = max_n.min(q.len());
+        if n == q.len() {
+            // Re-arm under the lock so a concurrent push always writes a fresh byte
+            self.clear_wakeup();
+        }
+        Some(q.drain(..n).collect())
+    }
+
+    /// Take everything queued right now without waiting.
+    pub fn drain(&self) -> Vec<IncomingMessage> {
+        let mut q = self.queue.lock().unwrap();
+        self.clear_wakeup();
+        q.drain(..).collect()
+    }
+}
 
 #[pyclass]
 pub struct Client {
     adapter: Arc<dyn Adapter>,
-    state: Arc<Mutex<State>>,
-    receiver: Arc<Mutex<mpsc::Receiver<IncomingMessage>>>, 
+    state: Arc<StateStore>,
+    ticks: Arc<Mutex<TickStore>>,
+    queue: Arc<MessageQueue>,
     logger: Arc<Mutex<Logger>>,
+    // Set by `with_engine`: orders go through it, and it owns `state`
+    engine: Option<OMSEngine>,
+}
+
+impl Client {
+    /// A client on an already built adapter, with the pump thread started.
+    pub fn with_adapter(adapter: Arc<dyn Adapter>, logger: Arc<Mutex<Logger>>, tick_history_size: usize) -> std::io::Result<Self> {
+        let (sender, receiver) = mpsc::channel();
+        adapter.set_monitor(sender);
+
+        let state = Arc::new(StateStore::new());
+        let ticks = Arc::new(Mutex::new(TickStore::new(tick_history_size)));
+        let queue = Arc::new(MessageQueue::new()?);
+
+        // Pump Thread: apply to State and hand off to Python
+        {
+            let state = state.clone();
+            let ticks = ticks.clone();
+            let queue = queue.clone();
+            thread::spawn(move || {
+                // Whatever is already waiting is published as one state version
+                let metrics = metrics::global();
+                while let Ok(first) = receiver.recv() {
+                    let mut batch = vec![first];
+                    batch.extend(receiver.try_iter().take(255));
+                    // queue_depth belongs to the engine's gateway listener; only ages here
+                    batch.iter().for_each(|msg| metrics.record_message_age(msg));
+                    let mut ticks = ticks.lock().unwrap();
+                    state.update(|txn| {
+                        for msg in &batch {
+                            txn.apply(msg);
+                            // Ticks see the book after each message, not just after the batch
+                            let book = message_symbol(msg).and_then(|s| txn.order_book(s));
+                            ticks.record(msg, book);
+                        }
+                    });
+                    drop(ticks);
+                    for msg in batch {
+                        queue.push(msg);
+                    }
+                }
+                queue.close();
+            });
+        }
+
+        Ok(Client {
+            adapter,
+            state,
+            ticks,
+            queue,
+            logger,
+            engine: None,
+        })
+    }
+
+    /// A client over `engine`, sharing its state store: books, orders and the
+    /// account are the engine's, orders go through its risk checks, and
+    /// messages arrive once its gateway listener has applied them.
+    pub fn with_engine(engine: OMSEngine, tick_history_size: usize) -> std::io::Result<Self> {
+        let receiver = engine.subscribe_messages();
+        let state = engine.state_store();
+        let ticks = Arc::new(Mutex::new(TickStore::new(tick_history_size)));
+        let queue = Arc::new(MessageQueue::new()?);
+
+        // Pump Thread: the engine has applied and timed the messages; only hand off to Python
+        {
+            let state = state.clone();
+            let ticks = ticks.clone();
+            let queue = queue.clone();
+            thread::spawn(move || {
+                while let Ok(first) = receiver.recv() {
+                    let mut batch = vec![first];
+                    batch.extend(receiver.try_iter().take(255));
+                    // Ticks see the book as it is now, which may include later messages
+                    let snapshot = state.snapshot();
+                    let mut ticks = ticks.lock().unwrap();
+                    for msg in &batch {
+                        let book = message_symbol(msg).and_then(|s| snapshot.order_books.get(s)).map(|b| b.as_ref());
+                        ticks.record(msg, book);
+                    }
+                    drop(ticks);
+                    drop(snapshot);
+                    for msg in batch {
+                        queue.push(msg);
+                    }
+                }
+                queue.close();
+            });
+        }
+
+        Ok(Client {
+            adapter: engine.adapter(),
+            state,
+            ticks,
+            queue,
+            logger: engine.logger(),
+            engine: Some(engine),
+        })
+    }
+
+    /// Record `order` in the state store as PENDING_NEW (assigning an id if it has
+    /// none) and send it. The venue's status messages then update the recorded
+    /// order, so `cancel_all` knows what is working. A rejected send is recorded
+    /// as REJECTED. On an engine client the engine records and sends it.
+    pub fn place_order_internal(&self, mut order: Order) -> anyhow::Result<bool> {
+        if let Some(engine) = &self.engine {
+            let order_id = engine.send_order_internal(order)?;
+            return Ok(engine.get_order(&order_id).map_or(false, |o| o.state != OrderState::REJECTED));
+        }
+        let order_id = order.order_id.get_or_insert_with(|| Uuid::new_v4().to_string()).clone();
+        order.update_state(OrderState::PENDING_NEW, None);
+        self.state.update(|txn| txn.put_order(order.clone()));
+        let result = self.adapter.place_order(&order);
+        match &result {
+            Ok(true) => {}
+            Ok(false) => self.set_order_state(&order_id, OrderState::REJECTED, Some("Rejected by adapter".to_string())),
+            Err(e) => self.set_order_state(&order_id, OrderState::REJECTED, Some(e.to_string())),
+        }
+        result
+    }
+
+    /// Send a cancel and mark the order PENDING_CANCEL once the adapter accepts it.
+    pub fn cancel_order_internal(&self, order_id: &str) -> anyhow::Result<bool> {
+        if let Some(engine) = &self.engine {
+            return engine.cancel_order_internal(order_id.to_string()).map(|()| true);
+        }
+        let ok = self.adapter.cancel_order(order_id)?;
+        if ok {
+            self.set_order_state(order_id, OrderState::PENDING_CANCEL, None);
+        }
+        Ok(ok)
+    }
+
+    /// Cancel every open order placed through this client, or only those in
+    /// `symbol`. Orders with a cancel already in flight are skipped.
+    pub fn cancel_all_internal(&self, symbol: Option<&str>) -> Vec<(String, anyhow::Result<bool>)> {
+        if let Some(engine) = &self.engine {
+            return engine.cancel_all_internal(symbol).into_iter().map(|(id, r)| (id, r.map(|()| true))).collect();
+        }
+        let ids: Vec<String> = self.state.snapshot().orders
+            .iter()
+            .filter(|(_, o)| o.state.is_open() && symbol.map_or(true, |s| o.symbol == s))
+            .map(|(id, _)| id.clone())
+            .collect();
+        let results = concurrent_map(ids.clone(), |id| self.cancel_order_internal(&id));
+        ids.into_iter().zip(results).collect()
+    }
+
+    /// The store this client reads; the engine's for a client built `with_engine`.
+    pub fn state_store(&self) -> Arc<StateStore> {
+        self.state.clone()
+    }
+
+    /// Working orders placed through this client, as last reported by the venue.
+    /// Orders leave once filled, canceled or rejected.
+    pub fn orders(&self) -> HashMap<String, Order> {
+        self.state.snapshot().orders.iter().map(|(id, o)| (id.clone(), o.as_ref().clone())).collect()
+    }
+
+    // In one update, so a status the pump applies concurrently is not lost.
+    // Terminal states reported by the venue are kept.
+    fn set_order_state(&self, order_id: &str, state: OrderState, msg: Option<String>) {
+        self.state.update(|txn| {
+            if let Some(order) = txn.order_mut(order_id).filter(|o| !o.state.is_terminal()) {
+                order.update_state(state, msg);
+            }
+            txn.close_if_terminal(order_id);
+        });
+    }
 }
 
 #[pymethods]
 impl Client {
     #[new]
-    #[pyo3(signature = (venue, config_path=None, s3_bucket=None, s3_region=None, s3_prefix=None))]
-    fn new(venue: String, config_path: Option<String>, s3_bucket: Option<String>, s3_region: Option<String>, s3_prefix: Option<String>) -> PyResult<Self> {
+    #[pyo3(signature = (venue, config_path=None, s3_bucket=None, s3_region=None, s3_prefix=None, log_path=None, log_format=None, log_compress=false, log_rotate_mb=None, log_rotate_seconds=None, log_queue_size=65536, log_overflow=None, tick_history_size=4096))]
+    #[allow(clippy::too_many_arguments)]
+    fn new(
+        venue: String,
+        config_path: Option<String>,
+        s3_bucket: Option<String>,
+        s3_region: Option<String>,
+        s3_prefix: Option<String>,
+        log_path: Option<String>,
+        log_format: Option<String>,
+        log_compress: bool,
+        log_rotate_mb: Option<u64>,
+        log_rotate_seconds: Option<u64>,
+        log_queue_size: usize,
+        log_overflow: Option<String>,
+        tick_history_size: usize,
+    ) -> PyResult<Self> {
         let adapter: Arc<dyn Adapter> = match venue.as_str() {
             "hantoo" => {
                 let config = config_path.ok_or_else(|| pyo3::exceptions::PyValueError::new_err("Config path required for Hantoo"))?;
@@ -41,11 +342,6 @@ impl Client {
             _ => return Err(pyo3::exceptions::PyValueError::new_err(format!("Unknown venue: {}", venue))),
         };
         
-        let (sender, receiver) = mpsc::channel();
-        
-        // Initialize monitor on adapter
-        adapter.set_monitor(sender.clone());
-
         // Initialize Logger
         let destination = if let (Some(_bucket), Some(_region)) = (s3_bucket, s3_region) {
             // LogDestinationInfo::AmazonS3 { 
@@ -56,7 +352,8 @@ impl Client {
             eprintln!("S3 logging disabled");
             LogDestinationInfo::Console
         } else {
-             LogDestinationInfo::Console 
+            LogDestinationInfo::from_options(log_path, log_format.as_deref(), log_compress, log_rotate_mb, log_rotate_seconds)
+                .map_err(pyo3::exceptions::PyValueError::new_err)?
         };
 
         let config = LoggerConfig {
@@ -64,85 +361,226 @@ impl Client {
             flush_interval_seconds: 60,
             batch_size: 8192,
         };
-        let logger = Arc::new(Mutex::new(Logger::new(config)));
+        let overflow = match log_overflow.as_deref() {
+            Some(p) => OverflowPolicy::parse(p).map_err(pyo3::exceptions::PyValueError::new_err)?,
+            None => OverflowPolicy::Block,
+        };
+        let queue_config = QueueConfig { capacity: log_queue_size, overflow };
+        let logger = Arc::new(Mutex::new(Logger::with_queue(config, queue_config)));
         logger.lock().unwrap().start();
 
-        Ok(Client {
-            adapter,
-            state: Arc::new(Mutex::new(State::new())),
-            receiver: Arc::new(Mutex::new(receiver)),
-            logger,
-        })
+        Client::with_adapter(adapter, logger, tick_history_size)
+            .map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
-    fn connect(&self) -> PyResult<()> {
-        self.adapter.connect().map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    // Adapter calls below block on the network, so they run with the GIL released
+    fn connect(&self, py: Python) -> PyResult<()> {
+        py.allow_threads(|| self.adapter.connect()).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
     
-    fn disconnect(&self) -> PyResult<()> {
-        self.adapter.disconnect().map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    fn disconnect(&self, py: Python) -> PyResult<()> {
+        py.allow_threads(|| self.adapter.disconnect()).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
-    fn place_order(&self, order: &Order) -> PyResult<bool> {
-        self.adapter.place_order(order).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    fn place_order(&self, py: Python, order: Order) -> PyResult<bool> {
+        py.allow_threads(|| self.place_order_internal(order)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
     
-    fn cancel_order(&self, order_id: &str) -> PyResult<bool> {
-        self.adapter.cancel_order(order_id).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    fn cancel_order(&self, py: Python, order_id: &str) -> PyResult<bool> {
+        py.allow_threads(|| self.cancel_order_internal(order_id)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    }
+
+    /// Place several orders concurrently. Returns one entry per order, in order:
+    /// the adapter's bool, or the exception raised for that order.
+    fn place_orders(&self, py: Python, orders: Vec<Order>) -> Vec<PyObject> {
+        let results = py.allow_threads(|| concurrent_map(orders, |order| self.place_order_internal(order)));
+        batch_to_py(py, results, |py, ok| PyBool::new(py, ok).to_owned().into_any().unbind())
     }
 
-    fn update_order(&self, order_id: &str, price: Option<String>, qty: Option<i64>) -> PyResult<bool> {
+    /// Cancel several orders concurrently; results as in `place_orders`.
+    fn cancel_orders(&self, py: Python, order_ids: Vec<String>) -> Vec<PyObject> {
+        let results = py.allow_threads(|| concurrent_map(order_ids, |id| self.cancel_order_internal(&id)));
+        batch_to_py(py, results, |py, ok| PyBool::new(py, ok).to_owned().into_any().unbind())
+    }
+
+    /// Cancel every open order placed through this client (optionally only in
+    /// `symbol`). Returns `{order_id: bool | exception}`.
+    #[pyo3(signature = (symbol=None))]
+    fn cancel_all(&self, py: Python, symbol: Option<String>) -> PyResult<PyObject> {
+        let results = py.allow_threads(|| self.cancel_all_internal(symbol.as_deref()));
+        let (ids, results): (Vec<_>, Vec<_>) = results.into_iter().unzip();
+        let dict = PyDict::new(py);
+        for (id, r) in ids.into_iter().zip(batch_to_py(py, results, |py, ok| PyBool::new(py, ok).to_owned().into_any().unbind())) {
+            dict.set_item(id, r)?;
+        }
+        Ok(dict.into_any().unbind())
+    }
+
+    fn update_order(&self, py: Python, order_id: &str, price: Option<String>, qty: Option<i64>) -> PyResult<bool> {
         let price_dec = if let Some(p) = price {
             Some(crate::utils::parse_decimal(&p).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?)
         } else {
             None
         };
         
-        self.adapter.modify_order(order_id, price_dec, qty).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+        if let Some(engine) = &self.engine {
+            // The engine re-sends the remaining quantity itself
+            if qty.is_some() {
+                return Err(pyo3::exceptions::PyValueError::new_err("qty cannot be changed on an engine client"));
+            }
+            return py.allow_threads(|| engine.modify_order_internal(order_id.to_string(), price_dec))
+                .map(|()| true)
+                .map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()));
+        }
+        py.allow_threads(|| self.adapter.modify_order(order_id, price_dec, qty)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
     
-    fn subscribe(&self, symbols: Vec<String>) -> PyResult<()> {
-        self.adapter.subscribe(&symbols).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    fn subscribe(&self, py: Python, symbols: Vec<String>) -> PyResult<()> {
+        py.allow_threads(|| self.adapter.subscribe(&symbols)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
-    fn fetch_message(&self, timeout_sec: f64) -> PyResult<Option<String>> {
-        let rx = self.receiver.lock().unwrap();
+    fn unsubscribe(&self, py: Python, symbols: Vec<String>) -> PyResult<()> {
+        py.allow_threads(|| self.adapter.unsubscribe(&symbols)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    }
+
+    fn fetch_message(&self, py: Python, timeout_sec: f64) -> PyResult<Option<String>> {
+        let queue = self.queue.clone();
         let timeout = Duration::from_secs_f64(timeout_sec);
         
-        match rx.recv_timeout(timeout) {
-            Ok(msg) => {
-                // Apply to State
-                {
-                    let mut state = self.state.lock().unwrap();
-                    state.apply(&msg);
-                }
-                
-                // Return as JSON
+        // State is already applied by the pump thread
+        match py.allow_threads(move || queue.pop_batch(1, timeout)) {
+            Some(batch) => match batch.into_iter().next() {
                 // IncomingMessage is alias to Message, so it implements Serialize
-                let json = serde_json::to_string(&msg).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
-                Ok(Some(json))
+                Some(msg) => {
+                    let json = serde_json::to_string(&msg).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+                    Ok(Some(json))
+                },
+                None => Ok(None),
             },
-            Err(mpsc::RecvTimeoutError::Timeout) => Ok(None),
-            Err(mpsc::RecvTimeoutError::Disconnected) => Err(pyo3::exceptions::PyRuntimeError::new_err("Channel disconnected")),
+            None => Err(pyo3::exceptions::PyRuntimeError::new_err("Channel disconnected")),
         }
     }
+
+    /// File descriptor that becomes readable when messages are queued.
+    /// Register it with `loop.add_reader` and call `drain_messages` from the callback.
+    fn wakeup_fd(&self) -> i32 {
+        self.queue.wakeup_fd()
+    }
+
+    /// Return every queued message as typed objects without blocking, and re-arm the wakeup fd.
+    fn drain_messages(&self, py: Python) -> PyResult<Vec<PyObject>> {
+        self.queue.drain()
+            .into_iter()
+            .map(|msg| msg.into_py_object(py))
+            .collect()
+    }
+
+    /// Drain up to `max_n` messages as typed objects (OrderBookEvent, MarketTrade,
+    /// OrderStatusEvent, ExecutionEvent, SystemEvent).
+    /// Waits at most `timeout_sec` for the first message, with the GIL released.
+    #[pyo3(signature = (max_n=1024, timeout_sec=0.1))]
+    fn fetch_messages(&self, py: Python, max_n: usize, timeout_sec: f64) -> PyResult<Vec<PyObject>> {
+        let queue = self.queue.clone();
+        let timeout = Duration::from_secs_f64(timeout_sec);
+
+        let batch = py.allow_threads(move || queue.pop_batch(max_n, timeout))
+            .ok_or_else(|| pyo3::exceptions::PyRuntimeError::new_err("Channel disconnected"))?;
+        batch.into_iter().map(|msg| msg.into_py_object(py)).collect()
+    }
     
     /// Get a JSON snapshot of the account
     fn get_account_state(&self, account_id: &str) -> PyResult<Option<String>> {
-        let state = self.state.lock().unwrap();
-        if let Some(acct) = state.accounts.get(account_id) {
-            let json = serde_json::to_string(acct).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+        let state = self.state.snapshot();
+        if let Some(acct) = state.account(account_id) {
+            let json = serde_json::to_string(&*acct).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
             Ok(Some(json))
         } else {
             Ok(None)
         }
     }
     
+    /// Logging queue counters as JSON: enqueued, dropped, flushed, high_water, len, capacity.
+    fn log_stats(&self) -> PyResult<String> {
+        let stats = self.logger.lock().unwrap().stats();
+        serde_json::to_string(&stats).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))
+    }
+
+    /// Stage latencies (parse, channel, ...) and the engine channel's depth, process-wide.
+    /// `{"stages": {name: {count, mean_us, p50_us, p90_us, p99_us, p999_us, max_us}}, "queue_depth": n, "queue_depth_max": n}`
+    fn get_metrics(&self, py: Python) -> PyResult<PyObject> {
+        Ok(metrics::global().snapshot().to_py_dict(py)?.into_any().unbind())
+    }
+
+    /// Write the metrics to `path` in Prometheus text format.
+    fn dump_metrics(&self, path: &str) -> PyResult<()> {
+        metrics::global().write_prometheus(std::path::Path::new(path)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    }
+
+    /// Version of the shared state store; bumps once per applied batch.
+    fn state_version(&self) -> u64 {
+        self.state.version()
+    }
+
+    /// JSON of what changed after `version`: version, resync, connection_status,
+    /// order_books, orders, accounts. On `resync`, re-read everything.
+    fn changes_since(&self, version: u64) -> PyResult<String> {
+        let changes = self.state.changes_since(version);
+        serde_json::to_string(&changes).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))
+    }
+
+    /// Top `depth` levels of `symbols` from one state snapshot, as a dict of
+    /// little-endian buffers: bid_px/ask_px (f8) and bid_qty/ask_qty (i8) shaped
+    /// (len(symbols), depth), update_id (i8) and timestamp (f8) per symbol.
+    /// Missing levels are NaN / 0.
+    #[pyo3(signature = (symbols, depth=10))]
+    fn book_arrays(&self, py: Python, symbols: Vec<String>, depth: usize) -> PyResult<PyObject> {
+        let snapshot = self.state.snapshot();
+        let arrays = py.allow_threads(|| {
+            let mut arrays = BookArrays::new(depth);
+            for symbol in &symbols {
+                arrays.push(symbol, snapshot.order_books.get(symbol).map(|b| b.as_ref()));
+            }
+            arrays
+        });
+        let dict = PyDict::new(py);
+        dict.set_item("symbols", arrays.symbols.clone())?;
+        dict.set_item("depth", arrays.depth)?;
+        dict.set_item("version", snapshot.version)?;
+        dict.set_item("bid_px", PyBytes::new(py, &columnar::f64_bytes(&arrays.bid_px)))?;
+        dict.set_item("bid_qty", PyBytes::new(py, &columnar::i64_bytes(&arrays.bid_qty)))?;
+        dict.set_item("ask_px", PyBytes::new(py, &columnar::f64_bytes(&arrays.ask_px)))?;
+        dict.set_item("ask_qty", PyBytes::new(py, &columnar::i64_bytes(&arrays.ask_qty)))?;
+        dict.set_item("update_id", PyBytes::new(py, &columnar::i64_bytes(&arrays.update_id)))?;
+        dict.set_item("timestamp", PyBytes::new(py, &columnar::f64_bytes(&arrays.timestamp)))?;
+        Ok(dict.into())
+    }
+
+    /// Newest `last_n` ticks of `symbol` (all if None), oldest first, as a dict of
+    /// little-endian column buffers: timestamp, bid_px, ask_px, last_px (f8) and
+    /// bid_qty, ask_qty, last_qty, kind (i8; 0 = book, 1 = trade). None if never seen.
+    #[pyo3(signature = (symbol, last_n=None))]
+    fn tick_history(&self, py: Python, symbol: &str, last_n: Option<usize>) -> PyResult<PyObject> {
+        let cols = match self.ticks.lock().unwrap().get(symbol) {
+            Some(history) => history.columns(last_n),
+            None => return Ok(py.None()),
+        };
+        let dict = PyDict::new(py);
+        dict.set_item("timestamp", PyBytes::new(py, &columnar::f64_bytes(&cols.timestamp)))?;
+        dict.set_item("bid_px", PyBytes::new(py, &columnar::f64_bytes(&cols.bid_px)))?;
+        dict.set_item("bid_qty", PyBytes::new(py, &columnar::i64_bytes(&cols.bid_qty)))?;
+        dict.set_item("ask_px", PyBytes::new(py, &columnar::f64_bytes(&cols.ask_px)))?;
+        dict.set_item("ask_qty", PyBytes::new(py, &columnar::i64_bytes(&cols.ask_qty)))?;
+        dict.set_item("last_px", PyBytes::new(py, &columnar::f64_bytes(&cols.last_px)))?;
+        dict.set_item("last_qty", PyBytes::new(py, &columnar::i64_bytes(&cols.last_qty)))?;
+        dict.set_item("kind", PyBytes::new(py, &columnar::i64_bytes(&cols.kind)))?;
+        Ok(dict.into())
+    }
+
     /// Get a JSON snapshot of the order book
     fn get_order_book(&self, symbol: &str) -> PyResult<Option<String>> {
-        let state = self.state.lock().unwrap();
-        if let Some(ob) = state.order_books.get(symbol) {
-             let json = serde_json::to_string(ob).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+        let state = self.state.snapshot();
+        if let Some(ob) = state.order_book(symbol) {
+             let json = serde_json::to_string(&*ob).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
              Ok(Some(json))
         } else {
             Ok(None)
@@ -5,6 +5,7 @@ pub mod logger;
 pub mod utils;
 pub mod message;
 pub mod state;
+pub mod metrics;
 pub mod client;
 
 use pyo3::prelude::*;
@@ -15,6 +16,7 @@ use pyo3::types::PyModule;
 fn core(m: &Bound<'_, PyModule>) -> PyResult<()> {
     oms::register(m)?;
     utils::register(m)?;
+    message::register(m)?;
     m.add_class::<client::Client>()?;
     Ok(())
 }
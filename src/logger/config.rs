@@ -2,11 +2,47 @@ use serde::{Serialize, Deserialize};
 
 #[derive(Debug, Clone, Serialize, Deserialize, PartialEq, Eq)]
 pub enum LogDestinationInfo {
+    /// JSON lines.
     LocalFile { path: String },
+    /// Length-prefixed MessagePack records, optionally zstd-compressed, rotated by
+    /// uncompressed size and/or age. See `sink::BinarySink`.
+    BinaryFile {
+        path: String,
+        compress: bool,
+        max_bytes: Option<u64>,
+        max_age_seconds: Option<u64>,
+    },
     // AmazonS3 { bucket: String, key_prefix: String, region: String },
     Console,
 }
 
+impl LogDestinationInfo {
+    /// Destination from the Python constructor arguments.
+    /// `log_format` is "json" (default) or "binary"; without `log_path` logs go to the console.
+    pub fn from_options(
+        log_path: Option<String>,
+        log_format: Option<&str>,
+        compress: bool,
+        rotate_mb: Option<u64>,
+        rotate_seconds: Option<u64>,
+    ) -> Result<Self, String> {
+        let path = match log_path {
+            Some(p) => p,
+            None => return Ok(LogDestinationInfo::Console),
+        };
+        match log_format.unwrap_or("json") {
+            "json" => Ok(LogDestinationInfo::LocalFile { path }),
+            "binary" => Ok(LogDestinationInfo::BinaryFile {
+                path,
+                compress,
+                max_bytes: rotate_mb.map(|mb| mb * 1024 * 1024),
+                max_age_seconds: rotate_seconds,
+            }),
+            other => Err(format!("Unknown log_format: {} (expected \"json\" or \"binary\")", other)),
+        }
+    }
+}
+
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct LoggerConfig {
     pub destination: LogDestinationInfo,
@@ -19,6 +19,11 @@ impl Message {
 
 pub enum AsyncMessage {
     Computed(Message),
+    /// Venue message logged as MARKET_DATA; the JSON body is built on the logger thread.
+    Market {
+        timestamp: f64,
+        msg: crate::message::Message,
+    },
     Lazy {
         log_type: String,
         timestamp: f64,
@@ -35,9 +40,21 @@ impl AsyncMessage {
         }
     }
     
+    pub fn new_market(msg: crate::message::Message) -> Self {
+        AsyncMessage::Market {
+            timestamp: chrono::Local::now().timestamp_millis() as f64 / 1000.0,
+            msg,
+        }
+    }
+
     pub fn into_message(self) -> Message {
         match self {
             AsyncMessage::Computed(m) => m,
+            AsyncMessage::Market { timestamp, msg } => Message {
+                log_type: "MARKET_DATA".to_string(),
+                log_body: market_data_body(&msg),
+                timestamp,
+            },
             AsyncMessage::Lazy { log_type, timestamp, generator } => {
                 Message {
                     log_type,
@@ -54,3 +71,35 @@ impl From<Message> for AsyncMessage {
         AsyncMessage::Computed(m)
     }
 }
+
+fn market_data_body(msg: &crate::message::Message) -> serde_json::Value {
+    use crate::message::Message as IncomingMessage;
+    match msg {
+        IncomingMessage::OrderBookUpdate{symbol, delta} => {
+            let (bp, bv): (Vec<_>, Vec<_>) = delta.bids.iter().map(|(p, q)| (p.to_string(), *q)).unzip();
+            let (ap, av): (Vec<_>, Vec<_>) = delta.asks.iter().map(|(p, q)| (p.to_string(), *q)).unzip();
+            
+            serde_json::json!({
+                "type": "OrderBookDelta", 
+                "symbol": symbol, 
+                "update_id": delta.update_id,
+                "data": {
+                    "bp": bp,
+                    "bv": bv,
+                    "ap": ap,
+                    "av": av
+                }
+            })
+        },
+        IncomingMessage::MarketTrade{symbol, price, quantity, ..} => serde_json::json!({"type": "Trade", "symbol": symbol, "price": price.to_string(), "qty": quantity}),
+        IncomingMessage::Execution{order_id, fill_qty, ..} => serde_json::json!({"type": "Execution", "order_id": order_id, "qty": fill_qty}),
+        IncomingMessage::OrderBookSnapshot(s) => serde_json::json!({
+            "type": "OrderBookSnapshot", 
+            "symbol": s.symbol,
+            "bids": s.bids,
+            "asks": s.asks 
+        }),
+        IncomingMessage::OrderStatus{order_id, state, ..} => serde_json::json!({"type": "OrderUpdate", "order_id": order_id, "state": format!("{:?}", state)}),
+        _ => serde_json::json!({"type": "Unknown"}),
+    }
+}
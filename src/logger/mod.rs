@@ -1,36 +1,42 @@
 pub mod message;
 pub mod config;
 pub mod aws;
+pub mod sink;
+pub mod queue;
 
 use std::sync::{Arc, Mutex};
 use std::thread;
 use std::time::Duration;
 use crate::logger::message::Message;
-use crate::logger::config::{LoggerConfig, LogDestinationInfo};
-use anyhow::Result;
-use std::fs::OpenOptions;
-use std::io::Write;
+use crate::logger::config::LoggerConfig;
+use crate::logger::sink::{open_sink, ConsoleSink, LogSink};
 // use aws_sdk_s3::Client as S3Client;
 // use aws_sdk_s3::primitives::ByteStream;
-use tokio::runtime::Runtime;
 // use std::io::Cursor;
 // use zstd::stream::encode_all;
 
-use std::sync::mpsc;
 use crate::logger::message::AsyncMessage;
+use crate::logger::queue::{LogHandle, LogQueue, LogQueueStats, QueueConfig};
 
 pub struct Logger {
     config: LoggerConfig,
-    sender: Option<mpsc::Sender<AsyncMessage>>,
+    queue: Arc<LogQueue>,
     is_running: Arc<Mutex<bool>>,
     handle: Option<thread::JoinHandle<()>>,
 }
 
 impl Logger {
     pub fn new(config: LoggerConfig) -> Self {
+        Self::with_queue(config, QueueConfig::default())
+    }
+
+    pub fn with_queue(config: LoggerConfig, queue: QueueConfig) -> Self {
+        let queue = Arc::new(LogQueue::new(queue));
+        // Opened by `start`; as with the old channel, nothing is kept before that
+        queue.close();
         Logger {
             config,
-            sender: None,
+            queue,
             is_running: Arc::new(Mutex::new(false)),
             handle: None,
         }
@@ -44,68 +50,55 @@ impl Logger {
             *r = true;
         }
 
-        let (tx, rx) = mpsc::channel();
-        self.sender = Some(tx);
-        
         let destination = self.config.destination.clone();
-        let interval = self.config.flush_interval_seconds;
-        let batch_size = self.config.batch_size;
+        let interval = Duration::from_secs(self.config.flush_interval_seconds);
+        let batch_size = self.config.batch_size.max(1);
         let running_clone = self.is_running.clone();
+        let queue = self.queue.clone();
+        queue.reopen();
 
-        self.handle = Some(thread::spawn(move || {
-            // Create tokio runtime for this thread if needed for S3
-            let rt = Runtime::new().ok(); 
-            let mut buffer = Vec::new();
+        let handle = thread::spawn(move || {
+            // Opened once; file sinks keep their handle for the life of the thread
+            let mut sink: Box<dyn LogSink> = open_sink(&destination).unwrap_or_else(|e| {
+                eprintln!("Failed to open log destination {:?}: {}, using console", destination, e);
+                Box::new(ConsoleSink)
+            });
+            let mut buffer = Vec::with_capacity(batch_size);
             let mut last_flush = std::time::Instant::now();
 
             loop {
-                // Non-blocking try_recv loop with sleep? OR select?
-                // Or recv_timeout?
-                // Let's use recv_timeout matching flush interval approximately? 
-                // Or just loop processing messages and check time.
-                
-                // If we use simple recv, we might block and miss flush interval if no msgs come?
-                // Actually if no msgs come, we don't *need* to flush (buffer empty).
-                // So recv_timeout is efficient.
-                
-                match rx.recv_timeout(Duration::from_millis(100)) {
-                    Ok(async_msg) => {
-                         // Convert AsyncMessage -> Message (This executes the closure!)
-                         let msg = async_msg.into_message();
-                         buffer.push(msg);
-                         
-                         if buffer.len() >= batch_size {
-                             Self::flush_buffer(&mut buffer, &destination, rt.as_ref());
-                             last_flush = std::time::Instant::now();
-                         }
-                    },
-                    Err(mpsc::RecvTimeoutError::Timeout) => {
-                        // Check time
-                        if last_flush.elapsed() >= Duration::from_secs(interval) {
-                             if !buffer.is_empty() {
-                                 Self::flush_buffer(&mut buffer, &destination, rt.as_ref());
-                                 last_flush = std::time::Instant::now();
-                             }
-                        }
-                    },
-                    Err(mpsc::RecvTimeoutError::Disconnected) => break,
+                // Lazy bodies are computed here, off the producer threads
+                while buffer.len() < batch_size {
+                    match queue.pop() {
+                        Some(async_msg) => buffer.push(async_msg.into_message()),
+                        None => break,
+                    }
+                }
+
+                if buffer.len() >= batch_size || (!buffer.is_empty() && last_flush.elapsed() >= interval) {
+                    Self::flush_buffer(&mut buffer, sink.as_mut(), &queue);
+                    last_flush = std::time::Instant::now();
+                    continue;
                 }
-                
-                {
-                    let r = running_clone.lock().unwrap();
-                    if !*r {
-                        // Drain remaining
-                        while let Ok(amsg) = rx.try_recv() {
-                             buffer.push(amsg.into_message());
-                        }
-                        if !buffer.is_empty() {
-                             Self::flush_buffer(&mut buffer, &destination, rt.as_ref());
-                        }
-                        break;
+
+                if !*running_clone.lock().unwrap() {
+                    // Drain remaining
+                    while let Some(amsg) = queue.pop() {
+                        buffer.push(amsg.into_message());
+                    }
+                    Self::flush_buffer(&mut buffer, sink.as_mut(), &queue);
+                    if let Err(e) = sink.close() {
+                        eprintln!("Failed to close log sink: {}", e);
                     }
+                    break;
                 }
+
+                // Producers unpark us once a batch is waiting
+                queue.park(Duration::from_millis(100));
             }
-        }));
+        });
+        self.queue.set_consumer(Some(handle.thread().clone()), batch_size);
+        self.handle = Some(handle);
     }
 
     pub fn stop(&mut self) {
@@ -113,58 +106,40 @@ impl Logger {
             let mut r = self.is_running.lock().unwrap();
             *r = false;
         }
+        // Later messages are dropped (and counted); blocked producers are released
+        self.queue.close();
+        self.queue.unpark();
         if let Some(h) = self.handle.take() {
             let _ = h.join();
         }
+        self.queue.set_consumer(None, self.config.batch_size);
     }
 
     pub fn log(&self, msg: Message) {
-        if let Some(tx) = &self.sender {
-            let _ = tx.send(AsyncMessage::from(msg));
-        }
+        self.queue.push(AsyncMessage::from(msg));
     }
     
     pub fn log_lazy(&self, log_type: String, f: Box<dyn FnOnce() -> serde_json::Value + Send>) {
-        if let Some(tx) = &self.sender {
-             let _ = tx.send(AsyncMessage::new_lazy(log_type, f));
-        }
+        self.queue.push(AsyncMessage::new_lazy(log_type, f));
     }
 
-    fn flush_buffer(messages: &mut Vec<Message>, destination: &LogDestinationInfo, rt: Option<&Runtime>) {
-        if messages.is_empty() { return; }
-        // Take messages out of buffer to flush, clearing buffer
-        let batch = std::mem::take(messages);
-        
-        match destination {
-            LogDestinationInfo::LocalFile { path } => {
-                if let Err(e) = Self::write_to_file(path, &batch) {
-                    eprintln!("Failed to write logs to file: {}", e);
-                }
-            },
-            // AmazonS3 logging disabled
-            LogDestinationInfo::Console => {
-                for msg in batch {
-                    if let Ok(json) = serde_json::to_string(&msg) {
-                        println!("{}", json);
-                    }
-                }
-            }
-        }
+    /// Producer handle that logs without going through `Arc<Mutex<Logger>>`.
+    pub fn handle(&self) -> LogHandle {
+        LogHandle::new(self.queue.clone())
     }
 
+    pub fn stats(&self) -> LogQueueStats {
+        self.queue.stats()
+    }
 
-
-    fn write_to_file(path: &str, messages: &[Message]) -> Result<()> {
-        let mut file = OpenOptions::new()
-            .create(true)
-            .append(true)
-            .open(path)?;
-            
-        for msg in messages {
-            let json = serde_json::to_string(msg)?;
-            writeln!(file, "{}", json)?;
+    fn flush_buffer(messages: &mut Vec<Message>, sink: &mut dyn LogSink, queue: &LogQueue) {
+        if messages.is_empty() { return; }
+        // AmazonS3 logging disabled
+        if let Err(e) = sink.write_batch(messages) {
+            eprintln!("Failed to write logs: {}", e);
         }
-        Ok(())
+        queue.record_flushed(messages.len());
+        messages.clear();
     }
 }
 
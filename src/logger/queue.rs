@@ -0,0 +1,245 @@
+use crate::logger::message::AsyncMessage;
+use crossbeam_queue::ArrayQueue;
+use serde::{Deserialize, Serialize};
+use std::sync::atomic::{AtomicBool, AtomicU64, AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread::{self, Thread};
+use std::time::Duration;
+
+/// What `log` does when the queue is full.
+#[derive(Debug, Clone, Copy, Serialize, Deserialize, PartialEq, Eq)]
+pub enum OverflowPolicy {
+    /// Wait for the flusher. Nothing is lost, callers slow down.
+    Block,
+    /// Evict the oldest queued message to make room.
+    DropOldest,
+    /// Once the queue is half full, keep only every `every`-th message;
+    /// drop new messages while it is completely full.
+    Sample { every: u64 },
+}
+
+impl OverflowPolicy {
+    /// "block", "drop_oldest", or "sample:N".
+    pub fn parse(s: &str) -> Result<Self, String> {
+        match s {
+            "block" => Ok(OverflowPolicy::Block),
+            "drop_oldest" => Ok(OverflowPolicy::DropOldest),
+            _ => s
+                .strip_prefix("sample:")
+                .and_then(|n| n.parse::<u64>().ok())
+                .filter(|n| *n > 0)
+                .map(|every| OverflowPolicy::Sample { every })
+                .ok_or_else(|| format!("Unknown overflow policy: {} (expected block, drop_oldest or sample:N)", s)),
+        }
+    }
+}
+
+#[derive(Debug, Clone, Copy, Serialize, Deserialize)]
+pub struct QueueConfig {
+    pub capacity: usize,
+    pub overflow: OverflowPolicy,
+}
+
+impl Default for QueueConfig {
+    fn default() -> Self {
+        QueueConfig {
+            capacity: 65_536,
+            overflow: OverflowPolicy::Block,
+        }
+    }
+}
+
+#[derive(Debug, Clone, Default, Serialize, Deserialize, PartialEq, Eq)]
+pub struct LogQueueStats {
+    pub enqueued: u64,
+    pub dropped: u64,
+    pub flushed: u64,
+    pub high_water: usize,
+    pub len: usize,
+    pub capacity: usize,
+}
+
+/// Bounded MPSC log queue.
+///
+/// Producers push into a lock-free ring (`crossbeam_queue::ArrayQueue`), so
+/// logging from the gateway or strategy threads never takes a mutex. Memory is
+/// capped at `capacity` messages; what happens beyond that is the `OverflowPolicy`.
+/// The flusher thread parks while the queue is short and is unparked once
+/// `wake_at` messages are waiting.
+pub struct LogQueue {
+    ring: ArrayQueue<AsyncMessage>,
+    policy: OverflowPolicy,
+    enqueued: AtomicU64,
+    dropped: AtomicU64,
+    flushed: AtomicU64,
+    high_water: AtomicUsize,
+    sampled: AtomicU64,
+    wake_at: AtomicUsize,
+    closed: AtomicBool,
+    // Set by the flusher before it parks; producers only unpark it when set
+    parked: AtomicBool,
+    consumer: Mutex<Option<Thread>>,
+}
+
+impl LogQueue {
+    pub fn new(config: QueueConfig) -> Self {
+        let capacity = config.capacity.max(1);
+        LogQueue {
+            ring: ArrayQueue::new(capacity),
+            policy: config.overflow,
+            enqueued: AtomicU64::new(0),
+            dropped: AtomicU64::new(0),
+            flushed: AtomicU64::new(0),
+            high_water: AtomicUsize::new(0),
+            sampled: AtomicU64::new(0),
+            wake_at: AtomicUsize::new((capacity / 2).max(1)),
+            closed: AtomicBool::new(false),
+            parked: AtomicBool::new(false),
+            consumer: Mutex::new(None),
+        }
+    }
+
+    pub fn push(&self, msg: AsyncMessage) {
+        if self.closed.load(Ordering::Relaxed) {
+            self.dropped.fetch_add(1, Ordering::Relaxed);
+            return;
+        }
+        let accepted = match self.policy {
+            OverflowPolicy::Block => self.push_blocking(msg),
+            OverflowPolicy::DropOldest => {
+                if self.ring.force_push(msg).is_some() {
+                    self.dropped.fetch_add(1, Ordering::Relaxed);
+                }
+                true
+            },
+            OverflowPolicy::Sample { every } => {
+                if self.ring.len() >= self.ring.capacity() / 2
+                    && self.sampled.fetch_add(1, Ordering::Relaxed) % every != 0
+                {
+                    false
+                } else {
+                    self.ring.push(msg).is_ok()
+                }
+            },
+        };
+        if !accepted {
+            self.dropped.fetch_add(1, Ordering::Relaxed);
+            return;
+        }
+        self.enqueued.fetch_add(1, Ordering::Relaxed);
+        let len = self.ring.len();
+        self.high_water.fetch_max(len, Ordering::Relaxed);
+        if len >= self.wake_at.load(Ordering::Relaxed) {
+            self.wake();
+        }
+    }
+
+    fn push_blocking(&self, mut msg: AsyncMessage) -> bool {
+        let mut spins = 0u32;
+        loop {
+            match self.ring.push(msg) {
+                Ok(()) => return true,
+                Err(back) => msg = back,
+            }
+            if self.closed.load(Ordering::Relaxed) {
+                return false;
+            }
+            self.wake();
+            spins += 1;
+            if spins < 16 {
+                thread::yield_now();
+            } else {
+                thread::sleep(Duration::from_micros(50));
+            }
+        }
+    }
+
+    pub fn pop(&self) -> Option<AsyncMessage> {
+        self.ring.pop()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.ring.is_empty()
+    }
+
+    pub(crate) fn set_consumer(&self, consumer: Option<Thread>, wake_at: usize) {
+        self.wake_at.store(wake_at.clamp(1, self.ring.capacity()), Ordering::Relaxed);
+        *self.consumer.lock().unwrap() = consumer;
+    }
+
+    /// Park the flusher for up to `timeout`, unless `wake_at` messages are already waiting.
+    pub(crate) fn park(&self, timeout: Duration) {
+        self.parked.store(true, Ordering::SeqCst);
+        if self.ring.len() < self.wake_at.load(Ordering::Relaxed) {
+            thread::park_timeout(timeout);
+        }
+        self.parked.store(false, Ordering::SeqCst);
+    }
+
+    // Cheap when the flusher is awake: one atomic swap, no lock
+    fn wake(&self) {
+        if self.parked.swap(false, Ordering::SeqCst) {
+            self.unpark();
+        }
+    }
+
+    pub(crate) fn unpark(&self) {
+        if let Some(t) = self.consumer.lock().unwrap().as_ref() {
+            t.unpark();
+        }
+    }
+
+    pub(crate) fn record_flushed(&self, n: usize) {
+        self.flushed.fetch_add(n as u64, Ordering::Relaxed);
+    }
+
+    /// Reject further messages (counted as dropped) and release blocked producers.
+    pub fn close(&self) {
+        self.closed.store(true, Ordering::Relaxed);
+    }
+
+    pub fn reopen(&self) {
+        self.closed.store(false, Ordering::Relaxed);
+    }
+
+    pub fn stats(&self) -> LogQueueStats {
+        LogQueueStats {
+            enqueued: self.enqueued.load(Ordering::Relaxed),
+            dropped: self.dropped.load(Ordering::Relaxed),
+            flushed: self.flushed.load(Ordering::Relaxed),
+            high_water: self.high_water.load(Ordering::Relaxed),
+            len: self.ring.len(),
+            capacity: self.ring.capacity(),
+        }
+    }
+}
+
+/// Cheap, cloneable producer side of a `Logger`.
+/// Hold one of these on hot paths instead of locking `Arc<Mutex<Logger>>`.
+#[derive(Clone)]
+pub struct LogHandle {
+    queue: Arc<LogQueue>,
+}
+
+impl LogHandle {
+    pub(crate) fn new(queue: Arc<LogQueue>) -> Self {
+        LogHandle { queue }
+    }
+
+    pub fn log(&self, msg: crate::logger::message::Message) {
+        self.queue.push(AsyncMessage::from(msg));
+    }
+
+    pub fn log_lazy(&self, log_type: String, f: Box<dyn FnOnce() -> serde_json::Value + Send>) {
+        self.queue.push(AsyncMessage::new_lazy(log_type, f));
+    }
+
+    /// Log a venue message as-is; it is converted to JSON on the flusher thread.
+    pub fn log_market(&self, msg: crate::message::Message) {
+        self.queue.push(AsyncMessage::new_market(msg));
+    }
+
+    pub fn stats(&self) -> LogQueueStats {
+        self.queue.stats()
+    }
+}
@@ -0,0 +1,253 @@
+use crate::logger::config::LogDestinationInfo;
+use crate::logger::message::Message;
+use anyhow::{anyhow, Result};
+use std::fs::{self, File, OpenOptions};
+use std::io::{self, BufReader, BufWriter, Read, Write};
+use std::path::Path;
+use std::time::{Duration, Instant};
+
+const WRITE_BUFFER: usize = 256 * 1024;
+const ZSTD_MAGIC: [u8; 4] = [0x28, 0xB5, 0x2F, 0xFD];
+
+/// Where the logger thread writes flushed batches.
+/// Sinks are created once per logger thread and keep their handles open.
+pub trait LogSink: Send {
+    fn write_batch(&mut self, batch: &[Message]) -> Result<()>;
+    /// Flush and finalize (e.g. end the zstd frame). Called once on stop.
+    fn close(&mut self) -> Result<()> {
+        Ok(())
+    }
+}
+
+pub fn open_sink(destination: &LogDestinationInfo) -> Result<Box<dyn LogSink>> {
+    Ok(match destination {
+        LogDestinationInfo::Console => Box::new(ConsoleSink),
+        LogDestinationInfo::LocalFile { path } => Box::new(JsonLinesSink::new(path)),
+        LogDestinationInfo::BinaryFile { path, compress, max_bytes, max_age_seconds } => Box::new(BinarySink::new(
+            path,
+            *compress,
+            *max_bytes,
+            max_age_seconds.map(Duration::from_secs),
+        )?),
+    })
+}
+
+/// One JSON line per message on stdout; the stdout lock is taken once per batch.
+pub struct ConsoleSink;
+
+impl LogSink for ConsoleSink {
+    fn write_batch(&mut self, batch: &[Message]) -> Result<()> {
+        let stdout = io::stdout();
+        let mut out = BufWriter::new(stdout.lock());
+        for msg in batch {
+            serde_json::to_writer(&mut out, msg)?;
+            out.write_all(b"\n")?;
+        }
+        out.flush()?;
+        Ok(())
+    }
+}
+
+/// JSON lines appended to `path` through a handle that stays open.
+pub struct JsonLinesSink {
+    path: String,
+    file: Option<BufWriter<File>>,
+}
+
+impl JsonLinesSink {
+    pub fn new(path: &str) -> Self {
+        JsonLinesSink { path: path.to_string(), file: None }
+    }
+}
+
+fn open_append(path: &str) -> Result<File> {
+    if let Some(dir) = Path::new(path).parent() {
+        if !dir.as_os_str().is_empty() {
+            fs::create_dir_all(dir)?;
+        }
+    }
+    Ok(OpenOptions::new().create(true).append(true).open(path)?)
+}
+
+impl LogSink for JsonLinesSink {
+    fn write_batch(&mut self, batch: &[Message]) -> Result<()> {
+        if self.file.is_none() {
+            self.file = Some(BufWriter::with_capacity(WRITE_BUFFER, open_append(&self.path)?));
+        }
+        let file = self.file.as_mut().unwrap();
+        for msg in batch {
+            serde_json::to_writer(&mut *file, msg)?;
+            file.write_all(b"\n")?;
+        }
+        file.flush()?;
+        Ok(())
+    }
+
+    fn close(&mut self) -> Result<()> {
+        if let Some(mut f) = self.file.take() {
+            f.flush()?;
+        }
+        Ok(())
+    }
+}
+
+enum Segment {
+    Plain(BufWriter<File>),
+    Zstd(zstd::Encoder<'static, BufWriter<File>>),
+}
+
+impl Segment {
+    fn writer(&mut self) -> &mut dyn Write {
+        match self {
+            Segment::Plain(w) => w,
+            Segment::Zstd(w) => w,
+        }
+    }
+
+    fn finish(self) -> Result<()> {
+        match self {
+            Segment::Plain(mut w) => w.flush()?,
+            Segment::Zstd(w) => w.finish()?.flush()?,
+        }
+        Ok(())
+    }
+}
+
+/// Length-prefixed MessagePack records: `[u32 LE length][Message]`, optionally
+/// inside one streaming zstd frame per file.
+///
+/// The active segment is always `path`. When it reaches `max_bytes` (uncompressed)
+/// or `max_age`, it is finished and renamed to `path.<YYYYmmdd-HHMMSS.fff>` and a
+/// new segment is started. Read back with `read_binary_log`.
+pub struct BinarySink {
+    path: String,
+    compress: bool,
+    max_bytes: Option<u64>,
+    max_age: Option<Duration>,
+    segment: Option<Segment>,
+    written: u64,
+    opened_at: Instant,
+    // Reused per-record encode buffer
+    buf: Vec<u8>,
+}
+
+impl BinarySink {
+    pub fn new(path: &str, compress: bool, max_bytes: Option<u64>, max_age: Option<Duration>) -> Result<Self> {
+        Ok(BinarySink {
+            path: path.to_string(),
+            compress,
+            max_bytes,
+            max_age,
+            segment: None,
+            written: 0,
+            opened_at: Instant::now(),
+            buf: Vec::with_capacity(1024),
+        })
+    }
+
+    fn open_segment(&mut self) -> Result<()> {
+        // An existing segment (from a previous run) is kept as its own file,
+        // so compressed frames are never appended to
+        if Path::new(&self.path).exists() {
+            self.archive_active()?;
+        }
+        let file = BufWriter::with_capacity(WRITE_BUFFER, open_append(&self.path)?);
+        self.segment = Some(if self.compress {
+            Segment::Zstd(zstd::Encoder::new(file, 3)?)
+        } else {
+            Segment::Plain(file)
+        });
+        self.written = 0;
+        self.opened_at = Instant::now();
+        Ok(())
+    }
+
+    fn archive_active(&self) -> Result<()> {
+        let suffix = chrono::Local::now().format("%Y%m%d-%H%M%S%.3f");
+        fs::rename(&self.path, format!("{}.{}", self.path, suffix))?;
+        Ok(())
+    }
+
+    fn rotate(&mut self) -> Result<()> {
+        if let Some(seg) = self.segment.take() {
+            seg.finish()?;
+            self.archive_active()?;
+        }
+        Ok(())
+    }
+
+    fn due_for_rotation(&self) -> bool {
+        self.max_bytes.map_or(false, |m| self.written >= m)
+            || self.max_age.map_or(false, |a| self.opened_at.elapsed() >= a)
+    }
+}
+
+impl LogSink for BinarySink {
+    fn write_batch(&mut self, batch: &[Message]) -> Result<()> {
+        if self.segment.is_some() && self.due_for_rotation() {
+            self.rotate()?;
+        }
+        if self.segment.is_none() {
+            self.open_segment()?;
+        }
+        let out = self.segment.as_mut().unwrap().writer();
+        for msg in batch {
+            self.buf.clear();
+            rmp_serde::encode::write(&mut self.buf, msg)?;
+            out.write_all(&(self.buf.len() as u32).to_le_bytes())?;
+            out.write_all(&self.buf)?;
+            self.written += 4 + self.buf.len() as u64;
+        }
+        out.flush()?;
+        Ok(())
+    }
+
+    fn close(&mut self) -> Result<()> {
+        if let Some(seg) = self.segment.take() {
+            seg.finish()?;
+        }
+        Ok(())
+    }
+}
+
+impl Drop for BinarySink {
+    fn drop(&mut self) {
+        let _ = self.close();
+    }
+}
+
+/// Decode a file written by `BinarySink` (plain or zstd).
+/// A truncated trailing record (e.g. after a crash) ends the read without error.
+pub fn read_binary_log(path: &str) -> Result<Vec<Message>> {
+    let mut file = BufReader::new(File::open(path)?);
+    let mut magic = [0u8; 4];
+    let n = file.read(&mut magic)?;
+    let head = io::Cursor::new(magic[..n].to_vec());
+    let compressed = n == 4 && magic == ZSTD_MAGIC;
+    let chained = head.chain(file);
+    let mut reader: Box<dyn Read> = if compressed {
+        Box::new(zstd::Decoder::new(chained)?)
+    } else {
+        Box::new(chained)
+    };
+
+    let mut messages = Vec::new();
+    let mut len = [0u8; 4];
+    let mut buf = Vec::new();
+    loop {
+        match reader.read_exact(&mut len) {
+            Ok(()) => {},
+            Err(e) if e.kind() == io::ErrorKind::UnexpectedEof => break,
+            Err(e) => return Err(e.into()),
+        }
+        buf.resize(u32::from_le_bytes(len) as usize, 0);
+        match reader.read_exact(&mut buf) {
+            Ok(()) => {},
+            Err(e) if e.kind() == io::ErrorKind::UnexpectedEof => break,
+            Err(e) => return Err(e.into()),
+        }
+        let msg: Message = rmp_serde::from_slice(&buf).map_err(|e| anyhow!("Corrupt log record: {}", e))?;
+        messages.push(msg);
+    }
+    Ok(messages)
+}
@@ -1,5 +1,7 @@
 use serde::{Deserialize, Serialize};
 use rust_decimal::Decimal;
+use rust_decimal::prelude::ToPrimitive;
+use pyo3::prelude::*;
 use crate::oms::order::{Order, OrderState};
 use crate::oms::order_book::OrderBookDelta;
 
@@ -64,3 +66,200 @@ pub enum ConnectionStatus {
     Connected,
     Reconnecting,
 }
+
+// --- Python Views ---
+// Typed, read-only objects handed to Python instead of JSON strings.
+// Prices are exposed as float for tick handlers; `Client.fetch_message()` returns the same
+// messages as JSON with exact decimal strings, and `get_order_book()` does so for books.
+
+fn dec_to_f64(d: &Decimal) -> f64 {
+    d.to_f64().unwrap_or(0.0)
+}
+
+fn levels_to_f64(levels: &[(Decimal, i64)]) -> Vec<(f64, i64)> {
+    levels.iter().map(|(p, q)| (dec_to_f64(p), *q)).collect()
+}
+
+/// Order book snapshot (`is_snapshot=True`) or delta.
+#[pyclass(frozen, name = "OrderBookEvent")]
+pub struct PyOrderBookEvent {
+    #[pyo3(get)]
+    pub symbol: String,
+    #[pyo3(get)]
+    pub is_snapshot: bool,
+    #[pyo3(get)]
+    pub update_id: i64,
+    #[pyo3(get)]
+    pub timestamp: f64,
+    pub bids: Vec<(Decimal, i64)>,
+    pub asks: Vec<(Decimal, i64)>,
+}
+
+#[pymethods]
+impl PyOrderBookEvent {
+    /// List of (price, qty) as sent by the venue
+    #[getter]
+    fn bids(&self) -> Vec<(f64, i64)> {
+        levels_to_f64(&self.bids)
+    }
+
+    #[getter]
+    fn asks(&self) -> Vec<(f64, i64)> {
+        levels_to_f64(&self.asks)
+    }
+
+    fn __repr__(&self) -> String {
+        format!("OrderBookEvent(symbol={}, snapshot={}, bids={}, asks={})", self.symbol, self.is_snapshot, self.bids.len(), self.asks.len())
+    }
+}
+
+#[pyclass(frozen, name = "MarketTrade")]
+pub struct PyMarketTrade {
+    #[pyo3(get)]
+    pub symbol: String,
+    pub price: Decimal,
+    #[pyo3(get)]
+    pub quantity: i64,
+    #[pyo3(get)]
+    pub timestamp: f64,
+}
+
+#[pymethods]
+impl PyMarketTrade {
+    #[getter]
+    fn price(&self) -> f64 {
+        dec_to_f64(&self.price)
+    }
+
+    fn __repr__(&self) -> String {
+        format!("MarketTrade(symbol={}, price={}, qty={})", self.symbol, self.price, self.quantity)
+    }
+}
+
+#[pyclass(frozen, name = "OrderStatusEvent")]
+pub struct PyOrderStatusEvent {
+    #[pyo3(get)]
+    pub order_id: String,
+    #[pyo3(get)]
+    pub state: OrderState,
+    #[pyo3(get)]
+    pub filled_qty: i64,
+    pub filled_price: Option<Decimal>,
+    #[pyo3(get)]
+    pub msg: Option<String>,
+    #[pyo3(get)]
+    pub updated_at: f64,
+}
+
+#[pymethods]
+impl PyOrderStatusEvent {
+    #[getter]
+    fn filled_price(&self) -> Option<f64> {
+        self.filled_price.as_ref().map(dec_to_f64)
+    }
+
+    fn __repr__(&self) -> String {
+        format!("OrderStatusEvent(order_id={}, state={:?}, filled_qty={})", self.order_id, self.state, self.filled_qty)
+    }
+}
+
+#[pyclass(frozen, name = "ExecutionEvent")]
+pub struct PyExecutionEvent {
+    #[pyo3(get)]
+    pub order_id: String,
+    #[pyo3(get)]
+    pub fill_qty: i64,
+    pub fill_price: Decimal,
+}
+
+#[pymethods]
+impl PyExecutionEvent {
+    #[getter]
+    fn fill_price(&self) -> f64 {
+        dec_to_f64(&self.fill_price)
+    }
+
+    fn __repr__(&self) -> String {
+        format!("ExecutionEvent(order_id={}, qty={}, price={})", self.order_id, self.fill_qty, self.fill_price)
+    }
+}
+
+/// Connection status, account update and error messages.
+/// Rare enough that a generic view with the JSON body is sufficient.
+#[pyclass(frozen, name = "SystemEvent")]
+pub struct PySystemEvent {
+    #[pyo3(get)]
+    pub kind: String,
+    #[pyo3(get)]
+    pub body: String,
+}
+
+#[pymethods]
+impl PySystemEvent {
+    fn __repr__(&self) -> String {
+        format!("SystemEvent(kind={}, body={})", self.kind, self.body)
+    }
+}
+
+impl Message {
+    /// Convert into the matching Python view object. Caller must hold the GIL.
+    pub fn into_py_object(self, py: Python<'_>) -> PyResult<PyObject> {
+        let obj = match self {
+            Message::OrderBookSnapshot(s) => Py::new(py, PyOrderBookEvent {
+                symbol: s.symbol,
+                is_snapshot: true,
+                update_id: s.update_id,
+                timestamp: s.timestamp,
+                bids: s.bids,
+                asks: s.asks,
+            })?.into_any(),
+            Message::OrderBookUpdate { symbol, delta } => Py::new(py, PyOrderBookEvent {
+                symbol,
+                is_snapshot: false,
+                update_id: delta.update_id,
+                timestamp: delta.timestamp,
+                bids: delta.bids,
+                asks: delta.asks,
+            })?.into_any(),
+            Message::MarketTrade { symbol, price, quantity, timestamp } => Py::new(py, PyMarketTrade {
+                symbol,
+                price,
+                quantity,
+                timestamp,
+            })?.into_any(),
+            Message::OrderStatus { order_id, state, filled_qty, filled_price, msg, updated_at } => Py::new(py, PyOrderStatusEvent {
+                order_id,
+                state,
+                filled_qty,
+                filled_price,
+                msg,
+                updated_at,
+            })?.into_any(),
+            Message::Execution { order_id, fill_qty, fill_price } => Py::new(py, PyExecutionEvent {
+                order_id,
+                fill_qty,
+                fill_price,
+            })?.into_any(),
+            other => {
+                let kind = match &other {
+                    Message::ConnectionStatus(_) => "ConnectionStatus",
+                    Message::AccountUpdate { .. } => "AccountUpdate",
+                    _ => "Error",
+                };
+                let body = serde_json::to_string(&other)
+                    .map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+                Py::new(py, PySystemEvent { kind: kind.to_string(), body })?.into_any()
+            }
+        };
+        Ok(obj)
+    }
+}
+
+pub fn register(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_class::<PyOrderBookEvent>()?;
+    m.add_class::<PyMarketTrade>()?;
+    m.add_class::<PyOrderStatusEvent>()?;
+    m.add_class::<PyExecutionEvent>()?;
+    m.add_class::<PySystemEvent>()?;
+    Ok(())
+}
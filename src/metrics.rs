@@ -0,0 +1,324 @@
+use pyo3::prelude::*;
+use pyo3::types::PyDict;
+use serde::Serialize;
+use crate::message::Message;
+use std::fmt::Write as _;
+use std::path::Path;
+use std::sync::atomic::{AtomicI64, AtomicU64, Ordering};
+use std::sync::OnceLock;
+use std::time::{Duration, Instant, SystemTime, UNIX_EPOCH};
+
+// Log-linear buckets: exact below 32ns, then 32 sub-buckets per power of two
+// (about 3% relative error) up to u64::MAX
+const SUB_BITS: u32 = 5;
+const SUB: usize = 1 << SUB_BITS;
+const BUCKETS: usize = (64 - SUB_BITS as usize + 1) * SUB;
+
+fn bucket_index(v: u64) -> usize {
+    if v < SUB as u64 {
+        return v as usize;
+    }
+    let e = 63 - v.leading_zeros();
+    (e - SUB_BITS + 1) as usize * SUB + ((v >> (e - SUB_BITS)) as usize & (SUB - 1))
+}
+
+// Midpoint of a bucket, the value reported for samples that fell in it
+fn bucket_value(i: usize) -> u64 {
+    if i < SUB {
+        return i as u64;
+    }
+    let shift = (i / SUB) as u32 - 1;
+    let lower = ((SUB + i % SUB) as u64) << shift;
+    lower + ((1u64 << shift) >> 1)
+}
+
+/// Lock-free latency histogram in nanoseconds (HDR-style log-linear buckets).
+///
+/// Recording is three relaxed atomic adds and a `fetch_max`, so any thread can
+/// record on the hot path without coordination. Reads are not a consistent cut,
+/// which is fine for monitoring.
+pub struct Histogram {
+    counts: Box<[AtomicU64]>,
+    count: AtomicU64,
+    sum_ns: AtomicU64,
+    max_ns: AtomicU64,
+}
+
+impl Default for Histogram {
+    fn default() -> Self {
+        Histogram {
+            counts: (0..BUCKETS).map(|_| AtomicU64::new(0)).collect(),
+            count: AtomicU64::new(0),
+            sum_ns: AtomicU64::new(0),
+            max_ns: AtomicU64::new(0),
+        }
+    }
+}
+
+impl Histogram {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub fn record_ns(&self, ns: u64) {
+        self.counts[bucket_index(ns)].fetch_add(1, Ordering::Relaxed);
+        self.count.fetch_add(1, Ordering::Relaxed);
+        self.sum_ns.fetch_add(ns, Ordering::Relaxed);
+        self.max_ns.fetch_max(ns, Ordering::Relaxed);
+    }
+
+    pub fn record(&self, d: Duration) {
+        self.record_ns(d.as_nanos().min(u64::MAX as u128) as u64);
+    }
+
+    pub fn count(&self) -> u64 {
+        self.count.load(Ordering::Relaxed)
+    }
+
+    pub fn reset(&self) {
+        for c in self.counts.iter() {
+            c.store(0, Ordering::Relaxed);
+        }
+        self.count.store(0, Ordering::Relaxed);
+        self.sum_ns.store(0, Ordering::Relaxed);
+        self.max_ns.store(0, Ordering::Relaxed);
+    }
+
+    /// Values (ns) at each quantile in `qs` (ascending), 0 when empty.
+    pub fn quantiles(&self, qs: &[f64]) -> Vec<u64> {
+        let counts: Vec<u64> = self.counts.iter().map(|c| c.load(Ordering::Relaxed)).collect();
+        let total: u64 = counts.iter().sum();
+        let max = self.max_ns.load(Ordering::Relaxed);
+        let mut out = Vec::with_capacity(qs.len());
+        let (mut seen, mut i) = (0u64, 0usize);
+        for q in qs {
+            if total == 0 {
+                out.push(0);
+                continue;
+            }
+            let rank = ((q * total as f64).ceil() as u64).clamp(1, total);
+            while seen + counts[i] < rank {
+                seen += counts[i];
+                i += 1;
+            }
+            out.push(bucket_value(i).min(max));
+        }
+        out
+    }
+
+    pub fn stats(&self) -> LatencyStats {
+        let q = self.quantiles(&[0.5, 0.9, 0.99, 0.999]);
+        let count = self.count();
+        let us = |ns: u64| ns as f64 / 1000.0;
+        LatencyStats {
+            count,
+            mean_us: if count > 0 { us(self.sum_ns.load(Ordering::Relaxed)) / count as f64 } else { 0.0 },
+            p50_us: us(q[0]),
+            p90_us: us(q[1]),
+            p99_us: us(q[2]),
+            p999_us: us(q[3]),
+            max_us: us(self.max_ns.load(Ordering::Relaxed)),
+        }
+    }
+}
+
+/// Last value and high-water mark.
+#[derive(Debug, Default)]
+pub struct Gauge {
+    value: AtomicI64,
+    max: AtomicI64,
+}
+
+impl Gauge {
+    pub fn set(&self, v: i64) {
+        self.value.store(v, Ordering::Relaxed);
+        self.max.fetch_max(v, Ordering::Relaxed);
+    }
+
+    pub fn get(&self) -> i64 {
+        self.value.load(Ordering::Relaxed)
+    }
+
+    pub fn max(&self) -> i64 {
+        self.max.load(Ordering::Relaxed)
+    }
+}
+
+/// Stages of the tick-to-order path.
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Stage {
+    /// WS frame received -> parsed into a message (adapter thread)
+    Parse,
+    /// Parsed -> dequeued by the engine or `Client` pump. Taken from the message's
+    /// local receive timestamp, so only book and trade messages count.
+    Channel,
+    /// Dequeued -> book updated (`apply_delta` / `apply_snapshot`)
+    Book,
+    /// Book updated -> strategies evaluated
+    Strategy,
+    /// `adapter.place_order` call, from entry to return
+    PlaceOrder,
+    /// Dequeued -> last order from that message returned by the adapter
+    TickToOrder,
+}
+
+impl Stage {
+    pub const ALL: [Stage; 6] = [Stage::Parse, Stage::Channel, Stage::Book, Stage::Strategy, Stage::PlaceOrder, Stage::TickToOrder];
+
+    pub fn name(&self) -> &'static str {
+        match self {
+            Stage::Parse => "parse",
+            Stage::Channel => "channel",
+            Stage::Book => "book",
+            Stage::Strategy => "strategy",
+            Stage::PlaceOrder => "place_order",
+            Stage::TickToOrder => "tick_to_order",
+        }
+    }
+}
+
+#[derive(Debug, Clone, Default, Serialize, PartialEq)]
+pub struct LatencyStats {
+    pub count: u64,
+    pub mean_us: f64,
+    pub p50_us: f64,
+    pub p90_us: f64,
+    pub p99_us: f64,
+    pub p999_us: f64,
+    pub max_us: f64,
+}
+
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct MetricsSnapshot {
+    pub stages: Vec<(&'static str, LatencyStats)>,
+    /// Messages waiting in the adapter -> engine channel when last drained
+    pub queue_depth: i64,
+    pub queue_depth_max: i64,
+}
+
+impl MetricsSnapshot {
+    pub fn stage(&self, stage: Stage) -> &LatencyStats {
+        &self.stages.iter().find(|(n, _)| *n == stage.name()).expect("every stage is reported").1
+    }
+
+    /// `{"stages": {name: {count, mean_us, p50_us, ...}}, "queue_depth": n, "queue_depth_max": n}`
+    pub fn to_py_dict<'py>(&self, py: Python<'py>) -> PyResult<Bound<'py, PyDict>> {
+        let stages = PyDict::new(py);
+        for (name, s) in &self.stages {
+            let d = PyDict::new(py);
+            d.set_item("count", s.count)?;
+            d.set_item("mean_us", s.mean_us)?;
+            d.set_item("p50_us", s.p50_us)?;
+            d.set_item("p90_us", s.p90_us)?;
+            d.set_item("p99_us", s.p99_us)?;
+            d.set_item("p999_us", s.p999_us)?;
+            d.set_item("max_us", s.max_us)?;
+            stages.set_item(*name, d)?;
+        }
+        let dict = PyDict::new(py);
+        dict.set_item("stages", stages)?;
+        dict.set_item("queue_depth", self.queue_depth)?;
+        dict.set_item("queue_depth_max", self.queue_depth_max)?;
+        Ok(dict)
+    }
+}
+
+/// Histograms for every `Stage` plus the channel depth gauge.
+#[derive(Default)]
+pub struct Metrics {
+    stages: [Histogram; 6],
+    pub queue_depth: Gauge,
+}
+
+// Channel ages above this come from replayed or venue-stamped messages, not queueing
+const MAX_CHANNEL_AGE: f64 = 10.0;
+
+impl Metrics {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub fn histogram(&self, stage: Stage) -> &Histogram {
+        &self.stages[stage as usize]
+    }
+
+    pub fn record(&self, stage: Stage, d: Duration) {
+        self.histogram(stage).record(d);
+    }
+
+    pub fn record_since(&self, stage: Stage, start: Instant) {
+        self.record(stage, start.elapsed());
+    }
+
+    /// Channel stage from a message's epoch-seconds receive timestamp.
+    pub fn record_channel_age(&self, stamped_at: f64) {
+        let age = epoch_secs() - stamped_at;
+        if (0.0..MAX_CHANNEL_AGE).contains(&age) {
+            self.histogram(Stage::Channel).record_ns((age * 1e9) as u64);
+        }
+    }
+
+    /// Channel stage for messages stamped on receipt (books and market trades).
+    pub fn record_message_age(&self, msg: &Message) {
+        let stamped_at = match msg {
+            Message::OrderBookSnapshot(s) => s.timestamp,
+            Message::OrderBookUpdate { delta, .. } => delta.timestamp,
+            Message::MarketTrade { timestamp, .. } => *timestamp,
+            _ => return,
+        };
+        self.record_channel_age(stamped_at);
+    }
+
+    pub fn reset(&self) {
+        self.stages.iter().for_each(Histogram::reset);
+    }
+
+    pub fn snapshot(&self) -> MetricsSnapshot {
+        MetricsSnapshot {
+            stages: Stage::ALL.iter().map(|s| (s.name(), self.histogram(*s).stats())).collect(),
+            queue_depth: self.queue_depth.get(),
+            queue_depth_max: self.queue_depth.max(),
+        }
+    }
+
+    /// Prometheus text exposition: one summary per stage plus the depth gauges.
+    pub fn prometheus(&self) -> String {
+        const QS: [f64; 4] = [0.5, 0.9, 0.99, 0.999];
+        let mut out = String::new();
+        out.push_str("# HELP didius_stage_latency_seconds Latency of each tick-to-order stage.\n");
+        out.push_str("# TYPE didius_stage_latency_seconds summary\n");
+        for stage in Stage::ALL {
+            let h = self.histogram(stage);
+            for (q, v) in QS.iter().zip(h.quantiles(&QS)) {
+                let _ = writeln!(out, "didius_stage_latency_seconds{{stage=\"{}\",quantile=\"{}\"}} {:e}", stage.name(), q, v as f64 / 1e9);
+            }
+            let _ = writeln!(out, "didius_stage_latency_seconds_sum{{stage=\"{}\"}} {:e}", stage.name(), h.sum_ns.load(Ordering::Relaxed) as f64 / 1e9);
+            let _ = writeln!(out, "didius_stage_latency_seconds_count{{stage=\"{}\"}} {}", stage.name(), h.count());
+        }
+        out.push_str("# HELP didius_queue_depth Messages waiting in the adapter to engine channel.\n");
+        out.push_str("# TYPE didius_queue_depth gauge\n");
+        let _ = writeln!(out, "didius_queue_depth {}", self.queue_depth.get());
+        out.push_str("# TYPE didius_queue_depth_max gauge\n");
+        let _ = writeln!(out, "didius_queue_depth_max {}", self.queue_depth.max());
+        out
+    }
+
+    /// Write `prometheus()` to `path` (e.g. for node_exporter's textfile collector).
+    /// Written to a temp file and renamed, so scrapers never read a partial file.
+    pub fn write_prometheus(&self, path: &Path) -> anyhow::Result<()> {
+        let tmp = path.with_extension("prom.tmp");
+        std::fs::write(&tmp, self.prometheus())?;
+        std::fs::rename(&tmp, path)?;
+        Ok(())
+    }
+}
+
+/// Process-wide metrics. Adapters, the engine and `Client` all record here.
+pub fn global() -> &'static Metrics {
+    static METRICS: OnceLock<Metrics> = OnceLock::new();
+    METRICS.get_or_init(Metrics::new)
+}
+
+pub fn epoch_secs() -> f64 {
+    SystemTime::now().duration_since(UNIX_EPOCH).map(|d| d.as_secs_f64()).unwrap_or(0.0)
+}
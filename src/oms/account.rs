@@ -31,6 +31,9 @@ pub struct AccountState {
     pub balance: Decimal,
     pub locked: Decimal,
     pub positions: HashMap<String, Position>,
+    /// Realized PnL of positions closed through `on_execution`, before fees.
+    #[serde(default)]
+    pub realized_pnl: Decimal,
 }
 
 impl AccountState {
@@ -39,6 +42,7 @@ impl AccountState {
             balance: Decimal::ZERO,
             locked: Decimal::ZERO,
             positions: HashMap::new(),
+            realized_pnl: Decimal::ZERO,
         }
     }
 
@@ -93,6 +97,13 @@ impl AccountState {
                  let old_qty_dec = Decimal::from_i64(old_qty).unwrap_or_default();
                  let new_qty_dec = Decimal::from_i64(new_qty).unwrap_or_default();
 
+                 // Closing part of the fill realizes PnL against the average price
+                 if (old_qty > 0) != (signed_qty > 0) {
+                     let closed = old_qty.abs().min(signed_qty.abs());
+                     let closed_dec = Decimal::from_i64(closed * old_qty.signum()).unwrap_or_default();
+                     self.realized_pnl += (price - pos.average_price) * closed_dec;
+                 }
+
                  if new_qty == 0 {
                      self.positions.remove(&symbol);
                  } else {
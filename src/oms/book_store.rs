@@ -0,0 +1,64 @@
+use std::collections::HashMap;
+use std::sync::{Arc, Mutex, RwLock};
+use crate::oms::order_book::OrderBook;
+
+/// Per-symbol order book registry.
+///
+/// The outer `RwLock` only guards the symbol -> book map and is write-locked
+/// when a new symbol is first seen. Each book has its own `Mutex`, so an update
+/// to one symbol never blocks readers or writers of another.
+#[derive(Debug, Default)]
+pub struct OrderBookStore {
+    books: RwLock<HashMap<String, Arc<Mutex<OrderBook>>>>,
+}
+
+impl OrderBookStore {
+    pub fn new() -> Self {
+        OrderBookStore {
+            books: RwLock::new(HashMap::new()),
+        }
+    }
+
+    /// Handle to the book for `symbol`, creating an empty one if needed.
+    pub fn entry(&self, symbol: &str) -> Arc<Mutex<OrderBook>> {
+        if let Some(book) = self.books.read().unwrap().get(symbol) {
+            return book.clone();
+        }
+        let mut books = self.books.write().unwrap();
+        books.entry(symbol.to_string())
+            .or_insert_with(|| Arc::new(Mutex::new(OrderBook::new(symbol.to_string()))))
+            .clone()
+    }
+
+    pub fn get(&self, symbol: &str) -> Option<Arc<Mutex<OrderBook>>> {
+        self.books.read().unwrap().get(symbol).cloned()
+    }
+
+    /// Copy of a single book. Only that symbol's lock is taken.
+    pub fn snapshot(&self, symbol: &str) -> Option<OrderBook> {
+        self.get(symbol).map(|b| b.lock().unwrap().clone())
+    }
+
+    /// Replace the book for `symbol` in place (e.g. after a REST snapshot).
+    pub fn replace(&self, symbol: &str, book: OrderBook) {
+        let handle = self.entry(symbol);
+        let mut guard = handle.lock().unwrap();
+        *guard = book;
+    }
+
+    pub fn contains(&self, symbol: &str) -> bool {
+        self.books.read().unwrap().contains_key(symbol)
+    }
+
+    pub fn symbols(&self) -> Vec<String> {
+        self.books.read().unwrap().keys().cloned().collect()
+    }
+
+    pub fn len(&self) -> usize {
+        self.books.read().unwrap().len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.len() == 0
+    }
+}
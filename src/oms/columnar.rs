@@ -0,0 +1,247 @@
+use crate::message::Message;
+use crate::oms::order_book::OrderBook;
+use rust_decimal::prelude::ToPrimitive;
+use rust_decimal::Decimal;
+use std::collections::{HashMap, VecDeque};
+
+// Columnar views of books and ticks for vectorized analytics.
+// Prices are f64 (NaN = no level), quantities i64 (0 = no level).
+
+fn px(d: &Decimal) -> f64 {
+    d.to_f64().unwrap_or(f64::NAN)
+}
+
+/// Little-endian bytes of a column, ready for `numpy.frombuffer(b, "<f8")`.
+pub fn f64_bytes(col: &[f64]) -> Vec<u8> {
+    col.iter().flat_map(|x| x.to_le_bytes()).collect()
+}
+
+/// Little-endian bytes of a column, ready for `numpy.frombuffer(b, "<i8")`.
+pub fn i64_bytes(col: &[i64]) -> Vec<u8> {
+    col.iter().flat_map(|x| x.to_le_bytes()).collect()
+}
+
+/// Top `depth` levels of several books as row-major `symbols x depth` matrices.
+///
+/// Row `i` belongs to `symbols[i]`; level 0 is the best price. Shallow or
+/// missing books are padded with NaN / 0.
+#[derive(Debug, Clone, Default)]
+pub struct BookArrays {
+    pub symbols: Vec<String>,
+    pub depth: usize,
+    pub bid_px: Vec<f64>,
+    pub bid_qty: Vec<i64>,
+    pub ask_px: Vec<f64>,
+    pub ask_qty: Vec<i64>,
+    /// Per symbol; -1 if the book is missing.
+    pub update_id: Vec<i64>,
+    pub timestamp: Vec<f64>,
+}
+
+impl BookArrays {
+    pub fn new(depth: usize) -> Self {
+        BookArrays { depth, ..Default::default() }
+    }
+
+    pub fn push(&mut self, symbol: &str, book: Option<&OrderBook>) {
+        self.symbols.push(symbol.to_string());
+        let start = self.bid_px.len();
+        self.bid_px.resize(start + self.depth, f64::NAN);
+        self.bid_qty.resize(start + self.depth, 0);
+        self.ask_px.resize(start + self.depth, f64::NAN);
+        self.ask_qty.resize(start + self.depth, 0);
+        let Some(book) = book else {
+            self.update_id.push(-1);
+            self.timestamp.push(f64::NAN);
+            return;
+        };
+        for (i, (p, q)) in book.bids.iter().rev().take(self.depth).enumerate() {
+            self.bid_px[start + i] = px(p);
+            self.bid_qty[start + i] = *q;
+        }
+        for (i, (p, q)) in book.asks.iter().take(self.depth).enumerate() {
+            self.ask_px[start + i] = px(p);
+            self.ask_qty[start + i] = *q;
+        }
+        self.update_id.push(book.last_update_id);
+        self.timestamp.push(book.timestamp);
+    }
+
+    pub fn len(&self) -> usize {
+        self.symbols.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.symbols.is_empty()
+    }
+}
+
+/// Columns of a tick history, oldest first.
+#[derive(Debug, Clone, Default, PartialEq)]
+pub struct TickColumns {
+    pub timestamp: Vec<f64>,
+    pub bid_px: Vec<f64>,
+    pub bid_qty: Vec<i64>,
+    pub ask_px: Vec<f64>,
+    pub ask_qty: Vec<i64>,
+    /// Last market trade as of this tick.
+    pub last_px: Vec<f64>,
+    pub last_qty: Vec<i64>,
+    /// 0 = book update, 1 = market trade.
+    pub kind: Vec<i64>,
+}
+
+impl TickColumns {
+    pub fn len(&self) -> usize {
+        self.timestamp.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.timestamp.is_empty()
+    }
+}
+
+pub const TICK_BOOK: i64 = 0;
+pub const TICK_TRADE: i64 = 1;
+
+#[derive(Debug, Clone, Copy)]
+struct Tick {
+    timestamp: f64,
+    bid_px: f64,
+    bid_qty: i64,
+    ask_px: f64,
+    ask_qty: i64,
+    last_px: f64,
+    last_qty: i64,
+    kind: i64,
+}
+
+/// Bounded per-symbol history of top-of-book and last trade.
+///
+/// A row is added for every book message that moves the best bid/ask and for
+/// every market trade; once `capacity` rows are held the oldest is dropped.
+#[derive(Debug)]
+pub struct TickHistory {
+    capacity: usize,
+    ticks: VecDeque<Tick>,
+    last: Option<Tick>,
+}
+
+impl TickHistory {
+    pub fn new(capacity: usize) -> Self {
+        TickHistory { capacity: capacity.max(1), ticks: VecDeque::new(), last: None }
+    }
+
+    fn push(&mut self, tick: Tick) {
+        if self.ticks.len() == self.capacity {
+            self.ticks.pop_front();
+        }
+        self.ticks.push_back(tick);
+        self.last = Some(tick);
+    }
+
+    pub fn on_book(&mut self, book: &OrderBook) {
+        let (bid, ask) = book.top_of_book();
+        let (bid_px, bid_qty) = bid.map(|(p, q)| (px(&p), q)).unwrap_or((f64::NAN, 0));
+        let (ask_px, ask_qty) = ask.map(|(p, q)| (px(&p), q)).unwrap_or((f64::NAN, 0));
+        let (last_px, last_qty) = self.last.map(|t| (t.last_px, t.last_qty)).unwrap_or((f64::NAN, 0));
+        if let Some(t) = &self.last {
+            // Depth changes below the top are not ticks
+            let same = |a: f64, b: f64| a == b || (a.is_nan() && b.is_nan());
+            if same(t.bid_px, bid_px) && t.bid_qty == bid_qty && same(t.ask_px, ask_px) && t.ask_qty == ask_qty {
+                return;
+            }
+        }
+        self.push(Tick { timestamp: book.timestamp, bid_px, bid_qty, ask_px, ask_qty, last_px, last_qty, kind: TICK_BOOK });
+    }
+
+    pub fn on_trade(&mut self, price: &Decimal, quantity: i64, timestamp: f64) {
+        let mut tick = self.last.unwrap_or(Tick {
+            timestamp,
+            bid_px: f64::NAN,
+            bid_qty: 0,
+            ask_px: f64::NAN,
+            ask_qty: 0,
+            last_px: f64::NAN,
+            last_qty: 0,
+            kind: TICK_TRADE,
+        });
+        tick.timestamp = timestamp;
+        tick.last_px = px(price);
+        tick.last_qty = quantity;
+        tick.kind = TICK_TRADE;
+        self.push(tick);
+    }
+
+    pub fn len(&self) -> usize {
+        self.ticks.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.ticks.is_empty()
+    }
+
+    /// The newest `last_n` rows (all if `None`), oldest first.
+    pub fn columns(&self, last_n: Option<usize>) -> TickColumns {
+        let n = last_n.unwrap_or(self.ticks.len()).min(self.ticks.len());
+        let mut cols = TickColumns::default();
+        for t in self.ticks.iter().skip(self.ticks.len() - n) {
+            cols.timestamp.push(t.timestamp);
+            cols.bid_px.push(t.bid_px);
+            cols.bid_qty.push(t.bid_qty);
+            cols.ask_px.push(t.ask_px);
+            cols.ask_qty.push(t.ask_qty);
+            cols.last_px.push(t.last_px);
+            cols.last_qty.push(t.last_qty);
+            cols.kind.push(t.kind);
+        }
+        cols
+    }
+}
+
+/// Tick histories for every symbol seen, fed from the message stream.
+#[derive(Debug)]
+pub struct TickStore {
+    capacity: usize,
+    histories: HashMap<String, TickHistory>,
+}
+
+impl TickStore {
+    /// `capacity` rows per symbol; 0 disables recording.
+    pub fn new(capacity: usize) -> Self {
+        TickStore { capacity, histories: HashMap::new() }
+    }
+
+    fn history(&mut self, symbol: &str) -> &mut TickHistory {
+        let capacity = self.capacity;
+        self.histories.entry(symbol.to_string()).or_insert_with(|| TickHistory::new(capacity))
+    }
+
+    /// Record `msg`. `book` is the symbol's book with `msg` already applied.
+    pub fn record(&mut self, msg: &Message, book: Option<&OrderBook>) {
+        if self.capacity == 0 {
+            return;
+        }
+        match msg {
+            Message::OrderBookSnapshot(_) | Message::OrderBookUpdate { .. } => {
+                if let Some(book) = book {
+                    self.history(&book.symbol).on_book(book);
+                }
+            },
+            Message::MarketTrade { symbol, price, quantity, timestamp } => {
+                self.history(symbol).on_trade(price, *quantity, *timestamp);
+            },
+            _ => {},
+        }
+    }
+
+    pub fn get(&self, symbol: &str) -> Option<&TickHistory> {
+        self.histories.get(symbol)
+    }
+
+    pub fn symbols(&self) -> Vec<String> {
+        let mut symbols: Vec<String> = self.histories.keys().cloned().collect();
+        symbols.sort();
+        symbols
+    }
+}
@@ -0,0 +1,194 @@
+use crate::oms::order::OrderSide;
+use crate::oms::order_book::{OrderBook, OrderBookDelta, OrderBookSnapshot};
+use rust_decimal::Decimal;
+use std::collections::{BTreeMap, HashMap};
+use std::sync::{Arc, Mutex, RwLock};
+
+/// Best bid and offer across venues, and where each sits.
+#[derive(Debug, Clone, Default, PartialEq)]
+pub struct VenueBbo {
+    pub bid: Option<(Decimal, i64)>,
+    pub bid_venue: Option<String>,
+    pub ask: Option<(Decimal, i64)>,
+    pub ask_venue: Option<String>,
+}
+
+/// One symbol's book on several venues, plus their sum.
+///
+/// Venue updates change only the levels they touch, and each touched level
+/// is folded into the merged ladder by the quantity difference, so full books
+/// are never re-merged. The cross-venue BBO is refreshed after each update
+/// and read without any work.
+#[derive(Debug, Clone)]
+pub struct ConsolidatedBook {
+    symbol: String,
+    venues: BTreeMap<String, OrderBook>,
+    merged: OrderBook,
+    bbo: VenueBbo,
+    seq: i64,
+}
+
+impl ConsolidatedBook {
+    pub fn new(symbol: &str) -> Self {
+        ConsolidatedBook {
+            symbol: symbol.to_string(),
+            venues: BTreeMap::new(),
+            merged: OrderBook::new(symbol.to_string()),
+            bbo: VenueBbo::default(),
+            seq: 0,
+        }
+    }
+
+    /// Sum of all venues; `last_update_id` counts merged updates.
+    pub fn merged(&self) -> &OrderBook {
+        &self.merged
+    }
+
+    pub fn venue_book(&self, venue: &str) -> Option<&OrderBook> {
+        self.venues.get(venue)
+    }
+
+    pub fn venues(&self) -> impl Iterator<Item = &str> {
+        self.venues.keys().map(|v| v.as_str())
+    }
+
+    pub fn bbo(&self) -> &VenueBbo {
+        &self.bbo
+    }
+
+    /// Venue with the best price for an order on `side` (the best ask for a buy).
+    pub fn best_venue(&self, side: &OrderSide) -> Option<&str> {
+        match side {
+            OrderSide::BUY => self.bbo.ask_venue.as_deref(),
+            OrderSide::SELL => self.bbo.bid_venue.as_deref(),
+        }
+    }
+
+    /// Fold a venue snapshot in. Returns the merged levels that changed
+    /// (absolute quantities, 0 = level gone).
+    pub fn apply_snapshot(&mut self, venue: &str, snapshot: &OrderBookSnapshot) -> OrderBookDelta {
+        let book = self.venue_entry(venue);
+        let delta = book.diff_snapshot(snapshot);
+        self.merge(venue, &delta.bids, &delta.asks, snapshot.timestamp)
+    }
+
+    /// Fold a venue delta in. Stale deltas (older than the venue book) are ignored.
+    pub fn apply_delta(&mut self, venue: &str, delta: &OrderBookDelta) -> OrderBookDelta {
+        if delta.timestamp < self.venue_entry(venue).timestamp {
+            return self.empty_delta(delta.timestamp);
+        }
+        self.merge(venue, &delta.bids, &delta.asks, delta.timestamp)
+    }
+
+    /// Drop a venue (e.g. its session closed) and take its liquidity out of the merged book.
+    pub fn remove_venue(&mut self, venue: &str) -> OrderBookDelta {
+        let Some(book) = self.venues.get(venue) else {
+            return self.empty_delta(self.merged.timestamp);
+        };
+        let bids: Vec<_> = book.bids.keys().map(|p| (*p, 0)).collect();
+        let asks: Vec<_> = book.asks.keys().map(|p| (*p, 0)).collect();
+        let delta = self.merge(venue, &bids, &asks, self.merged.timestamp);
+        self.venues.remove(venue);
+        self.refresh_bbo();
+        delta
+    }
+
+    fn venue_entry(&mut self, venue: &str) -> &mut OrderBook {
+        if !self.venues.contains_key(venue) {
+            self.venues.insert(venue.to_string(), OrderBook::new(self.symbol.clone()));
+        }
+        self.venues.get_mut(venue).unwrap()
+    }
+
+    fn empty_delta(&self, timestamp: f64) -> OrderBookDelta {
+        OrderBookDelta { symbol: self.symbol.clone(), bids: Vec::new(), asks: Vec::new(), update_id: self.seq, timestamp }
+    }
+
+    fn merge(&mut self, venue: &str, bids: &[(Decimal, i64)], asks: &[(Decimal, i64)], timestamp: f64) -> OrderBookDelta {
+        let book = self.venues.entry(venue.to_string()).or_insert_with(|| OrderBook::new(self.symbol.clone()));
+        let bids = merge_side(&mut book.bids, &mut self.merged.bids, bids);
+        let asks = merge_side(&mut book.asks, &mut self.merged.asks, asks);
+        book.timestamp = book.timestamp.max(timestamp);
+
+        // Venues are not synchronized; the merged clock only moves forward
+        let timestamp = self.merged.timestamp.max(timestamp);
+        if !bids.is_empty() || !asks.is_empty() {
+            self.seq += 1;
+            self.merged.last_update_id = self.seq;
+            self.merged.timestamp = timestamp;
+            self.refresh_bbo();
+        }
+        OrderBookDelta { symbol: self.symbol.clone(), bids, asks, update_id: self.seq, timestamp }
+    }
+
+    fn refresh_bbo(&mut self) {
+        let (bid, ask) = self.merged.top_of_book();
+        // A handful of venues, each an O(log n) peek
+        let at = |price: Option<Decimal>, pick: fn(&OrderBook) -> Option<(Decimal, i64)>| {
+            let price = price?;
+            self.venues
+                .iter()
+                .filter_map(|(v, b)| pick(b).filter(|(p, _)| *p == price).map(|(_, q)| (v, q)))
+                .max_by_key(|(_, q)| *q)
+                .map(|(v, _)| v.clone())
+        };
+        let bid_venue = at(bid.map(|b| b.0), OrderBook::get_best_bid);
+        let ask_venue = at(ask.map(|a| a.0), OrderBook::get_best_ask);
+        self.bbo = VenueBbo { bid, bid_venue, ask, ask_venue };
+    }
+}
+
+// Apply venue level changes and fold each difference into the merged side
+fn merge_side(venue: &mut BTreeMap<Decimal, i64>, merged: &mut BTreeMap<Decimal, i64>, changes: &[(Decimal, i64)]) -> Vec<(Decimal, i64)> {
+    let mut out = Vec::new();
+    for (price, qty) in changes {
+        let new = (*qty).max(0);
+        let old = venue.get(price).copied().unwrap_or(0);
+        if new == old {
+            continue;
+        }
+        if new == 0 {
+            venue.remove(price);
+        } else {
+            venue.insert(*price, new);
+        }
+        let total = merged.get(price).copied().unwrap_or(0) + new - old;
+        if total > 0 {
+            merged.insert(*price, total);
+        } else {
+            merged.remove(price);
+        }
+        out.push((*price, total.max(0)));
+    }
+    out
+}
+
+/// Per-symbol consolidated books, locked per symbol like `OrderBookStore`.
+#[derive(Debug, Default)]
+pub struct ConsolidatedStore {
+    books: RwLock<HashMap<String, Arc<Mutex<ConsolidatedBook>>>>,
+}
+
+impl ConsolidatedStore {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub fn entry(&self, symbol: &str) -> Arc<Mutex<ConsolidatedBook>> {
+        if let Some(book) = self.books.read().unwrap().get(symbol) {
+            return book.clone();
+        }
+        let mut books = self.books.write().unwrap();
+        books.entry(symbol.to_string())
+            .or_insert_with(|| Arc::new(Mutex::new(ConsolidatedBook::new(symbol))))
+            .clone()
+    }
+
+    pub fn get(&self, symbol: &str) -> Option<Arc<Mutex<ConsolidatedBook>>> {
+        self.books.read().unwrap().get(symbol).cloned()
+    }
+
+    pub fn bbo(&self, symbol: &str) -> Option<VenueBbo> {
+        self.get(symbol).map(|b| b.lock().unwrap().bbo().clone())
+    }
+}
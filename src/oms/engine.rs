@@ -1,53 +1,179 @@
 use pyo3::prelude::*;
+use pyo3::types::{PyBool, PyDict, PyString};
 // use pyo3::types::PyDict;
 use std::collections::HashMap;
-use std::sync::{Arc, Mutex};
+use std::sync::{Arc, Mutex, Condvar};
+use std::sync::atomic::{AtomicBool, Ordering};
 use std::thread;
-use std::time::Duration;
+use std::collections::VecDeque;
+use std::time::{Duration, Instant};
 use crate::oms::order::{Order, OrderState, ExecutionStrategy, OrderSide, OrderType};
 use crate::oms::order_book::OrderBook;
+use crate::oms::order_store::OrderStore;
 use crate::oms::account::AccountState;
+use crate::oms::risk::{RiskGate, RiskLimits, RiskStats};
+use crate::oms::pnl::{Crossing, PnlCallback, PnlMetric, PnlSummary, PnlTracker, PositionPnl};
 use crate::adapter::Adapter;
+use crate::adapter::router::VenueRouter;
+use crate::oms::consolidated::VenueBbo;
 use crate::logger::Logger;
+use crate::logger::queue::LogHandle;
 use crate::logger::message::Message;
 use uuid::Uuid;
 use chrono::Local;
-use std::sync::mpsc::Receiver;
+use std::sync::mpsc::{self, Receiver, Sender};
 use crate::adapter::{IncomingMessage};
+use crate::message::ConnectionStatus;
+use crate::state::{StateSnapshot, StateStore};
 use rust_decimal::Decimal;
 use rust_decimal::prelude::{FromPrimitive, FromStr};
 use crate::strategy::base::StrategyAction;
+use crate::strategy::registry::StrategyRegistry;
+use crate::utils::{batch_to_py, concurrent_map};
+use crate::metrics::{self, MetricsSnapshot, Stage};
 // use anyhow::anyhow;
 
 #[derive(Clone)]
 pub struct OMSEngine {
     adapter: Arc<dyn Adapter>,
-    order_books: Arc<Mutex<HashMap<String, OrderBook>>>,
     account: Arc<Mutex<AccountState>>,
-    orders: Arc<Mutex<HashMap<String, Order>>>,
+    orders: Arc<Mutex<OrderStore>>,
     is_running: Arc<Mutex<bool>>,
     // margin_requirement: Decimal,
 
-    active_strategies: Arc<Mutex<Vec<Box<dyn crate::strategy::base::Strategy + Send + Sync>>>>,
+    active_strategies: Arc<Mutex<StrategyRegistry>>,
+    // Wakes the timer thread (paired with the active_strategies mutex)
+    timer_wakeup: Arc<Condvar>,
     logger: Arc<Mutex<Logger>>,
+    // Producer side of `logger`, used without the mutex
+    log: LogHandle,
+    // Books live here (applied in place), plus the published copies of orders and the account
+    state: Arc<StateStore>,
+    // Get every gateway message once the engine has handled it (e.g. a `Client`)
+    listeners: Arc<Mutex<Vec<Sender<IncomingMessage>>>>,
+    // A resync thread is running / another pass was asked for while it ran
+    resyncing: Arc<AtomicBool>,
+    resync_requested: Arc<AtomicBool>,
+    // Key of `account` in `state`
+    account_id: Arc<Mutex<String>>,
+    // Positions marked to the live books (locked after `account`)
+    pnl: Arc<Mutex<PnlTracker>>,
+    // Pre-trade limits, checked before anything reaches the adapter
+    risk: Arc<Mutex<RiskGate>>,
+    // Same object as `adapter` when built with `with_venues`
+    router: Option<Arc<VenueRouter>>,
+}
+
+fn now_epoch() -> f64 {
+    Local::now().timestamp_micros() as f64 / 1_000_000.0
 }
 
 impl OMSEngine {
     pub fn new(adapter: Arc<dyn Adapter>, logger: Arc<Mutex<Logger>>) -> Self {
+        Self::with_state_store(adapter, logger, Arc::new(StateStore::new()))
+    }
+
+    /// Engine publishing into a store shared with other readers (e.g. a `Client`).
+    pub fn with_state_store(adapter: Arc<dyn Adapter>, logger: Arc<Mutex<Logger>>, state: Arc<StateStore>) -> Self {
         OMSEngine {
             adapter,
-            order_books: Arc::new(Mutex::new(HashMap::new())),
             account: Arc::new(Mutex::new(AccountState::new())),
-            orders: Arc::new(Mutex::new(HashMap::new())),
+            orders: Arc::new(Mutex::new(OrderStore::new())),
             is_running: Arc::new(Mutex::new(false)),
             // margin_requirement: Decimal::from_f64(margin_requirement).unwrap_or(Decimal::ONE),
-            active_strategies: Arc::new(Mutex::new(Vec::new())),
+            active_strategies: Arc::new(Mutex::new(StrategyRegistry::new())),
+            timer_wakeup: Arc::new(Condvar::new()),
+            log: logger.lock().unwrap().handle(),
             logger,
+            state,
+            listeners: Arc::new(Mutex::new(Vec::new())),
+            resyncing: Arc::new(AtomicBool::new(false)),
+            resync_requested: Arc::new(AtomicBool::new(false)),
+            account_id: Arc::new(Mutex::new("default".to_string())),
+            pnl: Arc::new(Mutex::new(PnlTracker::new())),
+            risk: Arc::new(Mutex::new(RiskGate::new(RiskLimits::default()))),
+            router: None,
         }
     }
 
-    pub fn start(&self, _py: Python, account_id: Option<String>) -> PyResult<()> {
-        self.start_internal(account_id).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    /// Engine over several venues. Orders route by `Order.exchange` ("SOR" picks
+    /// the best-priced venue) and books are consolidated across venues. The
+    /// first venue is the default.
+    pub fn with_venues(venues: Vec<(String, Arc<dyn Adapter>)>, logger: Arc<Mutex<Logger>>) -> anyhow::Result<Self> {
+        let router = Arc::new(VenueRouter::new(venues)?);
+        let mut engine = Self::new(router.clone(), logger);
+        engine.router = Some(router);
+        Ok(engine)
+    }
+
+    pub fn router(&self) -> Option<Arc<VenueRouter>> {
+        self.router.clone()
+    }
+
+    /// Best bid/offer across venues and the venue holding each. Multi-venue engines only.
+    pub fn consolidated_bbo(&self, symbol: &str) -> Option<VenueBbo> {
+        self.router.as_ref().and_then(|r| r.bbo(symbol))
+    }
+
+    /// One venue's book for `symbol`. Multi-venue engines only.
+    pub fn venue_book(&self, symbol: &str, venue: &str) -> Option<OrderBook> {
+        let book = self.router.as_ref()?.books().get(symbol)?;
+        let book = book.lock().unwrap();
+        book.venue_book(venue).cloned()
+    }
+
+    /// Tick-to-order stage latencies and channel depth. Process-wide: adapters
+    /// record the parse stage before a message reaches any engine.
+    pub fn get_metrics(&self) -> MetricsSnapshot {
+        metrics::global().snapshot()
+    }
+
+    /// Write the metrics as Prometheus text to `path`.
+    pub fn dump_metrics(&self, path: &str) -> anyhow::Result<()> {
+        metrics::global().write_prometheus(std::path::Path::new(path))
+    }
+
+    pub fn state_store(&self) -> Arc<StateStore> {
+        self.state.clone()
+    }
+
+    pub fn adapter(&self) -> Arc<dyn Adapter> {
+        self.adapter.clone()
+    }
+
+    pub fn logger(&self) -> Arc<Mutex<Logger>> {
+        self.logger.clone()
+    }
+
+    /// Every message the gateway listener receives, passed on after the engine
+    /// has applied it. Dropping the receiver unsubscribes.
+    pub fn subscribe_messages(&self) -> Receiver<IncomingMessage> {
+        let (tx, rx) = mpsc::channel();
+        self.listeners.lock().unwrap().push(tx);
+        rx
+    }
+
+    /// Consistent, immutable view of books, orders and the account. No copying;
+    /// hold it as long as needed.
+    pub fn snapshot(&self) -> Arc<StateSnapshot> {
+        self.state.snapshot()
+    }
+
+    // Publish the current copy of an order (or its removal)
+    fn publish_order(&self, order_id: &str) {
+        let order = self.orders.lock().unwrap().find(order_id);
+        self.state.update(|txn| match order {
+            Some(o) => txn.put_order(o),
+            None => txn.remove_order(order_id),
+        });
+    }
+
+    fn publish_book(&self, book: OrderBook) {
+        self.state.update(|txn| txn.put_order_book(book));
+    }
+
+    pub fn start(&self, py: Python, account_id: Option<String>) -> PyResult<()> {
+        py.allow_threads(|| self.start_internal(account_id)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
     pub fn start_internal(&self, account_id: Option<String>) -> anyhow::Result<()> {
@@ -72,64 +198,122 @@ impl OMSEngine {
             l.start();
         }
         
-        // Background Thread with Periodic Strategy Check
+        // Background Timer Thread
         let engine = self.clone();
-        
-        thread::spawn(move || {
-            loop {
-                {
-                    let r = engine.is_running.lock().unwrap();
-                    if !*r {
-                        break;
-                    }
-                }
-                
-                // Periodic Strategy Check
-                engine.check_strategies();
-                
-                thread::sleep(Duration::from_millis(100)); // 100ms interval
-            }
-        });
+        thread::spawn(move || engine.run_timer_loop());
 
         Ok(())
     }
+
+    /// Sleeps until the earliest strategy deadline, or until a new earlier one is
+    /// registered, then fires the due `on_timer` callbacks.
+    /// With no time-triggered strategy the thread blocks on the condvar and uses no CPU.
+    fn run_timer_loop(&self) {
+        let mut strats = self.active_strategies.lock().unwrap();
+        loop {
+            if !*self.is_running.lock().unwrap() {
+                break;
+            }
+            strats.take_timer_changed();
+            
+            let now = now_epoch();
+            let actions = strats.fire_due_timers(now);
+            if !actions.is_empty() {
+                drop(strats);
+                self.process_actions(actions);
+                strats = self.active_strategies.lock().unwrap();
+                continue;
+            }
+            
+            strats = match strats.next_deadline() {
+                Some(deadline) => {
+                    let wait = Duration::from_secs_f64((deadline - now).max(0.0));
+                    self.timer_wakeup.wait_timeout(strats, wait).unwrap().0
+                },
+                None => self.timer_wakeup.wait(strats).unwrap(),
+            };
+        }
+    }
+
+    /// Wake the timer thread if `strats` armed a deadline earlier than the one it sleeps on.
+    fn wake_timer_if_needed(&self, strats: &mut StrategyRegistry) {
+        if strats.take_timer_changed() {
+            self.timer_wakeup.notify_one();
+        }
+    }
     
+    /// Fire due strategy timers immediately (the timer thread does this automatically).
     pub fn check_strategies(&self) {
         let mut strats = self.active_strategies.lock().unwrap();
         
         // Remove completed strategies
-        strats.retain(|s| !s.is_completed());
+        strats.purge_completed();
         
-        let mut actions = Vec::new();
-        
-        for strat in strats.iter_mut() {
-            if let Ok(action) = strat.on_timer() {
-                if !matches!(action, StrategyAction::None) {
-                     actions.push(action);
-                }
-            }
-        }
+        let actions = strats.fire_due_timers(now_epoch());
         drop(strats);
         
+        self.process_actions(actions);
+    }
+
+    fn process_action(&self, action: StrategyAction) {
+        match action {
+             StrategyAction::PlaceOrder(o) => { let _ = self.send_order_internal(o); },
+             StrategyAction::CancelOrder(oid) => { let _ = self.cancel_order_internal(oid); },
+             StrategyAction::ModifyPrice(oid, price) => { let _ = self.modify_order_internal(oid, price); },
+             StrategyAction::RemoveOrder(oid) => { let _ = self.remove_order_internal(oid); },
+             StrategyAction::None => {}
+        }
+    }
+
+    fn process_actions(&self, actions: Vec<StrategyAction>) {
+        // Actions on the same order keep their order; different orders go out
+        // concurrently on at most `BATCH_WORKERS` threads, and the adapter bounds
+        // in-flight requests and rate underneath.
+        let mut groups: Vec<Vec<StrategyAction>> = Vec::new();
+        let mut by_order: HashMap<String, usize> = HashMap::new();
         for action in actions {
-             match action {
-                  StrategyAction::PlaceOrder(o) => { let _ = self.send_order_internal(o); },
-                  StrategyAction::CancelOrder(oid) => { let _ = self.cancel_order_internal(oid); },
-                  StrategyAction::ModifyPrice(oid, price) => { let _ = self.modify_order_internal(oid, price); },
-                  StrategyAction::RemoveOrder(oid) => { let _ = self.remove_order_internal(oid); },
-                  StrategyAction::None => {}
-             }
+            let key = match &action {
+                StrategyAction::PlaceOrder(o) => o.order_id.clone(),
+                StrategyAction::CancelOrder(oid)
+                | StrategyAction::ModifyPrice(oid, _)
+                | StrategyAction::RemoveOrder(oid) => Some(oid.clone()),
+                StrategyAction::None => continue,
+            };
+            match key {
+                Some(k) => {
+                    let idx = *by_order.entry(k).or_insert_with(|| {
+                        groups.push(Vec::new());
+                        groups.len() - 1
+                    });
+                    groups[idx].push(action);
+                },
+                None => groups.push(vec![action]),
+            }
         }
+
+        if groups.len() <= 1 {
+            for action in groups.into_iter().flatten() {
+                self.process_action(action);
+            }
+            return;
+        }
+        concurrent_map(groups, |group| {
+            for action in group {
+                self.process_action(action);
+            }
+        });
     }
     
     pub fn get_active_strategy_order_ids(&self) -> Vec<String> {
         let strats = self.active_strategies.lock().unwrap();
-        strats.iter().filter_map(|s| s.get_origin_order_id()).collect()
+        strats.origin_order_ids()
     }
     
     pub fn remove_order_internal(&self, order_id: String) -> anyhow::Result<()> {
         let mut orders = self.orders.lock().unwrap();
         orders.remove(&order_id);
+        drop(orders);
+        self.publish_order(&order_id);
         Ok(())
     }
 
@@ -143,15 +327,17 @@ impl OMSEngine {
              return Err(anyhow::anyhow!("Order not found"));
         };
         // Update local order state? 
-        if let Some(order) = orders.get_mut(&order_id) {
+        orders.update(&order_id, |order| {
             order.price = price;
             if price.is_none() { order.order_type = OrderType::MARKET; }
             // If price is Some, keep it as LIMIT (or update to LIMIT if it was MARKET?)
             // Usually Stop Strategy is Limit -> Market or Limit -> Different Limit.
             // If price is Some, it is Limit.
             else { order.order_type = OrderType::LIMIT; }
-        }
+        });
         drop(orders);
+        self.publish_order(&order_id);
+        self.risk.lock().unwrap().on_modify(&order_id, price);
         
         // Ensure book exists? modify_order doesn't need book.
         
@@ -161,8 +347,8 @@ impl OMSEngine {
         Ok(())
     }
 
-    pub fn stop(&self, _py: Python) -> PyResult<()> {
-        self.stop_internal().map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    pub fn stop(&self, py: Python) -> PyResult<()> {
+        py.allow_threads(|| self.stop_internal()).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
     pub fn stop_internal(&self) -> anyhow::Result<()> {
@@ -170,6 +356,11 @@ impl OMSEngine {
             let mut r = self.is_running.lock().unwrap();
             *r = false;
         }
+        // Wake the timer thread so it sees is_running == false
+        {
+            let _strats = self.active_strategies.lock().unwrap();
+            self.timer_wakeup.notify_all();
+        }
         // Stop logger
         {
             let mut l = self.logger.lock().unwrap();
@@ -180,30 +371,35 @@ impl OMSEngine {
         Ok(())
     }
 
-    pub fn initialize_symbol(&self, _py: Python, symbol: String) -> PyResult<()> {
-        self.initialize_symbol_internal(symbol).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))
+    pub fn initialize_symbol(&self, py: Python, symbol: String) -> PyResult<()> {
+        py.allow_threads(|| self.initialize_symbol_internal(symbol)).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))
     }
 
     pub fn initialize_symbol_internal(&self, symbol: String) -> anyhow::Result<()> {
         let snapshot = self.adapter.get_order_book_snapshot(&symbol)?;
-        let mut books = self.order_books.lock().unwrap();
-        books.insert(symbol.clone(), snapshot);
+        self.publish_book(snapshot);
         Ok(())
     }
     
-    pub fn initialize_account(&self, _py: Python, account_id: String) -> PyResult<()> {
-        self.initialize_account_internal(account_id).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))
+    pub fn initialize_account(&self, py: Python, account_id: String) -> PyResult<()> {
+        py.allow_threads(|| self.initialize_account_internal(account_id)).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))
     }
 
     pub fn initialize_account_internal(&self, account_id: String) -> anyhow::Result<()> {
         let snapshot = self.adapter.get_account_snapshot(&account_id)?;
         let mut acct = self.account.lock().unwrap();
-        *acct = snapshot;
+        *acct = snapshot.clone();
+        *self.account_id.lock().unwrap() = account_id.clone();
+        self.risk.lock().unwrap().reset_positions(&acct);
+        let fired = self.pnl.lock().unwrap().reset(&acct);
+        drop(acct);
+        self.fire_pnl_callbacks(fired);
+        self.state.update(|txn| txn.put_account(&account_id, snapshot));
         Ok(())
     }
 
-    pub fn send_order(&self, _py: Python, order: Order) -> PyResult<String> {
-        self.send_order_internal(order).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    pub fn send_order(&self, py: Python, order: Order) -> PyResult<String> {
+        py.allow_threads(|| self.send_order_internal(order)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
     pub fn send_order_internal(&self, mut order: Order) -> anyhow::Result<String> {
@@ -212,6 +408,16 @@ impl OMSEngine {
         }
         
         let order_id_clone = order.order_id.clone();
+
+        if let Err(reject) = self.risk.lock().unwrap().check(&order) {
+            let body = serde_json::json!({
+                "order_id": order_id_clone,
+                "symbol": order.symbol,
+                "reason": reject.to_string(),
+            });
+            self.log.log_lazy("RISK_REJECT".to_string(), Box::new(move || body));
+            return Err(reject.into());
+        }
         
         // Strategy Handling
         match order.strategy {
@@ -244,7 +450,8 @@ impl OMSEngine {
                          
                          {
                              let mut strats = self.active_strategies.lock().unwrap();
-                             strats.push(Box::new(strat));
+                             strats.add(Box::new(strat));
+                             self.wake_timer_if_needed(&mut strats);
                          }
                     } else {
                         println!("Failed to parse trigger price for Stop Order");
@@ -277,7 +484,8 @@ impl OMSEngine {
                 
                 {
                     let mut strats = self.active_strategies.lock().unwrap();
-                    strats.push(Box::new(strat));
+                    strats.add(Box::new(strat));
+                    self.wake_timer_if_needed(&mut strats);
                 }
                 
                 let mut orders = self.orders.lock().unwrap();
@@ -295,14 +503,29 @@ impl OMSEngine {
              }
         }
         
-        let success = self.adapter.place_order(&order)?;
+        let sent = Instant::now();
+        let placed = self.adapter.place_order(&order);
+        metrics::global().record_since(Stage::PlaceOrder, sent);
+        let success = match placed {
+            Ok(success) => success,
+            Err(e) => {
+                // Never reached the venue: rejected, so nothing stays reserved or
+                // looks open to `open_orders` / `cancel_all`
+                match &order_id_clone {
+                    Some(oid) => {
+                        self.on_order_status_update(oid, OrderState::REJECTED, Some(format!("Adapter Send Failed: {}", e)));
+                        self.publish_order(oid);
+                    },
+                    None => self.risk.lock().unwrap().on_status("", &OrderState::REJECTED),
+                }
+                return Err(e);
+            },
+        };
         
         if !success {
              let mut orders = self.orders.lock().unwrap();
              if let Some(oid) = &order.order_id {
-                 if let Some(o) = orders.get_mut(oid) {
-                     o.update_state(OrderState::REJECTED, Some("Adapter Send Failed".into()));
-                 }
+                 orders.update(oid, |o| o.update_state(OrderState::REJECTED, Some("Adapter Send Failed".into())));
              }
         }
         
@@ -311,22 +534,24 @@ impl OMSEngine {
                  self.on_order_status_update(oid, OrderState::REJECTED, Some("Adapter Placement Failed".into()));
              }
         }
+        if let Some(oid) = &order_id_clone {
+            self.publish_order(oid);
+        }
 
         Ok(order_id_clone.unwrap_or_default())
     }
 
-    pub fn cancel_order(&self, _py: Python, order_id: String) -> PyResult<()> {
-        self.cancel_order_internal(order_id).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    pub fn cancel_order(&self, py: Python, order_id: String) -> PyResult<()> {
+        py.allow_threads(|| self.cancel_order_internal(order_id)).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
     }
 
     pub fn cancel_order_internal(&self, order_id: String) -> anyhow::Result<()> {
         let mut orders = self.orders.lock().unwrap();
-        if let Some(order) = orders.get_mut(&order_id) {
-            order.update_state(OrderState::PENDING_CANCEL, None);
-        } else {
+        if orders.update(&order_id, |order| order.update_state(OrderState::PENDING_CANCEL, None)).is_none() {
              return Err(anyhow::anyhow!("Order not found"));
         }
         drop(orders);
+        self.publish_order(&order_id);
         
         let success = self.adapter.cancel_order(&order_id)?;
             
@@ -337,7 +562,7 @@ impl OMSEngine {
                 "success": success
             })
         );
-        self.logger.lock().unwrap().log(msg);
+        self.log.log(msg);
             
         if !success {
              // Handle failure
@@ -345,11 +570,56 @@ impl OMSEngine {
         
         Ok(())
     }
+
+    /// Send several orders at once; results are in input order. Each order goes
+    /// through `send_order_internal` (risk checks included), with the adapter
+    /// calls overlapping on up to `utils::BATCH_WORKERS` threads.
+    pub fn send_orders_internal(&self, orders: Vec<Order>) -> Vec<anyhow::Result<String>> {
+        concurrent_map(orders, |order| self.send_order_internal(order))
+    }
+
+    pub fn send_orders(&self, py: Python, orders: Vec<Order>) -> Vec<PyObject> {
+        let results = py.allow_threads(|| self.send_orders_internal(orders));
+        batch_to_py(py, results, |py, id| PyString::new(py, &id).into_any().unbind())
+    }
+
+    pub fn cancel_orders_internal(&self, order_ids: Vec<String>) -> Vec<anyhow::Result<()>> {
+        concurrent_map(order_ids, |id| self.cancel_order_internal(id))
+    }
+
+    pub fn cancel_orders(&self, py: Python, order_ids: Vec<String>) -> Vec<PyObject> {
+        let results = py.allow_threads(|| self.cancel_orders_internal(order_ids));
+        batch_to_py(py, results, |py, _| PyBool::new(py, true).to_owned().into_any().unbind())
+    }
+
+    /// Cancel every working order, or only those in `symbol`. Orders with a
+    /// cancel already in flight are skipped.
+    pub fn cancel_all_internal(&self, symbol: Option<&str>) -> Vec<(String, anyhow::Result<()>)> {
+        let ids: Vec<String> = self.orders.lock().unwrap()
+            .open_orders(symbol)
+            .into_iter()
+            .filter_map(|o| o.order_id.clone())
+            .collect();
+        let results = self.cancel_orders_internal(ids.clone());
+        ids.into_iter().zip(results).collect()
+    }
+
+    /// `{order_id: True | exception}` for every order a cancel was sent for.
+    pub fn cancel_all(&self, py: Python, symbol: Option<String>) -> PyResult<PyObject> {
+        let results = py.allow_threads(|| self.cancel_all_internal(symbol.as_deref()));
+        let (ids, results): (Vec<_>, Vec<_>) = results.into_iter().unzip();
+        let dict = PyDict::new(py);
+        for (id, r) in ids.into_iter().zip(batch_to_py(py, results, |py, _| PyBool::new(py, true).to_owned().into_any().unbind())) {
+            dict.set_item(id, r)?;
+        }
+        Ok(dict.into_any().unbind())
+    }
     
     pub fn on_trade_update(&self, order_id: &str, fill_qty: i64, fill_price: Decimal) {
         let mut orders = self.orders.lock().unwrap();
         
-        if let Some(order) = orders.get_mut(order_id) {
+        // A fill that races a cancel still lands, on the archived order
+        let filled = orders.update(order_id, |order| {
              let old_filled = order.filled_quantity;
              let new_filled = old_filled + fill_qty;
              let total_qty = order.quantity;
@@ -365,21 +635,38 @@ impl OMSEngine {
                  order.average_fill_price = (old_val + fill_val) / new_qty_dec;
              }
              
-             order.state = if new_filled >= total_qty { OrderState::FILLED } else { OrderState::PARTIALLY_FILLED };
+             // A late fill on a closed order only adds to its fill
+             if !order.state.is_terminal() {
+                 order.state = if new_filled >= total_qty { OrderState::FILLED } else { OrderState::PARTIALLY_FILLED };
+             }
              order.updated_at = Local::now().timestamp_millis() as f64 / 1000.0;
-             
-             {
+             order.clone()
+        });
+        
+        if let Some(order) = filled {
+             let (account, fired) = {
                  let mut acct = self.account.lock().unwrap();
                  let symbol = order.symbol.clone();
                  let side = match order.side { OrderSide::BUY => "BUY", OrderSide::SELL => "SELL" };
                  
-                  acct.on_execution(symbol, side.to_string(), fill_qty, fill_price, Decimal::ZERO); 
-             }
+                  acct.on_execution(symbol.clone(), side.to_string(), fill_qty, fill_price, Decimal::ZERO); 
+                  self.risk.lock().unwrap().on_fill(order_id, fill_qty, fill_price);
+                  let fired = self.pnl.lock().unwrap().on_fill(&acct, &symbol);
+                  (acct.clone(), fired)
+             };
              
              // Notify Strategies
-             let order_clone = order.clone();
+             let order_clone = order;
              drop(orders); // Drop lock before notifying strategies
+
+             // Fill and position land in the same version
+             let account_id = self.account_id.lock().unwrap().clone();
+             self.state.update(|txn| {
+                 txn.put_order(order_clone.clone());
+                 txn.put_account(&account_id, account);
+             });
              
+             self.fire_pnl_callbacks(fired);
              self.notify_strategies_and_process_actions(&order_clone);
 
              return;
@@ -387,39 +674,27 @@ impl OMSEngine {
     }
 
     fn notify_strategies_and_process_actions(&self, order: &Order) {
+        // Only the strategy owning this order is notified
+        let order_id = order.order_id.as_deref().unwrap_or("");
         let mut strats = self.active_strategies.lock().unwrap();
-        let mut actions = Vec::new();
-        for strat in strats.iter_mut() {
-             if let Ok(action) = strat.on_order_status_update(order) {
-                 if !matches!(action, StrategyAction::None) {
-                     actions.push(action);
-                 }
-             }
-        }
+        let actions = strats.dispatch_order(order_id, |s| s.on_order_status_update(order));
+        self.wake_timer_if_needed(&mut strats);
         drop(strats);
         
-        for action in actions {
-            match action {
-                  StrategyAction::PlaceOrder(o) => { let _ = self.send_order_internal(o); },
-                  StrategyAction::CancelOrder(oid) => { let _ = self.cancel_order_internal(oid); },
-                  StrategyAction::ModifyPrice(oid, price) => { let _ = self.modify_order_internal(oid, price); },
-                  StrategyAction::RemoveOrder(oid) => { let _ = self.remove_order_internal(oid); },
-                  StrategyAction::None => {}
-             }
-        }
+        self.process_actions(actions);
     }
 
     pub fn on_order_status_update(&self, order_id: &str, state: OrderState, msg: Option<String>) {
         let mut orders = self.orders.lock().unwrap();
-        let order_ref = if let Some(order) = orders.get_mut(order_id) {
+        let order_ref = orders.update(order_id, |order| {
              order.update_state(state.clone(), msg);
-             Some(order.clone()) 
-        } else {
-            None
-        };
+             order.clone()
+        });
         drop(orders);
         
+        self.risk.lock().unwrap().on_status(order_id, &state);
         if let Some(order) = order_ref {
+            self.state.update(|txn| txn.put_order(order.clone()));
             self.notify_strategies_and_process_actions(&order);
         }
     }
@@ -432,70 +707,180 @@ impl OMSEngine {
         Ok(())
     }
     
+    /// The account as last published: balance and positions as of the last
+    /// fill or account snapshot. Marks are in `position_pnl`.
+    pub fn account(&self) -> Arc<AccountState> {
+        let account_id = self.account_id.lock().unwrap().clone();
+        self.state.snapshot().account(&account_id).unwrap_or_else(|| Arc::new(AccountState::new()))
+    }
+
+    /// Copy of the account, with positions marked to the live books.
     pub fn get_account(&self) -> AccountState {
-        self.account.lock().unwrap().clone()
+        let mut acct = self.account.lock().unwrap().clone();
+        self.pnl.lock().unwrap().apply_marks(&mut acct);
+        acct
+    }
+
+    /// Account totals (PnL, exposure, margin) as of the last BBO change or fill.
+    pub fn pnl_summary(&self) -> PnlSummary {
+        self.pnl.lock().unwrap().summary()
+    }
+
+    pub fn position_pnl(&self, symbol: &str) -> Option<PositionPnl> {
+        self.pnl.lock().unwrap().position(symbol)
+    }
+
+    /// Margin as a fraction of exposure for `symbol`, or every symbol without its own rate.
+    pub fn set_margin_rate(&self, symbol: Option<&str>, rate: Decimal) {
+        self.pnl.lock().unwrap().set_margin_rate(symbol, rate);
+    }
+
+    /// Call `callback` once each time `metric` crosses `level`. It runs on the
+    /// thread that caused the change (usually the gateway listener), so keep it short.
+    pub fn add_pnl_threshold(&self, metric: PnlMetric, crossing: Crossing, level: Decimal, callback: PnlCallback) -> u64 {
+        self.pnl.lock().unwrap().add_threshold(metric, crossing, level, callback)
+    }
+
+    pub fn remove_pnl_threshold(&self, id: u64) -> bool {
+        self.pnl.lock().unwrap().remove_threshold(id)
+    }
+
+    /// Replace the pre-trade limits. Orders already accepted stay reserved.
+    pub fn set_risk_limits(&self, limits: RiskLimits) {
+        self.risk.lock().unwrap().set_limits(limits);
     }
 
+    pub fn risk_stats(&self) -> RiskStats {
+        self.risk.lock().unwrap().stats()
+    }
+
+    fn fire_pnl_callbacks(&self, fired: Vec<PnlCallback>) {
+        if fired.is_empty() {
+            return;
+        }
+        let summary = self.pnl_summary();
+        for callback in fired {
+            callback(&summary);
+        }
+    }
+
+    /// The live book, as published in the state store. No copy.
+    pub fn order_book(&self, symbol: &str) -> Option<Arc<OrderBook>> {
+        self.state.snapshot().order_book(symbol)
+    }
+
+    /// Owned copy of the book. Prefer `order_book`.
     pub fn get_order_book(&self, symbol: &str) -> Option<OrderBook> {
-        self.order_books.lock().unwrap().get(symbol).cloned()
+        self.order_book(symbol).map(|b| b.as_ref().clone())
     }
     
+    /// A working or archived order.
+    pub fn get_order(&self, order_id: &str) -> Option<Order> {
+        self.orders.lock().unwrap().find(order_id)
+    }
+
+    /// Orders still working (`OrderState::is_open`), optionally in one symbol.
+    /// Only that symbol's working orders are visited.
+    pub fn open_orders(&self, symbol: Option<&str>) -> Vec<Order> {
+        self.orders.lock().unwrap().open_orders(symbol).into_iter().cloned().collect()
+    }
+
+    pub fn open_order_count(&self) -> usize {
+        self.orders.lock().unwrap().open_count()
+    }
+
+    /// Orders moved to the archive after FILLED / CANCELED / REJECTED.
+    pub fn archived_order_count(&self) -> usize {
+        self.orders.lock().unwrap().archive().len()
+    }
+
+    /// Every order of the session, working and archived. Prefer `open_orders`
+    /// or `get_order`, which do not copy the archive.
     pub fn get_orders(&self) -> HashMap<String, Order> {
-        self.orders.lock().unwrap().clone()
+        self.orders.lock().unwrap().to_map()
     }
 
     pub fn on_order_book_information(&self, msg: IncomingMessage) -> PyResult<()> {
-        let (symbol, delta_opt, snapshot_opt) = match msg {
-            IncomingMessage::OrderBookUpdate{symbol, delta} => (symbol, Some(delta), None),
-            IncomingMessage::OrderBookSnapshot(s) => (s.symbol.clone(), None, Some(s)),
+        self.on_book_message(&msg)
+    }
+
+    // Borrowing form, so the gateway listener can still hand the message to the logger afterwards
+    fn on_book_message(&self, msg: &IncomingMessage) -> PyResult<()> {
+        let started = Instant::now();
+        let symbol = match msg {
+            IncomingMessage::OrderBookUpdate{symbol, ..} => symbol.as_str(),
+            IncomingMessage::OrderBookSnapshot(s) => s.symbol.as_str(),
             _ => return Ok(()),
         };
         
-        let mut books = self.order_books.lock().unwrap();
-        let book = books.entry(symbol.clone()).or_insert_with(|| OrderBook::new(symbol.clone()));
-        
-        if let Some(delta) = delta_opt {
-            book.apply_delta(&delta);
-        } else if let Some(snapshot) = snapshot_opt {
-            book.rebuild(snapshot.bids, snapshot.asks, snapshot.update_id, snapshot.timestamp);
-        }
+        // Applied to the published book in place: it is only copied if a reader
+        // still holds the previous version
+        let mut outcome = None;
+        self.state.update(|txn| {
+            if let IncomingMessage::OrderBookSnapshot(snapshot) = msg {
+                // A snapshot that moves no level is dropped before the book is
+                // touched, so a reader's copy is not duplicated for nothing
+                let unchanged = txn.order_book(symbol).map_or(false, |book| {
+                    let delta = book.diff_snapshot(snapshot);
+                    delta.bids.is_empty() && delta.asks.is_empty()
+                });
+                if unchanged {
+                    return;
+                }
+            }
+            outcome = txn.update_book(symbol, |book| match msg {
+                IncomingMessage::OrderBookUpdate{delta, ..} => {
+                    let top_before = book.top_of_book();
+                    book.apply_delta(delta);
+                    (true, Some((book.top_of_book() != top_before, book.validate())))
+                },
+                IncomingMessage::OrderBookSnapshot(snapshot) => {
+                    // Full snapshots are diffed so only moved levels are touched
+                    let change = book.apply_snapshot(snapshot);
+                    if change.is_empty() {
+                        return (false, None);
+                    }
+                    (true, Some((change.top_changed, book.validate())))
+                },
+                _ => (false, None),
+            });
+        });
+        let Some((top_changed, valid)) = outcome else { return Ok(()) };
+        let metrics = metrics::global();
+        metrics.record_since(Stage::Book, started);
+        let applied = Instant::now();
         
-        if !book.validate() {
-            drop(books); 
-            self.reconcile_orderbook(&symbol)?;
+        if !valid {
+            // Replaces the crossed book readers may already have seen
+            self.reconcile_orderbook(symbol)?;
             return Ok(()); 
         }
+        let Some(book) = self.state.snapshot().order_book(symbol) else { return Ok(()) };
+        let fired = if top_changed {
+            let (bid, ask) = book.top_of_book();
+            self.risk.lock().unwrap().on_bbo(symbol, bid.map(|b| b.0), ask.map(|a| a.0));
+            self.pnl.lock().unwrap().on_bbo(symbol, bid, ask)
+        } else {
+            Vec::new()
+        };
         
-        {
+        // Only strategies registered on this symbol are evaluated, and BBO-only
+        // strategies only when the top of book moved
+        let actions = {
             let mut strats = self.active_strategies.lock().unwrap();
-            let mut actions = Vec::new();
-            
-            for strat in strats.iter_mut() {
-                if let Ok(action) = strat.on_order_book_update(&book) {
-                    if !matches!(action, StrategyAction::None) {
-                        actions.push(action);
-                    }
-                }
-            }
-            drop(strats); 
-            
-            for action in actions {
-                match action {
-                    StrategyAction::PlaceOrder(o) => {
-                         let _ = self.send_order_internal(o);
-                    },
-                    StrategyAction::CancelOrder(oid) => {
-                         let _ = self.cancel_order_internal(oid);
-                    },
-                    StrategyAction::ModifyPrice(oid, price) => {
-                         let _ = self.modify_order_internal(oid, price);
-                    },
-                    StrategyAction::RemoveOrder(oid) => {
-                         let _ = self.remove_order_internal(oid);
-                    },
-                    StrategyAction::None => {}
-                }
-            }
+            let actions = strats.dispatch_book(symbol, top_changed, |s| s.on_order_book_update(&book));
+            self.wake_timer_if_needed(&mut strats);
+            actions
+        };
+        // Not held across the next tick, which would then have to copy the book
+        drop(book);
+        metrics.record_since(Stage::Strategy, applied);
+        
+        self.fire_pnl_callbacks(fired);
+        let sends_orders = actions.iter().any(|a| matches!(a, StrategyAction::PlaceOrder(_) | StrategyAction::CancelOrder(_) | StrategyAction::ModifyPrice(..)));
+        self.process_actions(actions);
+        if sends_orders {
+            metrics.record_since(Stage::TickToOrder, started);
         }
         
         Ok(())
@@ -506,65 +891,114 @@ impl OMSEngine {
         let snapshot = self.adapter.get_order_book_snapshot(symbol)
              .map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))?;
              
-        let mut books = self.order_books.lock().unwrap();
-        let book = books.entry(symbol.to_string()).or_insert_with(|| OrderBook::new(symbol.to_string()));
-        *book = snapshot;
+        self.publish_book(snapshot);
         Ok(())
     }
 
+    /// Reload every tracked book from REST snapshots.
+    /// Run after a market-data reconnect, since updates were missed while the stream was down.
+    /// A book the stream refreshed while its snapshot was in flight is left as the
+    /// stream has it: venues send full depth, so it is already current.
+    pub fn resync_orderbooks(&self) {
+        let marks: Vec<(String, i64, f64)> = self.state.snapshot().order_books.values()
+            .map(|b| (b.symbol.clone(), b.last_update_id, b.timestamp))
+            .collect();
+        for (symbol, update_id, timestamp) in marks {
+            let snapshot = match self.adapter.get_order_book_snapshot(&symbol) {
+                Ok(snapshot) => snapshot,
+                Err(e) => {
+                    eprintln!("Failed to resync OrderBook for {}: {}", symbol, e);
+                    continue;
+                },
+            };
+            self.state.update(|txn| {
+                let untouched = txn.order_book(&symbol).map_or(true, |b| b.last_update_id == update_id && b.timestamp == timestamp);
+                if untouched {
+                    txn.put_order_book(snapshot);
+                }
+            });
+        }
+    }
+
+    /// `resync_orderbooks` on its own thread, so the gateway listener keeps applying
+    /// fills and statuses while the rate-limited snapshots load. A request made
+    /// while a resync runs starts one more pass once it finishes.
+    pub fn request_resync(&self) {
+        self.resync_requested.store(true, Ordering::SeqCst);
+        if self.resyncing.swap(true, Ordering::SeqCst) {
+            return;
+        }
+        let engine = self.clone();
+        thread::spawn(move || loop {
+            while engine.resync_requested.swap(false, Ordering::SeqCst) {
+                engine.resync_orderbooks();
+            }
+            engine.resyncing.store(false, Ordering::SeqCst);
+            // A request that came in after the last check, with no thread left to take it
+            if !engine.resync_requested.load(Ordering::SeqCst) || engine.resyncing.swap(true, Ordering::SeqCst) {
+                break;
+            }
+        });
+    }
+
+    /// True while a resync started by `request_resync` is running.
+    pub fn is_resyncing(&self) -> bool {
+        self.resyncing.load(Ordering::SeqCst)
+    }
+
     pub fn start_gateway_listener(&self, receiver: Receiver<IncomingMessage>) -> PyResult<()> {
         let engine = self.clone();
     
         thread::spawn(move || {
-            for msg in receiver {
-                {
-                     let msg_clone = msg.clone();
-                     engine.logger.lock().unwrap().log_lazy("MARKET_DATA".to_string(), Box::new(move || {
-                        match &msg_clone {
-                            IncomingMessage::OrderBookUpdate{symbol, delta} => {
-                                let (bp, bv): (Vec<_>, Vec<_>) = delta.bids.iter().map(|(p, q)| (p.to_string(), *q)).unzip();
-                                let (ap, av): (Vec<_>, Vec<_>) = delta.asks.iter().map(|(p, q)| (p.to_string(), *q)).unzip();
-                                
-                                serde_json::json!({
-                                    "type": "OrderBookDelta", 
-                                    "symbol": symbol, 
-                                    "update_id": delta.update_id,
-                                    "data": {
-                                        "bp": bp,
-                                        "bv": bv,
-                                        "ap": ap,
-                                        "av": av
-                                    }
-                                })
-                            },
-                            IncomingMessage::MarketTrade{symbol, price, quantity, ..} => serde_json::json!({"type": "Trade", "symbol": symbol, "price": price.to_string(), "qty": quantity}),
-                            IncomingMessage::Execution{order_id, fill_qty, ..} => serde_json::json!({"type": "Execution", "order_id": order_id, "qty": fill_qty}),
-                            IncomingMessage::OrderBookSnapshot(s) => serde_json::json!({
-                                "type": "OrderBookSnapshot", 
-                                "symbol": s.symbol,
-                                "bids": s.bids,
-                                "asks": s.asks 
-                            }),
-                            IncomingMessage::OrderStatus{order_id, state, ..} => serde_json::json!({"type": "OrderUpdate", "order_id": order_id, "state": format!("{:?}", state)}),
-                            _ => serde_json::json!({"type": "Unknown"}),
-                        }
-                    }));
+            // Set when the stream drops; books are resynced once it is back
+            let mut resync_pending = false;
+            let metrics = metrics::global();
+            // Drained into a local queue so the channel backlog can be gauged
+            let mut pending = VecDeque::new();
+            loop {
+                if pending.is_empty() {
+                    match receiver.recv() {
+                        Ok(msg) => pending.push_back(msg),
+                        Err(_) => break,
+                    }
                 }
-                match msg {
+                pending.extend(receiver.try_iter());
+                metrics.queue_depth.set(pending.len() as i64);
+                let msg = pending.pop_front().expect("pending is not empty");
+                metrics.record_message_age(&msg);
+                match &msg {
                     IncomingMessage::OrderBookUpdate{..} | IncomingMessage::OrderBookSnapshot(_) => {
-                         let _ = engine.on_order_book_information(msg);
+                         let _ = engine.on_book_message(&msg);
                     },
                     IncomingMessage::MarketTrade{..} => {
                         // Handle market trade if needed
                     },
                     IncomingMessage::Execution{order_id, fill_qty, fill_price} => {
-                         engine.on_trade_update(&order_id, fill_qty, fill_price);
+                         engine.on_trade_update(order_id, *fill_qty, *fill_price);
                     },
                     IncomingMessage::OrderStatus{order_id, state, msg, ..} => {
-                        engine.on_order_status_update(&order_id, state, msg);
+                        engine.on_order_status_update(order_id, state.clone(), msg.clone());
+                    },
+                    IncomingMessage::ConnectionStatus(status) => match status {
+                        ConnectionStatus::Reconnecting | ConnectionStatus::Disconnected => resync_pending = true,
+                        ConnectionStatus::Connected if resync_pending => {
+                            resync_pending = false;
+                            engine.request_resync();
+                        },
+                        _ => {}
                     },
                     _ => {}
                 }
+                {
+                    // Cloned only while someone is subscribed
+                    let mut listeners = engine.listeners.lock().unwrap();
+                    if !listeners.is_empty() {
+                        listeners.retain(|tx| tx.send(msg.clone()).is_ok());
+                    }
+                }
+                // Moved, not cloned: converted to JSON on the logger thread, and
+                // dropped without that work if the queue sheds it
+                engine.log.log_market(msg);
             }
         });
         Ok(())
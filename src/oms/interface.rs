@@ -9,7 +9,9 @@ use crate::adapter::mock::MockAdapter;
 use crate::adapter::interface::{extract_adapter, initialize_monitor};
 use crate::logger::config::{LoggerConfig, LogDestinationInfo};
 use crate::logger::Logger;
+use crate::logger::queue::{OverflowPolicy, QueueConfig};
 use crate::adapter::Adapter;
+use crate::client::Client;
 
 #[pyclass(name = "OMSEngine")]
 pub struct Interface {
@@ -19,8 +21,21 @@ pub struct Interface {
 #[pymethods]
 impl Interface {
     #[new]
-    #[pyo3(signature = (adapter=None, s3_bucket=None, s3_region=None, s3_prefix=None))]
-    fn new(adapter: Option<&Bound<'_, PyAny>>, s3_bucket: Option<String>, s3_region: Option<String>, s3_prefix: Option<String>) -> PyResult<Self> {
+    #[pyo3(signature = (adapter=None, s3_bucket=None, s3_region=None, s3_prefix=None, log_path=None, log_format=None, log_compress=false, log_rotate_mb=None, log_rotate_seconds=None, log_queue_size=65536, log_overflow=None))]
+    #[allow(clippy::too_many_arguments)]
+    fn new(
+        adapter: Option<&Bound<'_, PyAny>>,
+        s3_bucket: Option<String>,
+        s3_region: Option<String>,
+        s3_prefix: Option<String>,
+        log_path: Option<String>,
+        log_format: Option<String>,
+        log_compress: bool,
+        log_rotate_mb: Option<u64>,
+        log_rotate_seconds: Option<u64>,
+        log_queue_size: usize,
+        log_overflow: Option<String>,
+    ) -> PyResult<Self> {
         
         let destination = if let (Some(_bucket), Some(_region)) = (s3_bucket, s3_region) {
             // LogDestinationInfo::AmazonS3 { 
@@ -31,7 +46,8 @@ impl Interface {
             eprintln!("S3 logging disabled");
             LogDestinationInfo::Console
         } else {
-             LogDestinationInfo::Console 
+            LogDestinationInfo::from_options(log_path, log_format.as_deref(), log_compress, log_rotate_mb, log_rotate_seconds)
+                .map_err(pyo3::exceptions::PyValueError::new_err)?
         };
 
         let config = LoggerConfig {
@@ -39,7 +55,12 @@ impl Interface {
             flush_interval_seconds: 60,
             batch_size: 8192,
         };
-        let logger = Arc::new(Mutex::new(Logger::new(config)));
+        let overflow = match log_overflow.as_deref() {
+            Some(p) => OverflowPolicy::parse(p).map_err(pyo3::exceptions::PyValueError::new_err)?,
+            None => OverflowPolicy::Block,
+        };
+        let queue_config = QueueConfig { capacity: log_queue_size, overflow };
+        let logger = Arc::new(Mutex::new(Logger::with_queue(config, queue_config)));
         logger.lock().unwrap().start();
         
         // Resolve Adapter
@@ -82,11 +103,35 @@ impl Interface {
     fn cancel_order(&self, py: Python, order_id: String) -> PyResult<()> {
         self.engine.cancel_order(py, order_id)
     }
+
+    /// Orders are sent concurrently; one order id or exception per order.
+    fn place_orders(&self, py: Python, orders: Vec<Order>) -> Vec<PyObject> {
+        self.engine.send_orders(py, orders)
+    }
+
+    fn cancel_orders(&self, py: Python, order_ids: Vec<String>) -> Vec<PyObject> {
+        self.engine.cancel_orders(py, order_ids)
+    }
+
+    #[pyo3(signature = (symbol=None))]
+    fn cancel_all(&self, py: Python, symbol: Option<String>) -> PyResult<PyObject> {
+        self.engine.cancel_all(py, symbol)
+    }
     
+    /// A `Didius` client over this engine. It shares the engine's state store
+    /// and sends orders through the engine; messages reach it once `start_gateway`
+    /// is running.
+    #[pyo3(signature = (tick_history_size=4096))]
+    fn client(&self, tick_history_size: usize) -> PyResult<Client> {
+        Client::with_engine((*self.engine).clone(), tick_history_size)
+            .map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    }
+
+    // The getters below read the published snapshot; nothing is copied but the Python objects
     fn get_order_book(&self, py: Python, symbol: String) -> PyResult<PyObject> {
-        if let Some(book) = self.engine.get_order_book(&symbol) {
+        if let Some(book) = self.engine.order_book(&symbol) {
             let dict = PyDict::new(py);
-            dict.set_item("symbol", book.symbol)?;
+            dict.set_item("symbol", &book.symbol)?;
             dict.set_item("last_update_id", book.last_update_id)?;
             dict.set_item("timestamp", book.timestamp)?;
             
@@ -109,19 +154,24 @@ impl Interface {
     }
     
     fn get_account(&self, py: Python) -> PyResult<PyObject> {
-        let acc = self.engine.get_account();
+        let acc = self.engine.account();
         let dict = PyDict::new(py);
         dict.set_item("balance", acc.balance.to_string())?;
         dict.set_item("locked", acc.locked.to_string())?;
         
         let positions_dict = PyDict::new(py);
-        for (sym, pos) in acc.positions {
+        for (sym, pos) in &acc.positions {
+            // Marked to the live book when there is one
+            let (current_price, unrealized_pnl) = match self.engine.position_pnl(sym) {
+                Some(p) => (p.mark, p.unrealized),
+                None => (pos.current_price, pos.unrealized_pnl()),
+            };
             let p_dict = PyDict::new(py);
-            p_dict.set_item("symbol", pos.symbol.clone())?;
+            p_dict.set_item("symbol", &pos.symbol)?;
             p_dict.set_item("quantity", pos.quantity)?;
             p_dict.set_item("average_price", pos.average_price.to_string())?;
-            p_dict.set_item("current_price", pos.current_price.to_string())?;
-            p_dict.set_item("unrealized_pnl", pos.unrealized_pnl().to_string())?;
+            p_dict.set_item("current_price", current_price.to_string())?;
+            p_dict.set_item("unrealized_pnl", unrealized_pnl.to_string())?;
             
             positions_dict.set_item(sym, p_dict)?;
         }
@@ -141,17 +191,28 @@ impl Interface {
         self.get_account(py)
     }
 
+    /// Working orders. Closed ones are in `get_order(order_id)`.
     fn get_orders(&self, _py: Python) -> PyResult<HashMap<String, Order>> {
-        // Order is PyClass, maps to Dict/Object in Python?
-        // PyO3 converts HashMap<String, Order> to Dict[str, Order] automatically if Order is PyClass.
-        Ok(self.engine.get_orders())
+        // PyO3 converts HashMap<String, Order> to Dict[str, Order] since Order is a PyClass
+        let snapshot = self.engine.snapshot();
+        Ok(snapshot.orders.iter().map(|(id, o)| (id.clone(), o.as_ref().clone())).collect())
+    }
+    
+    /// Working orders only, optionally for one symbol.
+    #[pyo3(signature = (symbol=None))]
+    fn open_orders(&self, _py: Python, symbol: Option<String>) -> PyResult<Vec<Order>> {
+        Ok(self.engine.open_orders(symbol.as_deref()))
+    }
+
+    fn get_order(&self, _py: Python, order_id: String) -> PyResult<Option<Order>> {
+        Ok(self.engine.get_order(&order_id))
     }
     
     fn get_oms_status(&self, _py: Python) -> PyResult<String> {
         // Simple status report
-        let orders = self.engine.get_orders();
-        let active_orders = orders.values().filter(|o| matches!(o.state, crate::oms::order::OrderState::PENDING_NEW | crate::oms::order::OrderState::NEW | crate::oms::order::OrderState::PARTIALLY_FILLED)).count();
-        let acc = self.engine.get_account();
+        let snapshot = self.engine.snapshot();
+        let active_orders = snapshot.orders.len();
+        let acc = self.engine.account();
         let positions_count = acc.positions.len();
         
         Ok(format!(
@@ -160,6 +221,16 @@ impl Interface {
         ))
     }
     
+    /// Stage latency percentiles and channel depth as a dict.
+    fn get_metrics(&self, py: Python) -> PyResult<PyObject> {
+        Ok(self.engine.get_metrics().to_py_dict(py)?.into_any().unbind())
+    }
+
+    /// Write the metrics to `path` in Prometheus text format.
+    fn dump_metrics(&self, path: &str) -> PyResult<()> {
+        self.engine.dump_metrics(path).map_err(|e| pyo3::exceptions::PyRuntimeError::new_err(e.to_string()))
+    }
+
     fn init_symbol(&self, py: Python, symbol: String) -> PyResult<()> {
         self.engine.initialize_symbol(py, symbol)
     }
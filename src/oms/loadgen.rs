@@ -0,0 +1,184 @@
+use crate::adapter::{Adapter, IncomingMessage};
+use crate::oms::engine::OMSEngine;
+use crate::oms::order::{Order, OrderSide, OrderState, OrderType};
+use anyhow::{anyhow, Result};
+use serde::Serialize;
+use std::collections::HashMap;
+use std::sync::mpsc;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+#[derive(Debug, Clone)]
+pub struct LoadConfig {
+    pub orders_per_sec: u64,
+    pub duration: Duration,
+    /// Orders go round-robin over these symbols, alternating BUY and SELL market orders.
+    pub symbols: Vec<String>,
+    pub quantity: i64,
+    /// How long to wait for outstanding acks and fills after the last order.
+    pub drain_timeout: Duration,
+}
+
+impl Default for LoadConfig {
+    fn default() -> Self {
+        LoadConfig {
+            orders_per_sec: 1_000,
+            duration: Duration::from_secs(10),
+            symbols: vec!["005930".to_string()],
+            quantity: 1,
+            drain_timeout: Duration::from_secs(5),
+        }
+    }
+}
+
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct LatencySummary {
+    pub count: usize,
+    pub p50_us: f64,
+    pub p99_us: f64,
+    pub max_us: f64,
+}
+
+impl LatencySummary {
+    pub fn from_samples(mut samples: Vec<Duration>) -> Self {
+        if samples.is_empty() {
+            return LatencySummary::default();
+        }
+        samples.sort();
+        let at = |q: f64| samples[((samples.len() - 1) as f64 * q).round() as usize].as_secs_f64() * 1e6;
+        LatencySummary {
+            count: samples.len(),
+            p50_us: at(0.50),
+            p99_us: at(0.99),
+            max_us: at(1.0),
+        }
+    }
+}
+
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct LoadReport {
+    pub sent: usize,
+    pub acked: usize,
+    pub filled: usize,
+    /// Rejected, or cancelled by the venue without a full fill.
+    pub failed: usize,
+    pub elapsed_s: f64,
+    pub orders_per_sec: f64,
+    /// place -> NEW
+    pub ack: LatencySummary,
+    /// place -> fully filled
+    pub fill: LatencySummary,
+}
+
+struct Track {
+    placed: Instant,
+    quantity: i64,
+    filled: i64,
+    ack: Option<Duration>,
+    fill: Option<Duration>,
+    failed: bool,
+}
+
+impl Track {
+    fn done(&self) -> bool {
+        self.fill.is_some() || self.failed
+    }
+}
+
+/// Open-loop load generator for the whole OMS path.
+///
+/// Orders are sent through `engine.send_order_internal` at a fixed rate, so a
+/// slow venue or engine shows up as latency rather than a lower send rate.
+/// `adapter` must be the engine's adapter; its monitor is routed through a tap
+/// that timestamps acks and fills as they reach the engine's gateway listener.
+pub fn run_load(engine: &OMSEngine, adapter: &dyn Adapter, config: &LoadConfig) -> Result<LoadReport> {
+    if config.orders_per_sec == 0 || config.symbols.is_empty() {
+        return Err(anyhow!("orders_per_sec and symbols must be non-empty"));
+    }
+    let tracks: Arc<Mutex<HashMap<String, Track>>> = Arc::new(Mutex::new(HashMap::new()));
+
+    let (engine_tx, engine_rx) = mpsc::channel();
+    engine.start_gateway_listener(engine_rx).map_err(|e| anyhow!(e.to_string()))?;
+    let (tx, rx) = mpsc::channel::<IncomingMessage>();
+    let tap_tracks = tracks.clone();
+    thread::spawn(move || {
+        for msg in rx {
+            let now = Instant::now();
+            {
+                let mut tracks = tap_tracks.lock().unwrap();
+                match &msg {
+                    IncomingMessage::OrderStatus { order_id, state, .. } => {
+                        if let Some(t) = tracks.get_mut(order_id) {
+                            match state {
+                                OrderState::NEW => t.ack = t.ack.or(Some(now - t.placed)),
+                                OrderState::REJECTED | OrderState::CANCELED if t.fill.is_none() => t.failed = true,
+                                _ => {},
+                            }
+                        }
+                    },
+                    IncomingMessage::Execution { order_id, fill_qty, .. } => {
+                        if let Some(t) = tracks.get_mut(order_id) {
+                            t.filled += fill_qty;
+                            if t.filled >= t.quantity && t.fill.is_none() {
+                                t.fill = Some(now - t.placed);
+                            }
+                        }
+                    },
+                    _ => {},
+                }
+            }
+            if engine_tx.send(msg).is_err() {
+                break;
+            }
+        }
+    });
+    adapter.set_monitor(tx);
+
+    let total = (config.orders_per_sec as f64 * config.duration.as_secs_f64()).round() as u64;
+    let interval = Duration::from_secs_f64(1.0 / config.orders_per_sec as f64);
+    let started = Instant::now();
+    for i in 0..total {
+        let due = started + interval * i as u32;
+        let now = Instant::now();
+        if due > now {
+            thread::sleep(due - now);
+        }
+        let side = if i % 2 == 0 { OrderSide::BUY } else { OrderSide::SELL };
+        let symbol = config.symbols[i as usize % config.symbols.len()].clone();
+        let mut order = Order::new(symbol, side, OrderType::MARKET, config.quantity, None, None, None, None, "KRX".to_string());
+        let order_id = format!("load-{}", i);
+        order.order_id = Some(order_id.clone());
+
+        // Tracked before sending, so an instant ack still finds it
+        tracks.lock().unwrap().insert(order_id, Track {
+            placed: Instant::now(),
+            quantity: config.quantity,
+            filled: 0,
+            ack: None,
+            fill: None,
+            failed: false,
+        });
+        engine.send_order_internal(order)?;
+    }
+    let sent_in = started.elapsed();
+
+    let deadline = Instant::now() + config.drain_timeout;
+    while Instant::now() < deadline && !tracks.lock().unwrap().values().all(Track::done) {
+        thread::sleep(Duration::from_millis(5));
+    }
+
+    let tracks = tracks.lock().unwrap();
+    let acks: Vec<_> = tracks.values().filter_map(|t| t.ack).collect();
+    let fills: Vec<_> = tracks.values().filter_map(|t| t.fill).collect();
+    Ok(LoadReport {
+        sent: tracks.len(),
+        acked: acks.len(),
+        filled: fills.len(),
+        failed: tracks.values().filter(|t| t.failed).count(),
+        elapsed_s: sent_in.as_secs_f64(),
+        orders_per_sec: tracks.len() as f64 / sent_in.as_secs_f64().max(f64::EPSILON),
+        ack: LatencySummary::from_samples(acks),
+        fill: LatencySummary::from_samples(fills),
+    })
+}
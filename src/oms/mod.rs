@@ -1,7 +1,14 @@
 pub mod order;
 pub mod order_book;
+pub mod order_store;
+pub mod book_store;
+pub mod consolidated;
+pub mod columnar;
 pub mod account;
+pub mod pnl;
+pub mod risk;
 pub mod engine;
+pub mod loadgen;
 // pub mod interface;
 
 use pyo3::prelude::*;
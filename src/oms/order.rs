@@ -36,6 +36,18 @@ pub enum OrderState {
     PENDING_REPLACE,
 }
 
+impl OrderState {
+    /// Working at (or on its way to) the venue and not being canceled.
+    pub fn is_open(&self) -> bool {
+        matches!(self, OrderState::PENDING_NEW | OrderState::NEW | OrderState::PARTIALLY_FILLED | OrderState::PENDING_REPLACE)
+    }
+
+    /// FILLED, CANCELED or REJECTED: nothing more will happen to the order.
+    pub fn is_terminal(&self) -> bool {
+        matches!(self, OrderState::FILLED | OrderState::CANCELED | OrderState::REJECTED)
+    }
+}
+
 #[pyclass(eq, eq_int)]
 #[derive(Debug, Clone, PartialEq, Eq, Hash, Serialize, Deserialize)]
 #[allow(non_camel_case_types)]
@@ -25,6 +25,37 @@ pub struct OrderBookSnapshot {
     pub timestamp: f64,
 }
 
+/// Outcome of applying a snapshot as a diff.
+#[derive(Debug, Clone)]
+pub struct BookChange {
+    /// Only the levels that changed (qty 0 = level removed).
+    pub delta: OrderBookDelta,
+    /// Best bid or best ask (price or qty) moved.
+    pub top_changed: bool,
+}
+
+impl BookChange {
+    pub fn is_empty(&self) -> bool {
+        self.delta.bids.is_empty() && self.delta.asks.is_empty()
+    }
+}
+
+// Snapshots are ~10 levels per side, so a linear scan beats building a map
+fn diff_side(current: &std::collections::BTreeMap<Decimal, i64>, target: &[(Decimal, i64)]) -> Vec<(Decimal, i64)> {
+    let mut changes = Vec::new();
+    for (price, qty) in target {
+        if *qty > 0 && current.get(price) != Some(qty) {
+            changes.push((*price, *qty));
+        }
+    }
+    for price in current.keys() {
+        if !target.iter().any(|(p, q)| p == price && *q > 0) {
+            changes.push((*price, 0));
+        }
+    }
+    changes
+}
+
 #[derive(Debug, Clone, Serialize, Deserialize)]
 pub struct OrderBook {
     pub symbol: String,
@@ -80,26 +111,60 @@ impl OrderBook {
              return;
         }
 
-        // Bids
-        for (price, qty) in &delta.bids {
+        self.apply_levels(&delta.bids, &delta.asks);
+
+        self.last_update_id = delta.update_id;
+        self.timestamp = delta.timestamp;
+    }
+
+    // Quantities replace the level; qty <= 0 removes it
+    fn apply_levels(&mut self, bids: &[(Decimal, i64)], asks: &[(Decimal, i64)]) {
+        for (price, qty) in bids {
             if *qty <= 0 {
                 self.bids.remove(price);
             } else {
                 self.bids.insert(*price, *qty);
             }
         }
+        for (price, qty) in asks {
+            if *qty <= 0 {
+                self.asks.remove(price);
+            } else {
+                self.asks.insert(*price, *qty);
+            }
+        }
+    }
+
+    /// Levels that differ between this book and a full snapshot, as a delta
+    /// (qty 0 for levels missing from the snapshot). Nothing is modified.
+    pub fn diff_snapshot(&self, snapshot: &OrderBookSnapshot) -> OrderBookDelta {
+        OrderBookDelta {
+            symbol: snapshot.symbol.clone(),
+            bids: diff_side(&self.bids, &snapshot.bids),
+            asks: diff_side(&self.asks, &snapshot.asks),
+            update_id: snapshot.update_id,
+            timestamp: snapshot.timestamp,
+        }
+    }
 
-        // Asks
-        for (price, qty) in &delta.asks {
-             if *qty <= 0 {
-                 self.asks.remove(price);
-             } else {
-                 self.asks.insert(*price, *qty);
-             }
+    /// Bring the book to `snapshot` by only touching the levels that changed.
+    /// Equivalent to `rebuild` (empty levels are dropped), but cheap when a
+    /// 10-level snapshot only moved one level, and it reports what changed.
+    pub fn apply_snapshot(&mut self, snapshot: &OrderBookSnapshot) -> BookChange {
+        let top_before = self.top_of_book();
+        let delta = self.diff_snapshot(snapshot);
+        self.apply_levels(&delta.bids, &delta.asks);
+        self.last_update_id = snapshot.update_id;
+        self.timestamp = snapshot.timestamp;
+        BookChange {
+            top_changed: self.top_of_book() != top_before,
+            delta,
         }
+    }
 
-        self.last_update_id = delta.update_id;
-        self.timestamp = delta.timestamp;
+    /// (best bid, best ask), each as (price, qty).
+    pub fn top_of_book(&self) -> (Option<(Decimal, i64)>, Option<(Decimal, i64)>) {
+        (self.get_best_bid(), self.get_best_ask())
     }
 
     pub fn get_best_bid(&self) -> Option<(Decimal, i64)> {
@@ -0,0 +1,246 @@
+use crate::oms::order::{ExecutionStrategy, Order, OrderSide, OrderState, OrderType};
+use rust_decimal::Decimal;
+use std::collections::{HashMap, HashSet};
+use std::sync::Arc;
+
+/// What is kept of an order once it is FILLED, CANCELED or REJECTED.
+///
+/// Strategy parameters and trigger prices only matter while the order works,
+/// so they are dropped, and symbol / exchange strings are shared between records.
+#[derive(Debug, Clone)]
+pub struct ArchivedOrder {
+    pub order_id: String,
+    pub exchange_order_id: Option<String>,
+    pub symbol: Arc<str>,
+    pub exchange: Arc<str>,
+    pub side: OrderSide,
+    pub order_type: OrderType,
+    pub state: OrderState,
+    pub quantity: i64,
+    pub filled_quantity: i64,
+    pub price: Option<Decimal>,
+    pub average_fill_price: Decimal,
+    pub created_at: f64,
+    pub updated_at: f64,
+    pub error_message: Option<String>,
+}
+
+impl ArchivedOrder {
+    pub fn to_order(&self) -> Order {
+        Order {
+            symbol: self.symbol.to_string(),
+            side: self.side.clone(),
+            order_type: self.order_type.clone(),
+            quantity: self.quantity,
+            price: self.price,
+            order_id: Some(self.order_id.clone()),
+            exchange_order_id: self.exchange_order_id.clone(),
+            state: self.state.clone(),
+            filled_quantity: self.filled_quantity,
+            average_fill_price: self.average_fill_price,
+            strategy: ExecutionStrategy::NONE,
+            strategy_params: HashMap::new(),
+            limit_price: None,
+            stop_price: None,
+            created_at: self.created_at,
+            updated_at: self.updated_at,
+            error_message: self.error_message.clone(),
+            exchange: self.exchange.to_string(),
+        }
+    }
+}
+
+/// The engine's orders: working orders with secondary indices, and an archive.
+///
+/// Working orders are indexed by state, symbol and exchange order id, so
+/// `open_orders(symbol)` or a state count touch only the matching orders.
+/// An order reaching a terminal state moves to the append-only archive, so
+/// memory and query cost follow the working set rather than the session.
+/// Late messages for archived orders (a fill racing a cancel) patch the
+/// archived record's fill; they do not change its state or bring the order back.
+#[derive(Debug, Default)]
+pub struct OrderStore {
+    live: HashMap<String, Order>,
+    by_state: HashMap<OrderState, HashSet<String>>,
+    by_symbol: HashMap<String, HashSet<String>>,
+    // Covers archived orders too, for late venue notices
+    by_exchange_id: HashMap<String, String>,
+    archive: Vec<ArchivedOrder>,
+    archive_index: HashMap<String, usize>,
+    interned: HashSet<Arc<str>>,
+}
+
+impl OrderStore {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    /// Add or replace an order. Terminal orders go straight to the archive.
+    pub fn insert(&mut self, order_id: String, order: Order) {
+        self.unindex(&order_id);
+        self.live.remove(&order_id);
+        if let Some(ex) = &order.exchange_order_id {
+            self.by_exchange_id.insert(ex.clone(), order_id.clone());
+        }
+        if order.state.is_terminal() {
+            self.archive_order(order_id, &order);
+        } else {
+            self.index(&order_id, &order);
+            self.live.insert(order_id, order);
+        }
+    }
+
+    /// Change an order in place and re-index it. Returns `f`'s result, or None
+    /// for an unknown id. An archived order keeps its terminal state.
+    pub fn update<R>(&mut self, order_id: &str, f: impl FnOnce(&mut Order) -> R) -> Option<R> {
+        if self.live.contains_key(order_id) {
+            self.unindex(order_id);
+            let mut order = self.live.remove(order_id).expect("order is live");
+            let out = f(&mut order);
+            self.insert(order_id.to_string(), order);
+            return Some(out);
+        }
+        let i = *self.archive_index.get(order_id)?;
+        let mut order = self.archive[i].to_order();
+        let out = f(&mut order);
+        order.state = self.archive[i].state.clone();
+        if let Some(ex) = &order.exchange_order_id {
+            self.by_exchange_id.insert(ex.clone(), order_id.to_string());
+        }
+        self.archive[i] = self.compact(order_id.to_string(), &order);
+        Some(out)
+    }
+
+    /// Drop a working order without archiving it (`StrategyAction::RemoveOrder`).
+    pub fn remove(&mut self, order_id: &str) -> Option<Order> {
+        self.unindex(order_id);
+        let order = self.live.remove(order_id)?;
+        if let Some(ex) = &order.exchange_order_id {
+            self.by_exchange_id.remove(ex);
+        }
+        Some(order)
+    }
+
+    /// A working order.
+    pub fn get(&self, order_id: &str) -> Option<&Order> {
+        self.live.get(order_id)
+    }
+
+    /// A working or archived order.
+    pub fn find(&self, order_id: &str) -> Option<Order> {
+        self.live.get(order_id).cloned().or_else(|| self.archived(order_id).map(ArchivedOrder::to_order))
+    }
+
+    pub fn archived(&self, order_id: &str) -> Option<&ArchivedOrder> {
+        self.archive_index.get(order_id).map(|&i| &self.archive[i])
+    }
+
+    pub fn contains(&self, order_id: &str) -> bool {
+        self.live.contains_key(order_id) || self.archive_index.contains_key(order_id)
+    }
+
+    /// Our order id for a venue order number.
+    pub fn by_exchange_order_id(&self, exchange_order_id: &str) -> Option<&str> {
+        self.by_exchange_id.get(exchange_order_id).map(|s| s.as_str())
+    }
+
+    /// Orders that can still trade (`OrderState::is_open`), optionally in one symbol.
+    pub fn open_orders(&self, symbol: Option<&str>) -> Vec<&Order> {
+        let open = |o: &&Order| o.state.is_open();
+        match symbol {
+            Some(s) => self.by_symbol.get(s).into_iter().flatten().filter_map(|id| self.live.get(id)).filter(open).collect(),
+            None => self.live.values().filter(open).collect(),
+        }
+    }
+
+    pub fn in_state(&self, state: &OrderState) -> Vec<&Order> {
+        self.by_state.get(state).into_iter().flatten().filter_map(|id| self.live.get(id)).collect()
+    }
+
+    pub fn count_in_state(&self, state: &OrderState) -> usize {
+        self.by_state.get(state).map_or(0, |ids| ids.len())
+    }
+
+    pub fn open_count(&self) -> usize {
+        self.by_state.iter().filter(|(s, _)| s.is_open()).map(|(_, ids)| ids.len()).sum()
+    }
+
+    pub fn live(&self) -> impl Iterator<Item = (&String, &Order)> {
+        self.live.iter()
+    }
+
+    pub fn live_len(&self) -> usize {
+        self.live.len()
+    }
+
+    pub fn archive(&self) -> &[ArchivedOrder] {
+        &self.archive
+    }
+
+    /// Every order, working and archived, as full `Order`s.
+    pub fn to_map(&self) -> HashMap<String, Order> {
+        let mut all: HashMap<String, Order> = self.archive.iter().map(|a| (a.order_id.clone(), a.to_order())).collect();
+        all.extend(self.live.iter().map(|(id, o)| (id.clone(), o.clone())));
+        all
+    }
+
+    fn index(&mut self, order_id: &str, order: &Order) {
+        self.by_state.entry(order.state.clone()).or_default().insert(order_id.to_string());
+        self.by_symbol.entry(order.symbol.clone()).or_default().insert(order_id.to_string());
+    }
+
+    fn unindex(&mut self, order_id: &str) {
+        let Some(order) = self.live.get(order_id) else { return };
+        if let Some(ids) = self.by_state.get_mut(&order.state) {
+            ids.remove(order_id);
+            if ids.is_empty() {
+                self.by_state.remove(&order.state);
+            }
+        }
+        if let Some(ids) = self.by_symbol.get_mut(&order.symbol) {
+            ids.remove(order_id);
+            if ids.is_empty() {
+                self.by_symbol.remove(&order.symbol);
+            }
+        }
+    }
+
+    fn archive_order(&mut self, order_id: String, order: &Order) {
+        let record = self.compact(order_id.clone(), order);
+        match self.archive_index.get(&order_id) {
+            Some(&i) => self.archive[i] = record,
+            None => {
+                self.archive_index.insert(order_id, self.archive.len());
+                self.archive.push(record);
+            }
+        }
+    }
+
+    fn compact(&mut self, order_id: String, order: &Order) -> ArchivedOrder {
+        ArchivedOrder {
+            order_id,
+            exchange_order_id: order.exchange_order_id.clone(),
+            symbol: self.intern(&order.symbol),
+            exchange: self.intern(&order.exchange),
+            side: order.side.clone(),
+            order_type: order.order_type.clone(),
+            state: order.state.clone(),
+            quantity: order.quantity,
+            filled_quantity: order.filled_quantity,
+            price: order.price,
+            average_fill_price: order.average_fill_price,
+            created_at: order.created_at,
+            updated_at: order.updated_at,
+            error_message: order.error_message.clone(),
+        }
+    }
+
+    fn intern(&mut self, s: &str) -> Arc<str> {
+        if let Some(v) = self.interned.get(s) {
+            return v.clone();
+        }
+        let v: Arc<str> = Arc::from(s);
+        self.interned.insert(v.clone());
+        v
+    }
+}
@@ -0,0 +1,293 @@
+use crate::oms::account::AccountState;
+use rust_decimal::prelude::FromPrimitive;
+use rust_decimal::Decimal;
+use serde::Serialize;
+use std::collections::HashMap;
+use std::sync::Arc;
+
+/// Mark-to-market figures of one position.
+#[derive(Debug, Clone, Serialize)]
+pub struct PositionPnl {
+    pub symbol: String,
+    pub quantity: i64,
+    pub average_price: Decimal,
+    /// Mid of the live book, or the last known price until the book has both sides.
+    pub mark: Decimal,
+    pub unrealized: Decimal,
+    /// |quantity| * mark
+    pub exposure: Decimal,
+    pub margin: Decimal,
+}
+
+/// Account-wide totals, kept up to date incrementally.
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct PnlSummary {
+    pub balance: Decimal,
+    pub realized: Decimal,
+    pub unrealized: Decimal,
+    pub gross_exposure: Decimal,
+    pub net_exposure: Decimal,
+    pub margin_used: Decimal,
+    pub positions: usize,
+}
+
+impl PnlSummary {
+    pub fn total_pnl(&self) -> Decimal {
+        self.realized + self.unrealized
+    }
+
+    /// Cash plus the marked value of every position.
+    pub fn equity(&self) -> Decimal {
+        self.balance + self.net_exposure
+    }
+
+    pub fn metric(&self, metric: PnlMetric) -> Decimal {
+        match metric {
+            PnlMetric::Realized => self.realized,
+            PnlMetric::Unrealized => self.unrealized,
+            PnlMetric::Total => self.total_pnl(),
+            PnlMetric::Equity => self.equity(),
+            PnlMetric::GrossExposure => self.gross_exposure,
+            PnlMetric::NetExposure => self.net_exposure,
+            PnlMetric::MarginUsed => self.margin_used,
+        }
+    }
+
+    fn add(&mut self, p: &PositionPnl) {
+        self.unrealized += p.unrealized;
+        self.gross_exposure += p.exposure;
+        self.net_exposure += p.mark * Decimal::from_i64(p.quantity).unwrap_or_default();
+        self.margin_used += p.margin;
+        self.positions += 1;
+    }
+
+    fn sub(&mut self, p: &PositionPnl) {
+        self.unrealized -= p.unrealized;
+        self.gross_exposure -= p.exposure;
+        self.net_exposure -= p.mark * Decimal::from_i64(p.quantity).unwrap_or_default();
+        self.margin_used -= p.margin;
+        self.positions -= 1;
+    }
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum PnlMetric {
+    Realized,
+    Unrealized,
+    Total,
+    Equity,
+    GrossExposure,
+    NetExposure,
+    MarginUsed,
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum Crossing {
+    /// Fires when the metric reaches `level` or more
+    Above,
+    /// Fires when the metric drops to `level` or less
+    Below,
+}
+
+pub type PnlCallback = Arc<dyn Fn(&PnlSummary) + Send + Sync>;
+
+struct Threshold {
+    id: u64,
+    metric: PnlMetric,
+    crossing: Crossing,
+    level: Decimal,
+    // Cleared once fired, set again when the metric moves back
+    armed: bool,
+    callback: PnlCallback,
+}
+
+impl Threshold {
+    fn breached(&self, summary: &PnlSummary) -> bool {
+        let value = summary.metric(self.metric);
+        match self.crossing {
+            Crossing::Above => value >= self.level,
+            Crossing::Below => value <= self.level,
+        }
+    }
+}
+
+/// Incremental mark-to-market of an `AccountState`.
+///
+/// Each best bid/ask change re-marks only that symbol's position and adjusts
+/// the totals by the difference, so `summary` is O(1) and a tick costs the
+/// same however many positions are held. Thresholds are checked against the
+/// totals after each change and fire once per crossing.
+pub struct PnlTracker {
+    marks: HashMap<String, Decimal>,
+    positions: HashMap<String, PositionPnl>,
+    summary: PnlSummary,
+    default_margin_rate: Decimal,
+    margin_rates: HashMap<String, Decimal>,
+    thresholds: Vec<Threshold>,
+    next_threshold_id: u64,
+}
+
+impl Default for PnlTracker {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+impl PnlTracker {
+    pub fn new() -> Self {
+        PnlTracker {
+            marks: HashMap::new(),
+            positions: HashMap::new(),
+            summary: PnlSummary::default(),
+            default_margin_rate: Decimal::ONE,
+            margin_rates: HashMap::new(),
+            thresholds: Vec::new(),
+            next_threshold_id: 1,
+        }
+    }
+
+    pub fn summary(&self) -> PnlSummary {
+        self.summary.clone()
+    }
+
+    pub fn position(&self, symbol: &str) -> Option<PositionPnl> {
+        self.positions.get(symbol).cloned()
+    }
+
+    pub fn mark(&self, symbol: &str) -> Option<Decimal> {
+        self.marks.get(symbol).copied()
+    }
+
+    /// Margin as a fraction of exposure. 1 (fully funded) unless set.
+    pub fn set_margin_rate(&mut self, symbol: Option<&str>, rate: Decimal) {
+        match symbol {
+            Some(s) => {
+                self.margin_rates.insert(s.to_string(), rate);
+                self.remark(s);
+            },
+            None => {
+                self.default_margin_rate = rate;
+                let symbols: Vec<String> = self.positions.keys().cloned().collect();
+                symbols.iter().for_each(|s| self.remark(s));
+            },
+        }
+    }
+
+    /// Replace every position from an account snapshot.
+    pub fn reset(&mut self, account: &AccountState) -> Vec<PnlCallback> {
+        self.positions.clear();
+        self.summary = PnlSummary {
+            balance: account.balance,
+            realized: account.realized_pnl,
+            ..Default::default()
+        };
+        for symbol in account.positions.keys() {
+            self.sync_position(account, symbol);
+        }
+        self.check_thresholds()
+    }
+
+    /// Pick up `symbol`'s position, cash and realized PnL after a fill.
+    pub fn on_fill(&mut self, account: &AccountState, symbol: &str) -> Vec<PnlCallback> {
+        self.summary.balance = account.balance;
+        self.summary.realized = account.realized_pnl;
+        self.sync_position(account, symbol);
+        self.check_thresholds()
+    }
+
+    /// Re-mark `symbol` from its best bid/ask.
+    pub fn on_bbo(&mut self, symbol: &str, bid: Option<(Decimal, i64)>, ask: Option<(Decimal, i64)>) -> Vec<PnlCallback> {
+        let mark = match (bid, ask) {
+            (Some((b, _)), Some((a, _))) => (b + a) / Decimal::TWO,
+            (Some((p, _)), None) | (None, Some((p, _))) => p,
+            (None, None) => return Vec::new(),
+        };
+        match self.marks.get_mut(symbol) {
+            Some(m) if *m == mark => return Vec::new(),
+            Some(m) => *m = mark,
+            None => {
+                self.marks.insert(symbol.to_string(), mark);
+            },
+        }
+        if !self.positions.contains_key(symbol) {
+            return Vec::new();
+        }
+        self.remark(symbol);
+        self.check_thresholds()
+    }
+
+    /// Copy live marks into `account`'s positions.
+    pub fn apply_marks(&self, account: &mut AccountState) {
+        for (symbol, pos) in account.positions.iter_mut() {
+            if let Some(p) = self.positions.get(symbol) {
+                pos.current_price = p.mark;
+            }
+        }
+    }
+
+    pub fn add_threshold(&mut self, metric: PnlMetric, crossing: Crossing, level: Decimal, callback: PnlCallback) -> u64 {
+        let id = self.next_threshold_id;
+        self.next_threshold_id += 1;
+        self.thresholds.push(Threshold { id, metric, crossing, level, armed: true, callback });
+        id
+    }
+
+    pub fn remove_threshold(&mut self, id: u64) -> bool {
+        let before = self.thresholds.len();
+        self.thresholds.retain(|t| t.id != id);
+        self.thresholds.len() != before
+    }
+
+    fn sync_position(&mut self, account: &AccountState, symbol: &str) {
+        if let Some(old) = self.positions.remove(symbol) {
+            self.summary.sub(&old);
+        }
+        let Some(pos) = account.positions.get(symbol).filter(|p| p.quantity != 0) else {
+            return;
+        };
+        let fallback = if pos.current_price.is_zero() { pos.average_price } else { pos.current_price };
+        let mark = self.marks.get(symbol).copied().unwrap_or(fallback);
+        let entry = self.priced(symbol, pos.quantity, pos.average_price, mark);
+        self.summary.add(&entry);
+        self.positions.insert(symbol.to_string(), entry);
+    }
+
+    fn remark(&mut self, symbol: &str) {
+        let Some(old) = self.positions.get(symbol) else { return };
+        let mark = self.marks.get(symbol).copied().unwrap_or(old.mark);
+        let entry = self.priced(symbol, old.quantity, old.average_price, mark);
+        self.summary.sub(old);
+        self.summary.add(&entry);
+        self.positions.insert(symbol.to_string(), entry);
+    }
+
+    fn priced(&self, symbol: &str, quantity: i64, average_price: Decimal, mark: Decimal) -> PositionPnl {
+        let qty = Decimal::from_i64(quantity).unwrap_or_default();
+        let exposure = (qty * mark).abs();
+        let rate = self.margin_rates.get(symbol).copied().unwrap_or(self.default_margin_rate);
+        PositionPnl {
+            symbol: symbol.to_string(),
+            quantity,
+            average_price,
+            mark,
+            unrealized: (mark - average_price) * qty,
+            exposure,
+            margin: exposure * rate,
+        }
+    }
+
+    // Callbacks are returned rather than called so the caller can run them unlocked
+    fn check_thresholds(&mut self) -> Vec<PnlCallback> {
+        let mut fired = Vec::new();
+        for t in self.thresholds.iter_mut() {
+            let breached = t.breached(&self.summary);
+            if breached && t.armed {
+                t.armed = false;
+                fired.push(t.callback.clone());
+            } else if !breached {
+                t.armed = true;
+            }
+        }
+        fired
+    }
+}
@@ -0,0 +1,358 @@
+use crate::oms::account::AccountState;
+use crate::oms::order::{Order, OrderSide, OrderState};
+use rust_decimal::prelude::FromPrimitive;
+use rust_decimal::Decimal;
+use serde::Serialize;
+use std::collections::HashMap;
+use std::fmt;
+use std::time::Instant;
+
+/// Pre-trade limits. `None` disables a check; the default disables all of them.
+#[derive(Debug, Clone, Default)]
+pub struct RiskLimits {
+    pub max_order_qty: Option<i64>,
+    pub max_order_notional: Option<Decimal>,
+    /// Open-order notional plus position exposure, per symbol.
+    pub max_symbol_notional: Option<Decimal>,
+    /// Same, summed over all symbols.
+    pub max_gross_notional: Option<Decimal>,
+    pub max_open_orders: Option<usize>,
+    /// Token bucket: bursts up to this many, refilled at this rate.
+    pub max_orders_per_sec: Option<u32>,
+    /// Largest allowed distance of a limit price from the mid, as a fraction (0.05 = 5%).
+    pub price_band: Option<Decimal>,
+    /// |position + open orders on the same side| per symbol.
+    pub max_position: Option<i64>,
+}
+
+/// Why an order was stopped before reaching the adapter.
+#[derive(Debug, Clone, PartialEq)]
+pub enum RiskReject {
+    OrderQty { qty: i64, limit: i64 },
+    OrderNotional { notional: Decimal, limit: Decimal },
+    SymbolNotional { symbol: String, notional: Decimal, limit: Decimal },
+    GrossNotional { notional: Decimal, limit: Decimal },
+    OpenOrders { limit: usize },
+    OrderRate { limit: u32 },
+    PriceBand { price: Decimal, mid: Decimal, band: Decimal },
+    Position { symbol: String, projected: i64, limit: i64 },
+    /// A notional limit is set but the order has no price and the book has no quote
+    NoPrice { symbol: String },
+}
+
+impl fmt::Display for RiskReject {
+    fn fmt(&self, f: &mut fmt::Formatter<'_>) -> fmt::Result {
+        match self {
+            RiskReject::OrderQty { qty, limit } => write!(f, "order quantity {} exceeds {}", qty, limit),
+            RiskReject::OrderNotional { notional, limit } => write!(f, "order notional {} exceeds {}", notional, limit),
+            RiskReject::SymbolNotional { symbol, notional, limit } => write!(f, "{} notional {} would exceed {}", symbol, notional, limit),
+            RiskReject::GrossNotional { notional, limit } => write!(f, "gross notional {} would exceed {}", notional, limit),
+            RiskReject::OpenOrders { limit } => write!(f, "{} open orders already", limit),
+            RiskReject::OrderRate { limit } => write!(f, "more than {} orders/sec", limit),
+            RiskReject::PriceBand { price, mid, band } => write!(f, "price {} is more than {} away from mid {}", price, band, mid),
+            RiskReject::Position { symbol, projected, limit } => write!(f, "{} position would reach {} (limit {})", symbol, projected, limit),
+            RiskReject::NoPrice { symbol } => write!(f, "no price to value {} order", symbol),
+        }
+    }
+}
+
+impl std::error::Error for RiskReject {}
+
+/// Counters the gate keeps, for monitoring.
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct RiskStats {
+    pub open_orders: usize,
+    pub gross_notional: Decimal,
+    pub accepted: u64,
+    pub rejected: u64,
+}
+
+#[derive(Debug, Default)]
+struct SymbolRisk {
+    position: i64,
+    open_buy: i64,
+    open_sell: i64,
+    open_notional: Decimal,
+    // |position| * last price seen
+    position_notional: Decimal,
+    bid: Option<Decimal>,
+    ask: Option<Decimal>,
+}
+
+impl SymbolRisk {
+    fn notional(&self) -> Decimal {
+        self.open_notional + self.position_notional
+    }
+
+    fn mid(&self) -> Option<Decimal> {
+        match (self.bid, self.ask) {
+            (Some(b), Some(a)) => Some((b + a) / Decimal::TWO),
+            (b, a) => b.or(a),
+        }
+    }
+}
+
+#[derive(Debug)]
+struct Reservation {
+    symbol: String,
+    side: OrderSide,
+    remaining: i64,
+    price: Decimal,
+}
+
+impl Reservation {
+    fn notional(&self) -> Decimal {
+        self.price * Decimal::from_i64(self.remaining).unwrap_or_default()
+    }
+}
+
+/// Running pre-trade risk counters.
+///
+/// Each accepted order reserves its quantity and notional until it is filled,
+/// cancelled or rejected. Every check is a few hash lookups against these
+/// counters, so the cost does not depend on how many orders are open, and the
+/// gate has its own lock instead of reading the engine's order map.
+pub struct RiskGate {
+    limits: RiskLimits,
+    symbols: HashMap<String, SymbolRisk>,
+    open: HashMap<String, Reservation>,
+    gross_notional: Decimal,
+    tokens: f64,
+    refilled: Instant,
+    accepted: u64,
+    rejected: u64,
+}
+
+impl RiskGate {
+    pub fn new(limits: RiskLimits) -> Self {
+        RiskGate {
+            tokens: limits.max_orders_per_sec.unwrap_or(0) as f64,
+            limits,
+            symbols: HashMap::new(),
+            open: HashMap::new(),
+            gross_notional: Decimal::ZERO,
+            refilled: Instant::now(),
+            accepted: 0,
+            rejected: 0,
+        }
+    }
+
+    pub fn limits(&self) -> &RiskLimits {
+        &self.limits
+    }
+
+    /// Replace the limits; open reservations are kept.
+    pub fn set_limits(&mut self, limits: RiskLimits) {
+        self.tokens = limits.max_orders_per_sec.unwrap_or(0) as f64;
+        self.refilled = Instant::now();
+        self.limits = limits;
+    }
+
+    pub fn stats(&self) -> RiskStats {
+        RiskStats {
+            open_orders: self.open.len(),
+            gross_notional: self.gross_notional,
+            accepted: self.accepted,
+            rejected: self.rejected,
+        }
+    }
+
+    fn symbol(&mut self, symbol: &str) -> &mut SymbolRisk {
+        if !self.symbols.contains_key(symbol) {
+            self.symbols.insert(symbol.to_string(), SymbolRisk::default());
+        }
+        self.symbols.get_mut(symbol).unwrap()
+    }
+
+    pub fn on_bbo(&mut self, symbol: &str, bid: Option<Decimal>, ask: Option<Decimal>) {
+        let s = self.symbol(symbol);
+        s.bid = bid;
+        s.ask = ask;
+    }
+
+    /// Take positions from an account snapshot.
+    pub fn reset_positions(&mut self, account: &AccountState) {
+        for s in self.symbols.values_mut() {
+            s.position = 0;
+        }
+        let mut gross = Decimal::ZERO;
+        for (symbol, pos) in &account.positions {
+            let s = self.symbol(symbol);
+            s.position = pos.quantity;
+            let price = if pos.current_price.is_zero() { pos.average_price } else { pos.current_price };
+            s.position_notional = (price * Decimal::from_i64(pos.quantity).unwrap_or_default()).abs();
+        }
+        for s in self.symbols.values_mut() {
+            if s.position == 0 {
+                s.position_notional = Decimal::ZERO;
+            }
+            gross += s.notional();
+        }
+        self.gross_notional = gross;
+    }
+
+    /// Check `order` against every limit and reserve it if accepted.
+    pub fn check(&mut self, order: &Order) -> Result<(), RiskReject> {
+        let result = self.check_inner(order);
+        match result {
+            Ok(()) => self.accepted += 1,
+            Err(_) => self.rejected += 1,
+        }
+        result
+    }
+
+    fn check_inner(&mut self, order: &Order) -> Result<(), RiskReject> {
+        let limits = &self.limits;
+        let order_id = order.order_id.as_deref().unwrap_or("");
+        // The same id again (e.g. a strategy re-placing its order) replaces the reservation
+        let previous = self.open.get(order_id);
+
+        if let Some(limit) = limits.max_order_qty {
+            if order.quantity > limit {
+                return Err(RiskReject::OrderQty { qty: order.quantity, limit });
+            }
+        }
+        if let Some(limit) = limits.max_open_orders {
+            if previous.is_none() && self.open.len() >= limit {
+                return Err(RiskReject::OpenOrders { limit });
+            }
+        }
+
+        let sym = self.symbols.get(&order.symbol);
+        let (bid, ask, mid) = sym.map(|s| (s.bid, s.ask, s.mid())).unwrap_or((None, None, None));
+        if let (Some(band), Some(price), Some(mid)) = (limits.price_band, order.price, mid) {
+            if !mid.is_zero() && ((price - mid) / mid).abs() > band {
+                return Err(RiskReject::PriceBand { price, mid, band });
+            }
+        }
+
+        let qty = Decimal::from_i64(order.quantity).unwrap_or_default();
+        // Market orders are valued at the side they would take
+        let far = match order.side { OrderSide::BUY => ask, OrderSide::SELL => bid };
+        let price = order.price.or(far).or(mid);
+        let wants_notional = limits.max_order_notional.is_some() || limits.max_symbol_notional.is_some() || limits.max_gross_notional.is_some();
+        let notional = match price {
+            Some(p) => p * qty,
+            None if wants_notional => return Err(RiskReject::NoPrice { symbol: order.symbol.clone() }),
+            None => Decimal::ZERO,
+        };
+        let released = previous.filter(|p| p.symbol == order.symbol).map(|p| p.notional()).unwrap_or_default();
+
+        if let Some(limit) = limits.max_order_notional {
+            if notional > limit {
+                return Err(RiskReject::OrderNotional { notional, limit });
+            }
+        }
+        if let Some(limit) = limits.max_symbol_notional {
+            let projected = sym.map(|s| s.notional()).unwrap_or_default() - released + notional;
+            if projected > limit {
+                return Err(RiskReject::SymbolNotional { symbol: order.symbol.clone(), notional: projected, limit });
+            }
+        }
+        if let Some(limit) = limits.max_gross_notional {
+            let projected = self.gross_notional - released + notional;
+            if projected > limit {
+                return Err(RiskReject::GrossNotional { notional: projected, limit });
+            }
+        }
+        if let Some(limit) = limits.max_position {
+            let (position, open_buy, open_sell) = sym.map(|s| (s.position, s.open_buy, s.open_sell)).unwrap_or((0, 0, 0));
+            let prev_qty = |side: OrderSide| previous.filter(|p| p.symbol == order.symbol && p.side == side).map(|p| p.remaining).unwrap_or(0);
+            let projected = match order.side {
+                OrderSide::BUY => position + open_buy - prev_qty(OrderSide::BUY) + order.quantity,
+                OrderSide::SELL => position - (open_sell - prev_qty(OrderSide::SELL)) - order.quantity,
+            };
+            if projected.abs() > limit {
+                return Err(RiskReject::Position { symbol: order.symbol.clone(), projected, limit });
+            }
+        }
+        if let Some(limit) = limits.max_orders_per_sec {
+            let now = Instant::now();
+            let burst = limit as f64;
+            self.tokens = (self.tokens + now.duration_since(self.refilled).as_secs_f64() * burst).min(burst);
+            self.refilled = now;
+            if self.tokens < 1.0 {
+                return Err(RiskReject::OrderRate { limit });
+            }
+            self.tokens -= 1.0;
+        }
+
+        self.release(order_id);
+        let s = self.symbol(&order.symbol);
+        match order.side {
+            OrderSide::BUY => s.open_buy += order.quantity,
+            OrderSide::SELL => s.open_sell += order.quantity,
+        }
+        s.open_notional += notional;
+        self.gross_notional += notional;
+        self.open.insert(order_id.to_string(), Reservation {
+            symbol: order.symbol.clone(),
+            side: order.side.clone(),
+            remaining: order.quantity,
+            price: price.unwrap_or_default(),
+        });
+        Ok(())
+    }
+
+    /// A fill moves quantity from the open reservation into the position.
+    pub fn on_fill(&mut self, order_id: &str, fill_qty: i64, fill_price: Decimal) {
+        let Some(r) = self.open.get_mut(order_id) else { return };
+        let filled = fill_qty.min(r.remaining);
+        let before = r.notional();
+        r.remaining -= filled;
+        let after = r.notional();
+        let (symbol, side, done) = (r.symbol.clone(), r.side.clone(), r.remaining == 0);
+        if done {
+            self.open.remove(order_id);
+        }
+
+        let s = self.symbol(&symbol);
+        let old_notional = s.notional();
+        match side {
+            OrderSide::BUY => {
+                s.open_buy -= filled;
+                s.position += filled;
+            },
+            OrderSide::SELL => {
+                s.open_sell -= filled;
+                s.position -= filled;
+            },
+        }
+        s.open_notional -= before - after;
+        s.position_notional = (fill_price * Decimal::from_i64(s.position).unwrap_or_default()).abs();
+        let delta = s.notional() - old_notional;
+        self.gross_notional += delta;
+    }
+
+    /// Free whatever is still reserved once an order can no longer fill.
+    pub fn on_status(&mut self, order_id: &str, state: &OrderState) {
+        if matches!(state, OrderState::FILLED | OrderState::CANCELED | OrderState::REJECTED) {
+            self.release(order_id);
+        }
+    }
+
+    /// Re-value an open order after its price changed.
+    pub fn on_modify(&mut self, order_id: &str, price: Option<Decimal>) {
+        let Some(r) = self.open.get_mut(order_id) else { return };
+        let before = r.notional();
+        if let Some(p) = price {
+            r.price = p;
+        }
+        let delta = r.notional() - before;
+        let symbol = r.symbol.clone();
+        self.symbol(&symbol).open_notional += delta;
+        self.gross_notional += delta;
+    }
+
+    fn release(&mut self, order_id: &str) {
+        let Some(r) = self.open.remove(order_id) else { return };
+        let notional = r.notional();
+        let s = self.symbol(&r.symbol);
+        match r.side {
+            OrderSide::BUY => s.open_buy -= r.remaining,
+            OrderSide::SELL => s.open_sell -= r.remaining,
+        }
+        s.open_notional -= notional;
+        self.gross_notional -= notional;
+    }
+}
@@ -1,54 +1,194 @@
-use std::collections::HashMap;
+use std::collections::{HashMap, HashSet, VecDeque};
+use std::sync::{Arc, Mutex, RwLock};
+use serde::Serialize;
 use crate::message::{Message, ConnectionStatus};
 use crate::oms::order::{Order, OrderState};
 use crate::oms::order_book::OrderBook;
 use crate::oms::account::AccountState;
 
+/// Immutable view of the whole state at one version.
+///
+/// Maps and entries are behind `Arc`s, so taking a snapshot is a pointer copy.
+/// While a reader holds a version, the next one copies the map it touched (a
+/// table of pointers) plus the entries that changed; otherwise it is built in
+/// place. Readers never see a half-applied update.
 #[derive(Debug, Clone)]
-pub struct State {
+pub struct StateSnapshot {
+    pub version: u64,
     pub connection_status: ConnectionStatus,
-    pub order_books: HashMap<String, OrderBook>,
-    pub accounts: HashMap<String, AccountState>,
-    pub orders: HashMap<String, Order>,
+    pub order_books: Arc<HashMap<String, Arc<OrderBook>>>,
+    pub accounts: Arc<HashMap<String, Arc<AccountState>>>,
+    /// Working orders. An order leaves the map in the version that closes it
+    /// (FILLED, CANCELED, REJECTED), so the map follows the working set rather
+    /// than the session; `changes_since` still lists it in that version.
+    pub orders: Arc<HashMap<String, Arc<Order>>>,
 }
 
-impl State {
-    pub fn new() -> Self {
-        Self {
+impl StateSnapshot {
+    fn empty() -> Self {
+        StateSnapshot {
+            version: 0,
             connection_status: ConnectionStatus::Disconnected,
-            order_books: HashMap::new(),
-            accounts: HashMap::new(),
-            orders: HashMap::new(),
+            order_books: Arc::new(HashMap::new()),
+            accounts: Arc::new(HashMap::new()),
+            orders: Arc::new(HashMap::new()),
         }
     }
 
+    pub fn order_book(&self, symbol: &str) -> Option<Arc<OrderBook>> {
+        self.order_books.get(symbol).cloned()
+    }
+
+    pub fn account(&self, account_id: &str) -> Option<Arc<AccountState>> {
+        self.accounts.get(account_id).cloned()
+    }
+
+    pub fn order(&self, order_id: &str) -> Option<Arc<Order>> {
+        self.orders.get(order_id).cloned()
+    }
+}
+
+#[derive(Debug, Clone, PartialEq, Eq, Hash)]
+pub enum StateKey {
+    ConnectionStatus,
+    OrderBook(String),
+    Order(String),
+    Account(String),
+}
+
+/// Keys changed after a given version, for incremental polling.
+#[derive(Debug, Clone, Default, Serialize)]
+pub struct StateChanges {
+    /// Version the changes bring the caller up to; pass it to the next `changes_since`.
+    pub version: u64,
+    /// The journal no longer reaches back far enough: re-read everything.
+    pub resync: bool,
+    pub connection_status: bool,
+    pub order_books: Vec<String>,
+    pub orders: Vec<String>,
+    pub accounts: Vec<String>,
+}
+
+/// Mutations collected into one new version. See `StateStore::update`.
+pub struct StateTxn<'a> {
+    next: &'a mut StateSnapshot,
+    changed: Vec<StateKey>,
+}
+
+impl StateTxn<'_> {
+    fn touch(&mut self, key: StateKey) {
+        if !self.changed.contains(&key) {
+            self.changed.push(key);
+        }
+    }
+
+    fn book_mut(&mut self, symbol: &str) -> &mut OrderBook {
+        self.touch(StateKey::OrderBook(symbol.to_string()));
+        let books = Arc::make_mut(&mut self.next.order_books);
+        let book = books.entry(symbol.to_string()).or_insert_with(|| Arc::new(OrderBook::new(symbol.to_string())));
+        Arc::make_mut(book)
+    }
+
+    pub fn order_mut(&mut self, order_id: &str) -> Option<&mut Order> {
+        if !self.next.orders.contains_key(order_id) {
+            return None;
+        }
+        self.touch(StateKey::Order(order_id.to_string()));
+        Arc::make_mut(&mut self.next.orders).get_mut(order_id).map(Arc::make_mut)
+    }
+
+    fn account_mut(&mut self, account_id: &str) -> &mut AccountState {
+        self.touch(StateKey::Account(account_id.to_string()));
+        let accounts = Arc::make_mut(&mut self.next.accounts);
+        Arc::make_mut(accounts.entry(account_id.to_string()).or_insert_with(|| Arc::new(AccountState::new())))
+    }
+
+    /// Change the book for `symbol` in place, creating an empty one if needed.
+    /// `f` returns whether it changed the book and a value passed back to the
+    /// caller; the book is only recorded as changed when it did.
+    pub fn update_book<R, F: FnOnce(&mut OrderBook) -> (bool, R)>(&mut self, symbol: &str, f: F) -> R {
+        let books = Arc::make_mut(&mut self.next.order_books);
+        let book = books.entry(symbol.to_string()).or_insert_with(|| Arc::new(OrderBook::new(symbol.to_string())));
+        let (changed, out) = f(Arc::make_mut(book));
+        if changed {
+            self.touch(StateKey::OrderBook(symbol.to_string()));
+        }
+        out
+    }
+
+    /// The book as it stands in this transaction, pending changes included.
+    pub fn order_book(&self, symbol: &str) -> Option<&OrderBook> {
+        self.next.order_books.get(symbol).map(|b| b.as_ref())
+    }
+
+    pub fn set_connection_status(&mut self, status: ConnectionStatus) {
+        self.touch(StateKey::ConnectionStatus);
+        self.next.connection_status = status;
+    }
+
+    pub fn put_order_book(&mut self, book: OrderBook) {
+        self.touch(StateKey::OrderBook(book.symbol.clone()));
+        Arc::make_mut(&mut self.next.order_books).insert(book.symbol.clone(), Arc::new(book));
+    }
+
+    /// Publish an order; a terminal one is taken out of `orders`.
+    pub fn put_order(&mut self, order: Order) {
+        let order_id = order.order_id.clone().unwrap_or_default();
+        self.touch(StateKey::Order(order_id.clone()));
+        let orders = Arc::make_mut(&mut self.next.orders);
+        if order.state.is_terminal() {
+            orders.remove(&order_id);
+        } else {
+            orders.insert(order_id, Arc::new(order));
+        }
+    }
+
+    /// Take the order out of `orders` if it has reached a terminal state.
+    pub fn close_if_terminal(&mut self, order_id: &str) {
+        if self.next.orders.get(order_id).map_or(false, |o| o.state.is_terminal()) {
+            Arc::make_mut(&mut self.next.orders).remove(order_id);
+        }
+    }
+
+    pub fn remove_order(&mut self, order_id: &str) {
+        if self.next.orders.contains_key(order_id) {
+            self.touch(StateKey::Order(order_id.to_string()));
+            Arc::make_mut(&mut self.next.orders).remove(order_id);
+        }
+    }
+
+    pub fn put_account(&mut self, account_id: &str, account: AccountState) {
+        self.touch(StateKey::Account(account_id.to_string()));
+        Arc::make_mut(&mut self.next.accounts).insert(account_id.to_string(), Arc::new(account));
+    }
+
+    /// Fold a venue message into the state.
     pub fn apply(&mut self, msg: &Message) {
         match msg {
             Message::ConnectionStatus(status) => {
-                self.connection_status = status.clone();
+                self.set_connection_status(status.clone());
             }
             Message::OrderBookUpdate { symbol, delta } => {
-                let book = self.order_books.entry(symbol.clone()).or_insert_with(|| OrderBook::new(symbol.clone()));
-                book.apply_delta(delta); 
+                self.book_mut(symbol).apply_delta(delta);
             }
             Message::OrderBookSnapshot(snapshot) => {
-                 let book = self.order_books.entry(snapshot.symbol.clone()).or_insert_with(|| OrderBook::new(snapshot.symbol.clone()));
-                 book.rebuild(snapshot.bids.clone(), snapshot.asks.clone(), snapshot.update_id, snapshot.timestamp);
+                self.book_mut(&snapshot.symbol).apply_snapshot(snapshot);
             }
             Message::MarketTrade { .. } => {
                 // Market trades might update Last Price, Volume, etc.
             }
             Message::OrderStatus { order_id, state, filled_qty, filled_price, .. } => {
-                 if let Some(order) = self.orders.get_mut(order_id) {
-                     order.state = state.clone();
-                     order.filled_quantity = *filled_qty;
-                     if let Some(price) = filled_price {
-                         order.average_fill_price = *price; // Simplified
-                     }
-                 }
+                if let Some(order) = self.order_mut(order_id) {
+                    order.state = state.clone();
+                    order.filled_quantity = *filled_qty;
+                    if let Some(price) = filled_price {
+                        order.average_fill_price = *price; // Simplified
+                    }
+                }
+                self.close_if_terminal(order_id);
             }
             Message::AccountUpdate { account_id, balance, locked } => {
-                let account = self.accounts.entry(account_id.clone()).or_insert_with(AccountState::new);
+                let account = self.account_mut(account_id);
                 if let Some(b) = balance {
                     account.balance = *b;
                 }
@@ -57,16 +197,139 @@ impl State {
                 }
             }
             Message::Execution { order_id, fill_qty, fill_price: _ } => {
-                 if let Some(order) = self.orders.get_mut(order_id) {
-                     // Update order based on execution?
-                     // Usually Execution implies OrderStatus update too, or we drive it here.
-                     // For now just logging or simple update logic if State manages orders.
-                     order.filled_quantity += fill_qty; 
-                     // Update avg price... logic omitted for brevity but should be here.
-                 }
+                if let Some(order) = self.order_mut(order_id) {
+                    order.filled_quantity += fill_qty;
+                    if order.filled_quantity >= order.quantity {
+                        order.state = OrderState::FILLED;
+                    }
+                }
+                self.close_if_terminal(order_id);
             }
             Message::Error { .. } => {
             }
         }
     }
 }
+
+/// The one place the rest of the system reads state from.
+///
+/// Writers (the `Client` pump thread, `OMSEngine`) go through `update`, which
+/// builds the next version under the write lock: in place when no reader holds
+/// the current one, copy-on-write (touched maps and entries only) when one
+/// does. Readers call `snapshot` and keep a consistent view for as long as
+/// they hold it; a later update never mutates it.
+///
+/// Every version records the keys it touched in a bounded journal, so callers
+/// can poll `changes_since(version)` instead of re-reading everything.
+pub struct StateStore {
+    current: RwLock<Arc<StateSnapshot>>,
+    // Also serializes writers
+    journal: Mutex<Journal>,
+    journal_capacity: usize,
+}
+
+#[derive(Default)]
+struct Journal {
+    // (version, key) for the last `journal_capacity` changes
+    entries: VecDeque<(u64, StateKey)>,
+    // Newest version with at least one key dropped from `entries`
+    evicted: u64,
+}
+
+impl Default for StateStore {
+    fn default() -> Self {
+        Self::new()
+    }
+}
+
+impl StateStore {
+    pub fn new() -> Self {
+        Self::with_journal(65_536)
+    }
+
+    pub fn with_journal(capacity: usize) -> Self {
+        StateStore {
+            current: RwLock::new(Arc::new(StateSnapshot::empty())),
+            journal: Mutex::new(Journal::default()),
+            journal_capacity: capacity.max(1),
+        }
+    }
+
+    pub fn snapshot(&self) -> Arc<StateSnapshot> {
+        self.current.read().unwrap().clone()
+    }
+
+    pub fn version(&self) -> u64 {
+        self.current.read().unwrap().version
+    }
+
+    /// Apply `f` as one version. Nothing is published if it changed nothing.
+    /// Returns the current version.
+    ///
+    /// `f` runs under the write lock: keep it short, and do not read the store
+    /// (`snapshot`, `version`) from inside it.
+    pub fn update<F: FnOnce(&mut StateTxn)>(&self, f: F) -> u64 {
+        let mut journal = self.journal.lock().unwrap();
+        let mut current = self.current.write().unwrap();
+        // Copies only the top-level Arcs, and only if a reader holds this version
+        let next = Arc::make_mut(&mut current);
+        let changed = {
+            let mut txn = StateTxn { next: &mut *next, changed: Vec::new() };
+            f(&mut txn);
+            txn.changed
+        };
+        if changed.is_empty() {
+            return next.version;
+        }
+        next.version += 1;
+        let version = next.version;
+        for key in changed {
+            if journal.entries.len() == self.journal_capacity {
+                if let Some((v, _)) = journal.entries.pop_front() {
+                    journal.evicted = v;
+                }
+            }
+            journal.entries.push_back((version, key));
+        }
+        version
+    }
+
+    pub fn apply(&self, msg: &Message) -> u64 {
+        self.update(|txn| txn.apply(msg))
+    }
+
+    /// Apply a batch of messages as a single version.
+    pub fn apply_all(&self, msgs: &[Message]) -> u64 {
+        self.update(|txn| msgs.iter().for_each(|m| txn.apply(m)))
+    }
+
+    /// Keys changed in versions after `version`, each listed once.
+    pub fn changes_since(&self, version: u64) -> StateChanges {
+        let journal = self.journal.lock().unwrap();
+        let current = self.version();
+        let mut changes = StateChanges { version: current, ..Default::default() };
+        if version >= current {
+            return changes;
+        }
+        if version < journal.evicted {
+            changes.resync = true;
+            return changes;
+        }
+        let mut seen = HashSet::new();
+        for (_, key) in journal.entries.iter().rev().take_while(|(v, _)| *v > version) {
+            if !seen.insert(key) {
+                continue;
+            }
+            match key {
+                StateKey::ConnectionStatus => changes.connection_status = true,
+                StateKey::OrderBook(s) => changes.order_books.push(s.clone()),
+                StateKey::Order(s) => changes.orders.push(s.clone()),
+                StateKey::Account(s) => changes.accounts.push(s.clone()),
+            }
+        }
+        changes.order_books.sort();
+        changes.orders.sort();
+        changes.accounts.sort();
+        changes
+    }
+}
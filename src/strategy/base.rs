@@ -24,6 +24,11 @@ pub trait Strategy {
         Ok(StrategyAction::None)
     }
 
+    // Next time (epoch seconds) `on_timer` should be called. None means no time trigger.
+    fn next_deadline(&self) -> Option<f64> {
+        None
+    }
+
     fn is_completed(&self) -> bool {
         false
     }
@@ -31,6 +36,17 @@ pub trait Strategy {
     fn get_origin_order_id(&self) -> Option<String> {
         None
     }
+
+    // Symbol whose book updates this strategy needs. None means every symbol.
+    fn get_symbol(&self) -> Option<String> {
+        None
+    }
+
+    // True if only the best bid/ask matter, so book updates that leave the top
+    // of book unchanged can be skipped.
+    fn bbo_only(&self) -> bool {
+        false
+    }
     
     fn update_order_id(&mut self, _new_id: String) {}
 }
@@ -65,4 +65,12 @@ impl Strategy for LimitStrategy {
     fn get_origin_order_id(&self) -> Option<String> {
         Some(self.original_order_id.clone())
     }
+
+    fn get_symbol(&self) -> Option<String> {
+        Some(self.symbol.clone())
+    }
+
+    fn bbo_only(&self) -> bool {
+        true
+    }
 }
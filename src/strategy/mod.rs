@@ -1,3 +1,4 @@
 pub mod base;
 pub mod limit;
-pub mod stop;
\ No newline at end of file
+pub mod stop;
+pub mod registry;
\ No newline at end of file
@@ -0,0 +1,291 @@
+use std::collections::{BinaryHeap, HashMap};
+use std::cmp::Reverse;
+use anyhow::Result;
+use crate::strategy::base::{Strategy, StrategyAction};
+
+pub type BoxedStrategy = Box<dyn Strategy + Send + Sync>;
+
+struct Entry {
+    strategy: BoxedStrategy,
+    symbol: Option<String>,
+    order_id: Option<String>,
+    // Deadline currently armed in the timer heap (epoch micros)
+    deadline: Option<i64>,
+    bbo_only: bool,
+}
+
+// Deadlines round up and the clock rounds down, so a timer never fires before
+// the strategy's own deadline check would pass (it is not re-armed if it did)
+fn deadline_micros(epoch_secs: f64) -> i64 {
+    (epoch_secs * 1_000_000.0).ceil() as i64
+}
+
+fn now_micros(epoch_secs: f64) -> i64 {
+    (epoch_secs * 1_000_000.0).floor() as i64
+}
+
+/// Active strategies indexed by symbol and by origin order id.
+///
+/// A book update only reaches the strategies registered on that symbol, and an
+/// order update only reaches the strategy owning that order. Strategies that do
+/// not report a symbol / order id are kept in wildcard lists and see every event.
+/// Slots are reused, so ids stay small and lookups stay O(1) per event.
+///
+/// Time triggers (`Strategy::next_deadline`) are kept in a min-heap, so the engine
+/// can sleep until the earliest deadline instead of polling every strategy.
+/// Heap entries are invalidated lazily: an entry only fires if it still matches
+/// the deadline recorded for that slot.
+#[derive(Default)]
+pub struct StrategyRegistry {
+    slots: Vec<Option<Entry>>,
+    free: Vec<usize>,
+    by_symbol: HashMap<String, Vec<usize>>,
+    by_order: HashMap<String, usize>,
+    any_symbol: Vec<usize>,
+    any_order: Vec<usize>,
+    timers: BinaryHeap<Reverse<(i64, usize)>>,
+    // Set when a deadline earlier than the current head was armed
+    timer_changed: bool,
+    count: usize,
+}
+
+impl StrategyRegistry {
+    pub fn new() -> Self {
+        Self::default()
+    }
+
+    pub fn len(&self) -> usize {
+        self.count
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.count == 0
+    }
+
+    pub fn add(&mut self, strategy: BoxedStrategy) -> usize {
+        let symbol = strategy.get_symbol();
+        let order_id = strategy.get_origin_order_id();
+        let bbo_only = strategy.bbo_only();
+
+        let id = match self.free.pop() {
+            Some(id) => id,
+            None => {
+                self.slots.push(None);
+                self.slots.len() - 1
+            }
+        };
+
+        match &symbol {
+            Some(s) => self.by_symbol.entry(s.clone()).or_default().push(id),
+            None => self.any_symbol.push(id),
+        }
+        match &order_id {
+            Some(o) => { self.by_order.insert(o.clone(), id); },
+            None => self.any_order.push(id),
+        }
+
+        self.slots[id] = Some(Entry { strategy, symbol, order_id, deadline: None, bbo_only });
+        self.count += 1;
+        self.rearm(id);
+        id
+    }
+
+    /// Sync the heap with the strategy's current `next_deadline`.
+    fn rearm(&mut self, id: usize) {
+        if let Some(entry) = self.slots[id].as_mut() {
+            let deadline = entry.strategy.next_deadline().map(deadline_micros);
+            if deadline != entry.deadline {
+                entry.deadline = deadline;
+                if let Some(d) = deadline {
+                    if self.timers.peek().map_or(true, |Reverse((head, _))| d < *head) {
+                        self.timer_changed = true;
+                    }
+                    self.timers.push(Reverse((d, id)));
+                }
+            }
+        }
+    }
+
+    /// True (once) if a new earliest deadline was armed since the last call,
+    /// i.e. a sleeping timer thread must be woken to re-plan.
+    pub fn take_timer_changed(&mut self) -> bool {
+        std::mem::take(&mut self.timer_changed)
+    }
+
+    /// Earliest armed deadline (epoch seconds), if any.
+    pub fn next_deadline(&mut self) -> Option<f64> {
+        // Drop stale heap entries so the engine does not wake up for nothing
+        while let Some(Reverse((d, id))) = self.timers.peek().copied() {
+            let live = self.slots.get(id)
+                .and_then(|e| e.as_ref())
+                .map_or(false, |e| e.deadline == Some(d));
+            if live {
+                return Some(d as f64 / 1_000_000.0);
+            }
+            self.timers.pop();
+        }
+        None
+    }
+
+    /// Call `on_timer` on every strategy whose deadline is <= `now` (epoch seconds).
+    /// A deadline that is still in the past after firing is not re-armed, so a
+    /// strategy cannot make the timer thread spin.
+    pub fn fire_due_timers(&mut self, now: f64) -> Vec<StrategyAction> {
+        let now_us = now_micros(now);
+        let mut actions = Vec::new();
+        let mut done = Vec::new();
+
+        while let Some(Reverse((d, id))) = self.timers.peek().copied() {
+            if d > now_us {
+                break;
+            }
+            self.timers.pop();
+
+            let entry = match self.slots.get_mut(id).and_then(|e| e.as_mut()) {
+                Some(e) if e.deadline == Some(d) => e,
+                _ => continue, // stale
+            };
+            entry.deadline = None;
+            if let Ok(action) = entry.strategy.on_timer() {
+                if !matches!(action, StrategyAction::None) {
+                    actions.push(action);
+                }
+            }
+            if entry.strategy.is_completed() {
+                done.push(id);
+                continue;
+            }
+            if let Some(next) = entry.strategy.next_deadline().map(deadline_micros) {
+                if next > now_us {
+                    entry.deadline = Some(next);
+                    self.timers.push(Reverse((next, id)));
+                }
+            }
+        }
+        for id in done {
+            self.remove(id);
+        }
+        actions
+    }
+
+    fn remove(&mut self, id: usize) -> Option<BoxedStrategy> {
+        let entry = self.slots.get_mut(id)?.take()?;
+
+        match &entry.symbol {
+            Some(s) => {
+                if let Some(ids) = self.by_symbol.get_mut(s) {
+                    ids.retain(|&i| i != id);
+                    if ids.is_empty() {
+                        self.by_symbol.remove(s);
+                    }
+                }
+            },
+            None => self.any_symbol.retain(|&i| i != id),
+        }
+        match &entry.order_id {
+            Some(o) => {
+                if self.by_order.get(o) == Some(&id) {
+                    self.by_order.remove(o);
+                }
+            },
+            None => self.any_order.retain(|&i| i != id),
+        }
+
+        self.free.push(id);
+        self.count -= 1;
+        Some(entry.strategy)
+    }
+
+    /// Re-key a strategy after its origin order id changed (e.g. modify returned a new id).
+    pub fn update_order_id(&mut self, old_id: &str, new_id: String) {
+        if let Some(id) = self.by_order.remove(old_id) {
+            if let Some(entry) = self.slots[id].as_mut() {
+                entry.strategy.update_order_id(new_id.clone());
+                entry.order_id = Some(new_id.clone());
+            }
+            self.by_order.insert(new_id, id);
+        }
+    }
+
+    pub fn origin_order_ids(&self) -> Vec<String> {
+        self.by_order.keys().cloned().collect()
+    }
+
+    /// Run `f` on strategies for `symbol` (plus wildcard ones) and collect their actions.
+    pub fn dispatch_symbol<F>(&mut self, symbol: &str, f: F) -> Vec<StrategyAction>
+    where
+        F: FnMut(&mut BoxedStrategy) -> Result<StrategyAction>,
+    {
+        let mut ids: Vec<usize> = self.by_symbol.get(symbol).cloned().unwrap_or_default();
+        ids.extend_from_slice(&self.any_symbol);
+        self.dispatch(ids, f)
+    }
+
+    /// Like `dispatch_symbol`, but skips `bbo_only` strategies when the top of book did not move.
+    pub fn dispatch_book<F>(&mut self, symbol: &str, top_changed: bool, f: F) -> Vec<StrategyAction>
+    where
+        F: FnMut(&mut BoxedStrategy) -> Result<StrategyAction>,
+    {
+        let mut ids: Vec<usize> = self.by_symbol.get(symbol).cloned().unwrap_or_default();
+        ids.extend_from_slice(&self.any_symbol);
+        if !top_changed {
+            ids.retain(|&id| self.slots[id].as_ref().map_or(false, |e| !e.bbo_only));
+        }
+        self.dispatch(ids, f)
+    }
+
+    /// Run `f` on the strategy owning `order_id` (plus wildcard ones) and collect their actions.
+    pub fn dispatch_order<F>(&mut self, order_id: &str, f: F) -> Vec<StrategyAction>
+    where
+        F: FnMut(&mut BoxedStrategy) -> Result<StrategyAction>,
+    {
+        let mut ids: Vec<usize> = self.by_order.get(order_id).copied().into_iter().collect();
+        ids.extend_from_slice(&self.any_order);
+        self.dispatch(ids, f)
+    }
+
+    /// Run `f` on every strategy.
+    pub fn dispatch_all<F>(&mut self, f: F) -> Vec<StrategyAction>
+    where
+        F: FnMut(&mut BoxedStrategy) -> Result<StrategyAction>,
+    {
+        let ids: Vec<usize> = (0..self.slots.len()).filter(|&i| self.slots[i].is_some()).collect();
+        self.dispatch(ids, f)
+    }
+
+    /// Remove completed strategies.
+    pub fn purge_completed(&mut self) {
+        let done: Vec<usize> = self.slots.iter().enumerate()
+            .filter_map(|(i, e)| e.as_ref().filter(|e| e.strategy.is_completed()).map(|_| i))
+            .collect();
+        for id in done {
+            self.remove(id);
+        }
+    }
+
+    fn dispatch<F>(&mut self, ids: Vec<usize>, mut f: F) -> Vec<StrategyAction>
+    where
+        F: FnMut(&mut BoxedStrategy) -> Result<StrategyAction>,
+    {
+        let mut actions = Vec::new();
+        let mut done = Vec::new();
+        for id in ids {
+            if let Some(entry) = self.slots[id].as_mut() {
+                if let Ok(action) = f(&mut entry.strategy) {
+                    if !matches!(action, StrategyAction::None) {
+                        actions.push(action);
+                    }
+                }
+                if entry.strategy.is_completed() {
+                    done.push(id);
+                    continue;
+                }
+                self.rearm(id);
+            }
+        }
+        for id in done {
+            self.remove(id);
+        }
+        actions
+    }
+}
@@ -49,7 +49,8 @@ impl StopStrategy {
 
     fn check_trigger(&mut self, book: Option<&OrderBook>) -> bool {
          if self.trigger_timestamp > 0.0 {
-             let now = Local::now().timestamp_millis() as f64 / 1000.0;
+             // Microsecond clock: the engine wakes exactly at the deadline
+             let now = Local::now().timestamp_micros() as f64 / 1_000_000.0;
              if now >= self.trigger_timestamp {
                  return true;
              }
@@ -107,6 +108,14 @@ impl Strategy for StopStrategy {
         
         Ok(StrategyAction::None)
     }
+
+    fn next_deadline(&self) -> Option<f64> {
+        if self.trigger_timestamp > 0.0 && !self.triggered && !self.finished {
+            Some(self.trigger_timestamp)
+        } else {
+            None
+        }
+    }
     
     fn on_order_status_update(&mut self, order: &Order) -> Result<StrategyAction> {
         let order_id = order.order_id.as_deref().unwrap_or("");
@@ -139,6 +148,14 @@ impl Strategy for StopStrategy {
     fn get_origin_order_id(&self) -> Option<String> {
         Some(self.original_order_id.clone())
     }
+
+    fn get_symbol(&self) -> Option<String> {
+        Some(self.original_symbol.clone())
+    }
+
+    fn bbo_only(&self) -> bool {
+        true
+    }
     
     fn update_order_id(&mut self, new_id: String) {
         self.original_order_id = new_id;
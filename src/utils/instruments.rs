@@ -0,0 +1,360 @@
+use anyhow::{anyhow, Result};
+use encoding_rs::EUC_KR;
+use pyo3::prelude::*;
+use serde::{Deserialize, Serialize};
+use std::collections::HashMap;
+use std::fs;
+use std::io::{Cursor, Read};
+use std::path::PathBuf;
+use std::sync::{Arc, Mutex, OnceLock};
+use std::time::{Duration, SystemTime, UNIX_EPOCH};
+use zip::ZipArchive;
+
+pub const KOSPI_MST_URL: &str = "https://new.real.download.dws.co.kr/common/master/kospi_code.mst.zip";
+const CACHE_FILE: &str = "kospi_master.bin";
+
+// Fixed-width tail of every kospi_code.mst line (ASCII, so bytes == chars)
+const PART2_LEN: usize = 227;
+// Head: short code (9) + standard code (12) + CP949 name
+const SHORT_CODE_LEN: usize = 9;
+const STANDARD_CODE_LEN: usize = 12;
+
+/// One row of the KOSPI master file.
+#[pyclass]
+#[derive(Debug, Clone, Serialize, Deserialize, PartialEq)]
+pub struct Instrument {
+    #[pyo3(get)]
+    pub code: String,
+    #[pyo3(get)]
+    pub standard_code: String,
+    #[pyo3(get)]
+    pub name: String,
+    #[pyo3(get)]
+    pub group_code: String,
+    /// Index industry classification (large / medium / small), 4-digit codes
+    #[pyo3(get)]
+    pub sector_large: String,
+    #[pyo3(get)]
+    pub sector_medium: String,
+    #[pyo3(get)]
+    pub sector_small: String,
+    /// KOSPI200 sector code; blank or "0" if not a member
+    #[pyo3(get)]
+    pub kospi200_sector: String,
+    #[pyo3(get)]
+    pub kospi200: bool,
+    #[pyo3(get)]
+    pub kospi100: bool,
+    #[pyo3(get)]
+    pub kospi50: bool,
+}
+
+#[pymethods]
+impl Instrument {
+    fn __repr__(&self) -> String {
+        format!("Instrument(code='{}', name='{}', sector='{}')", self.code, self.name, self.sector_large)
+    }
+}
+
+#[derive(Debug, Clone, Copy, PartialEq, Eq)]
+pub enum IndexUniverse {
+    Kospi50,
+    Kospi100,
+    Kospi200,
+    All,
+}
+
+impl IndexUniverse {
+    pub fn parse(s: &str) -> Result<Self> {
+        match s.to_ascii_uppercase().as_str() {
+            "KOSPI50" => Ok(IndexUniverse::Kospi50),
+            "KOSPI100" => Ok(IndexUniverse::Kospi100),
+            "KOSPI200" => Ok(IndexUniverse::Kospi200),
+            "ALL" | "KOSPI" => Ok(IndexUniverse::All),
+            _ => Err(anyhow!("Unknown index '{}': expected KOSPI50, KOSPI100, KOSPI200 or ALL", s)),
+        }
+    }
+
+    fn contains(&self, i: &Instrument) -> bool {
+        match self {
+            IndexUniverse::Kospi50 => i.kospi50,
+            IndexUniverse::Kospi100 => i.kospi100,
+            IndexUniverse::Kospi200 => i.kospi200,
+            IndexUniverse::All => true,
+        }
+    }
+}
+
+fn flag(b: u8) -> bool {
+    b == b'1' || b == b'Y'
+}
+
+fn ascii(bytes: &[u8]) -> String {
+    String::from_utf8_lossy(bytes).trim().to_string()
+}
+
+/// Parse one line. Only the name is decoded from CP949; everything else is
+/// read at fixed byte offsets.
+fn parse_line(line: &[u8]) -> Option<Instrument> {
+    if line.len() <= PART2_LEN + SHORT_CODE_LEN + STANDARD_CODE_LEN {
+        return None;
+    }
+    let (head, tail) = line.split_at(line.len() - PART2_LEN);
+    let code = ascii(&head[..SHORT_CODE_LEN]);
+    if code.is_empty() {
+        return None;
+    }
+    let (name, _, _) = EUC_KR.decode(&head[SHORT_CODE_LEN + STANDARD_CODE_LEN..]);
+    // Tail: group(2) mktcap(1) sector L/M/S(4 each) mfg(1) low-liquidity(1)
+    // governance(1) K200 sector(1) K100(1) K50(1) ...
+    let k200_sector = tail[18];
+    Some(Instrument {
+        code,
+        standard_code: ascii(&head[SHORT_CODE_LEN..SHORT_CODE_LEN + STANDARD_CODE_LEN]),
+        name: name.trim().to_string(),
+        group_code: ascii(&tail[0..2]),
+        sector_large: ascii(&tail[3..7]),
+        sector_medium: ascii(&tail[7..11]),
+        sector_small: ascii(&tail[11..15]),
+        kospi200_sector: ascii(&tail[18..19]),
+        kospi200: !matches!(k200_sector, b' ' | b'0' | b'N'),
+        kospi100: flag(tail[19]),
+        kospi50: flag(tail[20]),
+    })
+}
+
+/// Parsed KOSPI master with lookups by code, index and sector.
+#[derive(Debug, Clone, Default, Serialize, Deserialize)]
+pub struct InstrumentMaster {
+    /// Seconds since the epoch when the file was downloaded
+    pub fetched_at: u64,
+    /// Validators for a conditional refresh
+    pub etag: Option<String>,
+    pub last_modified: Option<String>,
+    instruments: Vec<Instrument>,
+    #[serde(skip)]
+    by_code: HashMap<String, usize>,
+}
+
+impl InstrumentMaster {
+    /// Parse the raw (CP949) `kospi_code.mst` in one pass over its lines.
+    pub fn parse(content: &[u8]) -> Self {
+        let instruments = content
+            .split(|b| *b == b'\n')
+            .map(|l| l.strip_suffix(b"\r").unwrap_or(l))
+            .filter_map(parse_line)
+            .collect();
+        Self::from_instruments(instruments)
+    }
+
+    pub fn from_instruments(instruments: Vec<Instrument>) -> Self {
+        let mut master = InstrumentMaster { instruments, ..Default::default() };
+        master.reindex();
+        master
+    }
+
+    fn reindex(&mut self) {
+        self.by_code = self.instruments.iter().enumerate().map(|(i, inst)| (inst.code.clone(), i)).collect();
+    }
+
+    pub fn len(&self) -> usize {
+        self.instruments.len()
+    }
+
+    pub fn is_empty(&self) -> bool {
+        self.instruments.is_empty()
+    }
+
+    pub fn get(&self, code: &str) -> Option<&Instrument> {
+        self.by_code.get(code).map(|i| &self.instruments[*i])
+    }
+
+    pub fn instruments(&self) -> &[Instrument] {
+        &self.instruments
+    }
+
+    /// Codes in `index`, in file order.
+    pub fn universe(&self, index: IndexUniverse) -> Vec<String> {
+        self.instruments.iter().filter(|i| index.contains(i)).map(|i| i.code.clone()).collect()
+    }
+
+    /// Codes whose large, medium or small sector code (or KOSPI200 sector) is `sector`.
+    pub fn by_sector(&self, sector: &str) -> Vec<String> {
+        self.instruments
+            .iter()
+            .filter(|i| i.sector_large == sector || i.sector_medium == sector || i.sector_small == sector || (i.kospi200 && i.kospi200_sector == sector))
+            .map(|i| i.code.clone())
+            .collect()
+    }
+
+    pub fn to_bytes(&self) -> Result<Vec<u8>> {
+        Ok(rmp_serde::to_vec(self)?)
+    }
+
+    pub fn from_bytes(bytes: &[u8]) -> Result<Self> {
+        let mut master: InstrumentMaster = rmp_serde::from_slice(bytes)?;
+        master.reindex();
+        Ok(master)
+    }
+
+    pub fn age(&self) -> Duration {
+        let now = SystemTime::now().duration_since(UNIX_EPOCH).unwrap_or_default().as_secs();
+        Duration::from_secs(now.saturating_sub(self.fetched_at))
+    }
+}
+
+/// Where and how long the parsed master is cached.
+#[derive(Debug, Clone)]
+pub struct MasterCache {
+    pub dir: PathBuf,
+    /// Younger than this, the cache is used without touching the network.
+    pub max_age: Duration,
+    pub url: String,
+}
+
+impl Default for MasterCache {
+    fn default() -> Self {
+        let dir = std::env::var_os("DIDIUS_CACHE_DIR")
+            .map(PathBuf::from)
+            .or_else(|| std::env::var_os("HOME").map(|h| PathBuf::from(h).join(".cache").join("didius")))
+            .unwrap_or_else(|| std::env::temp_dir().join("didius"));
+        MasterCache { dir, max_age: Duration::from_secs(12 * 3600), url: KOSPI_MST_URL.to_string() }
+    }
+}
+
+impl MasterCache {
+    pub fn path(&self) -> PathBuf {
+        self.dir.join(CACHE_FILE)
+    }
+
+    pub fn read(&self) -> Option<InstrumentMaster> {
+        fs::read(self.path()).ok().and_then(|b| InstrumentMaster::from_bytes(&b).ok())
+    }
+
+    pub fn write(&self, master: &InstrumentMaster) -> Result<()> {
+        fs::create_dir_all(&self.dir)?;
+        // Written aside and renamed, so a concurrent reader never sees half a file
+        let tmp = self.dir.join(format!("{}.tmp", CACHE_FILE));
+        fs::write(&tmp, master.to_bytes()?)?;
+        fs::rename(tmp, self.path())?;
+        Ok(())
+    }
+
+    /// Cached master if fresh; otherwise a conditional download. A failed
+    /// download falls back to a stale cache.
+    pub fn load(&self, force_refresh: bool) -> Result<InstrumentMaster> {
+        let cached = self.read();
+        if let Some(c) = &cached {
+            if !force_refresh && c.age() < self.max_age && !c.is_empty() {
+                return Ok(c.clone());
+            }
+        }
+        match self.fetch(cached.as_ref()) {
+            Ok(master) => {
+                if let Err(e) = self.write(&master) {
+                    eprintln!("Failed to cache instrument master: {}", e);
+                }
+                Ok(master)
+            },
+            Err(e) => match cached {
+                Some(c) => {
+                    eprintln!("Instrument master refresh failed ({}), using cache from {}s ago", e, c.age().as_secs());
+                    Ok(c)
+                },
+                None => Err(e),
+            },
+        }
+    }
+
+    fn fetch(&self, cached: Option<&InstrumentMaster>) -> Result<InstrumentMaster> {
+        let client = reqwest::blocking::Client::new();
+        let mut req = client.get(&self.url);
+        if let Some(c) = cached {
+            if let Some(etag) = &c.etag {
+                req = req.header(reqwest::header::IF_NONE_MATCH, etag);
+            }
+            if let Some(lm) = &c.last_modified {
+                req = req.header(reqwest::header::IF_MODIFIED_SINCE, lm);
+            }
+        }
+        let resp = req.send().map_err(|e| anyhow!("Failed to download KOSPI master: {}", e))?;
+        let now = SystemTime::now().duration_since(UNIX_EPOCH).unwrap_or_default().as_secs();
+        if resp.status() == reqwest::StatusCode::NOT_MODIFIED {
+            if let Some(c) = cached {
+                let mut master = c.clone();
+                master.fetched_at = now;
+                return Ok(master);
+            }
+        }
+        let resp = resp.error_for_status()?;
+        let header = |name: reqwest::header::HeaderName| resp.headers().get(name).and_then(|v| v.to_str().ok()).map(|s| s.to_string());
+        let etag = header(reqwest::header::ETAG);
+        let last_modified = header(reqwest::header::LAST_MODIFIED);
+        let bytes = resp.bytes()?;
+
+        let mut zip = ZipArchive::new(Cursor::new(bytes))?;
+        let mut file = zip.by_name("kospi_code.mst")?;
+        let mut content = Vec::new();
+        file.read_to_end(&mut content)?;
+
+        let mut master = InstrumentMaster::parse(&content);
+        master.fetched_at = now;
+        master.etag = etag;
+        master.last_modified = last_modified;
+        Ok(master)
+    }
+}
+
+// Loaded once per process; later universe queries reuse it
+fn shared() -> &'static Mutex<Option<Arc<InstrumentMaster>>> {
+    static MASTER: OnceLock<Mutex<Option<Arc<InstrumentMaster>>>> = OnceLock::new();
+    MASTER.get_or_init(|| Mutex::new(None))
+}
+
+/// Process-wide master, loaded through the default `MasterCache` on first use.
+pub fn kospi_master(force_refresh: bool) -> Result<Arc<InstrumentMaster>> {
+    let mut slot = shared().lock().unwrap();
+    if let Some(m) = slot.as_ref() {
+        if !force_refresh {
+            return Ok(m.clone());
+        }
+    }
+    let master = Arc::new(MasterCache::default().load(force_refresh)?);
+    *slot = Some(master.clone());
+    Ok(master)
+}
+
+fn to_py_err(e: anyhow::Error) -> PyErr {
+    pyo3::exceptions::PyRuntimeError::new_err(e.to_string())
+}
+
+/// Codes in "KOSPI50", "KOSPI100", "KOSPI200" or "ALL", from the cached master.
+#[pyfunction]
+#[pyo3(signature = (index="KOSPI50", refresh=false))]
+pub fn kospi_universe(py: Python, index: &str, refresh: bool) -> PyResult<Vec<String>> {
+    let index = IndexUniverse::parse(index).map_err(|e| pyo3::exceptions::PyValueError::new_err(e.to_string()))?;
+    let master = py.allow_threads(|| kospi_master(refresh)).map_err(to_py_err)?;
+    Ok(master.universe(index))
+}
+
+/// Look up one instrument by short code.
+#[pyfunction]
+pub fn instrument(py: Python, code: &str) -> PyResult<Option<Instrument>> {
+    let master = py.allow_threads(|| kospi_master(false)).map_err(to_py_err)?;
+    Ok(master.get(code).cloned())
+}
+
+/// Codes in an index industry sector (large, medium or small code) or KOSPI200 sector.
+#[pyfunction]
+pub fn instruments_by_sector(py: Python, sector: &str) -> PyResult<Vec<String>> {
+    let master = py.allow_threads(|| kospi_master(false)).map_err(to_py_err)?;
+    Ok(master.by_sector(sector))
+}
+
+pub fn register(m: &Bound<'_, PyModule>) -> PyResult<()> {
+    m.add_class::<Instrument>()?;
+    m.add_function(wrap_pyfunction!(kospi_universe, m)?)?;
+    m.add_function(wrap_pyfunction!(instrument, m)?)?;
+    m.add_function(wrap_pyfunction!(instruments_by_sector, m)?)?;
+    Ok(())
+}
@@ -1,9 +1,11 @@
 pub mod universe;
+pub mod instruments;
 use pyo3::prelude::*;
 
 pub fn register(m: &Bound<'_, PyModule>) -> PyResult<()> {
     let utils_module = PyModule::new(m.py(), "utils")?;
     universe::register(&utils_module)?;
+    instruments::register(&utils_module)?;
     m.add_submodule(&utils_module)?;
     Ok(())
 }
@@ -12,3 +14,48 @@ pub fn parse_decimal(s: &str) -> anyhow::Result<rust_decimal::Decimal> {
     use std::str::FromStr;
     rust_decimal::Decimal::from_str(s).map_err(|e| anyhow::anyhow!(e))
 }
+
+/// Most threads a batch call (`place_orders`, `cancel_orders`, ...) fans out to.
+/// The adapter's own limits (e.g. the Hantoo REST pipeline) still apply underneath.
+pub const BATCH_WORKERS: usize = 16;
+
+/// `f` over `items` on up to `BATCH_WORKERS` scoped threads, results in input order.
+/// Blocking calls overlap, so a batch takes about as long as its slowest calls
+/// rather than their sum.
+pub fn concurrent_map<T, R, F>(items: Vec<T>, f: F) -> Vec<R>
+where
+    T: Send,
+    R: Send,
+    F: Fn(T) -> R + Sync,
+{
+    use std::sync::Mutex;
+    if items.len() <= 1 {
+        return items.into_iter().map(f).collect();
+    }
+    let n = items.len();
+    let work = Mutex::new(items.into_iter().enumerate());
+    let results: Vec<Mutex<Option<R>>> = (0..n).map(|_| Mutex::new(None)).collect();
+    std::thread::scope(|s| {
+        for _ in 0..n.min(BATCH_WORKERS) {
+            s.spawn(|| loop {
+                let next = work.lock().unwrap().next();
+                let Some((i, item)) = next else { break };
+                *results[i].lock().unwrap() = Some(f(item));
+            });
+        }
+    });
+    results.into_iter().map(|r| r.into_inner().unwrap().expect("every item is processed")).collect()
+}
+
+/// Batch results for Python: the value, or the exception instance in its place
+/// (like `asyncio.gather(..., return_exceptions=True)`), so one failure does not
+/// hide what happened to the rest.
+pub fn batch_to_py<T>(py: Python, results: Vec<anyhow::Result<T>>, ok: impl Fn(Python, T) -> PyObject) -> Vec<PyObject> {
+    results
+        .into_iter()
+        .map(|r| match r {
+            Ok(v) => ok(py, v),
+            Err(e) => pyo3::exceptions::PyRuntimeError::new_err(e.to_string()).into_value(py).into_any(),
+        })
+        .collect()
+}
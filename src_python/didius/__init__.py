@@ -2,4 +2,5 @@
 from . import *
 # OR if using a specific module-name:
 from .core import utils, ExecutionStrategy, Order, OrderType, OrderSide, OrderState
+from .core import OrderBookEvent, MarketTrade, OrderStatusEvent, ExecutionEvent, SystemEvent
 from .client import Didius
@@ -1,4 +1,5 @@
 import asyncio
+import json
 import logging
 from typing import Optional, Dict, Any, List, Union
 from .core import Client as RustClient, Order
@@ -6,13 +7,26 @@ from decimal import Decimal
 
 logger = logging.getLogger(__name__)
 
+# Column buffers from the Rust core are little-endian; np.frombuffer wraps them without parsing.
+_BOOK_DTYPES = {"bid_px": "<f8", "bid_qty": "<i8", "ask_px": "<f8", "ask_qty": "<i8", "update_id": "<i8", "timestamp": "<f8"}
+_TICK_DTYPES = {"timestamp": "<f8", "bid_px": "<f8", "bid_qty": "<i8", "ask_px": "<f8", "ask_qty": "<i8",
+                "last_px": "<f8", "last_qty": "<i8", "kind": "<i8"}
+
+
+def _columns(raw: Dict[str, Any], dtypes: Dict[str, str]) -> Dict[str, Any]:
+    import numpy as np
+    return {k: (np.frombuffer(v, dtype=dtypes[k]) if k in dtypes else v) for k, v in raw.items()}
+
+
 class Didius:
     """
     Main entry point for Didius client.
     Provides an asyncio interface compatible with ib_async style.
     Wrapper around the Rust-based Core Client.
     """
-    def __init__(self, venue: str = "mock", config_path: Optional[str] = None, s3_bucket: Optional[str] = None, s3_region: Optional[str] = None, s3_prefix: Optional[str] = None):
+    def __init__(self, venue: str = "mock", config_path: Optional[str] = None, s3_bucket: Optional[str] = None, s3_region: Optional[str] = None, s3_prefix: Optional[str] = None,
+                 log_path: Optional[str] = None, log_format: str = "json", log_compress: bool = False, log_rotate_mb: Optional[int] = None, log_rotate_seconds: Optional[int] = None,
+                 log_queue_size: int = 65536, log_overflow: str = "block", tick_history_size: int = 4096):
         """
         Initialize the Didius client.
         
@@ -22,24 +36,54 @@ class Didius:
             s3_bucket: Optional AWS S3 bucket for logging.
             s3_region: Optional AWS region.
             s3_prefix: Optional prefix for log files in S3.
+            log_path: Write logs to this file instead of the console.
+            log_format: "json" (one line per message) or "binary" (length-prefixed MessagePack).
+            log_compress: zstd-compress binary logs.
+            log_rotate_mb: Rotate binary logs after this many MB (uncompressed).
+            log_rotate_seconds: Rotate binary logs after this many seconds.
+            log_queue_size: Messages the logging queue holds before `log_overflow` applies.
+            log_overflow: "block", "drop_oldest", or "sample:N" (keep every Nth message once half full).
+            tick_history_size: Ticks kept per symbol for `tick_history` (0 disables it).
         """
+        self._attach(RustClient(venue, config_path, s3_bucket, s3_region, s3_prefix,
+                                log_path, log_format, log_compress, log_rotate_mb, log_rotate_seconds,
+                                log_queue_size, log_overflow, tick_history_size))
+
+    @classmethod
+    def from_engine(cls, engine: Any, tick_history_size: int = 4096) -> "Didius":
+        """
+        Client over an `OMSEngine`, sharing its state (books, orders, account)
+        instead of keeping its own. Orders go through the engine's risk checks,
+        and messages arrive once `engine.start_gateway(adapter)` is running.
+        """
+        self = cls.__new__(cls)
+        self._attach(engine.client(tick_history_size))
+        return self
+
+    def _attach(self, conn: RustClient):
         self._loop = asyncio.get_event_loop()
-        self.conn = RustClient(venue, config_path, s3_bucket, s3_region, s3_prefix)
+        self.conn = conn
         self.running = False
         self._message_task = None
         self.handlers = [] # List of callbacks
+        # Messages drained by the wakeup-fd reader, waiting for dispatch
+        self._inbox: List[Any] = []
+        self._inbox_ready = asyncio.Event()
 
     async def connect(self):
         """Connect to the backend adapter."""
         # Run blocking connect in thread executor
         await self._loop.run_in_executor(None, self.conn.connect)
         self.running = True
+        # Rust core signals this fd when messages are queued; no executor polling needed
+        self._loop.add_reader(self.conn.wakeup_fd(), self._on_wakeup)
         self._message_task = self._loop.create_task(self._process_messages())
         logger.info("Didius Client Connected")
 
     async def disconnect(self):
         """Disconnect from the backend."""
         self.running = False
+        self._loop.remove_reader(self.conn.wakeup_fd())
         if self._message_task:
             self._message_task.cancel()
             try:
@@ -52,12 +96,28 @@ class Didius:
 
     def place_order(self, order: Order) -> bool:
         """Place an order."""
-        # Blocking call for now, could be async wrapped if needed but place_order is usually fast HTTP
+        # Blocking, but the GIL is released while waiting, so other threads keep running.
+        # Use run_in_executor to keep the event loop free as well.
         return self.conn.place_order(order)
 
     def cancel_order(self, order_id: str) -> bool:
         """Cancel an order."""
         return self.conn.cancel_order(order_id)
+
+    def place_orders(self, orders: List[Order]) -> List[Union[bool, Exception]]:
+        """Place several orders concurrently, e.g. a whole rebalance.
+
+        One entry per order, in order: the result, or the exception for that order.
+        """
+        return self.conn.place_orders(orders)
+
+    def cancel_orders(self, order_ids: List[str]) -> List[Union[bool, Exception]]:
+        """Cancel several orders concurrently; results as in `place_orders`."""
+        return self.conn.cancel_orders(order_ids)
+
+    def cancel_all(self, symbol: Optional[str] = None) -> Dict[str, Union[bool, Exception]]:
+        """Cancel every open order placed through this client (or those in `symbol`); `{order_id: result}`."""
+        return self.conn.cancel_all(symbol)
         
     def reqMktData(self, contract: Union[str, List[str]], genericTickList: str = "", snapshot: bool = False, regulatorySnapshot: bool = False, mktDataOptions: List[Any] = None):
         """
@@ -74,32 +134,105 @@ class Didius:
         # Rust Client::subscribe takes generic list? No, Vec<String>.
         self.conn.subscribe(symbols)
 
+    def cancelMktData(self, contract: Union[str, List[str]]):
+        """Stop market data for one or more symbols (unsubscribe)."""
+        if isinstance(contract, str):
+            symbols = [contract]
+        else:
+            symbols = contract
+        self.conn.unsubscribe(symbols)
+
+    def log_stats(self) -> Dict[str, int]:
+        """Logging queue counters: enqueued, dropped, flushed, high_water, len, capacity."""
+        return json.loads(self.conn.log_stats())
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Latency percentiles per stage (parse, channel, book, strategy, place_order,
+        tick_to_order) in microseconds, plus queue_depth / queue_depth_max (the engine
+        gateway channel's backlog; the client pump does not set it)."""
+        return self.conn.get_metrics()
+
+    def dump_metrics(self, path: str) -> None:
+        """Write the metrics to `path` in Prometheus text format (atomic replace)."""
+        self.conn.dump_metrics(path)
+
+    def state_version(self) -> int:
+        """Current version of the Rust state store."""
+        return self.conn.state_version()
+
+    def changes_since(self, version: int) -> Dict[str, Any]:
+        """Books, orders and accounts changed after `version`.
+        Keys: version (pass it to the next call), resync (re-read everything), connection_status, order_books, orders, accounts."""
+        return json.loads(self.conn.changes_since(version))
+
+    def book_arrays(self, symbols: List[str], depth: int = 10, format: str = "numpy") -> Dict[str, Any]:
+        """
+        Top `depth` levels of many books, taken from one state snapshot.
+
+        Returns bid_px/bid_qty/ask_px/ask_qty as (len(symbols), depth) arrays (level 0 is best;
+        missing levels are NaN / 0), plus update_id and timestamp per symbol, symbols, depth and version.
+        With format="arrow", a pyarrow RecordBatch with one row per symbol and list columns.
+        """
+        raw = self.conn.book_arrays(symbols, depth)
+        out = _columns(raw, _BOOK_DTYPES)
+        for key in ("bid_px", "bid_qty", "ask_px", "ask_qty"):
+            out[key] = out[key].reshape(len(symbols), depth)
+        if format == "arrow":
+            import pyarrow as pa
+            columns = {"symbol": pa.array(symbols)}
+            for key in ("bid_px", "bid_qty", "ask_px", "ask_qty"):
+                columns[key] = pa.FixedSizeListArray.from_arrays(pa.array(out[key].ravel()), depth)
+            columns["update_id"] = pa.array(out["update_id"])
+            columns["timestamp"] = pa.array(out["timestamp"])
+            return pa.RecordBatch.from_pydict(columns)
+        return out
+
+    def tick_history(self, symbol: str, last_n: Optional[int] = None, format: str = "numpy"):
+        """
+        Newest `last_n` ticks of `symbol` (all kept if None), oldest first, or None if never seen.
+
+        Columns: timestamp, bid_px, bid_qty, ask_px, ask_qty, last_px, last_qty, kind (0 = book, 1 = trade).
+        With format="arrow", a pyarrow RecordBatch.
+        """
+        raw = self.conn.tick_history(symbol, last_n)
+        if raw is None:
+            return None
+        out = _columns(raw, _TICK_DTYPES)
+        if format == "arrow":
+            import pyarrow as pa
+            return pa.RecordBatch.from_pydict({k: pa.array(v) for k, v in out.items()})
+        return out
+
+    def _on_wakeup(self):
+        """Reader callback: drain every queued message in one call."""
+        try:
+            batch = self.conn.drain_messages()
+        except Exception as e:
+            logger.error(f"Error draining messages: {e}")
+            return
+        if batch:
+            self._inbox.extend(batch)
+            self._inbox_ready.set()
+
     async def _process_messages(self):
-        """Loop to fetch messages from Rust core."""
+        """Dispatch drained messages to handlers, one loop wakeup per batch."""
         while self.running:
-            try:
-                # fetch_message with timeout (0.1s)
-                # We use run_in_executor to avoid blocking asyncio loop
-                msg_json = await self._loop.run_in_executor(None, self.conn.fetch_message, 0.1)
-                
-                if msg_json:
-                    # Message received (JSON string).
-                    # We can parse it here or dispatch generic event.
-                    # For compatibility with ib_async, we might trigger events like 'updatePortfolio', 'execDetails', etc.
-                    # For now just log or print.
-                    # Or implement a callback system.
-                    for handler in self.handlers:
-                        try:
-                            if asyncio.iscoroutinefunction(handler):
-                                await handler(msg_json)
-                            else:
-                                handler(msg_json)
-                        except Exception as e:
-                            logger.error(f"Error in handler: {e}")
-                            
-            except Exception as e:
-                logger.error(f"Error in message loop: {e}")
-                await asyncio.sleep(1)
+            await self._inbox_ready.wait()
+            self._inbox_ready.clear()
+            batch, self._inbox = self._inbox, []
+
+            for msg in batch:
+                # Message received as a typed object (OrderBookEvent, MarketTrade, OrderStatusEvent,
+                # ExecutionEvent or SystemEvent); no JSON round trip.
+                # For compatibility with ib_async, we might trigger events like 'updatePortfolio', 'execDetails', etc.
+                for handler in self.handlers:
+                    try:
+                        if asyncio.iscoroutinefunction(handler):
+                            await handler(msg)
+                        else:
+                            handler(msg)
+                    except Exception as e:
+                        logger.error(f"Error in handler: {e}")
 
     def add_handler(self, callback):
         self.handlers.append(callback)
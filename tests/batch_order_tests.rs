@@ -0,0 +1,62 @@
+use didius::adapter::mock::MockAdapter;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::risk::{RiskLimits, RiskReject};
+use didius::utils::concurrent_map;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+fn order(symbol: &str, qty: i64) -> Order {
+    Order::new(symbol.to_string(), OrderSide::BUY, OrderType::LIMIT, qty, Some("100".to_string()), None, None, None, "KRX".to_string())
+}
+
+fn engine() -> OMSEngine {
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    OMSEngine::new(Arc::new(MockAdapter::new()), Arc::new(Mutex::new(Logger::new(config))))
+}
+
+#[test]
+fn test_concurrent_map_keeps_order_and_overlaps() {
+    let start = Instant::now();
+    let out = concurrent_map((0..16).collect(), |i: u64| {
+        thread::sleep(Duration::from_millis(50));
+        i * 2
+    });
+    assert_eq!(out, (0..16).map(|i| i * 2).collect::<Vec<_>>());
+    // Sequentially this would take 800ms
+    assert!(start.elapsed() < Duration::from_millis(400));
+}
+
+#[test]
+fn test_send_orders_reports_each_result() {
+    let engine = engine();
+    engine.set_risk_limits(RiskLimits { max_order_qty: Some(10), ..Default::default() });
+
+    let orders = vec![order("A", 1), order("A", 50), order("B", 2), order("A", 3)];
+    let results = engine.send_orders_internal(orders);
+    assert_eq!(results.len(), 4);
+    assert!(matches!(results[1].as_ref().unwrap_err().downcast_ref::<RiskReject>(), Some(RiskReject::OrderQty { .. })));
+    let ids: Vec<String> = [0, 2, 3].iter().map(|&i| results[i].as_ref().unwrap().clone()).collect();
+    let orders = engine.get_orders();
+    assert_eq!(orders.len(), 3);
+    assert_eq!(orders[&ids[1]].symbol, "B");
+
+    let canceled = engine.cancel_all_internal(Some("A"));
+    assert_eq!(canceled.len(), 2);
+    assert!(canceled.iter().all(|(_, r)| r.is_ok()));
+    let orders = engine.get_orders();
+    assert_eq!(orders[&ids[0]].state, OrderState::PENDING_CANCEL);
+    assert_eq!(orders[&ids[1]].state, OrderState::PENDING_NEW);
+    // Already being canceled, so not sent again
+    assert!(engine.cancel_all_internal(Some("A")).is_empty());
+
+    let results = engine.cancel_orders_internal(vec![ids[1].clone(), "missing".to_string()]);
+    assert!(results[0].is_ok());
+    assert!(results[1].is_err());
+}
@@ -0,0 +1,68 @@
+use didius::oms::book_store::OrderBookStore;
+use didius::oms::order_book::{OrderBook, OrderBookDelta};
+use rust_decimal::Decimal;
+use std::sync::Arc;
+use std::thread;
+
+#[test]
+fn test_book_store_per_symbol_isolation() {
+    let store = OrderBookStore::new();
+    
+    // Hold the lock on AAA; BBB must still be writable and readable.
+    let aaa = store.entry("AAA");
+    let _guard = aaa.lock().unwrap();
+    
+    store.entry("BBB").lock().unwrap().apply_delta(&OrderBookDelta {
+        symbol: "BBB".to_string(),
+        bids: vec![(Decimal::new(100, 0), 5)],
+        asks: vec![],
+        update_id: 1,
+        timestamp: 1.0,
+    });
+    let bbb = store.snapshot("BBB").unwrap();
+    assert_eq!(bbb.get_best_bid(), Some((Decimal::new(100, 0), 5)));
+    assert_eq!(store.len(), 2);
+}
+
+#[test]
+fn test_book_store_concurrent_symbols() {
+    let store = Arc::new(OrderBookStore::new());
+    let symbols: Vec<String> = (0..16).map(|i| format!("{:06}", i)).collect();
+    
+    let handles: Vec<_> = symbols.iter().cloned().map(|sym| {
+        let store = store.clone();
+        thread::spawn(move || {
+            for i in 1..=1000i64 {
+                let book = store.entry(&sym);
+                book.lock().unwrap().apply_delta(&OrderBookDelta {
+                    symbol: sym.clone(),
+                    bids: vec![(Decimal::new(100, 0), i)],
+                    asks: vec![(Decimal::new(101, 0), i)],
+                    update_id: i,
+                    timestamp: i as f64,
+                });
+            }
+        })
+    }).collect();
+    for h in handles {
+        h.join().unwrap();
+    }
+    
+    for sym in &symbols {
+        let book = store.snapshot(sym).unwrap();
+        assert_eq!(book.last_update_id, 1000);
+        assert_eq!(book.get_best_ask(), Some((Decimal::new(101, 0), 1000)));
+    }
+}
+
+#[test]
+fn test_book_store_replace() {
+    let store = OrderBookStore::new();
+    let mut snapshot = OrderBook::new("AAA".to_string());
+    snapshot.rebuild(vec![(Decimal::new(99, 0), 1)], vec![], 7, 7.0);
+    store.replace("AAA", snapshot);
+    
+    assert!(store.contains("AAA"));
+    assert_eq!(store.snapshot("AAA").unwrap().last_update_id, 7);
+    assert!(store.snapshot("ZZZ").is_none());
+}
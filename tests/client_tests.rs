@@ -0,0 +1,53 @@
+use didius::adapter::mock::MockAdapter;
+use didius::client::Client;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use std::sync::{Arc, Mutex};
+
+fn order(symbol: &str, qty: i64) -> Order {
+    Order::new(symbol.to_string(), OrderSide::BUY, OrderType::LIMIT, qty, Some("100".to_string()), None, None, None, "KRX".to_string())
+}
+
+fn client() -> Client {
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    Client::with_adapter(Arc::new(MockAdapter::new()), Arc::new(Mutex::new(Logger::new(config))), 16).unwrap()
+}
+
+#[test]
+fn test_place_order_records_order() {
+    let client = client();
+    let mut named = order("A", 1);
+    named.order_id = Some("mine".to_string());
+    assert!(client.place_order_internal(named).unwrap());
+    assert!(client.place_order_internal(order("A", 2)).unwrap());
+
+    let orders = client.orders();
+    assert_eq!(orders.len(), 2);
+    assert_eq!(orders["mine"].state, OrderState::PENDING_NEW);
+    // Orders without an id get one
+    assert!(orders.keys().all(|id| !id.is_empty()));
+}
+
+#[test]
+fn test_cancel_all_cancels_orders_placed_through_client() {
+    let client = client();
+    for o in [order("A", 1), order("A", 2), order("B", 3)] {
+        assert!(client.place_order_internal(o).unwrap());
+    }
+
+    let canceled = client.cancel_all_internal(Some("A"));
+    assert_eq!(canceled.len(), 2);
+    assert!(canceled.iter().all(|(_, r)| matches!(r, Ok(true))));
+    let orders = client.orders();
+    assert!(canceled.iter().all(|(id, _)| orders[id].state == OrderState::PENDING_CANCEL));
+    // Already being canceled, so not sent again
+    assert!(client.cancel_all_internal(Some("A")).is_empty());
+
+    let rest = client.cancel_all_internal(None);
+    assert_eq!(rest.len(), 1);
+    assert_eq!(client.orders()[&rest[0].0].symbol, "B");
+}
@@ -0,0 +1,64 @@
+use didius::message::Message;
+use didius::oms::columnar::{f64_bytes, BookArrays, TickStore, TICK_BOOK, TICK_TRADE};
+use didius::oms::order_book::{OrderBook, OrderBookSnapshot};
+use rust_decimal::dec;
+
+fn book(symbol: &str, bids: Vec<(rust_decimal::Decimal, i64)>, asks: Vec<(rust_decimal::Decimal, i64)>, update_id: i64) -> OrderBook {
+    let mut book = OrderBook::new(symbol.to_string());
+    book.rebuild(bids, asks, update_id, update_id as f64);
+    book
+}
+
+#[test]
+fn test_book_arrays_pad_and_order_levels() {
+    let a = book("A", vec![(dec!(99), 1), (dec!(100), 2)], vec![(dec!(101), 3)], 7);
+    let mut arrays = BookArrays::new(2);
+    arrays.push("A", Some(&a));
+    arrays.push("B", None);
+
+    assert_eq!(arrays.len(), 2);
+    assert_eq!(arrays.bid_px[..2], [100.0, 99.0]);
+    assert_eq!(arrays.bid_qty, vec![2, 1, 0, 0]);
+    assert_eq!(arrays.ask_px[0], 101.0);
+    assert!(arrays.ask_px[1].is_nan() && arrays.bid_px[2].is_nan());
+    assert_eq!(arrays.ask_qty, vec![3, 0, 0, 0]);
+    assert_eq!(arrays.update_id, vec![7, -1]);
+    assert_eq!(f64_bytes(&[1.5]), 1.5f64.to_le_bytes().to_vec());
+}
+
+#[test]
+fn test_tick_history_records_top_moves_and_trades() {
+    let mut store = TickStore::new(3);
+    let snapshot = |bid: rust_decimal::Decimal, deep: i64, id: i64| {
+        Message::OrderBookSnapshot(OrderBookSnapshot { symbol: "A".to_string(), bids: vec![(bid, 5), (dec!(90), deep)], asks: vec![(dec!(110), 5)], update_id: id, timestamp: id as f64 })
+    };
+    let mut live = OrderBook::new("A".to_string());
+    let mut feed = |store: &mut TickStore, msg: Message| {
+        if let Message::OrderBookSnapshot(s) = &msg {
+            live.apply_snapshot(s);
+        }
+        store.record(&msg, Some(&live));
+    };
+
+    feed(&mut store, snapshot(dec!(100), 1, 1));
+    // Only depth below the top moved: no tick
+    feed(&mut store, snapshot(dec!(100), 2, 2));
+    feed(&mut store, Message::MarketTrade { symbol: "A".to_string(), price: dec!(100), quantity: 4, timestamp: 3.0 });
+    feed(&mut store, snapshot(dec!(101), 2, 4));
+
+    let cols = store.get("A").unwrap().columns(None);
+    assert_eq!(cols.timestamp, vec![1.0, 3.0, 4.0]);
+    assert_eq!(cols.kind, vec![TICK_BOOK, TICK_TRADE, TICK_BOOK]);
+    assert_eq!(cols.bid_px, vec![100.0, 100.0, 101.0]);
+    assert!(cols.last_px[0].is_nan());
+    // The last trade carries forward to later book ticks
+    assert_eq!(cols.last_px[1..], [100.0, 100.0]);
+    assert_eq!(cols.last_qty, vec![0, 4, 4]);
+
+    // Capacity bounds the history; oldest rows go first
+    feed(&mut store, snapshot(dec!(102), 2, 5));
+    let cols = store.get("A").unwrap().columns(Some(2));
+    assert_eq!(cols.timestamp, vec![4.0, 5.0]);
+    assert_eq!(store.get("A").unwrap().len(), 3);
+    assert!(TickStore::new(0).get("A").is_none());
+}
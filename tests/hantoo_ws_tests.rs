@@ -0,0 +1,69 @@
+use aes::Aes256;
+use base64::{Engine as _, engine::general_purpose::STANDARD as BASE64};
+use block_padding::Pkcs7;
+use cbc::cipher::{BlockEncryptMut, KeyIvInit};
+use didius::adapter::hantoo_ws::{WsDecoder, WsEvent};
+use rust_decimal::Decimal;
+
+#[test]
+fn test_parse_recorded_h0unasp0() {
+    let text = std::fs::read_to_string(concat!(env!("CARGO_MANIFEST_DIR"), "/examples/websocket_stock.txt")).unwrap();
+    let line = text.lines().next().unwrap();
+
+    let mut decoder = WsDecoder::new();
+    match decoder.parse(line) {
+        Some(WsEvent::Book(s)) => {
+            assert_eq!(s.symbol, "005930");
+            assert_eq!(s.asks.len(), 10);
+            assert_eq!(s.bids.len(), 10);
+            assert_eq!(s.asks[0], (Decimal::new(142600, 0), 36029));
+            assert_eq!(s.bids[0], (Decimal::new(142500, 0), 15286));
+        },
+        other => panic!("expected book, got {:?}", other),
+    }
+}
+
+#[test]
+fn test_parse_trade_and_unknown() {
+    let mut decoder = WsDecoder::new();
+    let frame = "0|H0STCNT0|001|005930^093000^71200^2^100^0.14^71150^71000^71300^70900^71200^71100^35^1000";
+    match decoder.parse(frame) {
+        Some(WsEvent::Trade(t)) => {
+            assert_eq!(t.symbol, "005930");
+            assert_eq!(t.price, Decimal::new(71200, 0));
+            assert_eq!(t.quantity, 35);
+        },
+        other => panic!("expected trade, got {:?}", other),
+    }
+    assert!(decoder.parse("0|H0XXXXX0|001|a^b^c").is_none());
+    assert!(decoder.parse("0|H0UNASP0|001|005930^1^2").is_none());
+}
+
+#[test]
+fn test_encrypted_notice_uses_cached_keys() {
+    let key = b"0123456789abcdef0123456789abcdef";
+    let iv = b"abcdef0123456789";
+    let plain = "CUST^ACCT^0000117^10^01^0^00^005930^0^7^71200^093000^N^2^0";
+    let cipher = cbc::Encryptor::<Aes256>::new_from_slices(key, iv).unwrap()
+        .encrypt_padded_vec_mut::<Pkcs7>(plain.as_bytes());
+    let frame = format!("1|H0STCNI0|001|{}", BASE64.encode(cipher));
+
+    let mut decoder = WsDecoder::new();
+    let response = format!(
+        r#"{{"header":{{"tr_id":"H0STCNI0"}},"body":{{"msg1":"SUBSCRIBE SUCCESS","output":{{"iv":"{}","key":"{}"}}}}}}"#,
+        std::str::from_utf8(iv).unwrap(), std::str::from_utf8(key).unwrap(),
+    );
+    assert!(decoder.update_keys(&response));
+
+    for _ in 0..2 {
+        match decoder.parse(&frame) {
+            Some(WsEvent::Notice(n)) => {
+                assert_eq!(n.order_no, "0000117");
+                assert_eq!(n.cntg_yn, "2");
+                assert_eq!(n.fill_qty, 7);
+                assert_eq!(n.fill_price, Decimal::new(71200, 0));
+            },
+            other => panic!("expected notice, got {:?}", other),
+        }
+    }
+}
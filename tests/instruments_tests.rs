@@ -0,0 +1,74 @@
+use didius::utils::instruments::{IndexUniverse, InstrumentMaster, MasterCache};
+use encoding_rs::EUC_KR;
+use std::time::Duration;
+
+// One kospi_code.mst line: short code, standard code, CP949 name, 227-byte flag tail
+fn mst_line(code: &str, name: &str, sector: &str, k200: u8, k100: u8, k50: u8) -> Vec<u8> {
+    let mut line = format!("{:<9}{:<12}", code, format!("KR7{}003", code)).into_bytes();
+    let (encoded, _, _) = EUC_KR.encode(name);
+    line.extend_from_slice(&encoded);
+    line.extend_from_slice(&vec![b' '; 40 - encoded.len()]);
+    let mut tail = vec![b'0'; 227];
+    tail[0..2].copy_from_slice(b"ST");
+    tail[3..7].copy_from_slice(sector.as_bytes());
+    tail[18] = k200;
+    tail[19] = k100;
+    tail[20] = k50;
+    line.extend_from_slice(&tail);
+    line
+}
+
+fn sample() -> Vec<u8> {
+    let mut content = Vec::new();
+    for line in [
+        mst_line("005930", "삼성전자", "0013", b'3', b'1', b'1'),
+        mst_line("000660", "SK하이닉스", "0013", b'3', b'1', b'0'),
+        mst_line("035420", "NAVER", "0021", b'0', b'0', b'0'),
+    ] {
+        content.extend_from_slice(&line);
+        content.extend_from_slice(b"\r\n");
+    }
+    content
+}
+
+#[test]
+fn test_parse_and_lookup() {
+    let master = InstrumentMaster::parse(&sample());
+    assert_eq!(master.len(), 3);
+
+    let samsung = master.get("005930").unwrap();
+    assert_eq!(samsung.name, "삼성전자");
+    assert_eq!(samsung.standard_code, "KR7005930003");
+    assert_eq!(samsung.sector_large, "0013");
+    assert!(samsung.kospi200 && samsung.kospi100 && samsung.kospi50);
+
+    assert_eq!(master.universe(IndexUniverse::Kospi50), vec!["005930"]);
+    assert_eq!(master.universe(IndexUniverse::Kospi200), vec!["005930", "000660"]);
+    assert_eq!(master.universe(IndexUniverse::parse("all").unwrap()).len(), 3);
+    assert_eq!(master.by_sector("0021"), vec!["035420"]);
+    assert!(master.get("999999").is_none());
+    assert!(IndexUniverse::parse("NASDAQ").is_err());
+}
+
+#[test]
+fn test_cache_round_trip_and_stale_fallback() {
+    let dir = std::env::temp_dir().join(format!("didius_master_{}", std::process::id()));
+    let cache = MasterCache {
+        dir: dir.clone(),
+        max_age: Duration::from_secs(3600),
+        // Nothing listens here, so any download attempt fails fast
+        url: "http://127.0.0.1:9/kospi_code.mst.zip".to_string(),
+    };
+    assert!(cache.load(false).is_err());
+
+    let mut master = InstrumentMaster::parse(&sample());
+    master.fetched_at = std::time::SystemTime::now().duration_since(std::time::UNIX_EPOCH).unwrap().as_secs();
+    cache.write(&master).unwrap();
+
+    // Fresh: served from disk, index rebuilt
+    let loaded = cache.load(false).unwrap();
+    assert_eq!(loaded.get("000660").unwrap().name, "SK하이닉스");
+    // Refresh fails: the stale copy is still returned
+    assert_eq!(cache.load(true).unwrap().len(), 3);
+    std::fs::remove_dir_all(dir).unwrap();
+}
@@ -0,0 +1,102 @@
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::message::{AsyncMessage, Message};
+use didius::logger::queue::{LogQueue, OverflowPolicy, QueueConfig};
+use didius::logger::Logger;
+use serde_json::json;
+use std::fs;
+use std::sync::Arc;
+use std::thread;
+use std::time::Duration;
+
+fn msg(seq: usize) -> AsyncMessage {
+    AsyncMessage::from(Message::new("MARKET_DATA".to_string(), json!({"seq": seq})))
+}
+
+fn seq(m: AsyncMessage) -> u64 {
+    m.into_message().log_body["seq"].as_u64().unwrap()
+}
+
+#[test]
+fn test_drop_oldest_keeps_newest() {
+    let q = LogQueue::new(QueueConfig { capacity: 4, overflow: OverflowPolicy::DropOldest });
+    for i in 0..10 {
+        q.push(msg(i));
+    }
+    let stats = q.stats();
+    assert_eq!(stats.enqueued, 10);
+    assert_eq!(stats.dropped, 6);
+    assert_eq!(stats.high_water, 4);
+    assert_eq!(stats.len, 4);
+    let kept: Vec<u64> = std::iter::from_fn(|| q.pop()).map(seq).collect();
+    assert_eq!(kept, vec![6, 7, 8, 9]);
+}
+
+#[test]
+fn test_sample_thins_when_half_full() {
+    let q = LogQueue::new(QueueConfig { capacity: 8, overflow: OverflowPolicy::Sample { every: 2 } });
+    for i in 0..20 {
+        q.push(msg(i));
+    }
+    let stats = q.stats();
+    assert_eq!(stats.enqueued + stats.dropped, 20);
+    assert_eq!(stats.len, 8);
+    // First half is taken as-is, then every other message until full
+    let kept: Vec<u64> = std::iter::from_fn(|| q.pop()).map(seq).collect();
+    assert_eq!(&kept[..4], &[0, 1, 2, 3]);
+    assert_eq!(&kept[4..], &[4, 6, 8, 10]);
+}
+
+#[test]
+fn test_block_applies_backpressure() {
+    let q = Arc::new(LogQueue::new(QueueConfig { capacity: 2, overflow: OverflowPolicy::Block }));
+    let producer = {
+        let q = q.clone();
+        thread::spawn(move || {
+            for i in 0..200 {
+                q.push(msg(i));
+            }
+        })
+    };
+    let mut received = Vec::new();
+    while received.len() < 200 {
+        match q.pop() {
+            Some(m) => received.push(seq(m)),
+            None => thread::sleep(Duration::from_micros(100)),
+        }
+    }
+    producer.join().unwrap();
+    assert_eq!(received, (0..200).collect::<Vec<u64>>());
+    let stats = q.stats();
+    assert_eq!(stats.dropped, 0);
+    assert!(stats.high_water <= 2);
+}
+
+#[test]
+fn test_logger_counts_flushed_and_late_messages() {
+    let path = "tests/tmp_logger_queue.log";
+    let _ = fs::remove_file(path);
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::LocalFile { path: path.to_string() },
+        flush_interval_seconds: 10,
+        batch_size: 16,
+    };
+    let mut logger = Logger::with_queue(config, QueueConfig { capacity: 1024, overflow: OverflowPolicy::Block });
+    let handle = logger.handle();
+    handle.log(Message::new("INFO".to_string(), json!({"seq": -1}))); // before start: dropped
+    logger.start();
+    for i in 0..100 {
+        handle.log(Message::new("INFO".to_string(), json!({"seq": i})));
+    }
+    logger.stop();
+    handle.log(Message::new("INFO".to_string(), json!({"seq": 100}))); // after stop: dropped
+
+    let stats = logger.stats();
+    assert_eq!(stats.enqueued, 100);
+    assert_eq!(stats.flushed, 100);
+    assert_eq!(stats.dropped, 2);
+    assert_eq!(fs::read_to_string(path).unwrap().lines().count(), 100);
+    let _ = fs::remove_file(path);
+
+    assert_eq!(OverflowPolicy::parse("sample:10").unwrap(), OverflowPolicy::Sample { every: 10 });
+    assert!(OverflowPolicy::parse("sample:0").is_err());
+}
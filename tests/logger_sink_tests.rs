@@ -0,0 +1,84 @@
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::message::Message;
+use didius::logger::sink::{read_binary_log, BinarySink, LogSink};
+use didius::logger::Logger;
+use serde_json::json;
+use std::fs;
+
+fn messages(n: usize) -> Vec<Message> {
+    (0..n).map(|i| Message::new("MARKET_DATA".to_string(), json!({"symbol": "005930", "seq": i, "bp": ["142500"], "bv": [15286]}))).collect()
+}
+
+fn clean(dir: &str) {
+    let _ = fs::remove_dir_all(dir);
+}
+
+#[test]
+fn test_binary_sink_round_trip() {
+    for compress in [false, true] {
+        let dir = format!("tests/tmp_binlog_{}", compress);
+        clean(&dir);
+        let path = format!("{}/md.bin", dir);
+
+        let mut sink = BinarySink::new(&path, compress, None, None).unwrap();
+        sink.write_batch(&messages(3)).unwrap();
+        sink.write_batch(&messages(2)).unwrap();
+        sink.close().unwrap();
+
+        let read = read_binary_log(&path).unwrap();
+        assert_eq!(read.len(), 5);
+        assert_eq!(read[0].log_type, "MARKET_DATA");
+        assert_eq!(read[2].log_body["seq"], 2);
+        assert_eq!(read[4].log_body["bv"][0], 15286);
+        clean(&dir);
+    }
+}
+
+#[test]
+fn test_binary_sink_rotates_by_size() {
+    let dir = "tests/tmp_binlog_rotate";
+    clean(dir);
+    let path = format!("{}/md.bin", dir);
+
+    // Each batch crosses the limit, so every batch after the first starts a new segment
+    let mut sink = BinarySink::new(&path, true, Some(100), None).unwrap();
+    for _ in 0..3 {
+        sink.write_batch(&messages(4)).unwrap();
+        std::thread::sleep(std::time::Duration::from_millis(5)); // distinct rotation suffixes
+    }
+    sink.close().unwrap();
+
+    let mut files: Vec<_> = fs::read_dir(dir).unwrap().map(|e| e.unwrap().path().to_string_lossy().to_string()).collect();
+    files.sort();
+    assert_eq!(files.len(), 3);
+    let total: usize = files.iter().map(|f| read_binary_log(f).unwrap().len()).sum();
+    assert_eq!(total, 12);
+    clean(dir);
+}
+
+#[test]
+fn test_logger_binary_destination() {
+    let dir = "tests/tmp_binlog_logger";
+    clean(dir);
+    let path = format!("{}/trade.bin", dir);
+
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::from_options(Some(path.clone()), Some("binary"), true, None, None).unwrap(),
+        flush_interval_seconds: 10,
+        batch_size: 100,
+    };
+    let mut logger = Logger::new(config);
+    logger.start();
+    for m in messages(10) {
+        logger.log(m);
+    }
+    logger.stop();
+
+    let read = read_binary_log(&path).unwrap();
+    assert_eq!(read.len(), 10);
+    assert_eq!(read[9].log_body["seq"], 9);
+    clean(dir);
+
+    assert!(LogDestinationInfo::from_options(Some(path), Some("xml"), false, None, None).is_err());
+    assert_eq!(LogDestinationInfo::from_options(None, Some("binary"), true, None, None).unwrap(), LogDestinationInfo::Console);
+}
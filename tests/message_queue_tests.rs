@@ -0,0 +1,54 @@
+use didius::adapter::IncomingMessage;
+use didius::client::MessageQueue;
+use std::io::{ErrorKind, Read};
+use std::mem::ManuallyDrop;
+use std::os::unix::io::FromRawFd;
+use std::os::unix::net::UnixStream;
+use std::sync::Arc;
+use std::thread;
+use std::time::{Duration, Instant};
+
+#[test]
+fn test_wakeup_fd_is_readable_whenever_messages_wait() {
+    const PRODUCERS: usize = 4;
+    const PER_PRODUCER: usize = 20_000;
+    let queue = Arc::new(MessageQueue::new().unwrap());
+    // Borrowed, like asyncio's add_reader; the queue owns and closes the fd
+    let fd = ManuallyDrop::new(unsafe { UnixStream::from_raw_fd(queue.wakeup_fd()) });
+
+    let producers: Vec<_> = (0..PRODUCERS)
+        .map(|p| {
+            let queue = queue.clone();
+            thread::spawn(move || {
+                for i in 0..PER_PRODUCER {
+                    queue.push(IncomingMessage::Error { code: p as i32, message: i.to_string() });
+                    if i % 64 == 0 {
+                        thread::yield_now();
+                    }
+                }
+            })
+        })
+        .collect();
+
+    // Only drain when the fd says so, as the Python event loop does
+    let mut received = 0;
+    let mut idle_since = Instant::now();
+    let mut buf = [0u8; 1];
+    while received < PRODUCERS * PER_PRODUCER {
+        match (&*fd).read(&mut buf) {
+            Ok(_) => {
+                received += queue.drain().len();
+                idle_since = Instant::now();
+            },
+            Err(e) if e.kind() == ErrorKind::WouldBlock => {
+                assert!(idle_since.elapsed() < Duration::from_secs(5), "wakeup lost with {} of {} messages received", received, PRODUCERS * PER_PRODUCER);
+                thread::sleep(Duration::from_micros(20));
+            },
+            Err(e) => panic!("{}", e),
+        }
+    }
+    for p in producers {
+        p.join().unwrap();
+    }
+    assert!(queue.drain().is_empty());
+}
@@ -0,0 +1,84 @@
+use didius::adapter::mock::MockAdapter;
+use didius::adapter::IncomingMessage;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::metrics::{self, Histogram, Metrics, Stage};
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderType};
+use didius::oms::order_book::OrderBookSnapshot;
+use rust_decimal::dec;
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+#[test]
+fn test_histogram_quantiles() {
+    let h = Histogram::new();
+    for us in 1..=1000u64 {
+        h.record(Duration::from_micros(us));
+    }
+    let stats = h.stats();
+    assert_eq!(stats.count, 1000);
+    assert!((stats.mean_us - 500.5).abs() < 1e-6);
+    // Buckets are within ~3% of the recorded values
+    assert!((stats.p50_us - 500.0).abs() < 20.0, "{:?}", stats);
+    assert!((stats.p99_us - 990.0).abs() < 35.0, "{:?}", stats);
+    assert_eq!(stats.max_us, 1000.0);
+    h.reset();
+    assert_eq!(h.stats().p99_us, 0.0);
+}
+
+#[test]
+fn test_prometheus_text() {
+    let m = Metrics::new();
+    m.record(Stage::Book, Duration::from_micros(3));
+    m.queue_depth.set(4);
+    m.queue_depth.set(1);
+    let text = m.prometheus();
+    assert!(text.contains("didius_stage_latency_seconds_count{stage=\"book\"} 1"));
+    assert!(text.contains("didius_stage_latency_seconds{stage=\"parse\",quantile=\"0.99\"} 0e0"));
+    assert!(text.contains("didius_queue_depth 1\n"));
+    assert!(text.contains("didius_queue_depth_max 4\n"));
+
+    let path = std::env::temp_dir().join(format!("didius_metrics_{}.prom", std::process::id()));
+    m.write_prometheus(&path).unwrap();
+    assert_eq!(std::fs::read_to_string(&path).unwrap(), text);
+    std::fs::remove_file(path).unwrap();
+}
+
+#[test]
+fn test_engine_records_stages() {
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(Arc::new(MockAdapter::new()), Arc::new(Mutex::new(Logger::new(config))));
+    let before = engine.get_metrics();
+
+    let (tx, rx) = mpsc::channel();
+    for i in 0..5 {
+        let snapshot = OrderBookSnapshot {
+            symbol: "A".to_string(),
+            bids: vec![(dec!(100) - rust_decimal::Decimal::from(i), 1)],
+            asks: vec![(dec!(101), 1)],
+            update_id: i,
+            timestamp: metrics::epoch_secs(),
+        };
+        tx.send(IncomingMessage::OrderBookSnapshot(snapshot)).unwrap();
+    }
+    // Queued before the listener starts, so it sees the backlog
+    engine.start_gateway_listener(rx).unwrap();
+    let order = Order::new("A".to_string(), OrderSide::BUY, OrderType::LIMIT, 1, Some("99".to_string()), None, None, None, "KRX".to_string());
+    engine.send_order_internal(order).unwrap();
+
+    let deadline = Instant::now() + Duration::from_secs(5);
+    let grew = |stage: Stage| engine.get_metrics().stage(stage).count >= before.stage(stage).count + 5;
+    while !(grew(Stage::Book) && grew(Stage::Channel)) {
+        assert!(Instant::now() < deadline, "timed out");
+        thread::sleep(Duration::from_millis(5));
+    }
+    let after = engine.get_metrics();
+    assert!(after.stage(Stage::PlaceOrder).count > before.stage(Stage::PlaceOrder).count);
+    assert!(after.stage(Stage::Strategy).count >= before.stage(Stage::Strategy).count + 5);
+    assert!(after.queue_depth_max >= 5);
+}
@@ -0,0 +1,128 @@
+use didius::adapter::matching::{Fill, MatchingBook, StaticBook};
+use didius::adapter::mock::{MockAdapter, MockConfig};
+use didius::adapter::Adapter;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::loadgen::{run_load, LoadConfig};
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::OrderBookSnapshot;
+use rust_decimal::dec;
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+fn fill(id: &str, price: rust_decimal::Decimal, qty: i64) -> Fill {
+    Fill { order_id: id.to_string(), price, qty }
+}
+
+#[test]
+fn test_price_time_priority() {
+    let mut book = MatchingBook::new("X");
+    assert_eq!(book.submit("a", OrderSide::SELL, Some(dec!(100)), 2).1, 2);
+    assert_eq!(book.submit("b", OrderSide::SELL, Some(dec!(100)), 2).1, 2);
+    assert_eq!(book.submit("c", OrderSide::SELL, Some(dec!(99)), 1).1, 1);
+
+    // Best price first, then first come first served within the level
+    let (fills, remaining) = book.submit("d", OrderSide::BUY, Some(dec!(100)), 4);
+    assert_eq!(remaining, 0);
+    assert_eq!(
+        fills,
+        vec![
+            fill("d", dec!(99), 1),
+            fill("c", dec!(99), 1),
+            fill("d", dec!(100), 2),
+            fill("a", dec!(100), 2),
+            fill("d", dec!(100), 1),
+            fill("b", dec!(100), 1),
+        ]
+    );
+    assert_eq!(book.resting_qty("b"), Some(1));
+    assert_eq!(book.cancel("b"), Some(1));
+    assert_eq!(book.cancel("a"), None);
+
+    // Generated liquidity crossing a resting order executes it at the order's price
+    book.submit("e", OrderSide::BUY, Some(dec!(101)), 3);
+    let snapshot = OrderBookSnapshot {
+        symbol: "X".to_string(),
+        bids: vec![(dec!(99), 5)],
+        asks: vec![(dec!(100), 2), (dec!(102), 5)],
+        update_id: 1,
+        timestamp: 0.0,
+    };
+    assert_eq!(book.replace_liquidity(&snapshot), vec![fill("e", dec!(101), 2)]);
+    assert_eq!(book.resting_qty("e"), Some(1));
+    assert_eq!(book.depth(5), (vec![(dec!(101), 1), (dec!(99), 5)], vec![(dec!(102), 5)]));
+}
+
+fn engine_with_venue(latency: Duration) -> (Arc<MockAdapter>, OMSEngine) {
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig { latency, book_interval: Duration::from_millis(20) }));
+    adapter.add_book_generator(Box::new(StaticBook::new("005930", vec![(dec!(69900), 1000)], vec![(dec!(70000), 1000)])));
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))));
+    (adapter, engine)
+}
+
+fn limit(side: OrderSide, qty: i64, price: &str) -> Order {
+    Order::new("005930".to_string(), side, OrderType::LIMIT, qty, Some(price.to_string()), None, None, None, "KRX".to_string())
+}
+
+fn wait_for_state(engine: &OMSEngine, order_id: &str, state: OrderState) {
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while engine.get_orders()[order_id].state != state {
+        assert!(Instant::now() < deadline, "{} never reached {:?}", order_id, state);
+        thread::sleep(Duration::from_millis(5));
+    }
+}
+
+#[test]
+fn test_mock_venue_fills_and_cancels_through_engine() {
+    let (adapter, engine) = engine_with_venue(Duration::from_millis(2));
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    engine.start_gateway_listener(rx).unwrap();
+    thread::sleep(Duration::from_millis(50));
+
+    let marketable = engine.send_order_internal(limit(OrderSide::BUY, 3, "70000")).unwrap();
+    let resting = engine.send_order_internal(limit(OrderSide::BUY, 5, "69000")).unwrap();
+    wait_for_state(&engine, &marketable, OrderState::FILLED);
+    wait_for_state(&engine, &resting, OrderState::NEW);
+    assert_eq!(engine.get_orders()[&marketable].average_fill_price, dec!(70000));
+    assert_eq!(engine.get_account().positions["005930"].quantity, 3);
+    assert_eq!(adapter.resting_qty(&resting), Some(5));
+    // The venue book, ours included, is what reconcile sees
+    let book = adapter.get_order_book_snapshot("005930").unwrap();
+    assert_eq!(book.bids.get(&dec!(69000)), Some(&5));
+
+    engine.cancel_order_internal(resting.clone()).unwrap();
+    wait_for_state(&engine, &resting, OrderState::CANCELED);
+    assert_eq!(adapter.resting_qty(&resting), None);
+    adapter.disconnect().unwrap();
+}
+
+#[test]
+fn test_load_generator_reports_latency() {
+    let latency = Duration::from_millis(2);
+    let (adapter, engine) = engine_with_venue(latency);
+    let report = run_load(&engine, adapter.as_ref(), &LoadConfig {
+        orders_per_sec: 500,
+        duration: Duration::from_millis(200),
+        symbols: vec!["005930".to_string()],
+        ..Default::default()
+    })
+    .unwrap();
+
+    assert_eq!(report.sent, 100);
+    assert_eq!(report.acked, 100);
+    assert_eq!(report.filled, 100);
+    assert_eq!(report.failed, 0);
+    assert!(report.ack.p50_us >= latency.as_secs_f64() * 1e6);
+    assert!(report.fill.p99_us >= report.fill.p50_us);
+    // Alternating BUY/SELL of 1 leaves the position flat
+    wait_for_state(&engine, "load-99", OrderState::FILLED);
+    assert!(engine.get_account().positions.get("005930").is_none());
+    adapter.disconnect().unwrap();
+}
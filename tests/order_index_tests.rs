@@ -0,0 +1,75 @@
+use didius::adapter::order_index::{NoticeRoute, OrderNoIndex};
+use didius::adapter::IncomingMessage;
+use didius::oms::order::OrderState;
+
+#[test]
+fn test_order_no_routes_after_modify_and_cancel() {
+    let mut index: OrderNoIndex<String> = OrderNoIndex::new();
+    for i in 0..5000 {
+        index.insert(format!("client-{}", i), &format!("{:010}", i), 10, format!("org-{}", i));
+    }
+    assert_eq!(index.client_id("0000004321"), Some("client-4321"));
+
+    // Modify returns a new order number; fills on the old one must still route
+    index.add_order_no("client-7", "0000900007");
+    assert_eq!(index.client_id("0000900007"), Some("client-7"));
+    assert_eq!(index.client_id("0000000007"), Some("client-7"));
+
+    assert_eq!(index.remove("client-7"), Some("org-7".to_string()));
+    assert_eq!(index.client_id("0000900007"), None);
+    assert_eq!(index.client_id("0000000007"), None);
+    assert_eq!(index.len(), 4999);
+}
+
+fn status(msg: Option<IncomingMessage>) -> (OrderState, Option<String>) {
+    match msg {
+        Some(IncomingMessage::OrderStatus { state, msg, .. }) => (state, msg),
+        other => panic!("expected an order status, got {:?}", other),
+    }
+}
+
+#[test]
+fn test_cancel_ack_closes_the_order() {
+    let mut index: OrderNoIndex<()> = OrderNoIndex::new();
+    index.insert("a".to_string(), "0000000001", 10, ());
+    index.add_cancel_no("a", "0000000002");
+
+    // The cancel's number answers the cancel; it is not an alias of the order
+    assert_eq!(index.route("0000000002"), Some(NoticeRoute::Cancel("a".to_string())));
+    assert_eq!(index.route("0000000001"), Some(NoticeRoute::Order("a".to_string())));
+    assert_eq!(index.client_id("0000000002"), None);
+
+    assert_eq!(status(index.cancel_notice("a", false, 1.0)), (OrderState::CANCELED, None));
+    assert!(index.is_empty());
+    assert_eq!(index.route("0000000001"), None);
+    assert_eq!(index.route("0000000002"), None);
+}
+
+#[test]
+fn test_cancel_reject_leaves_the_order_working() {
+    let mut index: OrderNoIndex<()> = OrderNoIndex::new();
+    index.insert("a".to_string(), "0000000001", 10, ());
+    index.add_cancel_no("a", "0000000002");
+    assert_eq!(status(index.cancel_notice("a", true, 1.0)), (OrderState::NEW, Some("Cancel rejected".to_string())));
+    assert_eq!(index.len(), 1);
+
+    // After a partial fill, a refused cancel reports the order as partially filled
+    index.fill("a", 4);
+    index.add_cancel_no("a", "0000000003");
+    assert_eq!(status(index.cancel_notice("a", true, 2.0)).0, OrderState::PARTIALLY_FILLED);
+    assert_eq!(index.route("0000000001"), Some(NoticeRoute::Order("a".to_string())));
+}
+
+#[test]
+fn test_filled_orders_are_forgotten() {
+    let mut index: OrderNoIndex<()> = OrderNoIndex::new();
+    index.insert("a".to_string(), "0000000001", 10, ());
+    index.add_order_no("a", "0000000005");
+    // Modified down to 6 open
+    index.set_open_qty("a", 6);
+    index.fill("a", 5);
+    assert_eq!(index.len(), 1);
+    index.fill("a", 1);
+    assert!(index.is_empty());
+    assert_eq!(index.route("0000000005"), None);
+}
@@ -0,0 +1,105 @@
+use didius::adapter::matching::StaticBook;
+use didius::adapter::mock::{MockAdapter, MockConfig};
+use didius::adapter::Adapter;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_store::OrderStore;
+use rust_decimal::dec;
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+fn order(id: &str, symbol: &str) -> Order {
+    let mut o = Order::new(symbol.to_string(), OrderSide::BUY, OrderType::LIMIT, 10, Some("100".to_string()), None, None, None, "KRX".to_string());
+    o.order_id = Some(id.to_string());
+    o.state = OrderState::PENDING_NEW;
+    o
+}
+
+#[test]
+fn test_indices_follow_state_changes() {
+    let mut store = OrderStore::new();
+    for id in ["a1", "a2", "a3"] {
+        store.insert(id.to_string(), order(id, "A"));
+    }
+    store.insert("b1".to_string(), order("b1", "B"));
+    assert_eq!(store.open_orders(Some("A")).len(), 3);
+    assert_eq!(store.open_count(), 4);
+
+    store.update("a1", |o| {
+        o.state = OrderState::NEW;
+        o.exchange_order_id = Some("0000117".to_string());
+    });
+    assert_eq!(store.count_in_state(&OrderState::NEW), 1);
+    assert_eq!(store.count_in_state(&OrderState::PENDING_NEW), 3);
+    assert_eq!(store.by_exchange_order_id("0000117"), Some("a1"));
+
+    // Terminal orders leave the working set for the archive
+    store.update("a1", |o| o.update_state(OrderState::FILLED, None));
+    store.update("a2", |o| o.update_state(OrderState::CANCELED, None));
+    assert_eq!(store.live_len(), 2);
+    assert_eq!(store.archive().len(), 2);
+    assert_eq!(store.open_orders(Some("A")).len(), 1);
+    assert!(store.get("a1").is_none());
+    assert_eq!(store.find("a1").unwrap().state, OrderState::FILLED);
+    assert_eq!(store.by_exchange_order_id("0000117"), Some("a1"));
+
+    // A late fill on a canceled order patches the archived fill, not its state
+    store.update("a2", |o| {
+        o.filled_quantity += 4;
+        o.state = OrderState::PARTIALLY_FILLED;
+    }).unwrap();
+    assert_eq!(store.archived("a2").unwrap().filled_quantity, 4);
+    assert_eq!(store.archived("a2").unwrap().state, OrderState::CANCELED);
+    assert_eq!(store.count_in_state(&OrderState::PARTIALLY_FILLED), 0);
+    assert_eq!(store.archive().len(), 2);
+
+    // Pending cancels are working but no longer open
+    store.update("a3", |o| o.update_state(OrderState::PENDING_CANCEL, None));
+    assert!(store.open_orders(Some("A")).is_empty());
+    assert_eq!(store.in_state(&OrderState::PENDING_CANCEL).len(), 1);
+    assert!(store.remove("b1").is_some());
+    assert_eq!(store.to_map().len(), 3);
+}
+
+#[test]
+fn test_engine_archives_finished_orders() {
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig { latency: Duration::from_millis(1), book_interval: Duration::from_millis(20) }));
+    adapter.add_book_generator(Box::new(StaticBook::new("A", vec![(dec!(99), 100)], vec![(dec!(101), 100)])));
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))));
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    engine.start_gateway_listener(rx).unwrap();
+
+    let limit = |price: &str| Order::new("A".to_string(), OrderSide::BUY, OrderType::LIMIT, 5, Some(price.to_string()), None, None, None, "KRX".to_string());
+    let filled = engine.send_order_internal(limit("101")).unwrap();
+    let resting = engine.send_order_internal(limit("95")).unwrap();
+    let canceled = engine.send_order_internal(limit("96")).unwrap();
+
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while engine.get_order(&filled).map(|o| o.state) != Some(OrderState::FILLED) || adapter.resting_qty(&canceled).is_none() {
+        assert!(Instant::now() < deadline, "timed out");
+        thread::sleep(Duration::from_millis(5));
+    }
+    engine.cancel_order_internal(canceled.clone()).unwrap();
+    while engine.get_order(&canceled).map(|o| o.state) != Some(OrderState::CANCELED) {
+        assert!(Instant::now() < deadline, "timed out");
+        thread::sleep(Duration::from_millis(5));
+    }
+
+    let open: Vec<String> = engine.open_orders(Some("A")).into_iter().filter_map(|o| o.order_id).collect();
+    assert_eq!(open, vec![resting]);
+    assert_eq!(engine.open_order_count(), 1);
+    assert_eq!(engine.archived_order_count(), 2);
+    assert_eq!(engine.get_order(&filled).unwrap().filled_quantity, 5);
+    // Archived orders are still published and listed
+    assert_eq!(engine.snapshot().order(&canceled).unwrap().state, OrderState::CANCELED);
+    assert_eq!(engine.get_orders().len(), 3);
+    adapter.disconnect().unwrap();
+}
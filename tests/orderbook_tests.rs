@@ -1,4 +1,4 @@
-use didius::oms::order_book::{OrderBook, OrderBookDelta};
+use didius::oms::order_book::{OrderBook, OrderBookDelta, OrderBookSnapshot};
 use rust_decimal::Decimal;
 use rust_decimal::dec;
 use rand::seq::SliceRandom;
@@ -135,3 +135,37 @@ fn test_orderbook_validate_fail() {
     
     assert!(!book.validate());
 }
+
+#[test]
+fn test_apply_snapshot_diffs_levels() {
+    let snapshot = |bids: Vec<(Decimal, i64)>, asks: Vec<(Decimal, i64)>, id: i64| OrderBookSnapshot {
+        symbol: "TEST".to_string(),
+        bids,
+        asks,
+        update_id: id,
+        timestamp: id as f64,
+    };
+    let mut book = OrderBook::new("TEST".to_string());
+    let first = book.apply_snapshot(&snapshot(vec![(dec!(100), 5), (dec!(99), 7)], vec![(dec!(101), 3), (dec!(102), 4)], 1));
+    assert!(first.top_changed);
+    assert_eq!(first.delta.bids.len() + first.delta.asks.len(), 4);
+
+    // Only a deep level moved: one change, top of book untouched
+    let second = book.apply_snapshot(&snapshot(vec![(dec!(100), 5), (dec!(99), 8)], vec![(dec!(101), 3), (dec!(102), 4)], 2));
+    assert!(!second.top_changed);
+    assert_eq!(second.delta.bids, vec![(dec!(99), 8)]);
+    assert!(second.delta.asks.is_empty());
+
+    // Identical snapshot: nothing to do
+    assert!(book.apply_snapshot(&snapshot(vec![(dec!(100), 5), (dec!(99), 8)], vec![(dec!(101), 3), (dec!(102), 4)], 3)).is_empty());
+
+    // Best ask level disappears (and an empty level is not kept)
+    let fourth = book.apply_snapshot(&snapshot(vec![(dec!(100), 5), (dec!(99), 8)], vec![(dec!(101), 0), (dec!(102), 4)], 4));
+    assert!(fourth.top_changed);
+    assert_eq!(fourth.delta.asks, vec![(dec!(101), 0)]);
+
+    let mut rebuilt = OrderBook::new("TEST".to_string());
+    rebuilt.rebuild(vec![(dec!(100), 5), (dec!(99), 8)], vec![(dec!(102), 4)], 4, 4.0);
+    assert_eq!(book, rebuilt);
+    assert_eq!(book.last_update_id, 4);
+}
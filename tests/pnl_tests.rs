@@ -0,0 +1,116 @@
+use didius::adapter::matching::StaticBook;
+use didius::adapter::mock::{MockAdapter, MockConfig};
+use didius::adapter::Adapter;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::account::{AccountState, Position};
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::OrderBookSnapshot;
+use didius::oms::pnl::{Crossing, PnlMetric, PnlTracker};
+use rust_decimal::dec;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+fn account() -> AccountState {
+    let mut acct = AccountState::new();
+    acct.rebuild(dec!(1000), dec!(0), vec![
+        Position::new("A".to_string(), 10, dec!(100), dec!(0)),
+        Position::new("B".to_string(), -5, dec!(50), dec!(52)),
+    ]);
+    acct
+}
+
+#[test]
+fn test_tracker_marks_incrementally() {
+    let mut pnl = PnlTracker::new();
+    pnl.reset(&account());
+    // A marks at its average price until a book arrives; B at the snapshot's price
+    let s = pnl.summary();
+    assert_eq!(s.unrealized, dec!(-10));
+    assert_eq!(s.gross_exposure, dec!(1260));
+    assert_eq!(s.equity(), dec!(1740));
+
+    let threshold = pnl.add_threshold(PnlMetric::Unrealized, Crossing::Below, dec!(-50), Arc::new(|_| {}));
+    assert_eq!(pnl.on_bbo("A", Some((dec!(94), 1)), Some((dec!(96), 1))).len(), 1);
+    assert_eq!(pnl.position("A").unwrap().mark, dec!(95));
+    assert_eq!(pnl.summary().unrealized, dec!(-60));
+    // Still breached: no second call until it recovers
+    assert!(pnl.on_bbo("A", Some((dec!(93), 1)), Some((dec!(95), 1))).is_empty());
+    assert!(pnl.on_bbo("A", Some((dec!(99), 1)), Some((dec!(101), 1))).is_empty());
+    assert_eq!(pnl.on_bbo("A", Some((dec!(90), 1)), Some((dec!(92), 1))).len(), 1);
+    assert!(pnl.remove_threshold(threshold));
+
+    pnl.set_margin_rate(None, dec!(0.5));
+    assert_eq!(pnl.summary().margin_used, dec!(585));
+
+    // A symbol without a position only updates its mark
+    assert!(pnl.on_bbo("C", Some((dec!(10), 1)), None).is_empty());
+    assert_eq!(pnl.mark("C"), Some(dec!(10)));
+    assert_eq!(pnl.summary().positions, 2);
+}
+
+#[test]
+fn test_execution_realizes_pnl() {
+    let mut acct = AccountState::new();
+    acct.on_execution("A".to_string(), "BUY".to_string(), 10, dec!(100), dec!(0));
+    acct.on_execution("A".to_string(), "SELL".to_string(), 4, dec!(110), dec!(0));
+    assert_eq!(acct.realized_pnl, dec!(40));
+    // Flip: 6 closed at 90, 4 opened short
+    acct.on_execution("A".to_string(), "SELL".to_string(), 10, dec!(90), dec!(0));
+    assert_eq!(acct.realized_pnl, dec!(-20));
+    assert_eq!(acct.positions["A"].quantity, -4);
+}
+
+#[test]
+fn test_engine_marks_positions_to_live_book() {
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig { latency: Duration::from_millis(1), book_interval: Duration::from_secs(3600) }));
+    adapter.add_book_generator(Box::new(StaticBook::new("005930", vec![(dec!(69900), 1000)], vec![(dec!(70000), 1000)])));
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))));
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx.clone());
+    engine.start_gateway_listener(rx).unwrap();
+
+    let breaches = Arc::new(AtomicUsize::new(0));
+    let counter = breaches.clone();
+    engine.add_pnl_threshold(PnlMetric::Total, Crossing::Below, dec!(-10000), Arc::new(move |_| {
+        counter.fetch_add(1, Ordering::SeqCst);
+    }));
+
+    let order = Order::new("005930".to_string(), OrderSide::BUY, OrderType::LIMIT, 2, Some("70000".to_string()), None, None, None, "KRX".to_string());
+    let order_id = engine.send_order_internal(order).unwrap();
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while engine.get_orders()[&order_id].state != OrderState::FILLED {
+        assert!(Instant::now() < deadline);
+        thread::sleep(Duration::from_millis(5));
+    }
+
+    // The market drops; only the BBO moves, no fill of ours
+    tx.send(didius::message::Message::OrderBookSnapshot(OrderBookSnapshot {
+        symbol: "005930".to_string(),
+        bids: vec![(dec!(63900), 10)],
+        asks: vec![(dec!(64100), 10)],
+        update_id: 99,
+        timestamp: 0.0,
+    }))
+    .unwrap();
+    while engine.pnl_summary().unrealized != dec!(-12000) {
+        assert!(Instant::now() < deadline, "{:?}", engine.pnl_summary());
+        thread::sleep(Duration::from_millis(5));
+    }
+    assert_eq!(engine.get_account().positions["005930"].current_price, dec!(64000));
+    assert_eq!(engine.position_pnl("005930").unwrap().exposure, dec!(128000));
+    // Callbacks run right after the mark is published
+    while breaches.load(Ordering::SeqCst) == 0 {
+        assert!(Instant::now() < deadline);
+        thread::sleep(Duration::from_millis(5));
+    }
+    assert_eq!(breaches.load(Ordering::SeqCst), 1);
+    adapter.disconnect().unwrap();
+}
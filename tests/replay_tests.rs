@@ -0,0 +1,221 @@
+use didius::adapter::replay::{RecordReader, RecordWriter, RecordingIndex, ReplayAdapter, ReplayConfig, ReplaySpeed};
+use didius::adapter::{Adapter, IncomingMessage};
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{ExecutionStrategy, Order, OrderSide, OrderType};
+use didius::oms::order_book::OrderBookSnapshot;
+use rust_decimal::Decimal;
+use std::collections::HashMap;
+use std::fs;
+use std::sync::mpsc;
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+const SECOND: i64 = 1_000_000;
+
+fn snapshot(symbol: &str, bid: i64, ask: i64, update_id: i64) -> IncomingMessage {
+    IncomingMessage::OrderBookSnapshot(OrderBookSnapshot {
+        symbol: symbol.to_string(),
+        bids: vec![(Decimal::new(bid, 0), 10), (Decimal::new(bid - 100, 0), 20)],
+        asks: vec![(Decimal::new(ask, 0), 10), (Decimal::new(ask + 100, 0), 20)],
+        update_id,
+        timestamp: update_id as f64,
+    })
+}
+
+// Two symbols, one message each per second for `seconds`; ask of 005930 walks down 100 per second
+fn write_recording(path: &str, seconds: i64) {
+    let _ = fs::remove_file(path);
+    let _ = fs::remove_file(format!("{}.idx", path));
+    let mut writer = RecordWriter::create(path, Duration::from_secs(1)).unwrap();
+    for i in 0..seconds {
+        let ts = 1_000 * SECOND + i * SECOND;
+        writer.write(ts, &snapshot("005930", 70000 - i * 100, 70100 - i * 100, i)).unwrap();
+        writer.write(ts + 500_000, &snapshot("000660", 180000, 180500, i)).unwrap();
+    }
+    writer.finish().unwrap();
+}
+
+fn cleanup(path: &str) {
+    let _ = fs::remove_file(path);
+    let _ = fs::remove_file(format!("{}.idx", path));
+}
+
+fn replay(path: &str, config: ReplayConfig, symbols: &[&str]) -> Vec<IncomingMessage> {
+    let adapter = ReplayAdapter::new(path, config).unwrap();
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    adapter.subscribe(&symbols.iter().map(|s| s.to_string()).collect::<Vec<_>>()).unwrap();
+    adapter.connect().unwrap();
+    let stats = adapter.wait().unwrap();
+    let messages: Vec<_> = rx.iter().collect();
+    assert_eq!(stats.messages as usize, messages.len());
+    messages
+}
+
+fn symbol_and_id(msg: &IncomingMessage) -> (String, i64) {
+    match msg {
+        IncomingMessage::OrderBookSnapshot(s) => (s.symbol.clone(), s.update_id),
+        other => panic!("unexpected {:?}", other),
+    }
+}
+
+#[test]
+fn test_recording_round_trip_and_index() {
+    let path = "tests/tmp_replay_roundtrip.rec";
+    write_recording(path, 10);
+
+    let records: Vec<_> = RecordReader::open(path).unwrap().map(|r| r.unwrap()).collect();
+    assert_eq!(records.len(), 20);
+    assert_eq!(records[0].0, 1_000 * SECOND);
+    assert_eq!(symbol_and_id(&records[19].1), ("000660".to_string(), 9));
+
+    let index = RecordingIndex::load(path).unwrap();
+    assert_eq!(index.count, 20);
+    assert_eq!(index.symbols["005930"].len(), 10);
+
+    // A missing sidecar is rebuilt from the data
+    fs::remove_file(format!("{}.idx", path)).unwrap();
+    let rebuilt = RecordingIndex::load(path).unwrap();
+    assert_eq!(rebuilt.count, 20);
+    assert_eq!(rebuilt.last_ts, index.last_ts);
+
+    // Seeking lands on or before the first wanted record
+    let mut reader = RecordReader::open(path).unwrap();
+    reader.seek(index.seek_offset(1_005 * SECOND, None)).unwrap();
+    let (ts, msg) = reader.next().unwrap().unwrap();
+    assert_eq!(ts, 1_005 * SECOND);
+    assert_eq!(symbol_and_id(&msg), ("005930".to_string(), 5));
+    cleanup(path);
+}
+
+#[test]
+fn test_replay_time_range_and_symbol_filter() {
+    let path = "tests/tmp_replay_filter.rec";
+    write_recording(path, 10);
+
+    let config = ReplayConfig {
+        from_us: Some(1_003 * SECOND + 1),
+        to_us: Some(1_006 * SECOND),
+        ..Default::default()
+    };
+    let messages = replay(path, config.clone(), &[]);
+    let got: Vec<_> = messages.iter().map(symbol_and_id).collect();
+    assert_eq!(
+        got,
+        vec![
+            ("000660".to_string(), 3),
+            ("005930".to_string(), 4),
+            ("000660".to_string(), 4),
+            ("005930".to_string(), 5),
+            ("000660".to_string(), 5),
+            ("005930".to_string(), 6),
+        ]
+    );
+
+    let messages = replay(path, config, &["000660"]);
+    let ids: Vec<_> = messages.iter().map(|m| symbol_and_id(m).1).collect();
+    assert_eq!(ids, vec![3, 4, 5]);
+    cleanup(path);
+}
+
+#[test]
+fn test_replay_paces_at_scaled_speed() {
+    let path = "tests/tmp_replay_speed.rec";
+    write_recording(path, 3); // 2.5 recorded seconds
+
+    let started = Instant::now();
+    let messages = replay(path, ReplayConfig { speed: ReplaySpeed::Scaled(10.0), ..Default::default() }, &[]);
+    let elapsed = started.elapsed();
+    assert_eq!(messages.len(), 6);
+    assert!(elapsed >= Duration::from_millis(240), "too fast: {:?}", elapsed);
+    assert!(elapsed < Duration::from_secs(2), "too slow: {:?}", elapsed);
+    cleanup(path);
+}
+
+#[test]
+fn test_disconnect_interrupts_recorded_gap() {
+    let path = "tests/tmp_replay_gap.rec";
+    let _ = fs::remove_file(path);
+    let mut writer = RecordWriter::create(path, Duration::from_secs(1)).unwrap();
+    writer.write(1_000 * SECOND, &snapshot("005930", 70000, 70100, 0)).unwrap();
+    // Lunch break: an hour between two messages
+    writer.write(4_600 * SECOND, &snapshot("005930", 70000, 70100, 1)).unwrap();
+    writer.finish().unwrap();
+
+    let adapter = ReplayAdapter::new(path, ReplayConfig { speed: ReplaySpeed::Recorded, ..Default::default() }).unwrap();
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    adapter.connect().unwrap();
+    rx.recv_timeout(Duration::from_secs(1)).unwrap();
+
+    let started = Instant::now();
+    adapter.disconnect().unwrap();
+    assert!(started.elapsed() < Duration::from_secs(1), "disconnect waited out the gap: {:?}", started.elapsed());
+    assert!(rx.try_recv().is_err());
+    cleanup(path);
+}
+
+fn stop_sell(trigger: &str, chained: &str) -> Order {
+    let mut params = HashMap::new();
+    params.insert("trigger_price".to_string(), trigger.to_string());
+    params.insert("trigger_side".to_string(), "SELL".to_string());
+    params.insert("chained_price".to_string(), chained.to_string());
+    Order::new(
+        "005930".to_string(),
+        OrderSide::SELL,
+        OrderType::LIMIT,
+        1,
+        Some("71000".to_string()),
+        Some(ExecutionStrategy::STOP),
+        Some(params),
+        None,
+        "KRX".to_string(),
+    )
+}
+
+// Replays the recording through the gateway listener and returns the final prices of the stop orders
+fn backtest(path: &str) -> (Vec<Option<Decimal>>, Option<Decimal>) {
+    let log_path = format!("{}.log", path);
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::LocalFile { path: log_path.clone() },
+        ..Default::default()
+    };
+    let logger = Arc::new(Mutex::new(Logger::new(config)));
+    let adapter = Arc::new(ReplayAdapter::new(path, ReplayConfig::default()).unwrap());
+    let engine = OMSEngine::new(adapter.clone(), logger);
+
+    // Ask walks 70100 -> 69200: the first triggers, the second never does
+    let hit = engine.send_order_internal(stop_sell("69500", "69400")).unwrap();
+    let miss = engine.send_order_internal(stop_sell("60000", "59900")).unwrap();
+
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    engine.start_gateway_listener(rx).unwrap();
+    adapter.connect().unwrap();
+    assert_eq!(adapter.wait().unwrap().messages, 20);
+
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while engine.get_order_book("000660").map_or(true, |b| b.last_update_id != 9) {
+        assert!(Instant::now() < deadline, "replay not consumed");
+        thread::sleep(Duration::from_millis(5));
+    }
+    let orders = engine.get_orders();
+    let best_ask = engine.get_order_book("005930").unwrap().get_best_ask().map(|(p, _)| p);
+    let _ = fs::remove_file(log_path);
+    (vec![orders[&hit].price, orders[&miss].price], best_ask)
+}
+
+#[test]
+fn test_replay_backtest_is_reproducible() {
+    let path = "tests/tmp_replay_backtest.rec";
+    write_recording(path, 10);
+
+    let first = backtest(path);
+    assert_eq!(first.0, vec![Some(Decimal::new(69400, 0)), Some(Decimal::new(71000, 0))]);
+    assert_eq!(first.1, Some(Decimal::new(69200, 0)));
+    assert_eq!(backtest(path), first);
+    cleanup(path);
+}
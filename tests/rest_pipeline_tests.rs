@@ -0,0 +1,124 @@
+use didius::adapter::rest::{RestConfig, RestPipeline, RestRequest};
+use std::io::{BufRead, BufReader, Read, Write};
+use std::net::TcpListener;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::Arc;
+use std::thread;
+use std::time::{Duration, Instant};
+
+// Minimal keep-alive HTTP/1.1 server standing in for the venue.
+// Answers every request with an order-accepted body after `delay`.
+struct StubVenue {
+    url: String,
+    connections: Arc<AtomicUsize>,
+    requests: Arc<AtomicUsize>,
+    max_concurrent: Arc<AtomicUsize>,
+}
+
+fn start_stub(delay: Duration) -> StubVenue {
+    let listener = TcpListener::bind("127.0.0.1:0").unwrap();
+    let url = format!("http://{}", listener.local_addr().unwrap());
+    let connections = Arc::new(AtomicUsize::new(0));
+    let requests = Arc::new(AtomicUsize::new(0));
+    let max_concurrent = Arc::new(AtomicUsize::new(0));
+    let current = Arc::new(AtomicUsize::new(0));
+
+    let (c, r, m) = (connections.clone(), requests.clone(), max_concurrent.clone());
+    thread::spawn(move || {
+        for stream in listener.incoming() {
+            let stream = match stream { Ok(s) => s, Err(_) => break };
+            c.fetch_add(1, Ordering::SeqCst);
+            let (r, m, current) = (r.clone(), m.clone(), current.clone());
+            thread::spawn(move || {
+                let mut reader = BufReader::new(stream.try_clone().unwrap());
+                let mut stream = stream;
+                loop {
+                    // Request line + headers
+                    let mut content_length = 0usize;
+                    let mut line = String::new();
+                    if reader.read_line(&mut line).unwrap_or(0) == 0 { return; }
+                    loop {
+                        line.clear();
+                        if reader.read_line(&mut line).unwrap_or(0) == 0 { return; }
+                        if line == "\r\n" { break; }
+                        let lower = line.to_ascii_lowercase();
+                        if let Some(v) = lower.strip_prefix("content-length:") {
+                            content_length = v.trim().parse().unwrap_or(0);
+                        }
+                    }
+                    let mut body = vec![0u8; content_length];
+                    if reader.read_exact(&mut body).is_err() { return; }
+
+                    let now = current.fetch_add(1, Ordering::SeqCst) + 1;
+                    m.fetch_max(now, Ordering::SeqCst);
+                    thread::sleep(delay);
+                    current.fetch_sub(1, Ordering::SeqCst);
+                    let n = r.fetch_add(1, Ordering::SeqCst);
+
+                    let payload = format!(r#"{{"rt_cd":"0","msg1":"OK","output":{{"KRX_FWDG_ORD_ORGNO":"00950","ODNO":"{:010}"}}}}"#, n);
+                    let resp = format!(
+                        "HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {}\r\nConnection: keep-alive\r\n\r\n{}",
+                        payload.len(), payload
+                    );
+                    if stream.write_all(resp.as_bytes()).is_err() { return; }
+                }
+            });
+        }
+    });
+    StubVenue { url, connections, requests, max_concurrent }
+}
+
+#[test]
+fn test_pipeline_bounds_in_flight_and_reuses_connections() {
+    let venue = start_stub(Duration::from_millis(30));
+    let pipeline = RestPipeline::new(RestConfig { max_in_flight: 3, ..Default::default() }).unwrap();
+
+    let tickets: Vec<_> = (0..12)
+        .map(|i| pipeline.submit(RestRequest::post(format!("{}/order", venue.url), serde_json::json!({"i": i}))).unwrap())
+        .collect();
+    for t in tickets {
+        let resp = t.wait().unwrap();
+        assert!(resp.is_success());
+        assert_eq!(resp.json().unwrap()["rt_cd"], "0");
+    }
+
+    assert_eq!(venue.requests.load(Ordering::SeqCst), 12);
+    assert!(venue.max_concurrent.load(Ordering::SeqCst) <= 3);
+    // Keep-alive: far fewer connections than requests
+    assert!(venue.connections.load(Ordering::SeqCst) < 12);
+
+    let stats = pipeline.latency_stats();
+    assert_eq!(stats.count, 12);
+    assert!(stats.p99_us >= stats.p50_us);
+    assert!(stats.max_us >= 30_000);
+}
+
+#[test]
+fn test_pipeline_rate_limit() {
+    let venue = start_stub(Duration::from_millis(0));
+    let pipeline = RestPipeline::new(RestConfig { max_in_flight: 4, rate_per_sec: 20.0, burst: 1, ..Default::default() }).unwrap();
+
+    let start = Instant::now();
+    let tickets: Vec<_> = (0..6)
+        .map(|_| pipeline.submit(RestRequest::get(format!("{}/quote", venue.url))).unwrap())
+        .collect();
+    for t in tickets {
+        assert!(t.wait().unwrap().is_success());
+    }
+    // 1 token up front, then 5 more at 20/s
+    assert!(start.elapsed() >= Duration::from_millis(240));
+}
+
+#[test]
+fn test_warm_goes_through_rate_limit() {
+    let venue = start_stub(Duration::from_millis(0));
+    let pipeline = RestPipeline::new(RestConfig { max_in_flight: 4, rate_per_sec: 20.0, burst: 1, ..Default::default() }).unwrap();
+
+    let start = Instant::now();
+    pipeline.warm(&venue.url, 4);
+    assert_eq!(venue.requests.load(Ordering::SeqCst), 4);
+    // 1 token up front, then 3 more at 20/s
+    assert!(start.elapsed() >= Duration::from_millis(140));
+    // Warm-up is not order latency
+    assert_eq!(pipeline.latency_stats().count, 0);
+}
@@ -0,0 +1,101 @@
+use didius::adapter::{Adapter, IncomingMessage};
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::message::ConnectionStatus;
+use didius::oms::account::AccountState;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::{OrderBook, OrderBookSnapshot};
+use rust_decimal::{dec, Decimal};
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+// REST snapshots wait for `release`, like a rate-limited venue
+struct SlowSnapshots {
+    release: Mutex<mpsc::Receiver<()>>,
+    calls: AtomicUsize,
+}
+
+impl Adapter for SlowSnapshots {
+    fn connect(&self) -> anyhow::Result<()> { Ok(()) }
+    fn disconnect(&self) -> anyhow::Result<()> { Ok(()) }
+    fn place_order(&self, _: &Order) -> anyhow::Result<bool> { Ok(true) }
+    fn cancel_order(&self, _: &str) -> anyhow::Result<bool> { Ok(true) }
+    fn get_order_book_snapshot(&self, symbol: &str) -> anyhow::Result<OrderBook> {
+        self.calls.fetch_add(1, Ordering::SeqCst);
+        self.release.lock().unwrap().recv()?;
+        let mut book = OrderBook::new(symbol.to_string());
+        book.rebuild(vec![(dec!(99), 5)], vec![(dec!(101), 5)], 0, 15.0);
+        Ok(book)
+    }
+    fn get_account_snapshot(&self, _: &str) -> anyhow::Result<AccountState> { Ok(AccountState::new()) }
+    fn modify_order(&self, _: &str, _: Option<Decimal>, _: Option<i64>) -> anyhow::Result<bool> { Ok(true) }
+    fn subscribe(&self, _: &[String]) -> anyhow::Result<()> { Ok(()) }
+    fn set_monitor(&self, _: mpsc::Sender<IncomingMessage>) {}
+}
+
+fn book(symbol: &str, bid: Decimal, timestamp: f64) -> IncomingMessage {
+    IncomingMessage::OrderBookSnapshot(OrderBookSnapshot {
+        symbol: symbol.to_string(),
+        bids: vec![(bid, 10)],
+        asks: vec![(bid + dec!(2), 10)],
+        update_id: timestamp as i64,
+        timestamp,
+    })
+}
+
+fn wait_until(what: &str, f: impl Fn() -> bool) {
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while !f() {
+        assert!(Instant::now() < deadline, "timed out waiting for {}", what);
+        thread::sleep(Duration::from_millis(2));
+    }
+}
+
+#[test]
+fn test_resync_does_not_block_the_gateway_listener() {
+    let (release, gate) = mpsc::channel();
+    let adapter = Arc::new(SlowSnapshots { release: Mutex::new(gate), calls: AtomicUsize::new(0) });
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))));
+    let (tx, rx) = mpsc::channel();
+    engine.start_gateway_listener(rx).unwrap();
+
+    tx.send(book("A", dec!(100), 10.0)).unwrap();
+    tx.send(book("B", dec!(200), 10.0)).unwrap();
+    wait_until("books", || engine.order_book("A").is_some() && engine.order_book("B").is_some());
+    let mut order = Order::new("A".to_string(), OrderSide::BUY, OrderType::LIMIT, 1, Some("100".to_string()), None, None, None, "KRX".to_string());
+    order.order_id = Some("o1".to_string());
+    engine.send_order_internal(order).unwrap();
+
+    tx.send(IncomingMessage::ConnectionStatus(ConnectionStatus::Reconnecting)).unwrap();
+    tx.send(IncomingMessage::ConnectionStatus(ConnectionStatus::Connected)).unwrap();
+    wait_until("the first snapshot request", || adapter.calls.load(Ordering::SeqCst) == 1);
+
+    // The snapshot is still loading; statuses and stream books keep flowing
+    tx.send(IncomingMessage::OrderStatus {
+        order_id: "o1".to_string(),
+        state: OrderState::NEW,
+        filled_qty: 0,
+        filled_price: None,
+        msg: None,
+        updated_at: 0.0,
+    }).unwrap();
+    tx.send(book("B", dec!(210), 20.0)).unwrap();
+    wait_until("the order status", || engine.get_order("o1").map(|o| o.state) == Some(OrderState::NEW));
+    wait_until("the stream book", || engine.order_book("B").unwrap().get_best_bid() == Some((dec!(210), 10)));
+    assert!(engine.is_resyncing());
+
+    release.send(()).unwrap();
+    release.send(()).unwrap();
+    wait_until("the resync", || !engine.is_resyncing());
+    assert_eq!(adapter.calls.load(Ordering::SeqCst), 2);
+    // A was reloaded; B was refreshed by the stream in the meantime and keeps it
+    assert_eq!(engine.order_book("A").unwrap().get_best_bid(), Some((dec!(99), 5)));
+    assert_eq!(engine.order_book("B").unwrap().get_best_bid(), Some((dec!(210), 10)));
+}
@@ -0,0 +1,108 @@
+use didius::adapter::mock::MockAdapter;
+use didius::adapter::{Adapter, IncomingMessage};
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::engine::OMSEngine;
+use didius::oms::account::AccountState;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::OrderBook;
+use didius::oms::risk::{RiskGate, RiskLimits, RiskReject};
+use rust_decimal::{dec, Decimal};
+use std::sync::{Arc, Mutex};
+
+fn order(id: &str, side: OrderSide, qty: i64, price: Option<&str>) -> Order {
+    let order_type = if price.is_some() { OrderType::LIMIT } else { OrderType::MARKET };
+    let mut o = Order::new("A".to_string(), side, order_type, qty, price.map(|p| p.to_string()), None, None, None, "KRX".to_string());
+    o.order_id = Some(id.to_string());
+    o
+}
+
+#[test]
+fn test_gate_limits_and_reservations() {
+    let mut gate = RiskGate::new(RiskLimits {
+        max_order_qty: Some(100),
+        max_gross_notional: Some(dec!(10000)),
+        max_open_orders: Some(3),
+        price_band: Some(dec!(0.05)),
+        max_position: Some(50),
+        ..Default::default()
+    });
+    gate.on_bbo("A", Some(dec!(99)), Some(dec!(101)));
+
+    assert!(matches!(gate.check(&order("x", OrderSide::BUY, 200, Some("100"))), Err(RiskReject::OrderQty { .. })));
+    assert!(matches!(gate.check(&order("x", OrderSide::BUY, 1, Some("120"))), Err(RiskReject::PriceBand { .. })));
+    assert!(gate.check(&order("a", OrderSide::BUY, 40, Some("100"))).is_ok());
+    // Open buys count toward the position limit
+    assert!(matches!(gate.check(&order("b", OrderSide::BUY, 20, Some("100"))), Err(RiskReject::Position { projected: 60, .. })));
+    // Re-sending the same id replaces its reservation
+    assert!(gate.check(&order("a", OrderSide::BUY, 45, Some("100"))).is_ok());
+    assert_eq!(gate.stats().gross_notional, dec!(4500));
+
+    // Market sells are valued at the bid
+    assert!(matches!(gate.check(&order("c", OrderSide::SELL, 60, None)), Err(RiskReject::GrossNotional { .. })));
+    gate.on_fill("a", 45, dec!(100));
+    assert_eq!(gate.stats().open_orders, 0);
+    assert!(gate.check(&order("c", OrderSide::SELL, 40, None)).is_ok());
+    assert_eq!(gate.stats().gross_notional, dec!(8460));
+    gate.on_status("c", &OrderState::CANCELED);
+    assert_eq!(gate.stats().gross_notional, dec!(4500));
+    assert_eq!(gate.stats().rejected, 4);
+}
+
+#[test]
+fn test_gate_order_rate() {
+    let mut gate = RiskGate::new(RiskLimits { max_orders_per_sec: Some(3), ..Default::default() });
+    for i in 0..3 {
+        assert!(gate.check(&order(&format!("o{}", i), OrderSide::BUY, 1, None)).is_ok());
+    }
+    assert_eq!(gate.check(&order("o3", OrderSide::BUY, 1, None)), Err(RiskReject::OrderRate { limit: 3 }));
+}
+
+#[test]
+fn test_engine_rejects_before_adapter() {
+    let adapter = Arc::new(MockAdapter::new());
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))));
+    engine.set_risk_limits(RiskLimits { max_order_notional: Some(dec!(1000)), ..Default::default() });
+
+    assert!(engine.send_order_internal(order("small", OrderSide::BUY, 1, Some("500"))).is_ok());
+    let err = engine.send_order_internal(order("big", OrderSide::BUY, 3, Some("500"))).unwrap_err();
+    assert_eq!(err.downcast_ref::<RiskReject>(), Some(&RiskReject::OrderNotional { notional: dec!(1500), limit: dec!(1000) }));
+    assert!(!engine.get_orders().contains_key("big"));
+    assert_eq!(engine.risk_stats().open_orders, 1);
+}
+
+// Every placement fails before reaching the venue
+struct Unreachable;
+
+impl Adapter for Unreachable {
+    fn connect(&self) -> anyhow::Result<()> { Ok(()) }
+    fn disconnect(&self) -> anyhow::Result<()> { Ok(()) }
+    fn place_order(&self, _: &Order) -> anyhow::Result<bool> { Err(anyhow::anyhow!("connection refused")) }
+    fn cancel_order(&self, _: &str) -> anyhow::Result<bool> { Ok(true) }
+    fn get_order_book_snapshot(&self, symbol: &str) -> anyhow::Result<OrderBook> { Ok(OrderBook::new(symbol.to_string())) }
+    fn get_account_snapshot(&self, _: &str) -> anyhow::Result<AccountState> { Ok(AccountState::new()) }
+    fn modify_order(&self, _: &str, _: Option<Decimal>, _: Option<i64>) -> anyhow::Result<bool> { Ok(true) }
+    fn subscribe(&self, _: &[String]) -> anyhow::Result<()> { Ok(()) }
+    fn set_monitor(&self, _: std::sync::mpsc::Sender<IncomingMessage>) {}
+}
+
+#[test]
+fn test_engine_rejects_order_the_adapter_failed_to_send() {
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(Arc::new(Unreachable), Arc::new(Mutex::new(Logger::new(config))));
+    assert!(engine.send_order_internal(order("lost", OrderSide::BUY, 1, Some("500"))).is_err());
+
+    assert_eq!(engine.get_orders()["lost"].state, OrderState::REJECTED);
+    assert!(engine.open_orders(None).is_empty());
+    // Published as closed: listed as changed, gone from the working orders
+    assert!(engine.state_store().changes_since(0).orders.contains(&"lost".to_string()));
+    assert!(engine.snapshot().order("lost").is_none());
+    assert_eq!(engine.risk_stats().open_orders, 0);
+}
@@ -0,0 +1,187 @@
+use didius::adapter::matching::StaticBook;
+use didius::adapter::mock::{MockAdapter, MockConfig};
+use didius::adapter::Adapter;
+use didius::client::Client;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::message::{ConnectionStatus, Message};
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::OrderBookSnapshot;
+use didius::state::StateStore;
+use rust_decimal::dec;
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+fn book_msg(symbol: &str, bid: rust_decimal::Decimal, update_id: i64) -> Message {
+    Message::OrderBookSnapshot(OrderBookSnapshot {
+        symbol: symbol.to_string(),
+        bids: vec![(bid, 10)],
+        asks: vec![(bid + dec!(10), 10)],
+        update_id,
+        timestamp: 0.0,
+    })
+}
+
+#[test]
+fn test_snapshot_is_isolated_from_later_updates() {
+    let store = StateStore::new();
+    store.apply(&book_msg("A", dec!(100), 1));
+    store.apply(&book_msg("B", dec!(200), 1));
+    let before = store.snapshot();
+    assert_eq!(before.version, 2);
+
+    store.apply(&book_msg("A", dec!(101), 2));
+    let after = store.snapshot();
+    assert_eq!(after.version, 3);
+    assert_eq!(before.order_book("A").unwrap().bids.get(&dec!(100)), Some(&10));
+    assert_eq!(after.order_book("A").unwrap().bids.get(&dec!(101)), Some(&10));
+
+    // Untouched entries are shared, not copied
+    assert!(Arc::ptr_eq(&before.order_book("B").unwrap(), &after.order_book("B").unwrap()));
+}
+
+#[test]
+fn test_update_in_place_without_readers() {
+    let store = StateStore::new();
+    store.apply(&book_msg("A", dec!(100), 1));
+    let book = Arc::as_ptr(&store.snapshot().order_book("A").unwrap());
+
+    // Nobody holds version 1, so the book is updated where it is
+    store.apply(&book_msg("A", dec!(101), 2));
+    assert_eq!(Arc::as_ptr(&store.snapshot().order_book("A").unwrap()), book);
+
+    // A held version is copied away from instead
+    let held = store.snapshot();
+    store.apply(&book_msg("A", dec!(102), 3));
+    assert_ne!(Arc::as_ptr(&store.snapshot().order_book("A").unwrap()), Arc::as_ptr(&held.order_book("A").unwrap()));
+    assert_eq!(held.version, 2);
+    assert_eq!(held.order_book("A").unwrap().bids.get(&dec!(101)), Some(&10));
+}
+
+#[test]
+fn test_changes_since() {
+    let store = StateStore::with_journal(4);
+    assert_eq!(store.apply_all(&[book_msg("A", dec!(100), 1), book_msg("B", dec!(200), 1)]), 1);
+    store.apply(&Message::ConnectionStatus(ConnectionStatus::Connected));
+    store.apply(&book_msg("A", dec!(101), 2));
+
+    let changes = store.changes_since(1);
+    assert_eq!(changes.version, 3);
+    assert!(!changes.resync);
+    assert!(changes.connection_status);
+    assert_eq!(changes.order_books, vec!["A".to_string()]);
+    assert_eq!(store.changes_since(0).order_books, vec!["A".to_string(), "B".to_string()]);
+    assert!(store.changes_since(3).order_books.is_empty());
+
+    // Version 1 falls out of the journal
+    store.apply_all(&[book_msg("C", dec!(300), 1), book_msg("D", dec!(400), 1)]);
+    assert!(store.changes_since(0).resync);
+    assert_eq!(store.changes_since(2).order_books, vec!["A".to_string(), "C".to_string(), "D".to_string()]);
+}
+
+#[test]
+fn test_closed_orders_leave_the_snapshot() {
+    let store = StateStore::new();
+    let order = |id: &str| {
+        let mut o = Order::new("A".to_string(), OrderSide::BUY, OrderType::LIMIT, 5, Some("100".to_string()), None, None, None, "KRX".to_string());
+        o.order_id = Some(id.to_string());
+        o.state = OrderState::NEW;
+        o
+    };
+    store.update(|txn| {
+        txn.put_order(order("filled"));
+        txn.put_order(order("canceled"));
+        txn.put_order(order("working"));
+    });
+    let before = store.version();
+
+    store.apply(&Message::Execution { order_id: "filled".to_string(), fill_qty: 5, fill_price: dec!(100) });
+    store.apply(&Message::OrderStatus {
+        order_id: "canceled".to_string(),
+        state: OrderState::CANCELED,
+        filled_qty: 0,
+        filled_price: None,
+        msg: None,
+        updated_at: 0.0,
+    });
+    store.apply(&Message::Execution { order_id: "working".to_string(), fill_qty: 2, fill_price: dec!(100) });
+
+    let snap = store.snapshot();
+    assert_eq!(snap.orders.len(), 1);
+    assert_eq!(snap.order("working").unwrap().filled_quantity, 2);
+    // Still reported as changed, so pollers learn the order closed
+    assert_eq!(store.changes_since(before).orders, vec!["canceled".to_string(), "filled".to_string(), "working".to_string()]);
+
+    let mut done = order("working");
+    done.state = OrderState::REJECTED;
+    store.update(|txn| txn.put_order(done));
+    assert!(store.snapshot().orders.is_empty());
+}
+
+#[test]
+fn test_engine_publishes_into_shared_store() {
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig { latency: Duration::from_millis(1), book_interval: Duration::from_millis(20) }));
+    adapter.add_book_generator(Box::new(StaticBook::new("005930", vec![(dec!(69900), 1000)], vec![(dec!(70000), 1000)])));
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let store = Arc::new(StateStore::new());
+    let engine = OMSEngine::with_state_store(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))), store.clone());
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    engine.start_gateway_listener(rx).unwrap();
+
+    let order = Order::new("005930".to_string(), OrderSide::BUY, OrderType::LIMIT, 2, Some("70000".to_string()), None, None, None, "KRX".to_string());
+    let order_id = engine.send_order_internal(order).unwrap();
+
+    let deadline = Instant::now() + Duration::from_secs(5);
+    loop {
+        let snap = store.snapshot();
+        // Published when sent, so once gone from the working orders it has filled
+        let filled = snap.order(&order_id).is_none();
+        if filled && snap.order_book("005930").is_some() {
+            // The fill and the position it produced are in the same version
+            assert_eq!(snap.account("default").unwrap().positions["005930"].quantity, 2);
+            break;
+        }
+        assert!(Instant::now() < deadline, "engine never published the fill");
+        thread::sleep(Duration::from_millis(5));
+    }
+    assert!(Arc::ptr_eq(&engine.state_store(), &store));
+    assert!(store.changes_since(0).orders.contains(&order_id));
+    adapter.disconnect().unwrap();
+}
+
+#[test]
+fn test_client_shares_the_engine_store() {
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig { latency: Duration::from_millis(1), book_interval: Duration::from_millis(20) }));
+    adapter.add_book_generator(Box::new(StaticBook::new("005930", vec![(dec!(69900), 1000)], vec![(dec!(70000), 1000)])));
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::new(adapter.clone(), Arc::new(Mutex::new(Logger::new(config))));
+    let (tx, rx) = mpsc::channel();
+    adapter.set_monitor(tx);
+    engine.start_gateway_listener(rx).unwrap();
+    let client = Client::with_engine(engine.clone(), 16).unwrap();
+    assert!(Arc::ptr_eq(&client.state_store(), &engine.state_store()));
+
+    // Placed through the client, filled and booked by the engine
+    let mut order = Order::new("005930".to_string(), OrderSide::BUY, OrderType::LIMIT, 2, Some("70000".to_string()), None, None, None, "KRX".to_string());
+    order.order_id = Some("via-client".to_string());
+    assert!(client.place_order_internal(order).unwrap());
+
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while engine.get_order("via-client").map(|o| o.state) != Some(OrderState::FILLED) {
+        assert!(Instant::now() < deadline, "order never filled");
+        thread::sleep(Duration::from_millis(5));
+    }
+    assert!(client.orders().is_empty());
+    let book = engine.order_book("005930").unwrap();
+    assert!(Arc::ptr_eq(&book, &client.state_store().snapshot().order_book("005930").unwrap()));
+    adapter.disconnect().unwrap();
+}
@@ -0,0 +1,154 @@
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::OrderBook;
+use didius::strategy::base::{Strategy, StrategyAction};
+use didius::strategy::registry::StrategyRegistry;
+use didius::strategy::stop::StopStrategy;
+use rust_decimal::Decimal;
+
+fn stop(order_id: &str, symbol: &str, trigger: i64) -> Box<StopStrategy> {
+    Box::new(StopStrategy::new(
+        order_id.to_string(),
+        symbol.to_string(),
+        OrderSide::BUY,
+        1,
+        OrderSide::BUY,
+        Decimal::new(trigger, 0),
+        0.0,
+        None,
+    ))
+}
+
+fn book(symbol: &str, best_bid: i64) -> OrderBook {
+    let mut b = OrderBook::new(symbol.to_string());
+    b.rebuild(vec![(Decimal::new(best_bid, 0), 1)], vec![(Decimal::new(best_bid + 1, 0), 1)], 1, 1.0);
+    b
+}
+
+#[test]
+fn test_book_update_only_reaches_symbol() {
+    let mut registry = StrategyRegistry::new();
+    registry.add(stop("A1", "AAA", 100));
+    registry.add(stop("B1", "BBB", 100));
+    
+    // Both stops would trigger on this book, but only the AAA stop is evaluated
+    let actions = registry.dispatch_symbol("AAA", |s| s.on_order_book_update(&book("AAA", 200)));
+    assert_eq!(actions.len(), 1);
+    assert!(matches!(&actions[0], StrategyAction::ModifyPrice(oid, None) if oid == "A1"));
+    
+    assert!(registry.dispatch_symbol("CCC", |s| s.on_order_book_update(&book("CCC", 200))).is_empty());
+}
+
+#[test]
+fn test_order_update_only_reaches_owner_and_removes_completed() {
+    let mut registry = StrategyRegistry::new();
+    registry.add(stop("A1", "AAA", 100));
+    registry.add(stop("A2", "AAA", 100));
+    assert_eq!(registry.len(), 2);
+    
+    let mut order = Order::new("AAA".to_string(), OrderSide::BUY, OrderType::LIMIT, 1, None, None, None, None, "KRX".to_string());
+    order.order_id = Some("A2".to_string());
+    order.state = OrderState::FILLED;
+    
+    let actions = registry.dispatch_order("A2", |s| s.on_order_status_update(&order));
+    assert_eq!(actions.len(), 1);
+    assert!(matches!(&actions[0], StrategyAction::RemoveOrder(oid) if oid == "A2"));
+    
+    // Completed strategy is dropped from every index
+    assert_eq!(registry.len(), 1);
+    assert_eq!(registry.origin_order_ids(), vec!["A1".to_string()]);
+    assert!(registry.dispatch_order("A2", |s| s.on_order_status_update(&order)).is_empty());
+}
+
+#[test]
+fn test_slots_are_reused() {
+    let mut registry = StrategyRegistry::new();
+    let first = registry.add(stop("A1", "AAA", 100));
+    registry.dispatch_symbol("AAA", |s| s.on_order_book_update(&book("AAA", 200)));
+    let mut order = Order::new("AAA".to_string(), OrderSide::BUY, OrderType::LIMIT, 1, None, None, None, None, "KRX".to_string());
+    order.order_id = Some("A1".to_string());
+    order.state = OrderState::FILLED;
+    registry.dispatch_order("A1", |s| s.on_order_status_update(&order));
+    assert!(registry.is_empty());
+    
+    let second = registry.add(stop("A3", "AAA", 100));
+    assert_eq!(first, second);
+}
+
+#[test]
+fn test_timer_fires_only_when_due() {
+    let mut registry = StrategyRegistry::new();
+    let timed = StopStrategy::new(
+        "T1".to_string(),
+        "AAA".to_string(),
+        OrderSide::SELL,
+        1,
+        OrderSide::SELL,
+        Decimal::ZERO,
+        1_000.5,
+        None,
+    );
+    assert_eq!(timed.next_deadline(), Some(1_000.5));
+    registry.add(Box::new(timed));
+    registry.add(stop("A1", "AAA", 100)); // no time trigger
+    assert!(registry.take_timer_changed());
+    assert_eq!(registry.next_deadline(), Some(1_000.5));
+    
+    // Not due yet
+    assert!(registry.fire_due_timers(1_000.0).is_empty());
+    
+    // StopStrategy compares against the wall clock, which is far past 1000.5
+    let actions = registry.fire_due_timers(1_000.5);
+    assert_eq!(actions.len(), 1);
+    assert!(matches!(&actions[0], StrategyAction::ModifyPrice(oid, None) if oid == "T1"));
+    
+    // Triggered stop no longer has a deadline; nothing left to sleep on
+    assert_eq!(registry.next_deadline(), None);
+}
+
+// Fires once, at `deadline`, and only if the registry calls it on time
+struct Deadline {
+    deadline: f64,
+    fired: bool,
+}
+
+impl Strategy for Deadline {
+    fn on_order_book_update(&mut self, _book: &OrderBook) -> anyhow::Result<StrategyAction> {
+        Ok(StrategyAction::None)
+    }
+
+    fn on_trade_update(&mut self, _price: f64) -> anyhow::Result<StrategyAction> {
+        Ok(StrategyAction::None)
+    }
+
+    fn on_timer(&mut self) -> anyhow::Result<StrategyAction> {
+        self.fired = true;
+        Ok(StrategyAction::CancelOrder("D1".to_string()))
+    }
+
+    fn next_deadline(&self) -> Option<f64> {
+        if self.fired { None } else { Some(self.deadline) }
+    }
+}
+
+#[test]
+fn test_timer_does_not_fire_before_sub_microsecond_deadline() {
+    let mut registry = StrategyRegistry::new();
+    // 0.4us past a whole microsecond
+    registry.add(Box::new(Deadline { deadline: 1_000.000_000_4, fired: false }));
+    assert!(registry.next_deadline().unwrap() >= 1_000.000_000_4);
+
+    // Same microsecond when rounded, but still before the deadline
+    assert!(registry.fire_due_timers(1_000.000_000_1).is_empty());
+    assert_eq!(registry.fire_due_timers(1_000.000_001).len(), 1);
+    assert_eq!(registry.next_deadline(), None);
+}
+
+#[test]
+fn test_bbo_only_strategies_skip_depth_updates() {
+    let mut registry = StrategyRegistry::new();
+    registry.add(stop("A1", "AAA", 100));
+
+    // Top of book unchanged: the stop is not evaluated even though it would trigger
+    assert!(registry.dispatch_book("AAA", false, |s| s.on_order_book_update(&book("AAA", 200))).is_empty());
+    assert_eq!(registry.dispatch_book("AAA", true, |s| s.on_order_book_update(&book("AAA", 200))).len(), 1);
+}
@@ -0,0 +1,104 @@
+use didius::adapter::matching::StaticBook;
+use didius::adapter::mock::{MockAdapter, MockConfig};
+use didius::adapter::Adapter;
+use didius::logger::config::{LogDestinationInfo, LoggerConfig};
+use didius::logger::Logger;
+use didius::oms::consolidated::ConsolidatedBook;
+use didius::oms::engine::OMSEngine;
+use didius::oms::order::{Order, OrderSide, OrderState, OrderType};
+use didius::oms::order_book::{OrderBookDelta, OrderBookSnapshot};
+use rust_decimal::dec;
+use std::sync::{mpsc, Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+
+fn snapshot(bids: Vec<(rust_decimal::Decimal, i64)>, asks: Vec<(rust_decimal::Decimal, i64)>, ts: f64) -> OrderBookSnapshot {
+    OrderBookSnapshot { symbol: "X".to_string(), bids, asks, update_id: 1, timestamp: ts }
+}
+
+#[test]
+fn test_consolidated_book_merges_incrementally() {
+    let mut book = ConsolidatedBook::new("X");
+    book.apply_snapshot("KRX", &snapshot(vec![(dec!(100), 5), (dec!(99), 3)], vec![(dec!(101), 4)], 1.0));
+    let delta = book.apply_snapshot("NXT", &snapshot(vec![(dec!(100), 2)], vec![(dec!(100.5), 1)], 2.0));
+
+    // Only the levels NXT touched, with merged quantities
+    assert_eq!(delta.bids, vec![(dec!(100), 7)]);
+    assert_eq!(delta.asks, vec![(dec!(100.5), 1)]);
+    assert_eq!(book.merged().bids.get(&dec!(99)), Some(&3));
+    let bbo = book.bbo();
+    assert_eq!(bbo.bid, Some((dec!(100), 7)));
+    assert_eq!(bbo.bid_venue.as_deref(), Some("KRX"));
+    assert_eq!(bbo.ask, Some((dec!(100.5), 1)));
+    assert_eq!(book.best_venue(&OrderSide::BUY), Some("NXT"));
+
+    let lifted = OrderBookDelta { symbol: "X".to_string(), bids: vec![], asks: vec![(dec!(100.5), 0)], update_id: 2, timestamp: 3.0 };
+    assert_eq!(book.apply_delta("NXT", &lifted).asks, vec![(dec!(100.5), 0)]);
+    assert_eq!(book.best_venue(&OrderSide::BUY), Some("KRX"));
+    // Stale delta from a venue is ignored
+    let stale = OrderBookDelta { symbol: "X".to_string(), bids: vec![(dec!(98), 1)], asks: vec![], update_id: 0, timestamp: 0.5 };
+    assert!(book.apply_delta("KRX", &stale).bids.is_empty());
+
+    let gone = book.remove_venue("KRX");
+    assert_eq!(gone.bids, vec![(dec!(99), 0), (dec!(100), 2)]);
+    assert_eq!(book.bbo().ask, None);
+    assert_eq!(book.bbo().bid_venue.as_deref(), Some("NXT"));
+}
+
+fn venue(ask: rust_decimal::Decimal) -> Arc<MockAdapter> {
+    let adapter = Arc::new(MockAdapter::with_config(MockConfig { latency: Duration::from_millis(1), book_interval: Duration::from_millis(20) }));
+    adapter.add_book_generator(Box::new(StaticBook::new("005930", vec![(dec!(69800), 100)], vec![(ask, 100)])));
+    adapter
+}
+
+fn wait_until(mut f: impl FnMut() -> bool) {
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while !f() {
+        assert!(Instant::now() < deadline, "timed out");
+        thread::sleep(Duration::from_millis(5));
+    }
+}
+
+#[test]
+fn test_engine_routes_by_exchange_and_best_price() {
+    let (krx, nxt) = (venue(dec!(70000)), venue(dec!(69900)));
+    let config = LoggerConfig {
+        destination: LogDestinationInfo::Console,
+        ..Default::default()
+    };
+    let engine = OMSEngine::with_venues(
+        vec![("KRX".to_string(), krx.clone() as Arc<dyn Adapter>), ("NXT".to_string(), nxt.clone() as Arc<dyn Adapter>)],
+        Arc::new(Mutex::new(Logger::new(config))),
+    )
+    .unwrap();
+    let (tx, rx) = mpsc::channel();
+    engine.router().unwrap().set_monitor(tx);
+    engine.start_gateway_listener(rx).unwrap();
+    wait_until(|| engine.consolidated_bbo("005930").and_then(|b| b.ask_venue) == Some("NXT".to_string()));
+
+    // The engine's book is the sum of both venues
+    wait_until(|| engine.get_order_book("005930").map(|b| b.bids.get(&dec!(69800)) == Some(&200)).unwrap_or(false));
+    assert_eq!(engine.venue_book("005930", "KRX").unwrap().asks.get(&dec!(70000)), Some(&100));
+
+    let order = |exchange: &str| Order::new("005930".to_string(), OrderSide::BUY, OrderType::LIMIT, 3, Some("69000".to_string()), None, None, None, exchange.to_string());
+    let explicit = engine.send_order_internal(order("KRX")).unwrap();
+    let smart = engine.send_order_internal(order("SOR")).unwrap();
+    wait_until(|| krx.resting_qty(&explicit) == Some(3) && nxt.resting_qty(&smart) == Some(3));
+    assert_eq!(nxt.resting_qty(&explicit), None);
+
+    // Cancels follow the venue the order went to
+    engine.cancel_order_internal(smart.clone()).unwrap();
+    wait_until(|| engine.get_orders()[&smart].state == OrderState::CANCELED);
+    assert_eq!(nxt.resting_qty(&smart), None);
+    assert!(engine.send_order_internal(order("CME")).is_err());
+
+    // The router forgets orders once they are canceled or fully filled
+    let router = engine.router().unwrap();
+    wait_until(|| router.routed_count() == 1);
+    let marketable = Order::new("005930".to_string(), OrderSide::BUY, OrderType::LIMIT, 3, Some("69900".to_string()), None, None, None, "NXT".to_string());
+    let filled = engine.send_order_internal(marketable).unwrap();
+    wait_until(|| engine.get_orders()[&filled].state == OrderState::FILLED);
+    wait_until(|| router.routed_count() == 1);
+    assert!(router.cancel_order(&filled).is_err());
+    router.disconnect().unwrap();
+}
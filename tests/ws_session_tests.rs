@@ -0,0 +1,194 @@
+use didius::adapter::ws_session::{Backoff, WsHandler, WsSession};
+use didius::message::ConnectionStatus;
+use serde_json::Value;
+use std::net::TcpListener;
+use std::sync::atomic::{AtomicUsize, Ordering};
+use std::sync::{Arc, Mutex};
+use std::thread;
+use std::time::{Duration, Instant};
+use tungstenite::{accept, Message};
+use url::Url;
+
+// Local WebSocket server standing in for the KIS feed.
+// Records every subscribe frame and answers each tr_type 1 with one data frame;
+// sends a PINGPONG after the first one. With `drop_first_after`, the first
+// connection is cut after that many subscribe frames.
+struct StubFeed {
+    url: Url,
+    connections: Arc<AtomicUsize>,
+    // (tr_type, tr_id, tr_key), or ("PINGPONG", "", "") for echoed pings
+    received: Arc<Mutex<Vec<(String, String, String)>>>,
+}
+
+fn start_stub() -> StubFeed {
+    start_stub_dropping(None)
+}
+
+fn start_stub_dropping(drop_first_after: Option<usize>) -> StubFeed {
+    let listener = TcpListener::bind("127.0.0.1:0").unwrap();
+    let url = Url::parse(&format!("ws://{}/tryitout/H0STCNT0", listener.local_addr().unwrap())).unwrap();
+    let connections = Arc::new(AtomicUsize::new(0));
+    let received = Arc::new(Mutex::new(Vec::new()));
+
+    let (c, r) = (connections.clone(), received.clone());
+    thread::spawn(move || {
+        for stream in listener.incoming() {
+            let stream = match stream { Ok(s) => s, Err(_) => break };
+            let conn_no = c.fetch_add(1, Ordering::SeqCst);
+            let r = r.clone();
+            thread::spawn(move || {
+                let mut ws = accept(stream).unwrap();
+                let mut pinged = false;
+                let mut subs = 0;
+                while let Ok(msg) = ws.read() {
+                    let text = match msg {
+                        Message::Text(t) => t,
+                        Message::Close(_) => break,
+                        _ => continue,
+                    };
+                    if text.contains("PINGPONG") {
+                        r.lock().unwrap().push(("PINGPONG".to_string(), String::new(), String::new()));
+                        continue;
+                    }
+                    let v: Value = serde_json::from_str(&text).unwrap();
+                    let tr_type = v["header"]["tr_type"].as_str().unwrap().to_string();
+                    let tr_id = v["body"]["input"]["tr_id"].as_str().unwrap().to_string();
+                    let tr_key = v["body"]["input"]["tr_key"].as_str().unwrap().to_string();
+                    r.lock().unwrap().push((tr_type.clone(), tr_id.clone(), tr_key.clone()));
+                    if tr_type == "1" {
+                        subs += 1;
+                        if conn_no == 0 && drop_first_after == Some(subs) {
+                            break; // drop the TCP connection without a close frame
+                        }
+                        ws.send(Message::Text(format!("0|{}|001|{}^1", tr_id, tr_key))).unwrap();
+                        if !pinged {
+                            pinged = true;
+                            ws.send(Message::Text(r#"{"header":{"tr_id":"PINGPONG","datetime":"20260101090000"}}"#.to_string())).unwrap();
+                        }
+                    }
+                }
+            });
+        }
+    });
+
+    StubFeed { url, connections, received }
+}
+
+struct Collect(Arc<Mutex<Vec<String>>>, Arc<Mutex<Vec<ConnectionStatus>>>);
+
+impl Collect {
+    fn new(frames: &Arc<Mutex<Vec<String>>>) -> Self {
+        Collect(frames.clone(), Arc::new(Mutex::new(Vec::new())))
+    }
+}
+
+impl WsHandler for Collect {
+    fn on_text(&mut self, text: &str) {
+        self.0.lock().unwrap().push(text.to_string());
+    }
+
+    fn on_status(&mut self, status: ConnectionStatus) {
+        self.1.lock().unwrap().push(status);
+    }
+}
+
+fn wait_until(mut cond: impl FnMut() -> bool) {
+    let deadline = Instant::now() + Duration::from_secs(5);
+    while !cond() {
+        assert!(Instant::now() < deadline, "timed out");
+        thread::sleep(Duration::from_millis(10));
+    }
+}
+
+#[test]
+fn test_session_multiplexes_subscriptions() {
+    let stub = start_stub();
+    let frames = Arc::new(Mutex::new(Vec::new()));
+    let session = WsSession::start(stub.url.clone(), "key".to_string(), Collect::new(&frames)).unwrap();
+
+    session.subscribe("H0MFCNI0", "htsid");
+    for symbol in ["101W09", "101W12", "105W09"] {
+        assert!(session.subscribe("H0MFCNT0", symbol));
+        assert!(session.subscribe("H0MFASP0", symbol));
+    }
+    // Already subscribed: no second frame
+    assert!(!session.subscribe("H0MFCNT0", "101W09"));
+    assert!(!session.subscribe("H0MFCNI0", "htsid"));
+
+    wait_until(|| frames.lock().unwrap().len() == 7);
+    assert!(session.unsubscribe("H0MFCNT0", "105W09"));
+    assert!(session.unsubscribe("H0MFASP0", "105W09"));
+    assert!(!session.unsubscribe("H0MFASP0", "105W09"));
+    wait_until(|| stub.received.lock().unwrap().iter().filter(|(t, _, _)| t == "2").count() == 2);
+
+    // Later subscribes reuse the same connection
+    assert!(session.subscribe("H0MFCNT0", "105W12"));
+    wait_until(|| frames.lock().unwrap().len() == 8);
+
+    assert_eq!(stub.connections.load(Ordering::SeqCst), 1);
+    let received = stub.received.lock().unwrap().clone();
+    let subs: Vec<_> = received.iter().filter(|(t, _, _)| t == "1").collect();
+    assert_eq!(subs.len(), 8);
+    assert_eq!(subs.iter().filter(|(_, id, _)| id == "H0MFCNI0").count(), 1);
+    let unsubs: Vec<_> = received.iter().filter(|(t, _, _)| t == "2").map(|(_, id, key)| (id.as_str(), key.as_str())).collect();
+    assert!(unsubs.contains(&("H0MFCNT0", "105W09")));
+    assert!(unsubs.contains(&("H0MFASP0", "105W09")));
+
+    // PINGPONG is answered by the session, not passed to the handler
+    assert_eq!(received.iter().filter(|(t, _, _)| t == "PINGPONG").count(), 1);
+    assert!(frames.lock().unwrap().iter().all(|f| f.starts_with("0|")));
+    assert_eq!(session.subscriptions().len(), 6);
+
+    session.stop();
+    assert!(!session.is_running());
+}
+
+#[test]
+fn test_session_sends_pending_subscriptions_on_connect() {
+    let stub = start_stub();
+    let frames = Arc::new(Mutex::new(Vec::new()));
+    let session = WsSession::start(stub.url.clone(), "key".to_string(), Collect::new(&frames)).unwrap();
+    // Registered before the handshake finishes
+    session.subscribe("H0MFCNT0", "101W09");
+    session.subscribe("H0MFASP0", "101W09");
+
+    wait_until(|| frames.lock().unwrap().len() == 2);
+    thread::sleep(Duration::from_millis(100));
+    assert_eq!(stub.received.lock().unwrap().iter().filter(|(t, _, _)| t == "1").count(), 2);
+    session.stop();
+}
+
+#[test]
+fn test_session_reconnects_and_resubscribes() {
+    let stub = start_stub_dropping(Some(3));
+    let frames = Arc::new(Mutex::new(Vec::new()));
+    let handler = Collect::new(&frames);
+    let statuses = handler.1.clone();
+    let backoff = Backoff { initial: Duration::from_millis(20), max: Duration::from_millis(100) };
+    let session = WsSession::start_with_backoff(stub.url.clone(), "key".to_string(), handler, backoff).unwrap();
+
+    session.subscribe("H0STCNI0", "htsid");
+    session.subscribe("H0SCCNT0", "005930");
+    session.subscribe("H0UNASP0", "005930");
+
+    // First connection is cut on the third subscribe; the second gets all three again
+    wait_until(|| frames.lock().unwrap().len() >= 5);
+    assert_eq!(stub.connections.load(Ordering::SeqCst), 2);
+    assert_eq!(stub.received.lock().unwrap().iter().filter(|(t, _, _)| t == "1").count(), 6);
+
+    // Subscriptions added after the reconnect go out on the new connection
+    session.subscribe("H0SCCNT0", "000660");
+    wait_until(|| frames.lock().unwrap().iter().any(|f| f.contains("000660")));
+
+    session.stop();
+    assert_eq!(
+        *statuses.lock().unwrap(),
+        vec![
+            ConnectionStatus::Connecting,
+            ConnectionStatus::Connected,
+            ConnectionStatus::Reconnecting,
+            ConnectionStatus::Connected,
+            ConnectionStatus::Disconnected,
+        ]
+    );
+}